@@ -3,7 +3,9 @@ import logging
 import os
 import pickle
 from flask import Flask, request, jsonify
+from sqlalchemy import inspect
 from app.extensions import db, migrate
+from app.decision_log import setup_decision_log
 from app.logging_config import setup_logging
 from app.algorithms.flat_prob import FlatProbRLAlgorithm
 from app.algorithms.empirical_bayes import ThreeAgentEmpiricalBayesAlgorithm
@@ -16,12 +18,21 @@ from app.algorithms.random_baseline import RandomBaselineAlgorithm
 from app.algorithms.always_send import AlwaysSendAlgorithm
 from app.algorithms.always_none import AlwaysNoneAlgorithm
 from app.deterministic_sampler import DeterministicSampleStream
-from app.models import Action, ModelParameters
+from app.json_codec import init_json_codec
+from app.metrics import init_metrics
+from app.online_posterior import init_online_updates
+from app.speculation import init_speculation
+from app.standardization import init_baseline_cache
+from app.models import DEFAULT_STUDY_ID, Action, ModelParameters, StudyScoped
 
 
-def create_app(config_class="config.Config"):
+def create_app(config_class="config.Config", overrides=None):
     """
     Factory function to create and configure the Flask app.
+
+    ``overrides`` (a mapping of config keys) is applied on top of
+    ``config_class``; the /update worker process uses it to rebuild the
+    API process's exact configuration.
     """
     # Set up logging
     setup_logging()
@@ -30,6 +41,13 @@ def create_app(config_class="config.Config"):
 
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if overrides:
+        app.config.update(overrides)
+    if app.config.get("DECISION_LOG_PATH"):
+        setup_decision_log(app.config["DECISION_LOG_PATH"])
+
+    # JSON provider and JSON-column codec (must precede the engine).
+    init_json_codec(app)
 
     # Initialize database and migration extensions
     db.init_app(app)
@@ -93,11 +111,13 @@ def create_app(config_class="config.Config"):
     from app.routes.action import action_blueprint
     from app.routes.data import data_blueprint
     from app.routes.update import update_blueprint
+    from app.routes.metrics import metrics_blueprint
 
     app.register_blueprint(group_blueprint, url_prefix="/api/v1")
     app.register_blueprint(action_blueprint, url_prefix="/api/v1")
     app.register_blueprint(data_blueprint, url_prefix="/api/v1")
     app.register_blueprint(update_blueprint, url_prefix="/api/v1")
+    app.register_blueprint(metrics_blueprint, url_prefix="/api/v1")
 
     # Monitoring (Section 6 of main.tex): blueprint + CLI commands.
     # The Monitoring_Algorithm package must be on PYTHONPATH (or copied into
@@ -146,15 +166,30 @@ def create_app(config_class="config.Config"):
         return jsonify({"error": "Internal server error"}), 500
 
     with app.app_context():
+        # Request / DB / learner timing registry served at /api/v1/metrics.
+        init_metrics(app, db.engine)
+        # Rank-1 posterior folds between updates (opt-in).
+        init_online_updates(app)
+        # Decisions prepared by /upload_data ahead of /action (opt-in).
+        init_speculation(app)
+        init_baseline_cache(app)
+
         # Create tables for models
         db.create_all()
-        initialize_model_parameters(app)
-        # Restore sampler cursor to the last recorded position from the most
-        # recent Action so a server restart resumes the stream where it
-        # stopped (rather than re-consuming primitives that were already used).
-        if algo_name in ("empirical_bayes", "eb_gradient", "inf_lsvi",
-                         "inf_lsvi_pool", "hybrid_rel_pool"):
-            _restore_sampler_cursor(app)
+        unscoped = _tables_without_study_id()
+        if unscoped:
+            # Let `flask db upgrade` / `flask upgrade-schema` start.
+            app.logger.warning(
+                "Tables %s have no study_id column; run `flask db upgrade`", unscoped
+            )
+        else:
+            initialize_model_parameters(app)
+            # Restore sampler cursor to the last recorded position from the most
+            # recent Action so a server restart resumes the stream where it
+            # stopped (rather than re-consuming primitives that were already used).
+            if algo_name in ("empirical_bayes", "eb_gradient", "inf_lsvi",
+                             "inf_lsvi_pool", "hybrid_rel_pool"):
+                _restore_sampler_cursor(app)
 
     # Register CLI commands
     register_cli_commands(app)
@@ -262,6 +297,19 @@ def _restore_sampler_cursor(app) -> None:
             "Failed to restore sampler cursor from latest Action: %s", exc
         )
 
+def _tables_without_study_id() -> list[str]:
+    """Existing study-scoped tables that predate the study_id column."""
+    inspector = inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    return [
+        model.__tablename__
+        for model in db.Model.__subclasses__()
+        if issubclass(model, StudyScoped)
+        and model.__tablename__ in existing
+        and "study_id" not in {c["name"] for c in inspector.get_columns(model.__tablename__)}
+    ]
+
+
 def initialize_model_parameters(app):
     """
     Initialize the ModelParameters table with default priors if empty.
@@ -307,6 +355,8 @@ def register_cli_commands(app):
             ModelParameters,
             ThompsonSamplingParams,
             UpdateReproducibilitySnapshot,
+            UpdatePhaseProfile,
+            UpdateCheckpoint,
         )
 
         export_dir = "exports"
@@ -320,6 +370,8 @@ def register_cli_commands(app):
             ModelParameters,
             ThompsonSamplingParams,
             UpdateReproducibilitySnapshot,
+            UpdatePhaseProfile,
+            UpdateCheckpoint,
         ]
 
         for model in models:
@@ -400,11 +452,15 @@ def register_cli_commands(app):
         Idempotent schema-upgrade for in-place ADAPTS-HCT changes that arrived
         between releases.
 
-        Creates any new tables (e.g. data_uploads, standardization_baselines)
+        Creates any new tables (e.g. data_uploads, standardization_baselines, update_phase_profiles,
+        frozen_dyad_fits, update_checkpoints)
         and idempotently adds the new flat-contract columns
-        (actions.is_warmup / actions.warmup_reason, study_data.derived_at).
-        Column drops (groups.warmup, model_update_requests.callback_url) and
-        renames are handled by `flask db upgrade` (Alembic), not here.
+        (actions.is_warmup / actions.warmup_reason, study_data.derived_at)
+        and model_update_requests.sampler_window / fingerprint / resumed_from,
+        and the study_id column of every table.
+        Column drops (groups.warmup, model_update_requests.callback_url),
+        renames and the per-study unique keys are handled by
+        `flask db upgrade` (Alembic), not here.
 
         Safe to run repeatedly. Works against PostgreSQL and SQLite.
         """
@@ -422,7 +478,17 @@ def register_cli_commands(app):
             "study_data": [
                 ("derived_at", "TIMESTAMP"),
             ],
+            "model_update_requests": [
+                ("sampler_window", "JSON"),
+                ("fingerprint", "VARCHAR(64)"),
+                ("resumed_from", "VARCHAR(255)"),
+            ],
         }
+        for model in db.Model.__subclasses__():
+            if issubclass(model, StudyScoped):
+                new_columns.setdefault(model.__tablename__, []).append(
+                    ("study_id", f"VARCHAR(64) NOT NULL DEFAULT '{DEFAULT_STUDY_ID}'")
+                )
         for table_name, cols in new_columns.items():
             if table_name not in inspector.get_table_names():
                 continue
@@ -0,0 +1,116 @@
+"""
+SQL Core data access for /action.
+
+The route needs the group, the idempotency check, the dyad's latest
+upload, the latest policy row and the two warm-up counts before it can
+decide. ``fetch_decision_inputs`` reads all of them in one SELECT of
+correlated scalar subqueries (the same statement on Postgres and SQLite)
+without loading ORM instances. ``insert_action`` writes the row with
+``INSERT ... ON CONFLICT DO NOTHING`` on ``uq_action_group_type_idx``, so
+two concurrent requests for the same (group, decision_type, decision_idx)
+cannot both succeed; the pre-read flag only keeps a plain repeat from
+drawing from the sampler.
+
+The learner's own reads are batched on its side
+(``SqlRepository.load_latest_snapshots``) and its baselines are cached
+(app/standardization.py), so a posterior decision is three statements.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import exists, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Action, DataUpload, Group, ModelParameters
+
+_ACTION_KEY = ("study_id", "group_id", "decision_type", "decision_idx")
+
+
+@dataclass(frozen=True)
+class DecisionInputs:
+    group_exists: bool
+    decision_exists: bool
+    upload_id: int | None
+    upload_data: dict | None
+    model_parameters_id: int | None
+    probability_of_action: float | None
+    registered_dyads: int
+    cp_decisions: int
+
+
+def _latest(column, *criteria, order_by):
+    return select(column).where(*criteria).order_by(*order_by).limit(1).scalar_subquery()
+
+
+def fetch_decision_inputs(group_id: str, decision_type: str, decision_idx: int) -> DecisionInputs:
+    """Everything /action reads before deciding, in one statement."""
+    upload_order = (DataUpload.request_timestamp.desc(), DataUpload.id.desc())
+    policy = (ModelParameters.snapshot_type.is_(None),)
+    policy_order = (ModelParameters.timestamp.desc(),)
+    statement = select(
+        exists().where(Group.group_id == group_id).label("group_exists"),
+        exists()
+        .where(
+            Action.group_id == group_id,
+            Action.decision_type == decision_type,
+            Action.decision_idx == decision_idx,
+        )
+        .label("decision_exists"),
+        _latest(DataUpload.id, DataUpload.group_id == group_id, order_by=upload_order).label(
+            "upload_id"
+        ),
+        _latest(DataUpload.data, DataUpload.group_id == group_id, order_by=upload_order).label(
+            "upload_data"
+        ),
+        _latest(ModelParameters.id, *policy, order_by=policy_order).label("model_parameters_id"),
+        _latest(ModelParameters.probability_of_action, *policy, order_by=policy_order).label(
+            "probability_of_action"
+        ),
+        select(func.count(Group.id)).scalar_subquery().label("registered_dyads"),
+        select(func.count(Action.id))
+        .where(Action.group_id == group_id, Action.decision_type == "cp_message")
+        .scalar_subquery()
+        .label("cp_decisions"),
+    )
+    row = db.session.execute(statement).one()
+    return DecisionInputs(
+        group_exists=bool(row.group_exists),
+        decision_exists=bool(row.decision_exists),
+        upload_id=row.upload_id,
+        upload_data=row.upload_data,
+        model_parameters_id=row.model_parameters_id,
+        probability_of_action=row.probability_of_action,
+        registered_dyads=int(row.registered_dyads),
+        cp_decisions=int(row.cp_decisions),
+    )
+
+
+def _insert_ignoring_duplicates(table, dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=_ACTION_KEY)
+
+
+def insert_action(values: dict) -> bool:
+    """
+    Insert one actions row; False if (group_id, decision_type,
+    decision_idx) already exists. Does not commit.
+    """
+    table = Action.__table__
+    statement = _insert_ignoring_duplicates(table, db.session.get_bind().dialect.name)
+    if statement is None:
+        # No ON CONFLICT clause: let the unique constraint reject the row.
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table).values(**values))
+        except IntegrityError:
+            return False
+        return True
+    return db.session.execute(statement.values(**values)).rowcount == 1
@@ -12,14 +12,15 @@ from app.logging_config import get_rl_logger
 from app.protocol import (
     compute_reward, encode_state, validate_context, validate_outcome,
 )
-from app.standardization import fetch_baselines
+from app.repository import SqlRepository
 
 
 class AlwaysNoneAlgorithm(RLAlgorithm):
     """Returns (action=0, action_prob=1.0) on every call."""
 
-    def __init__(self, seed: int | None = None):
+    def __init__(self, seed: int | None = None, repository=None):
         super().__init__(seed)
+        self.repository = repository if repository is not None else SqlRepository()
         self.logger = get_rl_logger()
         self.seed = seed
         self.logger.info("AlwaysNone (action=0) initialized.")
@@ -36,7 +37,7 @@ class AlwaysNoneAlgorithm(RLAlgorithm):
         if not valid:
             return False, msg
         group_id = context.get("group_id")
-        baselines = fetch_baselines(group_id, decision_type) if group_id else None
+        baselines = self.repository.fetch_baselines(group_id, decision_type) if group_id else None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id, state, action, outcome):
@@ -25,6 +25,41 @@ class RLAlgorithm(ABC):
         """
         pass
 
+    def frozen_decision_types(self) -> frozenset:
+        """
+        Decision types for which completed dyads can be served from the
+        frozen-dyad archive (app/frozen_archive.py) instead of their
+        study_data rows. The default is none: every row is loaded on /update.
+        """
+        return frozenset()
+
+    def prepare_action(self, group_id, state, parameters, decision_type, decision_idx):
+        """
+        Everything get_action does before its random draw, without touching
+        the sampler: return (probability of action 1, random_state fields),
+        or None when the decision cannot be prepared ahead (warm-up, or a
+        learner without a draw-only path, which is the default). Used by the
+        speculative decisions of /upload_data (app/speculation.py).
+        """
+        return None
+
+    def draw_prepared_action(self, group_id, decision_type, decision_idx, prob_action_1, random_state) -> tuple:
+        """
+        Finish a prepared decision: draw the action and return it like
+        get_action does. Drawing from prepare_action's output must give the
+        same decision as calling get_action.
+        """
+        raise NotImplementedError
+
+    def online_update(self, group_id, decision_type, record):
+        """
+        Fold one newly finalized reward (record: decision_idx, raw_context,
+        action, reward) into the cached posterior between updates; see
+        app/online_posterior.py. Return the new online version, or None when
+        nothing was folded (already applied, or unsupported, the default).
+        """
+        return None
+
     @abstractmethod
     def make_state(self, context) -> tuple:
         """
@@ -42,18 +42,32 @@ from app.algorithms.empirical_bayes import (
     TAU_M_SQ_BY_AGENT,
     TAU_X_SQ_BY_AGENT,
     _prior_covariance,
+    _prior_precision,
+    cached_local_fit,
+    freeze_completed,
+    hyperprior_moved,
+    is_clean_dyad,
+    persist_pending_baselines,
+    shrink_to_hyperprior,
+    split_frozen,
+    stack_fits,
+    update_call_index,
+    undiscounted_decision_types,
 )
+from app.algorithms.linalg_kernels import psd_project, spd_inverse_logdet
 from app.deterministic_sampler import DeterministicSampleStream
-from app.extensions import db
-from app.feature_builder import ProtocolRLFeatureBuilder
+from app.feature_builder import feature_builder
 from app.logging_config import get_rl_logger
-from app.models import ModelParameters, StandardizationBaseline
-from app.protocol import compute_reward, encode_state, validate_context, validate_outcome
-from app.standardization import (
-    compute_week1_baselines_for_dyad,
-    fetch_baselines,
-    filter_week1_records,
+from app.online_posterior import online_overlay
+from app.profiling import iter_agent_phases
+from app.protocol import (
+    compute_reward,
+    encode_state,
+    validate_context,
+    validate_outcome,
 )
+from app.repository import SqlRepository
+from app.study_data_stream import iter_agent_dyads
 
 
 # ---------------------------------------------------------- smooth allocation
@@ -103,7 +117,7 @@ def _initial_eta(decision_type: str, tau0_sq: float) -> np.ndarray:
     location. The cold-start hyper-prior is intentionally large and
     diagonal so that for small N the EB posterior collapses to the
     per-dyad Inf-LSVI fit (Σ_0⁻¹ ≪ Σ̂_i⁻¹ in the posterior shrinkage)."""
-    fb = ProtocolRLFeatureBuilder(decision_type)
+    fb = feature_builder(decision_type)
     return np.full(fb.phi_dim, np.log(float(tau0_sq)), dtype=np.float64)
 
 
@@ -147,11 +161,14 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         seed: int | None = None,
         app=None,
         sampler: DeterministicSampleStream | None = None,
+        repository=None,
     ):
         super().__init__(seed)
         self.logger = get_rl_logger()
         self.seed = seed
         self.app = app
+        # Snapshot/baseline storage; defaults to the app's database.
+        self.repository = repository if repository is not None else SqlRepository(app)
         if sampler is None:
             raise ValueError(
                 "ThreeAgentEmpiricalBayesGradientAlgorithm requires a "
@@ -202,10 +219,6 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         decision_idx: int,
     ) -> tuple[int, float, dict]:
         try:
-            state_vec = np.asarray(state, dtype=np.float64)
-            fb = ProtocolRLFeatureBuilder(decision_type)
-            phi_dim = fb.phi_dim
-
             if self._is_warmup(group_id, decision_type, decision_idx):
                 cursor_start = self.sampler.cursor()
                 action = int(self.sampler.draw_bernoulli(0.5))
@@ -222,99 +235,124 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
                 )
                 return action, 0.5, random_state
 
-            posterior = self._load_latest_snapshot(
-                "posterior", decision_type, group_id=group_id
-            )
-            hyper = self._load_latest_snapshot("hyper", decision_type)
-
-            if posterior is not None and len(posterior.theta) == phi_dim:
-                mean = np.asarray(posterior.theta, dtype=np.float64)
-                cov = np.asarray(posterior.covariance, dtype=np.float64)
-                source = "posterior"
-            elif hyper is not None and len(hyper.theta) == phi_dim:
-                mean = np.asarray(hyper.theta, dtype=np.float64)
-                cov = np.asarray(hyper.covariance, dtype=np.float64)
-                source = "hyper"
-            else:
-                mean = np.zeros(phi_dim, dtype=np.float64)
-                cov = _prior_covariance(decision_type)
-                source = "prior"
-
-            cov = self._stabilize_covariance(cov)
-
-            phi0 = fb.expand_base_to_phi(state_vec, 0)
-            phi1 = fb.expand_base_to_phi(state_vec, 1)
-            dphi = phi1 - phi0
-            m = float(dphi @ mean)
-            v = float(dphi @ cov @ dphi)
-
-            prob_action_1 = smooth_allocation_prob(
-                m, v, self.z_bank,
-                lmin=self.lmin, lmax=self.lmax,
-                c=self.c, b=self.b, k=self.k,
+            prob_action_1, random_state = self.prepare_action(
+                group_id, state, parameters, decision_type, decision_idx
             )
-
-            cursor_start = self.sampler.cursor()
-            action = int(self.sampler.draw_bernoulli(prob_action_1))
-            cursor_end = self.sampler.cursor()
-            prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
-
-            random_state = {
-                "mode": "smooth_logistic",
-                "source": source,
-                "m": m,
-                "v": v,
-                "sampler_cursor_start": cursor_start,
-                "sampler_cursor_end": cursor_end,
-            }
-
-            self.logger.info(
-                "EBG action=%d group_id=%s decision_type=%s decision_idx=%d "
-                "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
-                action, group_id, decision_type, decision_idx,
-                prob, m, v, source, cursor_end,
+            return self.draw_prepared_action(
+                group_id, decision_type, decision_idx, prob_action_1, random_state
             )
-            return action, float(prob), random_state
         except Exception as exc:
             self.logger.error("EB-Gradient action selection failed: %s", exc)
             raise
 
+    def prepare_action(
+        self,
+        group_id: str,
+        state,
+        parameters: dict,
+        decision_type: str,
+        decision_idx: int,
+    ) -> tuple[float, dict] | None:
+        if self._is_warmup(group_id, decision_type, decision_idx):
+            return None
+        state_vec = np.asarray(state, dtype=np.float64)
+        fb = feature_builder(decision_type)
+
+        mean, cov, source, base_id = self._current_posterior(group_id, decision_type)
+        mean, cov, online = online_overlay(
+            self.app, decision_type, group_id, base_id, mean, cov
+        )
+        cov = self._stabilize_covariance(cov)
+
+        phi0 = fb.expand_base_to_phi(state_vec, 0)
+        phi1 = fb.expand_base_to_phi(state_vec, 1)
+        dphi = phi1 - phi0
+        m = float(dphi @ mean)
+        v = float(dphi @ cov @ dphi)
+
+        prob_action_1 = smooth_allocation_prob(
+            m, v, self.z_bank,
+            lmin=self.lmin, lmax=self.lmax,
+            c=self.c, b=self.b, k=self.k,
+        )
+        random_state = {"mode": "smooth_logistic", "source": source, "m": m, "v": v, **online}
+        return prob_action_1, random_state
+
+    def online_update(self, group_id: str, decision_type: str, record: dict) -> int | None:
+        store = getattr(self.app, "online_posteriors", None)
+        if store is None:
+            return None
+        mean, cov, _, base_id = self._current_posterior(group_id, decision_type)
+        baselines = self.repository.fetch_baselines(group_id, decision_type) or None
+        phi = feature_builder(decision_type).phi(
+            record["raw_context"], int(record["action"]), baselines=baselines
+        )
+        return store.fold(
+            decision_type, group_id, base_id, mean, cov, phi,
+            float(record["reward"]), SIGMA_NOISE**2, int(record["decision_idx"]),
+        )
+
+    def draw_prepared_action(
+        self,
+        group_id: str,
+        decision_type: str,
+        decision_idx: int,
+        prob_action_1: float,
+        random_state: dict,
+    ) -> tuple[int, float, dict]:
+        cursor_start = self.sampler.cursor()
+        action = int(self.sampler.draw_bernoulli(prob_action_1))
+        cursor_end = self.sampler.cursor()
+        prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
+
+        random_state = {
+            **random_state,
+            "sampler_cursor_start": cursor_start,
+            "sampler_cursor_end": cursor_end,
+        }
+
+        self.logger.info(
+            "EBG action=%d group_id=%s decision_type=%s decision_idx=%d "
+            "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
+            action, group_id, decision_type, decision_idx,
+            prob, random_state["m"], random_state["v"], random_state["source"], cursor_end,
+        )
+        return action, float(prob), random_state
+
     # ------------------------------------------------------------------ update
 
     def update(self, old_params: dict, data: dict) -> tuple[bool, dict]:
         try:
-            records = data.get("records", [])
-            if not records:
-                return True, {
-                    "probability_of_action": old_params.get("probability_of_action", 0.5)
-                }
-
-            grouped: dict[str, dict[str, list[dict]]] = defaultdict(
-                lambda: defaultdict(list)
-            )
-            for record in records:
-                grouped[record["decision_type"]][record["group_id"]].append(record)
-
-            for decision_type, group_records in grouped.items():
-                self._update_call_counts[decision_type] += 1
+            for decision_type, dyads in iter_agent_phases(data, iter_agent_dyads(data)):
+                prev_hyper = self._load_latest_snapshot("hyper", decision_type)
+                self._update_call_counts[decision_type] = update_call_index(
+                    self.repository, prev_hyper, self._update_call_counts[decision_type]
+                )
                 local_fits: dict[str, dict] = {}
+                feature_dim = feature_builder(decision_type).phi_dim
+                frozen, dyads = split_frozen(self.repository, decision_type, dyads)
+                persist_pending_baselines(self.repository, decision_type, data)
 
-                for group_id, rows in group_records.items():
+                for group_id, rows in dyads:
                     ordered_rows = sorted(
                         rows, key=lambda row: row["agent_decision_index"]
                     )
-                    self._maybe_persist_baselines(group_id, decision_type, ordered_rows)
-                    baselines = fetch_baselines(group_id, decision_type)
-
                     previous = self._load_latest_snapshot(
                         "local_fit", decision_type, group_id=group_id
                     )
+                    if is_clean_dyad(previous, decision_type, ordered_rows, feature_dim):
+                        local_fits[group_id] = cached_local_fit(previous)
+                        continue
+
+                    baselines = self.repository.fetch_baselines(group_id, decision_type)
+
                     fit_summary = self._fit_local_model(
                         decision_type, ordered_rows, previous, baselines
                     )
                     fit_summary["agent_decision_index"] = ordered_rows[-1][
                         "agent_decision_index"
                     ]
+                    fit_summary["refit"] = True
                     local_fits[group_id] = fit_summary
                     self._save_snapshot(
                         snapshot_type="local_fit",
@@ -332,13 +370,42 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
                         },
                     )
 
+                if not local_fits:
+                    continue  # every dyad is frozen: nothing can move the pool
+
                 max_agent_index = max(
                     fit["agent_decision_index"] for fit in local_fits.values()
                 )
                 if self._is_eb_refresh_point(decision_type):
                     eb_mean, eb_cov, opt_log = self._estimate_hyperparameters(
-                        local_fits, decision_type
+                        local_fits, decision_type, frozen
                     )
+                    moved = hyperprior_moved(prev_hyper, eb_mean, eb_cov)
+                    if moved:
+                        self._save_snapshot(
+                            snapshot_type="hyper",
+                            decision_type=decision_type,
+                            agent_decision_index=max_agent_index,
+                            group_id=None,
+                            sample_size=len(local_fits),
+                            theta=eb_mean.tolist(),
+                            covariance=eb_cov.tolist(),
+                            perturbation=None,
+                            metadata_json={
+                                "active_groups": len(local_fits),
+                                "frozen_groups": len(frozen) if frozen is not None else 0,
+                                "update_call_index": self._update_call_counts[decision_type],
+                                "update_id": data.get("update_id"),
+                                "map_loglik_final": opt_log["loglik_final"],
+                                "map_iterations": opt_log["iterations"],
+                                "tau_sq_diag": np.exp(opt_log["eta_final"]).tolist(),
+                            },
+                        )
+                elif prev_hyper is None:
+                    eb_mean, eb_cov, _ = self._estimate_hyperparameters(
+                        local_fits, decision_type, frozen
+                    )
+                    moved = True
                     self._save_snapshot(
                         snapshot_type="hyper",
                         decision_type=decision_type,
@@ -350,48 +417,35 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
                         perturbation=None,
                         metadata_json={
                             "active_groups": len(local_fits),
+                            "frozen_groups": len(frozen) if frozen is not None else 0,
                             "update_call_index": self._update_call_counts[decision_type],
-                            "map_loglik_final": opt_log["loglik_final"],
-                            "map_iterations": opt_log["iterations"],
-                            "tau_sq_diag": np.exp(opt_log["eta_final"]).tolist(),
+                            "update_id": data.get("update_id"),
+                            "bootstrap": True,
                         },
                     )
                 else:
-                    prev_hyper = self._load_latest_snapshot("hyper", decision_type)
-                    if prev_hyper is None:
-                        eb_mean, eb_cov, _ = self._estimate_hyperparameters(
-                            local_fits, decision_type
-                        )
-                        self._save_snapshot(
-                            snapshot_type="hyper",
-                            decision_type=decision_type,
-                            agent_decision_index=max_agent_index,
-                            group_id=None,
-                            sample_size=len(local_fits),
-                            theta=eb_mean.tolist(),
-                            covariance=eb_cov.tolist(),
-                            perturbation=None,
-                            metadata_json={
-                                "active_groups": len(local_fits),
-                                "update_call_index": self._update_call_counts[decision_type],
-                                "bootstrap": True,
-                            },
-                        )
-                    else:
-                        eb_mean = np.asarray(prev_hyper.theta, dtype=np.float64)
-                        eb_cov = np.asarray(prev_hyper.covariance, dtype=np.float64)
+                    eb_mean = np.asarray(prev_hyper.theta, dtype=np.float64)
+                    eb_cov = np.asarray(prev_hyper.covariance, dtype=np.float64)
+                    moved = False
 
                 # Per-dyad posterior is the Gaussian product of the Inf-LSVI
                 # local fit (θ̂_i, Σ̂_i) and the EB hyperprior (θ̂_0, Σ̂_0) —
                 # exactly the formula used by the MoM+anchor version, but with
                 # (θ̂_0, Σ̂_0) coming from the gradient-descent MAP above.
-                for group_id, fit_summary in local_fits.items():
-                    post_mean, post_cov = self._shrink_to_hyperprior(
-                        fit_summary["theta_hat"],
-                        fit_summary["covariance"],
-                        eb_mean,
-                        eb_cov,
+                stale = {
+                    group_id: fit_summary
+                    for group_id, fit_summary in local_fits.items()
+                    if not self._posterior_is_current(decision_type, group_id, fit_summary, moved)
+                }
+                # Shrink every stale dyad in one batched call.
+                post_means = post_covs = ()
+                if stale:
+                    post_means, post_covs = self._shrink_to_hyperprior(
+                        *stack_fits(stale), eb_mean, eb_cov
                     )
+                for (group_id, fit_summary), post_mean, post_cov in zip(
+                    stale.items(), post_means, post_covs
+                ):
                     self._save_snapshot(
                         snapshot_type="posterior",
                         decision_type=decision_type,
@@ -403,6 +457,8 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
                         perturbation=None,
                         metadata_json={"update_decision_idx": fit_summary["decision_idx"]},
                     )
+                freeze_completed(self.repository, decision_type, local_fits, data)
+                self._log_refit_counts(decision_type, local_fits, moved)
 
             return True, {
                 "probability_of_action": old_params.get("probability_of_action", 0.5)
@@ -421,7 +477,7 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         group_id = context.get("group_id")
         baselines = None
         if group_id is not None:
-            baselines = fetch_baselines(group_id, decision_type) or None
+            baselines = self.repository.fetch_baselines(group_id, decision_type) or None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id: str, state, action: int, outcome: dict) -> tuple[bool, float]:
@@ -439,30 +495,71 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         "dyad_game": 1,
     }
 
+    def _current_posterior(self, group_id: str, decision_type: str):
+        """
+        ``(mean, cov, source, base_id)`` of the dyad's shrunk posterior, else
+        the hyperprior, else the prior; ``base_id`` names the snapshot read.
+        """
+        phi_dim = feature_builder(decision_type).phi_dim
+        # Both candidates in one statement.
+        posterior, hyper = self.repository.load_latest_snapshots(
+            [("posterior", decision_type, group_id), ("hyper", decision_type, None)]
+        )
+        if posterior is not None and len(posterior.theta) == phi_dim:
+            return (
+                np.asarray(posterior.theta, dtype=np.float64),
+                np.asarray(posterior.covariance, dtype=np.float64),
+                "posterior",
+                ("posterior", posterior.id),
+            )
+        if hyper is not None and len(hyper.theta) == phi_dim:
+            return (
+                np.asarray(hyper.theta, dtype=np.float64),
+                np.asarray(hyper.covariance, dtype=np.float64),
+                "hyper",
+                ("hyper", hyper.id),
+            )
+        return (
+            np.zeros(phi_dim, dtype=np.float64),
+            _prior_covariance(decision_type),
+            "prior",
+            ("prior", None),
+        )
+
     def _is_warmup(self, group_id: str, decision_type: str, decision_idx: int) -> bool:
         # Warm-up is decided server-side in the /action route (API-Spec §3.2);
         # the route draws the warm-up action and skips get_action.
         return False
 
+    def frozen_decision_types(self) -> frozenset:
+        return undiscounted_decision_types()
+
+    def _posterior_is_current(
+        self, decision_type: str, group_id: str, fit_summary: dict, hyper_moved: bool
+    ) -> bool:
+        """A clean dyad's posterior stands unless the hyperprior moved."""
+        if fit_summary["refit"] or hyper_moved:
+            return False
+        return (
+            self._load_latest_snapshot("posterior", decision_type, group_id=group_id)
+            is not None
+        )
+
+    def _log_refit_counts(self, decision_type: str, local_fits: dict, hyper_moved: bool) -> None:
+        refit = sum(1 for fit in local_fits.values() if fit["refit"])
+        self.logger.info(
+            "%s update decision_type=%s refit=%d clean=%d hyper_moved=%s",
+            type(self).__name__,
+            decision_type,
+            refit,
+            len(local_fits) - refit,
+            hyper_moved,
+        )
+
     def _is_eb_refresh_point(self, decision_type: str) -> bool:
         every = EB_REFRESH_EVERY.get(decision_type, 1)
         return (self._update_call_counts[decision_type] % every) == 0
 
-    def _maybe_persist_baselines(
-        self, group_id: str, decision_type: str, ordered_rows: list[dict]
-    ) -> None:
-        existing = (
-            StandardizationBaseline.query
-            .filter_by(group_id=group_id, decision_type=decision_type)
-            .first()
-        )
-        if existing is not None:
-            return
-        week1 = filter_week1_records(ordered_rows)
-        if not week1:
-            return
-        compute_week1_baselines_for_dyad(group_id, decision_type, week1)
-
     def _fit_local_model(
         self,
         decision_type: str,
@@ -473,7 +570,7 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         """Collect per-dyad sufficient statistics and the ridge-regularized
         flat-prior local estimator (\\hat\\theta_i, V_i). These are the
         quantities consumed by the marginal-likelihood objective."""
-        fb = ProtocolRLFeatureBuilder(decision_type)
+        fb = feature_builder(decision_type)
         feature_dim = fb.phi_dim
         base_dim = fb.base_dim
         state_dim = len(records[0].get("state", []))
@@ -510,8 +607,7 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         # anchor — the EB hyper-parameters (θ_0, Σ_0) below are estimated
         # purely from data via marginal-likelihood maximization, with no
         # shrinkage toward this anchor.
-        anchor = _prior_covariance(decision_type)
-        prior_precision = np.linalg.inv(anchor)
+        prior_precision = _prior_precision(decision_type)
         V_inv = S + prior_precision
         V = np.linalg.inv(V_inv)
         theta_hat = V @ b
@@ -536,6 +632,7 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         self,
         local_fits: dict[str, dict],
         decision_type: str,
+        frozen=None,
     ) -> tuple[np.ndarray, np.ndarray, dict]:
         """MAP on the marginal log-likelihood of the Inf-LSVI local fits
         under the hierarchical model
@@ -552,11 +649,12 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         τ_d² toward τ₀² (large) so the EB posterior collapses to the
         per-dyad Inf-LSVI fit; at N ≫ ν₀ the data dominates and we
         recover the ML estimator.
+
+        Frozen dyads (``FrozenFits``) enter the likelihood like active ones.
         """
-        thetas = [np.asarray(fit["theta_hat"], dtype=np.float64) for fit in local_fits.values()]
-        Sigmas = [self._stabilize_covariance(fit["covariance"]) for fit in local_fits.values()]
-        N = len(thetas)
-        D = thetas[0].shape[0]
+        thetas, Sigmas = stack_fits(local_fits, frozen)
+        Sigmas = psd_project(Sigmas, MIN_COV_JITTER)
+        N, D = thetas.shape
         eye = np.eye(D)
 
         tau0_sq = self.prior_tau0_sq
@@ -592,26 +690,17 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
             Sigma0 = np.diag(np.exp(eta))
 
             # GLS closed-form for θ_0 given the current Σ_0 (prior is
-            # independent of θ_0, so the GLS is unchanged).
-            W_list: list[np.ndarray] = []
-            sum_W = np.zeros((D, D), dtype=np.float64)
-            sum_W_theta = np.zeros(D, dtype=np.float64)
-            for Sigma_i, theta_i in zip(Sigmas, thetas):
-                M_i = Sigma_i + Sigma0
-                W_i = np.linalg.inv(M_i + MIN_COV_JITTER * eye)
-                W_list.append(W_i)
-                sum_W += W_i
-                sum_W_theta += W_i @ theta_i
+            # independent of θ_0, so the GLS is unchanged). W_i = M_i^{-1}
+            # and log|M_i| for all dyads come from one batched Cholesky.
+            W, logdets = spd_inverse_logdet(Sigmas + Sigma0 + MIN_COV_JITTER * eye)
+            sum_W = W.sum(axis=0)
+            sum_W_theta = np.einsum("nij,nj->i", W, thetas)
             theta0 = np.linalg.solve(sum_W + MIN_COV_JITTER * eye, sum_W_theta)
 
             # ℓ_MAP at (θ_0(Σ_0), Σ_0) for monitoring + best-found tracking.
-            ll = 0.0
-            r_list: list[np.ndarray] = []
-            for Sigma_i, theta_i, W_i in zip(Sigmas, thetas, W_list):
-                _, logdet = np.linalg.slogdet(Sigma_i + Sigma0 + MIN_COV_JITTER * eye)
-                r_i = theta_i - theta0
-                r_list.append(r_i)
-                ll += -0.5 * (logdet + float(r_i @ (W_i @ r_i)))
+            r = thetas - theta0
+            Wr = np.einsum("nij,nj->ni", W, r)
+            ll = -0.5 * float(np.sum(logdets) + np.sum(r * Wr))
             # Add log-prior on η (ignoring constants).
             ll += float(np.sum(prior_const * eta - prior_pull * np.exp(-eta)))
 
@@ -621,10 +710,8 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
                 best_theta0 = theta0.copy()
 
             # Gradient of the *profiled* ℓ_MAP w.r.t. η: data + prior.
-            grad_eta = np.zeros_like(eta)
-            for W_i, r_i in zip(W_list, r_list):
-                Wr = W_i @ r_i
-                grad_eta -= 0.5 * np.exp(eta) * (np.diag(W_i) - Wr * Wr)
+            W_diag = np.diagonal(W, axis1=1, axis2=2)
+            grad_eta = -0.5 * np.exp(eta) * np.sum(W_diag - Wr * Wr, axis=0)
             # Prior gradient: -(ν₀/2 + 1) + (ν₀ τ₀²/2) exp(-η_d).
             grad_eta += prior_const + prior_pull * np.exp(-eta)
             if not np.all(np.isfinite(grad_eta)):
@@ -666,16 +753,8 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
     ) -> tuple[np.ndarray, np.ndarray]:
         """Gaussian product of the Inf-LSVI local posterior N(θ̂_i, Σ̂_i)
         with the EB-estimated hyperprior N(θ̂_0, Σ̂_0). Same formula as
-        the MoM+anchor version — no anchor enters."""
-        local_cov = self._stabilize_covariance(local_cov)
-        eb_cov = self._stabilize_covariance(eb_cov)
-        precision = np.linalg.inv(local_cov) + np.linalg.inv(eb_cov)
-        post_cov = np.linalg.inv(precision)
-        post_mean = post_cov @ (
-            np.linalg.inv(local_cov) @ local_theta
-            + np.linalg.inv(eb_cov) @ eb_mean
-        )
-        return post_mean, self._stabilize_covariance(post_cov)
+        the MoM+anchor version — no anchor enters. Accepts a stack of dyads."""
+        return shrink_to_hyperprior(local_theta, local_cov, eb_mean, eb_cov)
 
     # ---- persistence wrappers (identical to empirical_bayes) -------------
 
@@ -691,40 +770,24 @@ class ThreeAgentEmpiricalBayesGradientAlgorithm(RLAlgorithm):
         perturbation: list[float] | None,
         metadata_json: dict | None,
     ):
-        if self.app is None:
-            return
-        with self.app.app_context():
-            snapshot = ModelParameters(
-                snapshot_type=snapshot_type,
-                group_id=group_id,
-                decision_type=decision_type,
-                agent_decision_index=agent_decision_index,
-                sample_size=sample_size,
-                feature_dim=len(theta),
-                theta=theta,
-                covariance=covariance,
-                perturbation=perturbation,
-                metadata_json=metadata_json,
-            )
-            db.session.add(snapshot)
-            db.session.commit()
+        self.repository.save_snapshot(
+            snapshot_type=snapshot_type,
+            decision_type=decision_type,
+            agent_decision_index=agent_decision_index,
+            group_id=group_id,
+            sample_size=sample_size,
+            theta=theta,
+            covariance=covariance,
+            perturbation=perturbation,
+            metadata_json=metadata_json,
+        )
 
     def _load_latest_snapshot(
         self, snapshot_type: str, decision_type: str, group_id: str | None = None
     ):
-        if self.app is None:
-            return None
-        with self.app.app_context():
-            query = ModelParameters.query.filter_by(
-                snapshot_type=snapshot_type,
-                decision_type=decision_type,
-                group_id=group_id,
-            ).order_by(ModelParameters.agent_decision_index.desc())
-            return query.first()
+        return self.repository.load_latest_snapshot(
+            snapshot_type, decision_type, group_id=group_id
+        )
 
     def _stabilize_covariance(self, cov: np.ndarray) -> np.ndarray:
-        cov = np.asarray(cov, dtype=np.float64)
-        cov = (cov + cov.T) / 2.0
-        eigvals, eigvecs = np.linalg.eigh(cov)
-        eigvals = np.maximum(eigvals, MIN_COV_JITTER)
-        return eigvecs @ np.diag(eigvals) @ eigvecs.T
+        return psd_project(cov, MIN_COV_JITTER)
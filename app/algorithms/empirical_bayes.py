@@ -23,25 +23,30 @@ the original buffer.
 from __future__ import annotations
 
 from collections import defaultdict
+from functools import lru_cache
 from typing import Any
 
 import numpy as np
 
 from app.algorithms.base import RLAlgorithm
+from app.algorithms.linalg_kernels import gaussian_product, psd_project, spd_inverse
 from app.deterministic_sampler import (
     DeterministicSampleStream,
     closed_form_action_prob,
 )
-from app.extensions import db
-from app.feature_builder import ProtocolRLFeatureBuilder, tailoring_mask
+from app.feature_builder import feature_builder
 from app.logging_config import get_rl_logger
-from app.models import ModelParameters, Group, StandardizationBaseline
-from app.protocol import compute_reward, encode_state, validate_context, validate_outcome
-from app.standardization import (
-    compute_week1_baselines_for_dyad,
-    fetch_baselines,
-    filter_week1_records,
+from app.online_posterior import online_overlay
+from app.profiling import iter_agent_phases
+from app.protocol import (
+    DECISION_TYPES,
+    compute_reward,
+    encode_state,
+    validate_context,
+    validate_outcome,
 )
+from app.repository import SqlRepository
+from app.study_data_stream import agent_week1_records, iter_agent_dyads
 
 
 # Per-agent discount factors. main.tex Algorithm 2 calls Inf-LSVI with these.
@@ -110,19 +115,196 @@ def _prior_covariance(decision_type: str) -> np.ndarray:
     Interaction block B_x: {a*I, a*v_j*I for each j} → variance τ_x² for
     tailoring variables, τ_x²/2 for prognostic variables. The shared I
     interaction (a*I) gets the unweighted τ_x².
+
+    The matrix is computed once per process and shared; it is read-only.
     """
-    fb = ProtocolRLFeatureBuilder(decision_type)
+    return _prior_arrays(decision_type)[0]
+
+
+def _prior_precision(decision_type: str) -> np.ndarray:
+    """(Σ_0^g)^{-1}, cached and read-only alongside `_prior_covariance`."""
+    return _prior_arrays(decision_type)[1]
+
+
+@lru_cache(maxsize=None)
+def _prior_arrays(decision_type: str) -> tuple[np.ndarray, np.ndarray]:
+    fb = feature_builder(decision_type)
     tau_m_sq = TAU_M_SQ_BY_AGENT[decision_type]
     tau_x_sq = TAU_X_SQ_BY_AGENT[decision_type]
-    mask = tailoring_mask(decision_type)  # length n_vars
+    diag = np.empty(fb.interaction_block.stop, dtype=np.float64)
     # Main block: 1, a, I, then one v_j*I per variable
-    diag = [tau_m_sq, tau_m_sq, tau_m_sq]  # intercept, action, I
-    diag.extend([tau_m_sq] * fb.n_vars)    # v_j*I (one per variable)
-    # Interaction block: a*I, then a*v_j*I per variable
-    diag.append(tau_x_sq)                  # a*I (shared indicator)
-    for j in range(fb.n_vars):
-        diag.append(tau_x_sq if mask[j] else tau_x_sq / 2.0)
-    return np.diag(np.asarray(diag, dtype=np.float64))
+    diag[fb.main_block] = tau_m_sq
+    # Interaction block: a*I (shared indicator), then a*v_j*I per variable
+    interaction = diag[fb.interaction_block]
+    interaction[0] = tau_x_sq
+    interaction[1:] = np.where(fb.tailoring_mask, tau_x_sq, tau_x_sq / 2.0)
+    cov = np.diag(diag)
+    precision = np.linalg.inv(cov)
+    cov.setflags(write=False)
+    precision.setflags(write=False)
+    return cov, precision
+
+
+def stack_fits(local_fits: dict[str, dict], frozen=None) -> tuple[np.ndarray, np.ndarray]:
+    """(θ̂, Σ̂) of ``local_fits`` (and any ``FrozenFits``) as (N, D) and (N, D, D) stacks."""
+    thetas = [np.asarray(fit["theta_hat"], dtype=np.float64) for fit in local_fits.values()]
+    covariances = [np.asarray(fit["covariance"], dtype=np.float64) for fit in local_fits.values()]
+    if frozen is not None:
+        thetas.extend(frozen.theta)
+        covariances.extend(frozen.covariance)
+    return np.stack(thetas), np.stack(covariances)
+
+
+def shrink_to_hyperprior(
+    local_theta: np.ndarray,
+    local_cov: np.ndarray,
+    eb_mean: np.ndarray,
+    eb_cov: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gaussian product of the local posterior N(θ̂_i, Σ̂_i) with the hyperprior
+    N(θ̂_0, Σ̂_0), with every covariance PSD-projected. Broadcasts over a
+    leading dyad axis of ``local_theta`` / ``local_cov``.
+    """
+    _, local_precision = psd_project(local_cov, MIN_COV_JITTER, return_precision=True)
+    _, eb_precision = psd_project(eb_cov, MIN_COV_JITTER, return_precision=True)
+    post_mean, post_cov = gaussian_product(local_theta, local_precision, eb_mean, eb_precision)
+    return post_mean, psd_project(post_cov, MIN_COV_JITTER)
+
+
+def is_clean_dyad(
+    previous_fit, decision_type: str, ordered_rows: list[dict], feature_dim: int
+) -> bool:
+    """
+    True when a (dyad, agent) local fit can be reused instead of recomputed:
+    the agent is a bandit (γ = 0) and has no finalized study_data since the
+    fit.
+
+    With γ > 0 (aya_message, cp_message) the Bellman targets
+    r + γ·max_a φ(s′, a)ᵀθ_prev bootstrap from the previous local fit, so
+    every update runs one more value-iteration step even on unchanged rows
+    and the fit is always recomputed. With γ = 0 the targets are the
+    rewards, and the latest local_fit snapshot is a high-water mark: its
+    ``agent_decision_index`` is the last row fitted and ``sample_size`` the
+    number of rows. Finalized rows are never rewritten (reward derivation
+    skips them), so an unchanged (index, count) pair means unchanged input.
+    """
+    return is_clean_fit(
+        previous_fit,
+        decision_type,
+        ordered_rows[-1]["agent_decision_index"],
+        len(ordered_rows),
+        feature_dim,
+    )
+
+
+def is_clean_fit(
+    previous_fit,
+    decision_type: str,
+    agent_decision_index: int,
+    sample_size: int,
+    feature_dim: int,
+) -> bool:
+    """``is_clean_dyad`` on a fit's (last index, row count) high-water mark."""
+    return (
+        GAMMA_BY_AGENT.get(decision_type, 0.9) == 0.0
+        and previous_fit is not None
+        and previous_fit.feature_dim == feature_dim
+        and previous_fit.agent_decision_index == agent_decision_index
+        and previous_fit.sample_size == sample_size
+    )
+
+
+def cached_local_fit(previous_fit) -> dict:
+    """The ``local_fits`` entry for a clean dyad, rebuilt from its snapshot."""
+    metadata = previous_fit.metadata_json or {}
+    return {
+        "sample_size": previous_fit.sample_size,
+        "feature_dim": previous_fit.feature_dim,
+        "theta_hat": np.asarray(previous_fit.theta, dtype=np.float64),
+        "covariance": np.asarray(previous_fit.covariance, dtype=np.float64),
+        "agent_decision_index": previous_fit.agent_decision_index,
+        "decision_idx": metadata.get("update_decision_idx"),
+        "refit": False,
+    }
+
+
+def update_call_index(repository, previous_hyper, in_memory_count: int) -> int:
+    """
+    1-based index of this update among the agent's updates, which sets the
+    ``EB_REFRESH_EVERY`` cadence.
+
+    A learner rebuilt for every update (the "process" executor) starts its
+    in-memory count at zero, so when the latest hyper snapshot names the
+    /update that wrote it, the index continues from that snapshot's
+    ``update_call_index`` plus the updates completed since. Headless runs
+    (no request log) keep counting in memory.
+    """
+    metadata = {} if previous_hyper is None else previous_hyper.metadata_json or {}
+    since = repository.completed_updates_after(metadata.get("update_id"))
+    if since is None or "update_call_index" not in metadata:
+        return in_memory_count + 1
+    return int(metadata["update_call_index"]) + since + 1
+
+
+def hyperprior_moved(previous_hyper, eb_mean: np.ndarray, eb_cov: np.ndarray) -> bool:
+    """Whether (eb_mean, eb_cov) differs from the latest stored hyper snapshot."""
+    if previous_hyper is None:
+        return True
+    return not (
+        np.array_equal(np.asarray(previous_hyper.theta, dtype=np.float64), eb_mean)
+        and np.array_equal(np.asarray(previous_hyper.covariance, dtype=np.float64), eb_cov)
+    )
+
+
+def undiscounted_decision_types() -> frozenset:
+    """
+    Agents with γ = 0, whose local fit depends on the dyad's rows alone. A
+    γ > 0 fit bootstraps on the current value estimate and keeps moving
+    after a dyad's rows stop, so only these agents can freeze.
+    """
+    return frozenset(t for t in DECISION_TYPES if GAMMA_BY_AGENT.get(t, 0.9) == 0.0)
+
+
+def split_frozen(repository, decision_type: str, dyads) -> tuple:
+    """
+    The agent's archived ``FrozenFits`` (None if it has none, or if the
+    agent is discounted) and the ``(group_id, rows)`` pairs of ``dyads``
+    without those dyads (see app/frozen_archive.py).
+    """
+    if decision_type not in undiscounted_decision_types():
+        return None, dyads
+    frozen = repository.load_frozen_fits(decision_type)
+    if frozen is None or not len(frozen):
+        return None, dyads
+    archived = set(frozen.group_ids.tolist())
+    return frozen, (
+        (group_id, rows) for group_id, rows in dyads if group_id not in archived
+    )
+
+
+def persist_pending_baselines(repository, decision_type: str, data: dict) -> None:
+    """
+    Persist week-1 baselines for every dyad of the agent that has none yet,
+    in one pass over those dyads' rows and one transaction, before the
+    per-dyad fits read them.
+    """
+    week1 = agent_week1_records(data, decision_type, repository.baseline_group_ids(decision_type))
+    if week1:
+        repository.persist_week1_baselines_bulk(decision_type, week1)
+
+
+def freeze_completed(repository, decision_type: str, local_fits: dict, data: dict) -> None:
+    """Archive the final local fits of the dyads listed in ``data["freeze_group_ids"]``."""
+    if decision_type not in undiscounted_decision_types():
+        return
+    completed = {
+        group_id: local_fits[group_id]
+        for group_id in data.get("freeze_group_ids", ())
+        if group_id in local_fits
+    }
+    if completed:
+        repository.freeze_fits(decision_type, completed)
 
 
 class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
@@ -131,11 +313,14 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         seed: int | None = None,
         app=None,
         sampler: DeterministicSampleStream | None = None,
+        repository=None,
     ):
         super().__init__(seed)
         self.logger = get_rl_logger()
         self.seed = seed
         self.app = app
+        # Snapshot/baseline storage; defaults to the app's database.
+        self.repository = repository if repository is not None else SqlRepository(app)
         if sampler is None:
             raise ValueError(
                 "ThreeAgentEmpiricalBayesAlgorithm requires a "
@@ -165,10 +350,6 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         decision_idx: int,
     ) -> tuple[int, float, dict]:
         try:
-            state_vec = np.asarray(state, dtype=np.float64)
-            fb = ProtocolRLFeatureBuilder(decision_type)
-            phi_dim = fb.phi_dim
-
             # Warmup override: purely-randomized actions during each dyad's
             # first 7 days of enrollment (~14 AYA / 7 CP / 1 REL decisions),
             # for the standardization baseline and to seed the EB pool.
@@ -193,91 +374,124 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
                 )
                 return action, 0.5, random_state
 
-            posterior = self._load_latest_snapshot("posterior", decision_type, group_id=group_id)
-            hyper = self._load_latest_snapshot("hyper", decision_type)
-
-            if posterior is not None and len(posterior.theta) == phi_dim:
-                mean = np.asarray(posterior.theta, dtype=np.float64)
-                cov = np.asarray(posterior.covariance, dtype=np.float64)
-                source = "posterior"
-            elif hyper is not None and len(hyper.theta) == phi_dim:
-                mean = np.asarray(hyper.theta, dtype=np.float64)
-                cov = np.asarray(hyper.covariance, dtype=np.float64)
-                source = "hyper"
-            else:
-                mean = np.zeros(phi_dim, dtype=np.float64)
-                cov = _prior_covariance(decision_type)
-                source = "prior"
-
-            cov = self._stabilize_covariance(cov)
-
-            # Probit-TS marginal allocation probability (closed form, η = eta).
-            # No theta sampling — consumes ONE uniform primitive for the Bernoulli draw.
-            eta = ETA_BY_AGENT.get(decision_type, 1.0)
-            prob_action_1 = closed_form_action_prob(
-                state_vec, mean, cov, fb.expand_base_to_phi, eta=eta
+            prob_action_1, random_state = self.prepare_action(
+                group_id, state, parameters, decision_type, decision_idx
             )
-
-            cursor_start = self.sampler.cursor()
-            action = int(self.sampler.draw_bernoulli(prob_action_1))
-            cursor_end = self.sampler.cursor()
-
-            prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
-
-            random_state = {
-                "mode": "probit_ts",
-                "source": source,
-                "eta": eta,
-                "sampler_cursor_start": cursor_start,
-                "sampler_cursor_end": cursor_end,
-            }
-
-            self.logger.info(
-                "EB action=%d group_id=%s decision_type=%s decision_idx=%d "
-                "prob=%.6f source=%s cursor=%s",
-                action,
-                group_id,
-                decision_type,
-                decision_idx,
-                prob,
-                source,
-                cursor_end,
+            return self.draw_prepared_action(
+                group_id, decision_type, decision_idx, prob_action_1, random_state
             )
-            return action, float(prob), random_state
         except Exception as exc:
             self.logger.error("Empirical Bayes action selection failed: %s", exc)
             raise
 
+    def prepare_action(
+        self,
+        group_id: str,
+        state,
+        parameters: dict,
+        decision_type: str,
+        decision_idx: int,
+    ) -> tuple[float, dict] | None:
+        if self._is_warmup(group_id, decision_type, decision_idx):
+            return None
+        state_vec = np.asarray(state, dtype=np.float64)
+        fb = feature_builder(decision_type)
+
+        mean, cov, source, base_id = self._current_posterior(group_id, decision_type)
+        mean, cov, online = online_overlay(
+            self.app, decision_type, group_id, base_id, mean, cov
+        )
+        cov = self._stabilize_covariance(cov)
+
+        # Probit-TS marginal allocation probability (closed form, η = eta).
+        # No theta sampling — the draw consumes ONE uniform primitive.
+        eta = ETA_BY_AGENT.get(decision_type, 1.0)
+        prob_action_1 = closed_form_action_prob(
+            state_vec, mean, cov, fb.expand_base_to_phi, eta=eta
+        )
+        random_state = {"mode": "probit_ts", "source": source, "eta": eta, **online}
+        return prob_action_1, random_state
+
+    def online_update(self, group_id: str, decision_type: str, record: dict) -> int | None:
+        store = getattr(self.app, "online_posteriors", None)
+        if store is None:
+            return None
+        mean, cov, _, base_id = self._current_posterior(group_id, decision_type)
+        baselines = self.repository.fetch_baselines(group_id, decision_type) or None
+        phi = feature_builder(decision_type).phi(
+            record["raw_context"], int(record["action"]), baselines=baselines
+        )
+        return store.fold(
+            decision_type, group_id, base_id, mean, cov, phi,
+            float(record["reward"]), SIGMA_NOISE**2, int(record["decision_idx"]),
+        )
+
+    def draw_prepared_action(
+        self,
+        group_id: str,
+        decision_type: str,
+        decision_idx: int,
+        prob_action_1: float,
+        random_state: dict,
+    ) -> tuple[int, float, dict]:
+        cursor_start = self.sampler.cursor()
+        action = int(self.sampler.draw_bernoulli(prob_action_1))
+        cursor_end = self.sampler.cursor()
+
+        prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
+
+        random_state = {
+            **random_state,
+            "sampler_cursor_start": cursor_start,
+            "sampler_cursor_end": cursor_end,
+        }
+
+        self.logger.info(
+            "EB action=%d group_id=%s decision_type=%s decision_idx=%d "
+            "prob=%.6f source=%s cursor=%s",
+            action,
+            group_id,
+            decision_type,
+            decision_idx,
+            prob,
+            random_state["source"],
+            cursor_end,
+        )
+        return action, float(prob), random_state
+
     # ------------------------------------------------------------------ update
 
     def update(self, old_params: dict, data: dict) -> tuple[bool, dict]:
         try:
-            records = data.get("records", [])
-            if not records:
-                return True, {"probability_of_action": old_params.get("probability_of_action", 0.5)}
-
-            grouped: dict[str, dict[str, list[dict]]] = defaultdict(lambda: defaultdict(list))
-            for record in records:
-                grouped[record["decision_type"]][record["group_id"]].append(record)
-
-            for decision_type, group_records in grouped.items():
-                self._update_call_counts[decision_type] += 1
+            for decision_type, dyads in iter_agent_phases(data, iter_agent_dyads(data)):
+                prev_hyper = self._load_latest_snapshot("hyper", decision_type)
+                self._update_call_counts[decision_type] = update_call_index(
+                    self.repository, prev_hyper, self._update_call_counts[decision_type]
+                )
                 local_fits: dict[str, dict] = {}
+                feature_dim = feature_builder(decision_type).phi_dim
+                frozen, dyads = split_frozen(self.repository, decision_type, dyads)
+                # Week-1 baselines of dyads that have accumulated them, in bulk.
+                persist_pending_baselines(self.repository, decision_type, data)
 
-                for group_id, rows in group_records.items():
+                for group_id, rows in dyads:
                     ordered_rows = sorted(rows, key=lambda row: row["agent_decision_index"])
 
-                    # Persist per-dyad week-1 baselines once enough data exist.
-                    self._maybe_persist_baselines(group_id, decision_type, ordered_rows)
-                    baselines = fetch_baselines(group_id, decision_type)
-
                     previous = self._load_latest_snapshot(
                         "local_fit", decision_type, group_id=group_id
                     )
+                    # Bandit agent, no new finalized rows: reuse (θ̂_i, V_i) in the pool.
+                    if is_clean_dyad(previous, decision_type, ordered_rows, feature_dim):
+                        local_fits[group_id] = cached_local_fit(previous)
+                        continue
+
+                    baselines = self.repository.fetch_baselines(group_id, decision_type)
+
                     fit_summary = self._fit_local_model(
                         decision_type, ordered_rows, previous, baselines
                     )
                     fit_summary["agent_decision_index"] = ordered_rows[-1]["agent_decision_index"]
+                    fit_summary["refit"] = True
                     local_fits[group_id] = fit_summary
                     self._save_snapshot(
                         snapshot_type="local_fit",
@@ -295,29 +509,16 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
                         },
                     )
 
+                if not local_fits:
+                    continue  # every dyad is frozen: nothing can move the pool
+
                 max_agent_index = max(fit["agent_decision_index"] for fit in local_fits.values())
                 if self._is_eb_refresh_point(decision_type):
-                    eb_mean, eb_cov = self._estimate_hyperparameters(local_fits, decision_type)
-                    self._save_snapshot(
-                        snapshot_type="hyper",
-                        decision_type=decision_type,
-                        agent_decision_index=max_agent_index,
-                        group_id=None,
-                        sample_size=len(local_fits),
-                        theta=eb_mean.tolist(),
-                        covariance=eb_cov.tolist(),
-                        perturbation=None,
-                        metadata_json={
-                            "active_groups": len(local_fits),
-                            "update_call_index": self._update_call_counts[decision_type],
-                        },
+                    eb_mean, eb_cov = self._estimate_hyperparameters(
+                        local_fits, decision_type, frozen
                     )
-                else:
-                    prev_hyper = self._load_latest_snapshot("hyper", decision_type)
-                    if prev_hyper is None:
-                        # First update for REL, no hyper yet; build one to keep
-                        # downstream shrinkage well-defined.
-                        eb_mean, eb_cov = self._estimate_hyperparameters(local_fits, decision_type)
+                    moved = hyperprior_moved(prev_hyper, eb_mean, eb_cov)
+                    if moved:
                         self._save_snapshot(
                             snapshot_type="hyper",
                             decision_type=decision_type,
@@ -329,21 +530,54 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
                             perturbation=None,
                             metadata_json={
                                 "active_groups": len(local_fits),
+                                "frozen_groups": len(frozen) if frozen is not None else 0,
                                 "update_call_index": self._update_call_counts[decision_type],
-                                "bootstrap": True,
+                                "update_id": data.get("update_id"),
                             },
                         )
-                    else:
-                        eb_mean = np.asarray(prev_hyper.theta, dtype=np.float64)
-                        eb_cov = np.asarray(prev_hyper.covariance, dtype=np.float64)
-
-                for group_id, fit_summary in local_fits.items():
-                    post_mean, post_cov = self._shrink_to_hyperprior(
-                        fit_summary["theta_hat"],
-                        fit_summary["covariance"],
-                        eb_mean,
-                        eb_cov,
+                elif prev_hyper is None:
+                    # First update for REL, no hyper yet; build one to keep
+                    # downstream shrinkage well-defined.
+                    eb_mean, eb_cov = self._estimate_hyperparameters(
+                        local_fits, decision_type, frozen
                     )
+                    moved = True
+                    self._save_snapshot(
+                        snapshot_type="hyper",
+                        decision_type=decision_type,
+                        agent_decision_index=max_agent_index,
+                        group_id=None,
+                        sample_size=len(local_fits),
+                        theta=eb_mean.tolist(),
+                        covariance=eb_cov.tolist(),
+                        perturbation=None,
+                        metadata_json={
+                            "active_groups": len(local_fits),
+                            "frozen_groups": len(frozen) if frozen is not None else 0,
+                            "update_call_index": self._update_call_counts[decision_type],
+                            "update_id": data.get("update_id"),
+                            "bootstrap": True,
+                        },
+                    )
+                else:
+                    eb_mean = np.asarray(prev_hyper.theta, dtype=np.float64)
+                    eb_cov = np.asarray(prev_hyper.covariance, dtype=np.float64)
+                    moved = False
+
+                stale = {
+                    group_id: fit_summary
+                    for group_id, fit_summary in local_fits.items()
+                    if not self._posterior_is_current(decision_type, group_id, fit_summary, moved)
+                }
+                # Shrink every stale dyad in one batched call.
+                post_means = post_covs = ()
+                if stale:
+                    post_means, post_covs = self._shrink_to_hyperprior(
+                        *stack_fits(stale), eb_mean, eb_cov
+                    )
+                for (group_id, fit_summary), post_mean, post_cov in zip(
+                    stale.items(), post_means, post_covs
+                ):
                     self._save_snapshot(
                         snapshot_type="posterior",
                         decision_type=decision_type,
@@ -356,6 +590,9 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
                         metadata_json={"update_decision_idx": fit_summary["decision_idx"]},
                     )
 
+                freeze_completed(self.repository, decision_type, local_fits, data)
+                self._log_refit_counts(decision_type, local_fits, moved)
+
             return True, {"probability_of_action": old_params.get("probability_of_action", 0.5)}
         except Exception as exc:
             self.logger.error("Empirical Bayes update error: %s", exc)
@@ -371,7 +608,7 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         group_id = context.get("group_id")
         baselines = None
         if group_id is not None:
-            baselines = fetch_baselines(group_id, decision_type) or None
+            baselines = self.repository.fetch_baselines(group_id, decision_type) or None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id: str, state, action: int, outcome: dict) -> tuple[bool, float]:
@@ -391,6 +628,38 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         "dyad_game": 1,      # weekly: only the first weekly decision is random
     }
 
+    def _current_posterior(self, group_id: str, decision_type: str):
+        """
+        The dyad's action-selection posterior as ``(mean, cov, source,
+        base_id)``: its shrunk posterior, else the hyperprior, else the prior.
+        ``base_id`` names the snapshot read, for the online overlay.
+        """
+        phi_dim = feature_builder(decision_type).phi_dim
+        # Both candidates in one statement.
+        posterior, hyper = self.repository.load_latest_snapshots(
+            [("posterior", decision_type, group_id), ("hyper", decision_type, None)]
+        )
+        if posterior is not None and len(posterior.theta) == phi_dim:
+            return (
+                np.asarray(posterior.theta, dtype=np.float64),
+                np.asarray(posterior.covariance, dtype=np.float64),
+                "posterior",
+                ("posterior", posterior.id),
+            )
+        if hyper is not None and len(hyper.theta) == phi_dim:
+            return (
+                np.asarray(hyper.theta, dtype=np.float64),
+                np.asarray(hyper.covariance, dtype=np.float64),
+                "hyper",
+                ("hyper", hyper.id),
+            )
+        return (
+            np.zeros(phi_dim, dtype=np.float64),
+            _prior_covariance(decision_type),
+            "prior",
+            ("prior", None),
+        )
+
     def _is_warmup(self, group_id: str, decision_type: str, decision_idx: int) -> bool:
         # Warm-up is now decided server-side in the /action route (API-Spec
         # §3.2: cohort < 5 or first CP-week). The route draws the Bernoulli(0.5)
@@ -398,25 +667,35 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         # learner no longer gates on decision_idx.
         return False
 
+    def frozen_decision_types(self) -> frozenset:
+        return undiscounted_decision_types()
+
+    def _posterior_is_current(
+        self, decision_type: str, group_id: str, fit_summary: dict, hyper_moved: bool
+    ) -> bool:
+        """A clean dyad's posterior stands unless the hyperprior moved."""
+        if fit_summary["refit"] or hyper_moved:
+            return False
+        return (
+            self._load_latest_snapshot("posterior", decision_type, group_id=group_id)
+            is not None
+        )
+
+    def _log_refit_counts(self, decision_type: str, local_fits: dict, hyper_moved: bool) -> None:
+        refit = sum(1 for fit in local_fits.values() if fit["refit"])
+        self.logger.info(
+            "%s update decision_type=%s refit=%d clean=%d hyper_moved=%s",
+            type(self).__name__,
+            decision_type,
+            refit,
+            len(local_fits) - refit,
+            hyper_moved,
+        )
+
     def _is_eb_refresh_point(self, decision_type: str) -> bool:
         every = EB_REFRESH_EVERY.get(decision_type, 1)
         return (self._update_call_counts[decision_type] % every) == 0
 
-    def _maybe_persist_baselines(
-        self, group_id: str, decision_type: str, ordered_rows: list[dict]
-    ) -> None:
-        existing = (
-            StandardizationBaseline.query
-            .filter_by(group_id=group_id, decision_type=decision_type)
-            .first()
-        )
-        if existing is not None:
-            return
-        week1 = filter_week1_records(ordered_rows)
-        if not week1:
-            return
-        compute_week1_baselines_for_dyad(group_id, decision_type, week1)
-
     def _fit_local_model(
         self,
         decision_type: str,
@@ -424,14 +703,13 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         previous_snapshot,
         baselines: dict[str, dict[str, float]] | None,
     ) -> dict:
-        fb = ProtocolRLFeatureBuilder(decision_type)
+        fb = feature_builder(decision_type)
         feature_dim = fb.phi_dim
         base_dim = fb.base_dim
         state_dim = len(records[0].get("state", []))
         prev_theta = np.zeros(feature_dim, dtype=np.float64)
         gamma = GAMMA_BY_AGENT.get(decision_type, 0.9)
-        prior_cov = _prior_covariance(decision_type)
-        prior_precision = np.linalg.inv(prior_cov)
+        prior_precision = _prior_precision(decision_type)
 
         if previous_snapshot is not None and previous_snapshot.feature_dim == feature_dim:
             prev_theta = np.asarray(previous_snapshot.theta, dtype=np.float64)
@@ -476,31 +754,26 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         }
 
     def _estimate_hyperparameters(
-        self, local_fits: dict[str, dict], decision_type: str
+        self, local_fits: dict[str, dict], decision_type: str, frozen=None
     ) -> tuple[np.ndarray, np.ndarray]:
-        thetas = [fit["theta_hat"] for fit in local_fits.values()]
-        covariances = [fit["covariance"] for fit in local_fits.values()]
-        feature_dim = thetas[0].shape[0]
-        n_dyads = len(thetas)
-
-        weighted_precision = np.zeros((feature_dim, feature_dim), dtype=np.float64)
-        weighted_mean_term = np.zeros(feature_dim, dtype=np.float64)
-        for theta_hat, cov in zip(thetas, covariances):
-            cov = self._stabilize_covariance(cov)
-            inv_cov = np.linalg.inv(cov)
-            weighted_precision += inv_cov
-            weighted_mean_term += inv_cov @ theta_hat
-
-        eb_cov_mean = np.linalg.inv(weighted_precision + MIN_COV_JITTER * np.eye(feature_dim))
+        """
+        MoM + anchor hyperparameters over the active ``local_fits`` plus any
+        frozen dyads' stacked fits (``FrozenFits``), which enter as arrays.
+        """
+        thetas, covariances = stack_fits(local_fits, frozen)
+        n_dyads, feature_dim = thetas.shape
+
+        _, precisions = psd_project(covariances, MIN_COV_JITTER, return_precision=True)
+        weighted_precision = precisions.sum(axis=0)
+        weighted_mean_term = np.einsum("nij,nj->i", precisions, thetas)
+
+        eb_cov_mean = spd_inverse(weighted_precision + MIN_COV_JITTER * np.eye(feature_dim))
         eb_mean = eb_cov_mean @ weighted_mean_term
 
-        centered_cov = np.zeros((feature_dim, feature_dim), dtype=np.float64)
-        for theta_hat in thetas:
-            delta = theta_hat - eb_mean
-            centered_cov += np.outer(delta, delta)
-        centered_cov /= max(n_dyads, 1)
+        delta = thetas - eb_mean
+        centered_cov = (delta.T @ delta) / max(n_dyads, 1)
 
-        avg_local_cov = sum(covariances) / max(n_dyads, 1)
+        avg_local_cov = covariances.sum(axis=0) / max(n_dyads, 1)
         mom_cov = centered_cov - avg_local_cov
 
         # Anchor shrinkage (main.tex Algorithm 3 + Appendix B):
@@ -518,14 +791,8 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         eb_mean: np.ndarray,
         eb_cov: np.ndarray,
     ) -> tuple[np.ndarray, np.ndarray]:
-        local_cov = self._stabilize_covariance(local_cov)
-        eb_cov = self._stabilize_covariance(eb_cov)
-        precision = np.linalg.inv(local_cov) + np.linalg.inv(eb_cov)
-        post_cov = np.linalg.inv(precision)
-        post_mean = post_cov @ (
-            (np.linalg.inv(local_cov) @ local_theta) + (np.linalg.inv(eb_cov) @ eb_mean)
-        )
-        return post_mean, self._stabilize_covariance(post_cov)
+        """One dyad's fit, or a stack of them ((N, D), (N, D, D)), shrunk at once."""
+        return shrink_to_hyperprior(local_theta, local_cov, eb_mean, eb_cov)
 
     def _save_snapshot(
         self,
@@ -539,40 +806,24 @@ class ThreeAgentEmpiricalBayesAlgorithm(RLAlgorithm):
         perturbation: list[float] | None,
         metadata_json: dict | None,
     ):
-        if self.app is None:
-            return
-        with self.app.app_context():
-            snapshot = ModelParameters(
-                snapshot_type=snapshot_type,
-                group_id=group_id,
-                decision_type=decision_type,
-                agent_decision_index=agent_decision_index,
-                sample_size=sample_size,
-                feature_dim=len(theta),
-                theta=theta,
-                covariance=covariance,
-                perturbation=perturbation,
-                metadata_json=metadata_json,
-            )
-            db.session.add(snapshot)
-            db.session.commit()
+        self.repository.save_snapshot(
+            snapshot_type=snapshot_type,
+            decision_type=decision_type,
+            agent_decision_index=agent_decision_index,
+            group_id=group_id,
+            sample_size=sample_size,
+            theta=theta,
+            covariance=covariance,
+            perturbation=perturbation,
+            metadata_json=metadata_json,
+        )
 
     def _load_latest_snapshot(
         self, snapshot_type: str, decision_type: str, group_id: str | None = None
     ):
-        if self.app is None:
-            return None
-        with self.app.app_context():
-            query = ModelParameters.query.filter_by(
-                snapshot_type=snapshot_type,
-                decision_type=decision_type,
-                group_id=group_id,
-            ).order_by(ModelParameters.agent_decision_index.desc())
-            return query.first()
+        return self.repository.load_latest_snapshot(
+            snapshot_type, decision_type, group_id=group_id
+        )
 
     def _stabilize_covariance(self, cov: np.ndarray) -> np.ndarray:
-        cov = np.asarray(cov, dtype=np.float64)
-        cov = (cov + cov.T) / 2.0
-        eigvals, eigvecs = np.linalg.eigh(cov)
-        eigvals = np.maximum(eigvals, MIN_COV_JITTER)
-        return eigvecs @ np.diag(eigvals) @ eigvecs.T
+        return psd_project(cov, MIN_COV_JITTER)
@@ -24,6 +24,8 @@ from app.algorithms.eb_gradient import ThreeAgentEmpiricalBayesGradientAlgorithm
 from app.algorithms.inf_lsvi_pool import ThreeAgentInfLsviPooledAlgorithm
 from app.deterministic_sampler import DeterministicSampleStream
 from app.logging_config import get_rl_logger
+from app.protocol import DECISION_TYPES
+from app.study_data_stream import restrict_update_data
 
 
 _POOL_AGENTS = frozenset({"dyad_game"})
@@ -37,18 +39,19 @@ class HybridRelPoolAlgorithm(RLAlgorithm):
         seed: int | None = None,
         app=None,
         sampler: DeterministicSampleStream | None = None,
+        repository=None,
     ):
         super().__init__(seed)
         self.logger = get_rl_logger()
         self.app = app
         self.sampler = sampler
-        # Both learners share the same sampler so action-Bernoulli draws
-        # stay byte-for-byte reproducible.
+        # Both learners share the same sampler (and storage) so action-
+        # Bernoulli draws stay byte-for-byte reproducible.
         self.eb = ThreeAgentEmpiricalBayesGradientAlgorithm(
-            seed=seed, app=app, sampler=sampler
+            seed=seed, app=app, sampler=sampler, repository=repository
         )
         self.pool = ThreeAgentInfLsviPooledAlgorithm(
-            seed=seed, app=app, sampler=sampler
+            seed=seed, app=app, sampler=sampler, repository=repository
         )
         self.logger.info(
             "HybridRelPool initialized: EB-Gradient for {AYA, CP}, "
@@ -61,41 +64,37 @@ class HybridRelPoolAlgorithm(RLAlgorithm):
     def _route(self, decision_type: str) -> RLAlgorithm:
         return self.pool if decision_type in _POOL_AGENTS else self.eb
 
+    def frozen_decision_types(self):
+        # The pooled fit reads every dyad's rows, so only the EB agents freeze.
+        return self.eb.frozen_decision_types() - _POOL_AGENTS
+
     def get_action(self, group_id, state, parameters, decision_type, decision_idx):
         return self._route(decision_type).get_action(
             group_id, state, parameters, decision_type, decision_idx
         )
 
+    def prepare_action(self, group_id, state, parameters, decision_type, decision_idx):
+        return self._route(decision_type).prepare_action(
+            group_id, state, parameters, decision_type, decision_idx
+        )
+
+    def draw_prepared_action(self, group_id, decision_type, decision_idx, prob_action_1, random_state):
+        return self._route(decision_type).draw_prepared_action(
+            group_id, decision_type, decision_idx, prob_action_1, random_state
+        )
+
+    def online_update(self, group_id, decision_type, record):
+        return self._route(decision_type).online_update(group_id, decision_type, record)
+
     def update(self, old_params, data):
-        # Split records by decision_type and dispatch each batch to the
-        # appropriate learner. Both learners are designed to handle a
-        # mixed-agent records list themselves, but routing per-agent keeps
-        # each learner's hyper-snapshot table consistent.
-        records = data.get("records", [])
-        if not records:
-            ok, params = self.eb.update(old_params, data)
-            return ok, params
-
-        by_route: dict[str, list] = {"eb": [], "pool": []}
-        for r in records:
-            key = "pool" if r.get("decision_type") in _POOL_AGENTS else "eb"
-            by_route[key].append(r)
-
-        params = old_params
-        ok_overall = True
-        if by_route["eb"]:
-            ok, params = self.eb.update(
-                params, {"records": by_route["eb"],
-                         "current_index": data.get("current_index", {})}
-            )
-            ok_overall = ok_overall and ok
-        if by_route["pool"]:
-            ok, params = self.pool.update(
-                params, {"records": by_route["pool"],
-                         "current_index": data.get("current_index", {})}
-            )
-            ok_overall = ok_overall and ok
-        return ok_overall, params
+        # Dispatch each agent's rows to the appropriate learner. Both
+        # learners handle mixed-agent data themselves, but routing per-agent
+        # keeps each learner's hyper-snapshot table consistent.
+        ok_eb, params = self.eb.update(
+            old_params, restrict_update_data(data, frozenset(DECISION_TYPES) - _POOL_AGENTS)
+        )
+        ok_pool, params = self.pool.update(params, restrict_update_data(data, _POOL_AGENTS))
+        return ok_eb and ok_pool, params
 
     def make_state(self, context):
         return self._route(context.get("decision_type")).make_state(context)
@@ -18,8 +18,6 @@ hyper-update + posterior shrinkage are removed.
 
 from __future__ import annotations
 
-from collections import defaultdict
-
 import numpy as np
 
 from app.algorithms.base import RLAlgorithm
@@ -28,6 +26,13 @@ from app.algorithms.empirical_bayes import (
     MIN_COV_JITTER,
     SIGMA_NOISE,
     _prior_covariance,
+    _prior_precision,
+    cached_local_fit,
+    freeze_completed,
+    is_clean_dyad,
+    persist_pending_baselines,
+    split_frozen,
+    undiscounted_decision_types,
 )
 from app.algorithms.eb_gradient import (
     DEFAULT_B,
@@ -39,17 +44,20 @@ from app.algorithms.eb_gradient import (
     DEFAULT_MC_SEED,
     smooth_allocation_prob,
 )
+from app.algorithms.linalg_kernels import psd_project
 from app.deterministic_sampler import DeterministicSampleStream
-from app.extensions import db
-from app.feature_builder import ProtocolRLFeatureBuilder
+from app.feature_builder import feature_builder
 from app.logging_config import get_rl_logger
-from app.models import ModelParameters, StandardizationBaseline
-from app.protocol import compute_reward, encode_state, validate_context, validate_outcome
-from app.standardization import (
-    compute_week1_baselines_for_dyad,
-    fetch_baselines,
-    filter_week1_records,
+from app.online_posterior import online_overlay
+from app.profiling import iter_agent_phases
+from app.protocol import (
+    compute_reward,
+    encode_state,
+    validate_context,
+    validate_outcome,
 )
+from app.repository import SqlRepository
+from app.study_data_stream import iter_agent_dyads
 
 
 class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
@@ -66,11 +74,14 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
         seed: int | None = None,
         app=None,
         sampler: DeterministicSampleStream | None = None,
+        repository=None,
     ):
         super().__init__(seed)
         self.logger = get_rl_logger()
         self.seed = seed
         self.app = app
+        # Snapshot/baseline storage; defaults to the app's database.
+        self.repository = repository if repository is not None else SqlRepository(app)
         if sampler is None:
             raise ValueError(
                 "ThreeAgentInfLsviAlgorithm requires a "
@@ -110,10 +121,6 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
         decision_idx: int,
     ) -> tuple[int, float, dict]:
         try:
-            state_vec = np.asarray(state, dtype=np.float64)
-            fb = ProtocolRLFeatureBuilder(decision_type)
-            phi_dim = fb.phi_dim
-
             # Warm-up window: pure Bernoulli(0.5).
             if self._is_warmup(group_id, decision_type, decision_idx):
                 cursor_start = self.sampler.cursor()
@@ -130,85 +137,117 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
                     "sampler_cursor_end": cursor_end,
                 }
 
-            # Use the dyad's own latest local fit — no pool involved.
-            local = self._load_latest_snapshot(
-                "local_fit", decision_type, group_id=group_id
+            prob_action_1, random_state = self.prepare_action(
+                group_id, state, parameters, decision_type, decision_idx
             )
-            if local is not None and len(local.theta) == phi_dim:
-                mean = np.asarray(local.theta, dtype=np.float64)
-                cov = np.asarray(local.covariance, dtype=np.float64)
-                source = "local_fit"
-            else:
-                mean = np.zeros(phi_dim, dtype=np.float64)
-                cov = _prior_covariance(decision_type)
-                source = "prior"
-
-            cov = self._stabilize_covariance(cov)
-
-            phi0 = fb.expand_base_to_phi(state_vec, 0)
-            phi1 = fb.expand_base_to_phi(state_vec, 1)
-            dphi = phi1 - phi0
-            m = float(dphi @ mean)
-            v = float(dphi @ cov @ dphi)
-
-            prob = smooth_allocation_prob(
-                m, v, self.z_bank,
-                lmin=self.lmin, lmax=self.lmax,
-                c=self.c, b=self.b, k=self.k,
+            return self.draw_prepared_action(
+                group_id, decision_type, decision_idx, prob_action_1, random_state
             )
-
-            cursor_start = self.sampler.cursor()
-            action = int(self.sampler.draw_bernoulli(prob))
-            cursor_end = self.sampler.cursor()
-            chosen_prob = prob if action == 1 else (1.0 - prob)
-
-            self.logger.info(
-                "IL action=%d group_id=%s decision_type=%s decision_idx=%d "
-                "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
-                action, group_id, decision_type, decision_idx,
-                chosen_prob, m, v, source, cursor_end,
-            )
-            return action, float(chosen_prob), {
-                "mode": "smooth_logistic",
-                "source": source,
-                "m": m,
-                "v": v,
-                "sampler_cursor_start": cursor_start,
-                "sampler_cursor_end": cursor_end,
-            }
         except Exception as exc:
             self.logger.error("Inf-LSVI action selection failed: %s", exc)
             raise
 
+    def prepare_action(
+        self,
+        group_id: str,
+        state,
+        parameters: dict,
+        decision_type: str,
+        decision_idx: int,
+    ) -> tuple[float, dict] | None:
+        if self._is_warmup(group_id, decision_type, decision_idx):
+            return None
+        state_vec = np.asarray(state, dtype=np.float64)
+        fb = feature_builder(decision_type)
+
+        mean, cov, source, base_id = self._current_posterior(group_id, decision_type)
+        mean, cov, online = online_overlay(
+            self.app, decision_type, group_id, base_id, mean, cov
+        )
+        cov = self._stabilize_covariance(cov)
+
+        phi0 = fb.expand_base_to_phi(state_vec, 0)
+        phi1 = fb.expand_base_to_phi(state_vec, 1)
+        dphi = phi1 - phi0
+        m = float(dphi @ mean)
+        v = float(dphi @ cov @ dphi)
+
+        prob_action_1 = smooth_allocation_prob(
+            m, v, self.z_bank,
+            lmin=self.lmin, lmax=self.lmax,
+            c=self.c, b=self.b, k=self.k,
+        )
+        random_state = {"mode": "smooth_logistic", "source": source, "m": m, "v": v, **online}
+        return prob_action_1, random_state
+
+    def online_update(self, group_id: str, decision_type: str, record: dict) -> int | None:
+        store = getattr(self.app, "online_posteriors", None)
+        if store is None:
+            return None
+        mean, cov, _, base_id = self._current_posterior(group_id, decision_type)
+        baselines = self.repository.fetch_baselines(group_id, decision_type) or None
+        phi = feature_builder(decision_type).phi(
+            record["raw_context"], int(record["action"]), baselines=baselines
+        )
+        return store.fold(
+            decision_type, group_id, base_id, mean, cov, phi,
+            float(record["reward"]), SIGMA_NOISE**2, int(record["decision_idx"]),
+        )
+
+    def draw_prepared_action(
+        self,
+        group_id: str,
+        decision_type: str,
+        decision_idx: int,
+        prob_action_1: float,
+        random_state: dict,
+    ) -> tuple[int, float, dict]:
+        cursor_start = self.sampler.cursor()
+        action = int(self.sampler.draw_bernoulli(prob_action_1))
+        cursor_end = self.sampler.cursor()
+        prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
+
+        random_state = {
+            **random_state,
+            "sampler_cursor_start": cursor_start,
+            "sampler_cursor_end": cursor_end,
+        }
+
+        self.logger.info(
+            "IL action=%d group_id=%s decision_type=%s decision_idx=%d "
+            "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
+            action, group_id, decision_type, decision_idx,
+            prob, random_state["m"], random_state["v"], random_state["source"], cursor_end,
+        )
+        return action, float(prob), random_state
+
     # ------------------------------------------------------------------ update
 
     def update(self, old_params: dict, data: dict) -> tuple[bool, dict]:
         try:
-            records = data.get("records", [])
-            if not records:
-                return True, {
-                    "probability_of_action": old_params.get("probability_of_action", 0.5)
-                }
-
-            grouped: dict[str, dict[str, list[dict]]] = defaultdict(
-                lambda: defaultdict(list)
-            )
-            for record in records:
-                grouped[record["decision_type"]][record["group_id"]].append(record)
-
-            for decision_type, group_records in grouped.items():
-                for group_id, rows in group_records.items():
+            for decision_type, dyads in iter_agent_phases(data, iter_agent_dyads(data)):
+                feature_dim = feature_builder(decision_type).phi_dim
+                # Frozen dyads are simply left out: their last posterior stands.
+                _, dyads = split_frozen(self.repository, decision_type, dyads)
+                persist_pending_baselines(self.repository, decision_type, data)
+                local_fits: dict[str, dict] = {}
+                for group_id, rows in dyads:
                     ordered = sorted(rows, key=lambda r: r["agent_decision_index"])
-                    self._maybe_persist_baselines(group_id, decision_type, ordered)
-                    baselines = fetch_baselines(group_id, decision_type)
-
                     previous = self._load_latest_snapshot(
                         "local_fit", decision_type, group_id=group_id
                     )
+                    # No pooling here: a clean dyad's local fit is its posterior.
+                    if is_clean_dyad(previous, decision_type, ordered, feature_dim):
+                        local_fits[group_id] = cached_local_fit(previous)
+                        continue
+
+                    baselines = self.repository.fetch_baselines(group_id, decision_type)
+
                     fit = self._fit_local_model(
                         decision_type, ordered, previous, baselines
                     )
                     fit["agent_decision_index"] = ordered[-1]["agent_decision_index"]
+                    local_fits[group_id] = fit
                     self._save_snapshot(
                         snapshot_type="local_fit",
                         decision_type=decision_type,
@@ -224,6 +263,7 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
                             "sampler_cursor_end": fit["sampler_cursor_end"],
                         },
                     )
+                freeze_completed(self.repository, decision_type, local_fits, data)
 
             return True, {
                 "probability_of_action": old_params.get("probability_of_action", 0.5)
@@ -242,7 +282,7 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
         group_id = context.get("group_id")
         baselines = None
         if group_id is not None:
-            baselines = fetch_baselines(group_id, decision_type) or None
+            baselines = self.repository.fetch_baselines(group_id, decision_type) or None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id: str, state, action: int, outcome: dict) -> tuple[bool, float]:
@@ -254,26 +294,35 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
 
     # ---------------------------------------------------------------- helpers
 
+    def frozen_decision_types(self) -> frozenset:
+        return undiscounted_decision_types()
+
+    def _current_posterior(self, group_id: str, decision_type: str):
+        """``(mean, cov, source, base_id)`` of the dyad's local fit, else the prior."""
+        phi_dim = feature_builder(decision_type).phi_dim
+        # The dyad's own latest local fit — no pool involved.
+        fit = self._load_latest_snapshot(
+            "local_fit", decision_type, group_id=group_id
+        )
+        if fit is not None and len(fit.theta) == phi_dim:
+            return (
+                np.asarray(fit.theta, dtype=np.float64),
+                np.asarray(fit.covariance, dtype=np.float64),
+                "local_fit",
+                ("local_fit", fit.id),
+            )
+        return (
+            np.zeros(phi_dim, dtype=np.float64),
+            _prior_covariance(decision_type),
+            "prior",
+            ("prior", None),
+        )
+
     def _is_warmup(self, group_id: str, decision_type: str, decision_idx: int) -> bool:
         # Warm-up is decided server-side in the /action route (API-Spec §3.2);
         # the route draws the warm-up action and skips get_action.
         return False
 
-    def _maybe_persist_baselines(
-        self, group_id: str, decision_type: str, ordered_rows: list[dict]
-    ) -> None:
-        existing = (
-            StandardizationBaseline.query
-            .filter_by(group_id=group_id, decision_type=decision_type)
-            .first()
-        )
-        if existing is not None:
-            return
-        week1 = filter_week1_records(ordered_rows)
-        if not week1:
-            return
-        compute_week1_baselines_for_dyad(group_id, decision_type, week1)
-
     def _fit_local_model(
         self,
         decision_type: str,
@@ -284,7 +333,7 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
         """Same Inf-LSVI fit as in eb_gradient.py — Bayesian linear regression
         with the structural cold-start prior as the regularizer, on the
         Bellman targets computed against the previous snapshot."""
-        fb = ProtocolRLFeatureBuilder(decision_type)
+        fb = feature_builder(decision_type)
         feature_dim = fb.phi_dim
         gamma = GAMMA_BY_AGENT.get(decision_type, 0.9)
         prev_theta = np.zeros(feature_dim, dtype=np.float64)
@@ -311,8 +360,7 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
         y = np.asarray(y_vals, dtype=np.float64)
         S = (X.T @ X) / (SIGMA_NOISE ** 2)
         b = (X.T @ y) / (SIGMA_NOISE ** 2)
-        anchor = _prior_covariance(decision_type)
-        prior_prec = np.linalg.inv(anchor)
+        prior_prec = _prior_precision(decision_type)
         cov = np.linalg.inv(S + prior_prec)
         theta_hat = cov @ b
 
@@ -332,38 +380,22 @@ class ThreeAgentInfLsviAlgorithm(RLAlgorithm):
 
     def _save_snapshot(self, snapshot_type, decision_type, agent_decision_index,
                        group_id, sample_size, theta, covariance, perturbation, metadata_json):
-        if self.app is None:
-            return
-        with self.app.app_context():
-            snap = ModelParameters(
-                snapshot_type=snapshot_type,
-                group_id=group_id,
-                decision_type=decision_type,
-                agent_decision_index=agent_decision_index,
-                sample_size=sample_size,
-                feature_dim=len(theta),
-                theta=theta,
-                covariance=covariance,
-                perturbation=perturbation,
-                metadata_json=metadata_json,
-            )
-            db.session.add(snap)
-            db.session.commit()
+        self.repository.save_snapshot(
+            snapshot_type=snapshot_type,
+            decision_type=decision_type,
+            agent_decision_index=agent_decision_index,
+            group_id=group_id,
+            sample_size=sample_size,
+            theta=theta,
+            covariance=covariance,
+            perturbation=perturbation,
+            metadata_json=metadata_json,
+        )
 
     def _load_latest_snapshot(self, snapshot_type, decision_type, group_id=None):
-        if self.app is None:
-            return None
-        with self.app.app_context():
-            q = ModelParameters.query.filter_by(
-                snapshot_type=snapshot_type,
-                decision_type=decision_type,
-                group_id=group_id,
-            ).order_by(ModelParameters.agent_decision_index.desc())
-            return q.first()
+        return self.repository.load_latest_snapshot(
+            snapshot_type, decision_type, group_id=group_id
+        )
 
     def _stabilize_covariance(self, cov: np.ndarray) -> np.ndarray:
-        cov = np.asarray(cov, dtype=np.float64)
-        cov = (cov + cov.T) / 2.0
-        eigvals, eigvecs = np.linalg.eigh(cov)
-        eigvals = np.maximum(eigvals, MIN_COV_JITTER)
-        return eigvecs @ np.diag(eigvals) @ eigvecs.T
+        return psd_project(cov, MIN_COV_JITTER)
@@ -13,8 +13,6 @@ is the natural "full pooling" baseline that sits opposite the per-dyad
 
 from __future__ import annotations
 
-from collections import defaultdict
-
 import numpy as np
 
 from app.algorithms.base import RLAlgorithm
@@ -23,6 +21,10 @@ from app.algorithms.empirical_bayes import (
     MIN_COV_JITTER,
     SIGMA_NOISE,
     _prior_covariance,
+    _prior_precision,
+    is_clean_fit,
+    persist_pending_baselines,
+    undiscounted_decision_types,
 )
 from app.algorithms.eb_gradient import (
     DEFAULT_B,
@@ -34,17 +36,53 @@ from app.algorithms.eb_gradient import (
     DEFAULT_MC_SEED,
     smooth_allocation_prob,
 )
+from app.algorithms.linalg_kernels import psd_project
 from app.deterministic_sampler import DeterministicSampleStream
-from app.extensions import db
-from app.feature_builder import ProtocolRLFeatureBuilder
+from app.feature_builder import feature_builder
 from app.logging_config import get_rl_logger
-from app.models import ModelParameters, StandardizationBaseline
-from app.protocol import compute_reward, encode_state, validate_context, validate_outcome
-from app.standardization import (
-    compute_week1_baselines_for_dyad,
-    fetch_baselines,
-    filter_week1_records,
+from app.online_posterior import online_overlay
+from app.profiling import iter_agent_phases
+from app.protocol import (
+    DECISION_TYPES,
+    compute_reward,
+    encode_state,
+    validate_context,
+    validate_outcome,
 )
+from app.repository import SqlRepository
+from app.study_data_stream import agent_dyads_after, iter_agent_dyads, restrict_update_data
+
+# Rows per block when accumulating XᵀX and Xᵀy: the pooled fit holds one
+# (POOLED_CHUNK_ROWS, D) block of φ rows, however large the cohort.
+POOLED_CHUNK_ROWS = 512
+
+
+class GramAccumulator:
+    """Running XᵀX and Xᵀy, filled one fixed-size block of φ rows at a time."""
+
+    def __init__(self, feature_dim: int, xtx=None, xty=None, chunk_rows: int = POOLED_CHUNK_ROWS):
+        self.xtx = np.zeros((feature_dim, feature_dim), dtype=np.float64)
+        self.xty = np.zeros(feature_dim, dtype=np.float64)
+        if xtx is not None:
+            self.xtx += np.asarray(xtx, dtype=np.float64)
+            self.xty += np.asarray(xty, dtype=np.float64)
+        self._x = np.empty((chunk_rows, feature_dim), dtype=np.float64)
+        self._y = np.empty(chunk_rows, dtype=np.float64)
+        self._rows = 0
+
+    def add(self, phi: np.ndarray, target: float) -> None:
+        self._x[self._rows] = phi
+        self._y[self._rows] = target
+        self._rows += 1
+        if self._rows == self._y.shape[0]:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            block = self._x[: self._rows]
+            self.xtx += block.T @ block
+            self.xty += block.T @ self._y[: self._rows]
+            self._rows = 0
 
 
 class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
@@ -61,11 +99,14 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
         seed: int | None = None,
         app=None,
         sampler: DeterministicSampleStream | None = None,
+        repository=None,
     ):
         super().__init__(seed)
         self.logger = get_rl_logger()
         self.seed = seed
         self.app = app
+        # Snapshot/baseline storage; defaults to the app's database.
+        self.repository = repository if repository is not None else SqlRepository(app)
         if sampler is None:
             raise ValueError(
                 "ThreeAgentInfLsviPooledAlgorithm requires a "
@@ -105,10 +146,6 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
         decision_idx: int,
     ) -> tuple[int, float, dict]:
         try:
-            state_vec = np.asarray(state, dtype=np.float64)
-            fb = ProtocolRLFeatureBuilder(decision_type)
-            phi_dim = fb.phi_dim
-
             if self._is_warmup(group_id, decision_type, decision_idx):
                 cursor_start = self.sampler.cursor()
                 action = int(self.sampler.draw_bernoulli(0.5))
@@ -124,101 +161,127 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
                     "sampler_cursor_end": cursor_end,
                 }
 
-            # Use the agent-wide pooled fit (group_id=None).
-            pooled = self._load_latest_snapshot(
-                "local_fit", decision_type, group_id=None
+            prob_action_1, random_state = self.prepare_action(
+                group_id, state, parameters, decision_type, decision_idx
             )
-            if pooled is not None and len(pooled.theta) == phi_dim:
-                mean = np.asarray(pooled.theta, dtype=np.float64)
-                cov = np.asarray(pooled.covariance, dtype=np.float64)
-                source = "pooled_fit"
-            else:
-                mean = np.zeros(phi_dim, dtype=np.float64)
-                cov = _prior_covariance(decision_type)
-                source = "prior"
-
-            cov = self._stabilize_covariance(cov)
-
-            phi0 = fb.expand_base_to_phi(state_vec, 0)
-            phi1 = fb.expand_base_to_phi(state_vec, 1)
-            dphi = phi1 - phi0
-            m = float(dphi @ mean)
-            v = float(dphi @ cov @ dphi)
-
-            prob = smooth_allocation_prob(
-                m, v, self.z_bank,
-                lmin=self.lmin, lmax=self.lmax,
-                c=self.c, b=self.b, k=self.k,
-            )
-
-            cursor_start = self.sampler.cursor()
-            action = int(self.sampler.draw_bernoulli(prob))
-            cursor_end = self.sampler.cursor()
-            chosen_prob = prob if action == 1 else (1.0 - prob)
-
-            self.logger.info(
-                "ILP action=%d group_id=%s decision_type=%s decision_idx=%d "
-                "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
-                action, group_id, decision_type, decision_idx,
-                chosen_prob, m, v, source, cursor_end,
+            return self.draw_prepared_action(
+                group_id, decision_type, decision_idx, prob_action_1, random_state
             )
-            return action, float(chosen_prob), {
-                "mode": "smooth_logistic",
-                "source": source,
-                "m": m,
-                "v": v,
-                "sampler_cursor_start": cursor_start,
-                "sampler_cursor_end": cursor_end,
-            }
         except Exception as exc:
             self.logger.error("Inf-LSVI (pooled) action selection failed: %s", exc)
             raise
 
+    def prepare_action(
+        self,
+        group_id: str,
+        state,
+        parameters: dict,
+        decision_type: str,
+        decision_idx: int,
+    ) -> tuple[float, dict] | None:
+        if self._is_warmup(group_id, decision_type, decision_idx):
+            return None
+        state_vec = np.asarray(state, dtype=np.float64)
+        fb = feature_builder(decision_type)
+
+        mean, cov, source, base_id = self._current_posterior(group_id, decision_type)
+        mean, cov, online = online_overlay(
+            self.app, decision_type, None, base_id, mean, cov
+        )
+        cov = self._stabilize_covariance(cov)
+
+        phi0 = fb.expand_base_to_phi(state_vec, 0)
+        phi1 = fb.expand_base_to_phi(state_vec, 1)
+        dphi = phi1 - phi0
+        m = float(dphi @ mean)
+        v = float(dphi @ cov @ dphi)
+
+        prob_action_1 = smooth_allocation_prob(
+            m, v, self.z_bank,
+            lmin=self.lmin, lmax=self.lmax,
+            c=self.c, b=self.b, k=self.k,
+        )
+        random_state = {"mode": "smooth_logistic", "source": source, "m": m, "v": v, **online}
+        return prob_action_1, random_state
+
+    def online_update(self, group_id: str, decision_type: str, record: dict) -> int | None:
+        store = getattr(self.app, "online_posteriors", None)
+        if store is None:
+            return None
+        mean, cov, _, base_id = self._current_posterior(group_id, decision_type)
+        baselines = self.repository.fetch_baselines(group_id, decision_type) or None
+        phi = feature_builder(decision_type).phi(
+            record["raw_context"], int(record["action"]), baselines=baselines
+        )
+        return store.fold(
+            decision_type, None, base_id, mean, cov, phi,
+            float(record["reward"]), SIGMA_NOISE**2, (group_id, int(record["decision_idx"])),
+        )
+
+    def draw_prepared_action(
+        self,
+        group_id: str,
+        decision_type: str,
+        decision_idx: int,
+        prob_action_1: float,
+        random_state: dict,
+    ) -> tuple[int, float, dict]:
+        cursor_start = self.sampler.cursor()
+        action = int(self.sampler.draw_bernoulli(prob_action_1))
+        cursor_end = self.sampler.cursor()
+        prob = prob_action_1 if action == 1 else (1.0 - prob_action_1)
+
+        random_state = {
+            **random_state,
+            "sampler_cursor_start": cursor_start,
+            "sampler_cursor_end": cursor_end,
+        }
+
+        self.logger.info(
+            "ILP action=%d group_id=%s decision_type=%s decision_idx=%d "
+            "prob=%.6f m=%.4f v=%.4f source=%s cursor=%s",
+            action, group_id, decision_type, decision_idx,
+            prob, random_state["m"], random_state["v"], random_state["source"], cursor_end,
+        )
+        return action, float(prob), random_state
+
     # ------------------------------------------------------------------ update
 
     def update(self, old_params: dict, data: dict) -> tuple[bool, dict]:
         try:
-            records = data.get("records", [])
-            if not records:
-                return True, {
-                    "probability_of_action": old_params.get("probability_of_action", 0.5)
-                }
-
-            # Bucket by agent, ignore group_id (full pooling).
-            by_agent: dict[str, list[dict]] = defaultdict(list)
-            for record in records:
-                by_agent[record["decision_type"]].append(record)
-
-            # Also bucket by (agent, dyad) so we can compute per-dyad week-1
-            # baselines (still per-dyad — only the Q-fit is pooled).
-            by_agent_dyad: dict[str, dict[str, list[dict]]] = defaultdict(
-                lambda: defaultdict(list)
-            )
-            for record in records:
-                by_agent_dyad[record["decision_type"]][record["group_id"]].append(record)
-
-            for decision_type, agent_records in by_agent.items():
-                # Persist per-dyad week-1 baselines (used by the feature
-                # builder), then run ONE pooled Inf-LSVI fit per agent.
-                for group_id, dyad_rows in by_agent_dyad[decision_type].items():
-                    ordered_dyad = sorted(
-                        dyad_rows, key=lambda r: r["agent_decision_index"]
-                    )
-                    self._maybe_persist_baselines(group_id, decision_type, ordered_dyad)
-
-                # Order all records by (group_id, agent_decision_index) so the
-                # Bellman target's "next state" still walks a single dyad's
-                # trajectory, not across dyads.
-                ordered = sorted(
-                    agent_records,
-                    key=lambda r: (r["group_id"], r["agent_decision_index"]),
-                )
+            grams = self._running_grams()
+            for decision_type, (dyads, counts) in iter_agent_phases(
+                data, self._agent_dyads(data, grams)
+            ):
+                # Persist the pending per-dyad week-1 baselines (used by the
+                # feature builder) in one transaction before the fit reads them.
+                persist_pending_baselines(self.repository, decision_type, data)
 
                 previous = self._load_latest_snapshot(
                     "local_fit", decision_type, group_id=None
                 )
-                fit = self._fit_pooled_model(decision_type, ordered, previous)
-                fit["agent_decision_index"] = ordered[-1]["agent_decision_index"]
+                # ONE pooled Inf-LSVI fit per agent, streamed a dyad at a time.
+                fit = self._fit_pooled_model(
+                    decision_type, dyads, previous, grams.get(decision_type), counts
+                )
+                if fit is not None and fit["gram_stale"]:
+                    # Rows already in the running sums changed: rebuild them.
+                    _, dyads = next(iter_agent_dyads(restrict_update_data(data, {decision_type})))
+                    fit = self._fit_pooled_model(decision_type, dyads, previous, None)
+                if fit is None:
+                    continue
+
+                # Bandit agent and no dyad has new finalized rows: the pooled
+                # fit stands (with γ > 0 it moved one value-iteration step).
+                if is_clean_fit(
+                    previous,
+                    decision_type,
+                    fit["agent_decision_index"],
+                    fit["sample_size"],
+                    fit["feature_dim"],
+                ):
+                    continue
+
                 self._save_snapshot(
                     snapshot_type="local_fit",
                     decision_type=decision_type,
@@ -229,12 +292,24 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
                     covariance=fit["covariance"].tolist(),
                     perturbation=None,
                     metadata_json={
-                        "update_decision_idx": ordered[-1]["decision_idx"],
-                        "n_dyads_in_fit": len(by_agent_dyad[decision_type]),
+                        "update_decision_idx": fit["decision_idx"],
+                        "n_dyads_in_fit": fit["n_dyads"],
                         "sampler_cursor_start": fit["sampler_cursor_start"],
                         "sampler_cursor_end": fit["sampler_cursor_end"],
                     },
                 )
+                if fit["gram"] is not None:
+                    self._save_snapshot(
+                        snapshot_type="pooled_gram",
+                        decision_type=decision_type,
+                        agent_decision_index=fit["agent_decision_index"],
+                        group_id=None,
+                        sample_size=fit["gram"]["sample_size"],
+                        theta=fit["gram"]["xty"].tolist(),
+                        covariance=fit["gram"]["xtx"].tolist(),
+                        perturbation=None,
+                        metadata_json={"dyads": fit["gram"]["dyads"]},
+                    )
 
             return True, {
                 "probability_of_action": old_params.get("probability_of_action", 0.5)
@@ -243,6 +318,35 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
             self.logger.error("Inf-LSVI (pooled) update error: %s", exc)
             return False, old_params
 
+    def _running_grams(self) -> dict:
+        """The persisted running sums of each γ = 0 agent that has them."""
+        grams = {}
+        for decision_type in sorted(undiscounted_decision_types()):
+            gram = self._load_latest_snapshot("pooled_gram", decision_type, group_id=None)
+            if gram is not None and gram.feature_dim == feature_builder(decision_type).phi_dim:
+                grams[decision_type] = gram
+        return grams
+
+    def _agent_dyads(self, data: dict, grams: dict):
+        """
+        ``(decision_type, (dyads, counts))`` per agent in ``data``. Agents
+        with running sums read each folded dyad only past the decision_idx
+        high-water mark recorded in ``grams``, with ``counts`` its full row
+        count; the other agents stream every row (``counts`` None).
+        """
+        rest = restrict_update_data(data, frozenset(DECISION_TYPES) - set(grams))
+        for decision_type, dyads in iter_agent_dyads(rest):
+            yield decision_type, (dyads, None)
+        for decision_type, gram in grams.items():
+            marks = {
+                group_id: entry[2]
+                for group_id, entry in (gram.metadata_json or {}).get("dyads", {}).items()
+                if len(entry) > 2
+            }
+            counts, dyads = agent_dyads_after(data, decision_type, marks)
+            if counts:
+                yield decision_type, (dyads, counts)
+
     # ---------------------------------------------------------- delegation
 
     def make_state(self, context: dict) -> tuple[bool, list]:
@@ -253,7 +357,7 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
         group_id = context.get("group_id")
         baselines = None
         if group_id is not None:
-            baselines = fetch_baselines(group_id, decision_type) or None
+            baselines = self.repository.fetch_baselines(group_id, decision_type) or None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id: str, state, action: int, outcome: dict) -> tuple[bool, float]:
@@ -265,57 +369,112 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
 
     # ---------------------------------------------------------------- helpers
 
+    def _current_posterior(self, group_id: str, decision_type: str):
+        """``(mean, cov, source, base_id)`` of the pooled fit, else the prior."""
+        phi_dim = feature_builder(decision_type).phi_dim
+        # The agent-wide pooled fit (group_id=None).
+        fit = self._load_latest_snapshot(
+            "local_fit", decision_type, group_id=None
+        )
+        if fit is not None and len(fit.theta) == phi_dim:
+            return (
+                np.asarray(fit.theta, dtype=np.float64),
+                np.asarray(fit.covariance, dtype=np.float64),
+                "pooled_fit",
+                ("local_fit", fit.id),
+            )
+        return (
+            np.zeros(phi_dim, dtype=np.float64),
+            _prior_covariance(decision_type),
+            "prior",
+            ("prior", None),
+        )
+
     def _is_warmup(self, group_id: str, decision_type: str, decision_idx: int) -> bool:
         # Warm-up is decided server-side in the /action route (API-Spec §3.2);
         # the route draws the warm-up action and skips get_action.
         return False
 
-    def _maybe_persist_baselines(
-        self, group_id: str, decision_type: str, ordered_rows: list[dict]
-    ) -> None:
-        existing = (
-            StandardizationBaseline.query
-            .filter_by(group_id=group_id, decision_type=decision_type)
-            .first()
-        )
-        if existing is not None:
-            return
-        week1 = filter_week1_records(ordered_rows)
-        if not week1:
-            return
-        compute_week1_baselines_for_dyad(group_id, decision_type, week1)
-
     def _fit_pooled_model(
         self,
         decision_type: str,
-        records: list[dict],
+        dyads,
         previous_snapshot,
-    ) -> dict:
+        gram_snapshot=None,
+        counts: dict[str, int] | None = None,
+    ) -> dict | None:
         """Bayesian linear regression on the *concatenation* of every dyad's
         Bellman-target rows. The Bellman next-state uses each dyad's own
         successor (so we don't cross-link trajectories), but the parameter
-        vector being fit is shared across dyads."""
-        fb = ProtocolRLFeatureBuilder(decision_type)
+        vector being fit is shared across dyads.
+
+        ``dyads`` yields ``(group_id, records)``. XᵀX and Xᵀy are
+        accumulated in fixed-size blocks, so memory does not grow with the
+        cohort. With γ = 0 (REL) the targets are the rewards and the sums are
+        exact running totals: ``gram_snapshot`` carries those of every dyad
+        that has week-1 baselines (its φ rows can no longer change), and
+        only such a dyad's rows past its recorded (count, last
+        agent_decision_index, last decision_idx) are added; the updated
+        totals are returned under ``"gram"``. With ``counts`` (rows per
+        dyad), the records of a dyad with a recorded decision_idx hold only
+        the rows past it. Returns None when there are no rows."""
+        fb = feature_builder(decision_type)
         feature_dim = fb.phi_dim
         gamma = GAMMA_BY_AGENT.get(decision_type, 0.9)
         prev_theta = np.zeros(feature_dim, dtype=np.float64)
         if previous_snapshot is not None and previous_snapshot.feature_dim == feature_dim:
             prev_theta = np.asarray(previous_snapshot.theta, dtype=np.float64)
 
-        # Group rows by dyad so the per-dyad successor lookup is correct.
-        by_dyad: dict[str, list[dict]] = defaultdict(list)
-        for r in records:
-            by_dyad[r["group_id"]].append(r)
-        for gid in by_dyad:
-            by_dyad[gid].sort(key=lambda r: r["agent_decision_index"])
-
-        x_rows: list[np.ndarray] = []
-        y_vals: list[float] = []
-        for gid, ordered in by_dyad.items():
-            baselines = fetch_baselines(gid, decision_type)
-            for idx, record in enumerate(ordered):
-                raw = record["raw_context"]
-                phi_t = fb.phi(raw, int(record["action"]), baselines=baselines)
+        running = gamma == 0.0
+        settled = GramAccumulator(feature_dim)
+        folded: dict[str, list[int]] = {}
+        if running and gram_snapshot is not None and gram_snapshot.feature_dim == feature_dim:
+            settled = GramAccumulator(feature_dim, gram_snapshot.covariance, gram_snapshot.theta)
+            folded = dict((gram_snapshot.metadata_json or {}).get("dyads", {}))
+        # Rows of dyads still without baselines: refit on every update.
+        pending = GramAccumulator(feature_dim)
+        baselines_by_dyad = self.repository.fetch_agent_baselines(decision_type)
+
+        sample_size = 0
+        n_dyads = 0
+        last = None
+        stale = False
+        for gid, rows in dyads:
+            ordered = sorted(rows, key=lambda r: r["agent_decision_index"])
+            baselines = baselines_by_dyad.get(gid, {})
+            fold = folded.get(gid, (0, None))
+            past_mark = counts is not None and len(fold) > 2
+            n_rows = len(ordered) if counts is None else counts[gid]
+            tail = ordered[-1] if ordered else {
+                "group_id": gid, "agent_decision_index": fold[1], "decision_idx": fold[2]
+            }
+            sample_size += n_rows
+            n_dyads += 1
+            if last is None or gid > last["group_id"]:
+                last = tail
+
+            start, accumulator = 0, pending
+            if running and baselines:
+                count, last_index = fold[0], fold[1]
+                if past_mark:
+                    # Rows were added or removed at or below the mark.
+                    stale = n_rows - len(ordered) != count or stale
+                else:
+                    if count and (
+                        count > len(ordered)
+                        or ordered[count - 1]["agent_decision_index"] != last_index
+                    ):
+                        stale = True
+                    start = count
+                accumulator = settled
+                folded[gid] = [n_rows, tail["agent_decision_index"], tail["decision_idx"]]
+            elif past_mark:
+                # Folded rows of a dyad that lost its baselines.
+                stale = True
+
+            for idx in range(start, len(ordered)):
+                record = ordered[idx]
+                phi_t = fb.phi(record["raw_context"], int(record["action"]), baselines=baselines)
                 reward = float(record["reward"])
                 if idx + 1 < len(ordered):
                     nxt = ordered[idx + 1]["raw_context"]
@@ -324,24 +483,36 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
                     target = reward + gamma * max(q0, q1)
                 else:
                     target = reward
-                x_rows.append(phi_t)
-                y_vals.append(target)
-
-        X = np.vstack(x_rows)
-        y = np.asarray(y_vals, dtype=np.float64)
-        S = (X.T @ X) / (SIGMA_NOISE ** 2)
-        b = (X.T @ y) / (SIGMA_NOISE ** 2)
-        anchor = _prior_covariance(decision_type)
-        prior_prec = np.linalg.inv(anchor)
+                accumulator.add(phi_t, target)
+
+        if last is None:
+            return None
+        settled.flush()
+        pending.flush()
+        S = (settled.xtx + pending.xtx) / (SIGMA_NOISE ** 2)
+        b = (settled.xty + pending.xty) / (SIGMA_NOISE ** 2)
+        prior_prec = _prior_precision(decision_type)
         cov = np.linalg.inv(S + prior_prec)
         theta_hat = cov @ b
 
+        gram = None
+        if running:
+            gram = {
+                "xtx": settled.xtx,
+                "xty": settled.xty,
+                "sample_size": sum(entry[0] for entry in folded.values()),
+                "dyads": folded,
+            }
         return {
-            "sample_size": len(records),
+            "sample_size": sample_size,
             "feature_dim": feature_dim,
             "theta_hat": theta_hat,
             "covariance": cov,
-            "decision_idx": records[-1]["decision_idx"],
+            "agent_decision_index": last["agent_decision_index"],
+            "decision_idx": last["decision_idx"],
+            "n_dyads": n_dyads,
+            "gram": gram,
+            "gram_stale": stale,
             "sampler_cursor_start": self.sampler.cursor(),
             "sampler_cursor_end": self.sampler.cursor(),
         }
@@ -350,38 +521,22 @@ class ThreeAgentInfLsviPooledAlgorithm(RLAlgorithm):
 
     def _save_snapshot(self, snapshot_type, decision_type, agent_decision_index,
                        group_id, sample_size, theta, covariance, perturbation, metadata_json):
-        if self.app is None:
-            return
-        with self.app.app_context():
-            snap = ModelParameters(
-                snapshot_type=snapshot_type,
-                group_id=group_id,
-                decision_type=decision_type,
-                agent_decision_index=agent_decision_index,
-                sample_size=sample_size,
-                feature_dim=len(theta),
-                theta=theta,
-                covariance=covariance,
-                perturbation=perturbation,
-                metadata_json=metadata_json,
-            )
-            db.session.add(snap)
-            db.session.commit()
+        self.repository.save_snapshot(
+            snapshot_type=snapshot_type,
+            decision_type=decision_type,
+            agent_decision_index=agent_decision_index,
+            group_id=group_id,
+            sample_size=sample_size,
+            theta=theta,
+            covariance=covariance,
+            perturbation=perturbation,
+            metadata_json=metadata_json,
+        )
 
     def _load_latest_snapshot(self, snapshot_type, decision_type, group_id=None):
-        if self.app is None:
-            return None
-        with self.app.app_context():
-            q = ModelParameters.query.filter_by(
-                snapshot_type=snapshot_type,
-                decision_type=decision_type,
-                group_id=group_id,
-            ).order_by(ModelParameters.agent_decision_index.desc())
-            return q.first()
+        return self.repository.load_latest_snapshot(
+            snapshot_type, decision_type, group_id=group_id
+        )
 
     def _stabilize_covariance(self, cov: np.ndarray) -> np.ndarray:
-        cov = np.asarray(cov, dtype=np.float64)
-        cov = (cov + cov.T) / 2.0
-        eigvals, eigvecs = np.linalg.eigh(cov)
-        eigvals = np.maximum(eigvals, MIN_COV_JITTER)
-        return eigvecs @ np.diag(eigvals) @ eigvecs.T
+        return psd_project(cov, MIN_COV_JITTER)
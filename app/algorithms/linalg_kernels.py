@@ -0,0 +1,103 @@
+"""
+Batched linear-algebra kernels shared by the EB learners.
+
+Every kernel takes a single (D, D) matrix or a stack of shape (N, D, D)
+(vectors: (D,) or (N, D)) and broadcasts over the leading axis, so an
+agent's shrinkage or MoM step is a handful of stacked numpy calls instead
+of a Python loop of per-dyad inversions.
+
+  - ``psd_project``: symmetrize and floor the eigenvalues (the former
+    per-learner ``_stabilize_covariance``). With ``return_precision`` it
+    also returns the inverse, read off the same eigendecomposition.
+  - ``spd_inverse`` / ``spd_inverse_logdet``: inverse (and log-determinant)
+    of symmetric positive-definite matrices from one Cholesky factor.
+  - ``gaussian_product``: precision-weighted combination of two Gaussians.
+  - ``rank1_posterior_update``: one Gaussian observation folded into a
+    posterior by Sherman–Morrison (single posterior, O(D²)).
+
+Numpy has no batched triangular solve, so the Cholesky inverse solves
+L X = I with the general batched solver; precisions of projected
+covariances come from the eigendecomposition that the projection already
+computed. Results match the former ``np.linalg.inv`` path to within
+``KERNEL_RTOL`` (relative to the largest entry); both are rounding-level
+differences, not a change to the estimators.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+KERNEL_RTOL = 1e-9
+
+
+def psd_project(cov: np.ndarray, floor: float, return_precision: bool = False):
+    """
+    Nearest symmetric matrix with eigenvalues >= ``floor``, per matrix.
+
+    Returns the projected covariance, or ``(covariance, precision)`` when
+    ``return_precision`` is set.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    cov = (cov + np.swapaxes(cov, -1, -2)) / 2.0
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    eigvals = np.maximum(eigvals, floor)
+    projected = (eigvecs * eigvals[..., None, :]) @ np.swapaxes(eigvecs, -1, -2)
+    if not return_precision:
+        return projected
+    precision = (eigvecs / eigvals[..., None, :]) @ np.swapaxes(eigvecs, -1, -2)
+    return projected, precision
+
+
+def spd_inverse_logdet(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse and log-determinant of SPD matrices from one Cholesky factor."""
+    chol = np.linalg.cholesky(np.asarray(matrix, dtype=np.float64))
+    eye = np.broadcast_to(np.eye(chol.shape[-1]), chol.shape)
+    chol_inv = np.linalg.solve(chol, eye)
+    inverse = np.swapaxes(chol_inv, -1, -2) @ chol_inv
+    logdet = 2.0 * np.sum(np.log(np.diagonal(chol, axis1=-2, axis2=-1)), axis=-1)
+    return inverse, logdet
+
+
+def spd_inverse(matrix: np.ndarray) -> np.ndarray:
+    """Inverse of SPD matrices via Cholesky; the result is exactly symmetric."""
+    return spd_inverse_logdet(matrix)[0]
+
+
+def gaussian_product(
+    mean_a: np.ndarray,
+    precision_a: np.ndarray,
+    mean_b: np.ndarray,
+    precision_b: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and covariance of N(mean_a, P_a^{-1}) · N(mean_b, P_b^{-1}):
+        Σ = (P_a + P_b)^{-1},   μ = Σ (P_a mean_a + P_b mean_b).
+    Either side may be a single Gaussian broadcast against a stack.
+    """
+    cov = spd_inverse(precision_a + precision_b)
+    weighted = _matvec(precision_a, mean_a) + _matvec(precision_b, mean_b)
+    return _matvec(cov, weighted), cov
+
+
+def rank1_posterior_update(
+    mean: np.ndarray,
+    cov: np.ndarray,
+    phi: np.ndarray,
+    target: float,
+    noise_var: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Posterior after observing target = φᵀθ + ε, ε ~ N(0, noise_var):
+        s = noise_var + φᵀΣφ,   μ' = μ + Σφ (target − φᵀμ) / s,
+        Σ' = Σ − (Σφ)(Σφ)ᵀ / s.
+    Equivalent to adding φφᵀ / noise_var to the precision, without inverting.
+    """
+    cov_phi = cov @ phi
+    s = noise_var + float(phi @ cov_phi)
+    new_mean = mean + cov_phi * ((target - float(phi @ mean)) / s)
+    new_cov = cov - np.outer(cov_phi, cov_phi) / s
+    return new_mean, (new_cov + new_cov.T) / 2.0
+
+
+def _matvec(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    return (matrix @ np.asarray(vector, dtype=np.float64)[..., None])[..., 0]
@@ -17,15 +17,16 @@ from app.logging_config import get_rl_logger
 from app.protocol import (
     compute_reward, encode_state, validate_context, validate_outcome,
 )
-from app.standardization import fetch_baselines
+from app.repository import SqlRepository
 
 
 class RandomBaselineAlgorithm(RLAlgorithm):
     """Bernoulli(0.5) sampler. Ignores state. State / reward use the
     production pipeline so row schemas match EB."""
 
-    def __init__(self, seed: int | None = None):
+    def __init__(self, seed: int | None = None, repository=None):
         super().__init__(seed)
+        self.repository = repository if repository is not None else SqlRepository()
         self.logger = get_rl_logger()
         self.seed = seed
         self.rng = np.random.default_rng(seed)
@@ -46,7 +47,7 @@ class RandomBaselineAlgorithm(RLAlgorithm):
         if not valid:
             return False, msg
         group_id = context.get("group_id")
-        baselines = fetch_baselines(group_id, decision_type) if group_id else None
+        baselines = self.repository.fetch_baselines(group_id, decision_type) if group_id else None
         return True, encode_state(decision_type, context, baselines=baselines)
 
     def make_reward(self, user_id, state, action, outcome):
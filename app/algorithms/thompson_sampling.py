@@ -6,9 +6,15 @@ Each (group_id, decision_type) pair has its own independent Thompson Sampling ba
 - State: other entries (past3_vars) used as context for the linear model
 
 Uses Bayesian linear regression: E[r|a,x] = x^T theta_a with Gaussian prior.
+Each arm keeps the Cholesky factor of its posterior precision, updated by a
+rank-1 step per observation, so no decision re-inverts sum_xx. P(action=1) is
+the exact Gaussian probability that arm 1 scores higher.
 """
 
+import math
+
 import numpy as np
+from sqlalchemy import select
 from app.algorithms.base import RLAlgorithm
 from app.logging_config import get_rl_logger
 from app.extensions import db
@@ -27,15 +33,22 @@ def _default_params():
             "n": 0,
             "sum_xx": [[0.0] * STATE_DIM for _ in range(STATE_DIM)],
             "sum_xr": [0.0] * STATE_DIM,
+            "chol_prec": _prior_chol().tolist(),
         },
         "action_1": {
             "n": 0,
             "sum_xx": [[0.0] * STATE_DIM for _ in range(STATE_DIM)],
             "sum_xr": [0.0] * STATE_DIM,
+            "chol_prec": _prior_chol().tolist(),
         },
     }
 
 
+def _prior_chol() -> np.ndarray:
+    """Lower Cholesky factor of the prior precision I / lambda."""
+    return np.eye(STATE_DIM) / math.sqrt(LAMBDA_PRIOR)
+
+
 def _state_vector(context: dict) -> np.ndarray:
     """Build state vector x = [1, past3_vars[0], past3_vars[1], past3_vars[2]]."""
     past3 = context.get("past3_vars", [0.0, 0.0, 0.0])
@@ -45,51 +58,89 @@ def _state_vector(context: dict) -> np.ndarray:
     return np.array([1.0, float(past3[0]), float(past3[1]), float(past3[2])], dtype=np.float64)
 
 
-def _posterior_mean_cov(params: dict, action: int) -> tuple[np.ndarray, np.ndarray]:
-    """Compute posterior mean and covariance for the given action."""
-    pa = params[f"action_{action}"]
-    n = pa["n"]
-    sum_xx = np.array(pa["sum_xx"])
-    sum_xr = np.array(pa["sum_xr"])
+def _precision_chol(pa: dict) -> np.ndarray:
+    """
+    Lower Cholesky factor L of the posterior precision, L L^T = I/lambda + sum_xx/sigma^2.
 
+    Rows saved before the factor was tracked only carry sum_xx; for those it
+    is factored once here.
+    """
+    if "chol_prec" in pa:
+        return np.array(pa["chol_prec"], dtype=np.float64)
     prior_prec = (1.0 / LAMBDA_PRIOR) * np.eye(STATE_DIM)
-    lik_prec = (1.0 / (SIGMA_NOISE**2)) * sum_xx if n > 0 else np.zeros((STATE_DIM, STATE_DIM))
-    post_prec = prior_prec + lik_prec
-    post_cov = np.linalg.inv(post_prec)
+    lik_prec = (1.0 / (SIGMA_NOISE**2)) * np.array(pa["sum_xx"]) if pa["n"] > 0 else 0.0
+    return np.linalg.cholesky(prior_prec + lik_prec)
+
+
+def _chol_rank1_update(L: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Return the Cholesky factor of L L^T + v v^T (O(d^2), no refactorization)."""
+    L = L.copy()
+    v = v.astype(np.float64, copy=True)
+    for k in range(L.shape[0]):
+        r = math.hypot(L[k, k], v[k])
+        c = r / L[k, k]
+        s = v[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1:, k] = (L[k + 1:, k] + s * v[k + 1:]) / c
+        v[k + 1:] = c * v[k + 1:] - s * L[k + 1:, k]
+    return L
+
+
+def _posterior(params: dict, action: int) -> tuple[np.ndarray, np.ndarray]:
+    """Posterior mean and precision Cholesky factor L for the given action."""
+    pa = params[f"action_{action}"]
+    L = _precision_chol(pa)
+    lik_term = (1.0 / (SIGMA_NOISE**2)) * np.array(pa["sum_xr"]) if pa["n"] > 0 else np.zeros(STATE_DIM)
+    # Prior mean is zero, so the mean is (L L^T)^{-1} lik_term.
+    post_mean = np.linalg.solve(L.T, np.linalg.solve(L, lik_term))
+    return post_mean, L
 
-    prior_term = prior_prec @ np.zeros(STATE_DIM)
-    lik_term = (1.0 / (SIGMA_NOISE**2)) * sum_xr if n > 0 else np.zeros(STATE_DIM)
-    post_mean = post_cov @ (prior_term + lik_term)
 
-    return post_mean, post_cov
+def _posterior_mean_cov(params: dict, action: int) -> tuple[np.ndarray, np.ndarray]:
+    """Compute posterior mean and covariance for the given action."""
+    post_mean, L = _posterior(params, action)
+    L_inv = np.linalg.solve(L, np.eye(STATE_DIM))
+    return post_mean, L_inv.T @ L_inv
 
 
-def _sample_theta(params: dict, action: int, rng: np.random.Generator) -> np.ndarray:
-    """Sample theta from posterior for the given action."""
-    mu, cov = _posterior_mean_cov(params, action)
-    return rng.multivariate_normal(mu, cov)
+def _sample_thetas(posteriors, rng: np.random.Generator) -> list[np.ndarray]:
+    """One theta per arm from a single standard-normal draw: theta = mu + L^{-T} z."""
+    z = rng.standard_normal((len(posteriors), STATE_DIM))
+    return [mu + np.linalg.solve(L.T, z_a) for (mu, L), z_a in zip(posteriors, z)]
 
 
 def _update_params(params: dict, action: int, x: np.ndarray, r: float) -> dict:
-    """Update sufficient statistics for the given action."""
-    pa = params[f"action_{action}"].copy()
+    """Update sufficient statistics for the given action; returns a new dict."""
+    pa = dict(params[f"action_{action}"])
+    pa["chol_prec"] = _chol_rank1_update(_precision_chol(pa), x / SIGMA_NOISE).tolist()
     pa["n"] = pa["n"] + 1
     xx = np.outer(x, x)
     pa["sum_xx"] = (np.array(pa["sum_xx"]) + xx).tolist()
     pa["sum_xr"] = (np.array(pa["sum_xr"]) + x * r).tolist()
-    params[f"action_{action}"] = pa
-    return params
+    return {**params, f"action_{action}": pa}
 
 
-def _prob_action_1(params: dict, x: np.ndarray, rng: np.random.Generator, n_samples: int = 100) -> float:
-    """Estimate P(action=1 is better) via sampling."""
-    wins = 0
-    for _ in range(n_samples):
-        theta_0 = _sample_theta(params, 0, rng)
-        theta_1 = _sample_theta(params, 1, rng)
-        if x @ theta_1 > x @ theta_0:
-            wins += 1
-    return wins / n_samples
+def _params_version(group_id: str, decision_type: str) -> tuple | None:
+    """(id, updated_at) of the stored params row, or None if there is none."""
+    row = db.session.execute(
+        select(ThompsonSamplingParams.id, ThompsonSamplingParams.updated_at).filter_by(
+            group_id=group_id, decision_type=decision_type
+        )
+    ).first()
+    return None if row is None else tuple(row)
+
+
+def _prob_action_1(posteriors, x: np.ndarray) -> float:
+    """
+    Exact P(x^T theta_1 > x^T theta_0) for independent Gaussian arm posteriors.
+
+    The difference is N(x^T (mu_1 - mu_0), x^T Sigma_0 x + x^T Sigma_1 x), and
+    x^T Sigma x = ||L^{-1} x||^2 for the precision factor L.
+    """
+    (mu_0, L_0), (mu_1, L_1) = posteriors
+    mean = float(x @ (mu_1 - mu_0))
+    var = float(np.sum(np.linalg.solve(L_0, x) ** 2) + np.sum(np.linalg.solve(L_1, x) ** 2))
+    return 0.5 * (1.0 + math.erf(mean / math.sqrt(2.0 * var)))
 
 
 class ThompsonSamplingAlgorithm(RLAlgorithm):
@@ -104,6 +155,11 @@ class ThompsonSamplingAlgorithm(RLAlgorithm):
         self.seed = seed
         self.rng = np.random.default_rng(seed)
         self.app = app
+        # (group_id, decision_type) -> (row version, params) as last read or
+        # written by this process. Entries are replaced, never mutated. Any
+        # process may write the table, so each read checks the row's
+        # (id, updated_at) and reloads the params when it moved.
+        self._params_cache: dict[tuple[str, str], tuple[tuple | None, dict]] = {}
         self.logger.info("Thompson Sampling algorithm initialized.")
 
     def _get_params(self, group_id: str, decision_type: str) -> dict:
@@ -111,12 +167,17 @@ class ThompsonSamplingAlgorithm(RLAlgorithm):
         if self.app is None:
             return _default_params()
         with self.app.app_context():
+            version = _params_version(group_id, decision_type)
+            cached = self._params_cache.get((group_id, decision_type))
+            if cached is not None and cached[0] == version:
+                return cached[1]
             row = ThompsonSamplingParams.query.filter_by(
                 group_id=group_id, decision_type=decision_type
             ).first()
-            if row is None:
-                return _default_params()
-            return row.params
+            params = _default_params() if row is None else row.params
+            version = None if row is None else (row.id, row.updated_at)
+        self._params_cache[(group_id, decision_type)] = (version, params)
+        return params
 
     def _save_params(self, group_id: str, decision_type: str, params: dict):
         """Save TS params for (group_id, decision_type)."""
@@ -133,6 +194,8 @@ class ThompsonSamplingAlgorithm(RLAlgorithm):
                 row.params = params
                 row.updated_at = __import__("datetime").datetime.now()
             db.session.commit()
+            version = (row.id, row.updated_at)
+        self._params_cache[(group_id, decision_type)] = (version, params)
 
     def get_action(
         self, group_id: str, state, parameters: dict, decision_type: str, decision_idx: int
@@ -154,13 +217,13 @@ class ThompsonSamplingAlgorithm(RLAlgorithm):
 
         params = self._get_params(group_id, decision_type)
 
-        theta_0 = _sample_theta(params, 0, self.rng)
-        theta_1 = _sample_theta(params, 1, self.rng)
+        posteriors = [_posterior(params, 0), _posterior(params, 1)]
+        theta_0, theta_1 = _sample_thetas(posteriors, self.rng)
         val_0 = float(x @ theta_0)
         val_1 = float(x @ theta_1)
 
         action = 1 if val_1 > val_0 else 0
-        prob_a1 = _prob_action_1(params, x, self.rng)
+        prob_a1 = _prob_action_1(posteriors, x)
         prob = prob_a1 if action == 1 else (1.0 - prob_a1)
 
         self.logger.info(
@@ -0,0 +1,218 @@
+"""
+Append-only binary decision log (``logs/decisions.bin``).
+
+One fixed-width record per served /action decision — π, the learner's
+m / v / eta, the parameter source, sample-buffer cursors and the warm-up
+flag — so analysts can load a whole trial with ``load_decision_log``
+instead of regex-parsing rl.log.
+
+File layout: ``MAGIC``, a little-endian uint32 header length, a JSON
+header ``{"version": ..., "descr": [...]}`` describing the numpy record
+dtype, then packed records of that dtype. Readers take the dtype from the
+header, so files written under an older ``DECISION_DTYPE`` stay readable;
+a trailing partial record (crash mid-write) is ignored.
+
+Records are handed to the queue pipeline in app/logging_config.py and
+written by its listener thread, never on the request thread. Like
+app.log and rl.log the log holds only pseudonymous group ids and
+algorithm internals: no context, state or payload values.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import math
+import os
+import struct
+
+import numpy as np
+
+from app.logging_config import install_queue_pipeline
+
+MAGIC = b"RLDECLOG"
+SCHEMA_VERSION = 2
+
+DECISION_DTYPE = np.dtype(
+    [
+        ("request_timestamp", "<M8[us]"),
+        ("served_at", "<M8[us]"),
+        ("study_id", "S64"),  # empty outside multi-study tenancy (app/tenancy.py)
+        ("group_id", "S255"),
+        ("decision_type", "S16"),
+        ("decision_idx", "<i4"),
+        ("action", "i1"),
+        ("prob", "<f8"),  # probability of the action taken (actions.action_prob)
+        ("pi", "<f8"),  # P(A = 1)
+        ("m", "<f8"),
+        ("v", "<f8"),
+        ("eta", "<f8"),
+        ("mode", "S16"),
+        ("source", "S16"),
+        ("warmup", "?"),
+        ("warmup_reason", "S16"),
+        ("cursor_normal_start", "<i8"),
+        ("cursor_normal_end", "<i8"),
+        ("cursor_uniform_start", "<i8"),
+        ("cursor_uniform_end", "<i8"),
+    ]
+)
+
+_logger = logging.getLogger("RLDecisions")
+_logger.propagate = False
+
+
+def _header(dtype: np.dtype) -> bytes:
+    body = json.dumps({"version": SCHEMA_VERSION, "descr": dtype.descr}).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(body)) + body
+
+
+def _read_header(handle) -> tuple[np.dtype, int]:
+    if handle.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{handle.name} is not a decision log")
+    (length,) = struct.unpack("<I", handle.read(4))
+    header = json.loads(handle.read(length).decode("utf-8"))
+    dtype = np.dtype([tuple(field) for field in header["descr"]])
+    return dtype, len(MAGIC) + 4 + length
+
+
+def _datetime64(value) -> np.datetime64:
+    if value is None:
+        return np.datetime64("NaT", "us")
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _encode(value, width: int) -> bytes:
+    return (value or "").encode("utf-8")[:width]
+
+
+def encode_decision(decision: dict) -> np.ndarray:
+    """One ``DECISION_DTYPE`` record from a ``log_decision`` payload."""
+    random_state = decision.get("random_state") or {}
+    start = random_state.get("sampler_cursor_start") or {}
+    end = random_state.get("sampler_cursor_end") or {}
+    action = int(decision["action"])
+    prob = float(decision["prob"])
+
+    record = np.zeros((), dtype=DECISION_DTYPE)
+    record["request_timestamp"] = _datetime64(decision.get("request_timestamp"))
+    record["served_at"] = _datetime64(decision.get("served_at"))
+    record["study_id"] = _encode(decision.get("study_id"), 64)
+    record["group_id"] = _encode(decision["group_id"], 255)
+    record["decision_type"] = _encode(decision["decision_type"], 16)
+    record["decision_idx"] = int(decision["decision_idx"])
+    record["action"] = action
+    record["prob"] = prob
+    record["pi"] = prob if action == 1 else 1.0 - prob
+    record["m"] = _float(random_state.get("m"))
+    record["v"] = _float(random_state.get("v"))
+    record["eta"] = _float(random_state.get("eta"))
+    record["mode"] = _encode(random_state.get("mode"), 16)
+    record["source"] = _encode(random_state.get("source"), 16)
+    record["warmup"] = bool(decision.get("warmup", False))
+    record["warmup_reason"] = _encode(decision.get("warmup_reason"), 16)
+    record["cursor_normal_start"] = int(start.get("normal", -1))
+    record["cursor_normal_end"] = int(end.get("normal", -1))
+    record["cursor_uniform_start"] = int(start.get("uniform", -1))
+    record["cursor_uniform_end"] = int(end.get("uniform", -1))
+    return record
+
+
+class DecisionLogFileHandler(logging.Handler):
+    """
+    Appends the ``decision`` payload of each record to a binary decision log.
+
+    An existing file written under a different dtype is moved aside to
+    ``<path>.v<n>`` rather than appended to with a mismatched layout; a
+    trailing partial record is truncated before appending.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(level=logging.INFO)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as handle:
+                try:
+                    dtype, offset = _read_header(handle)
+                except (ValueError, struct.error, KeyError, TypeError):
+                    dtype = None
+            if dtype != DECISION_DTYPE:
+                suffix = 1
+                while os.path.exists(f"{path}.v{suffix}"):
+                    suffix += 1
+                os.replace(path, f"{path}.v{suffix}")
+            else:
+                # Drop a partial record left by a crash so appends stay aligned.
+                partial = (os.path.getsize(path) - offset) % dtype.itemsize
+                if partial:
+                    os.truncate(path, os.path.getsize(path) - partial)
+        self._stream = open(path, "ab")
+        if self._stream.tell() == 0:
+            self._stream.write(_header(DECISION_DTYPE))
+            self._stream.flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        decision = getattr(record, "decision", None)
+        if decision is None:
+            return
+        try:
+            self._stream.write(encode_decision(decision).tobytes())
+            self._stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        try:
+            if not self._stream.closed:
+                self._stream.close()
+        finally:
+            super().close()
+
+
+def setup_decision_log(path: str) -> None:
+    """Start the queued binary decision log at ``path`` (once per process)."""
+    if _logger.handlers:
+        return
+    install_queue_pipeline("decisions", _logger, DecisionLogFileHandler(path))
+
+
+def log_decision(**decision) -> None:
+    """
+    Queue one decision for the binary log; a no-op unless
+    ``setup_decision_log`` ran. Fields: study_id, group_id, decision_type,
+    decision_idx, action, prob, random_state, warmup, warmup_reason,
+    request_timestamp, served_at.
+    """
+    if not _logger.handlers:
+        return
+    _logger.info("decision", extra={"decision": decision})
+
+
+def load_decision_log(path: str) -> dict[str, np.ndarray]:
+    """
+    Load every record of a decision log as numpy columns, one array per
+    field. Byte-string fields are decoded to ``str`` arrays; missing floats
+    are NaN and missing cursors -1.
+    """
+    with open(path, "rb") as handle:
+        dtype, offset = _read_header(handle)
+    size = os.path.getsize(path) - offset
+    count = max(size, 0) // dtype.itemsize
+    records = np.fromfile(path, dtype=dtype, count=count, offset=offset)
+    columns = {}
+    for name in dtype.names:
+        column = records[name]
+        if dtype[name].kind == "S":
+            column = np.char.decode(column, "utf-8", "replace")
+        columns[name] = column
+    return columns
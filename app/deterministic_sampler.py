@@ -18,6 +18,11 @@ Design:
   and stamped onto the Action / EB snapshot rows that triggered it. Together
   with the original buffer file, this is sufficient to deterministically
   replay the algorithm.
+- A consumer in another process (the /update worker, app/update_worker.py)
+  is handed an explicit window: ``reserve`` moves this stream past the
+  next primitives and returns their ranges; the worker's copy of the
+  buffer is ``confine``-d to that window, so the two never draw the same
+  primitive and neither depends on the other's timing.
 
 Multivariate sampling uses
 ``y = mean + L @ z`` where ``L = U sqrt(D)`` from the eigendecomposition of
@@ -32,6 +37,7 @@ from __future__ import annotations
 
 import os
 import threading
+import time
 from typing import Any
 
 import numpy as np
@@ -41,6 +47,33 @@ class SampleBufferExhausted(RuntimeError):
     """Raised when the pre-sampled stream runs out of primitives."""
 
 
+class _TimedLock:
+    """
+    ``threading.Lock`` that accumulates, per thread, the time spent waiting
+    to acquire it. The /metrics hooks read (and reset) the calling thread's
+    total at the end of each request via ``take_wait_seconds``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._lock.acquire()
+        self._local.wait = getattr(self._local, "wait", 0.0) + (time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        return False
+
+    def take_wait_seconds(self) -> float:
+        wait = getattr(self._local, "wait", 0.0)
+        self._local.wait = 0.0
+        return wait
+
+
 class DeterministicSampleStream:
     NORMAL_KEY = "normals"
     UNIFORM_KEY = "uniforms"
@@ -70,8 +103,11 @@ class DeterministicSampleStream:
             )
         self._normal_cursor = int(normal_cursor)
         self._uniform_cursor = int(uniform_cursor)
+        # Draws stop here (the buffer end unless confined to a window).
+        self._normal_stop = len(self._normals)
+        self._uniform_stop = len(self._uniforms)
         self._seed = seed
-        self._lock = threading.Lock()
+        self._lock = _TimedLock()
 
     # ------------------------------------------------------------ properties
 
@@ -87,6 +123,11 @@ class DeterministicSampleStream:
     def seed(self) -> int | None:
         return self._seed
 
+    def take_lock_wait_seconds(self) -> float:
+        """Time the calling thread spent waiting on the stream lock since the
+        last call (reset on read)."""
+        return self._lock.take_wait_seconds()
+
     def cursor(self) -> dict[str, int]:
         """Snapshot of the current consumption position."""
         with self._lock:
@@ -107,6 +148,47 @@ class DeterministicSampleStream:
                 )
             self._normal_cursor = n
             self._uniform_cursor = u
+            self._normal_stop = len(self._normals)
+            self._uniform_stop = len(self._uniforms)
+
+    def reserve(self, normals: int = 0, uniforms: int = 0) -> dict[str, list[int]]:
+        """
+        Set aside the next ``normals`` / ``uniforms`` primitives for another
+        consumer and advance past them. Returns the window
+        ``{"normal": [start, end], "uniform": [start, end]}``.
+        """
+        if normals < 0 or uniforms < 0:
+            raise ValueError("reservation sizes must be non-negative")
+        with self._lock:
+            n_end = self._normal_cursor + int(normals)
+            u_end = self._uniform_cursor + int(uniforms)
+            if n_end > self._normal_stop or u_end > self._uniform_stop:
+                raise SampleBufferExhausted(
+                    f"cannot reserve normals={normals} uniforms={uniforms} at cursor "
+                    f"{{'normal': {self._normal_cursor}, 'uniform': {self._uniform_cursor}}}"
+                )
+            window = {
+                "normal": [self._normal_cursor, n_end],
+                "uniform": [self._uniform_cursor, u_end],
+            }
+            self._normal_cursor = n_end
+            self._uniform_cursor = u_end
+            return window
+
+    def confine(self, window: dict[str, list[int]]) -> None:
+        """
+        Draw only from a ``reserve``-d window: the cursor moves to its start
+        and draws past its end raise ``SampleBufferExhausted``. ``restore``
+        lifts the limit.
+        """
+        (n_start, n_end), (u_start, u_end) = window["normal"], window["uniform"]
+        if not (0 <= n_start <= n_end <= len(self._normals)) or not (
+            0 <= u_start <= u_end <= len(self._uniforms)
+        ):
+            raise SampleBufferExhausted(f"window {window} outside the buffer")
+        with self._lock:
+            self._normal_cursor, self._normal_stop = int(n_start), int(n_end)
+            self._uniform_cursor, self._uniform_stop = int(u_start), int(u_end)
 
     # ----------------------------------------------------------------- draws
 
@@ -116,10 +198,10 @@ class DeterministicSampleStream:
             raise ValueError("dim must be non-negative")
         with self._lock:
             end = self._normal_cursor + dim
-            if end > self.n_normals:
+            if end > self._normal_stop:
                 raise SampleBufferExhausted(
                     f"normal buffer exhausted: cursor={self._normal_cursor} "
-                    f"+ dim={dim} > size={self.n_normals}"
+                    f"+ dim={dim} > stop={self._normal_stop}"
                 )
             out = self._normals[self._normal_cursor:end].copy()
             self._normal_cursor = end
@@ -128,7 +210,7 @@ class DeterministicSampleStream:
     def draw_uniform(self) -> float:
         """Pull the next uniform [0, 1) primitive."""
         with self._lock:
-            if self._uniform_cursor >= self.n_uniforms:
+            if self._uniform_cursor >= self._uniform_stop:
                 raise SampleBufferExhausted(
                     f"uniform buffer exhausted: cursor={self._uniform_cursor}"
                 )
@@ -25,11 +25,17 @@ Only variable names listed in `CONTINUOUS_VARIABLES` below are candidates for
 standardization; all others fall through unchanged. Missing baselines fall back
 to the raw (already-scaled) value — this is the steady-state behavior during
 week 1 and the warmup cohort.
+
+Builders are immutable once constructed. `feature_builder(decision_type)`
+returns the process-wide instance for an agent, so the variable specs and
+the constants derived from them (tailoring mask, φ block slices) are built
+once per process rather than on every call.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Callable
 
 import numpy as np
@@ -90,8 +96,14 @@ class ProtocolRLFeatureBuilder:
 
     def __init__(self, decision_type: str):
         self.decision_type = decision_type
-        self._specs = self._specs_for(decision_type)
+        self._specs = tuple(self._specs_for(decision_type))
         self.n_vars = len(self._specs)
+        # Per-spec "standardize?" flags, resolved once instead of per vector.
+        self._standardized = tuple(spec.name in CONTINUOUS_VARIABLES for spec in self._specs)
+        tailoring = TAILORING_VARS_BY_AGENT.get(decision_type, frozenset())
+        mask = np.asarray([spec.name in tailoring for spec in self._specs], dtype=bool)
+        mask.setflags(write=False)
+        self.tailoring_mask = mask
 
     @property
     def base_dim(self) -> int:
@@ -103,6 +115,16 @@ class ProtocolRLFeatureBuilder:
         # [1, a, I, v_1*I, ..., v_J*I, a*I, a*v_1*I, ..., a*v_J*I]
         return 4 + 2 * self.n_vars
 
+    @property
+    def main_block(self) -> slice:
+        """φ indices of the main block [1, a, I, v_1*I, ..., v_J*I]."""
+        return slice(0, 3 + self.n_vars)
+
+    @property
+    def interaction_block(self) -> slice:
+        """φ indices of the interaction block [a*I, a*v_1*I, ..., a*v_J*I]."""
+        return slice(3 + self.n_vars, 4 + 2 * self.n_vars)
+
     @property
     def variable_names(self) -> list[str]:
         return [spec.name for spec in self._specs]
@@ -116,12 +138,12 @@ class ProtocolRLFeatureBuilder:
         all_observed = all(spec.observed(context) for spec in self._specs)
         I = 1.0 if all_observed else 0.0
         values: list[float] = []
-        for spec in self._specs:
+        for spec, standardized in zip(self._specs, self._standardized):
             if I == 0.0:
                 values.append(0.0)
                 continue
             raw_val = float(spec.value(context))
-            if spec.name in CONTINUOUS_VARIABLES:
+            if standardized:
                 raw_val = _standardize(spec.name, raw_val, baselines)
             values.append(raw_val)
         return np.asarray([1.0, I, *values], dtype=np.float64)
@@ -151,7 +173,7 @@ class ProtocolRLFeatureBuilder:
 
     @staticmethod
     def for_decision_type(decision_type: str) -> ProtocolRLFeatureBuilder:
-        return ProtocolRLFeatureBuilder(decision_type)
+        return feature_builder(decision_type)
 
     def _specs_for(self, dt: str) -> list[RawVariableSpec]:
         if dt == "aya_message":
@@ -318,8 +340,14 @@ class ProtocolRLFeatureBuilder:
         raise ValueError(f"unknown decision_type: {dt}")
 
 
+@lru_cache(maxsize=None)
+def feature_builder(decision_type: str) -> ProtocolRLFeatureBuilder:
+    """The shared, immutable builder for `decision_type`."""
+    return ProtocolRLFeatureBuilder(decision_type)
+
+
 def phi_dims_by_decision_type() -> dict[str, int]:
-    return {dt: ProtocolRLFeatureBuilder(dt).phi_dim for dt in ("aya_message", "cp_message", "dyad_game")}
+    return {dt: feature_builder(dt).phi_dim for dt in ("aya_message", "cp_message", "dyad_game")}
 
 
 # Tailoring vs prognostic classification per agent (main.tex Table 2 and §3.1).
@@ -353,7 +381,6 @@ def tailoring_mask(decision_type: str) -> np.ndarray:
     """
     Return a length-n_vars boolean array: True for tailoring features, False for
     prognostic. Indexed in the same order as ProtocolRLFeatureBuilder(decision_type)._specs.
+    The array is shared and read-only.
     """
-    fb = ProtocolRLFeatureBuilder(decision_type)
-    tailoring = TAILORING_VARS_BY_AGENT.get(decision_type, frozenset())
-    return np.asarray([name in tailoring for name in fb.variable_names], dtype=bool)
+    return feature_builder(decision_type).tailoring_mask
@@ -0,0 +1,165 @@
+"""
+Frozen-dyad archive: final local fits of dyads that have completed the study.
+
+Once a dyad is past its ``consent_end_date`` and every one of its actions
+has a finalized study_data row, it can never change again. ``/update`` then
+freezes it: each learner that supports the archive (see
+``RLAlgorithm.frozen_decision_types``) appends the dyad's final local fit
+(θ̂_i, V_i, sample size, high-water decision index) to a per-agent stack,
+and later updates stop loading, re-deriving and refitting that dyad's rows.
+Its fit still enters the EB pool, read back as stacked arrays with a single
+row fetch per agent. Only γ = 0 agents freeze: a discounted agent's local
+fit bootstraps on the current value estimate, so it keeps changing after
+the dyad's rows stop (``undiscounted_decision_types``).
+
+Storage is one ``frozen_dyad_fits`` row per decision_type holding an
+``.npz`` payload (``SqlRepository``), or a plain dict for headless runs
+(``InMemoryRepository``). The archive is a cache of the frozen dyads'
+last local_fit snapshots, which stay in model_parameters.
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Action, FrozenDyadFits, Group, StudyData
+
+
+@dataclass
+class FrozenFits:
+    """Stacked final local fits of one agent's frozen dyads (row i = group_ids[i])."""
+
+    group_ids: np.ndarray  # (n,) str
+    theta: np.ndarray  # (n, d)
+    covariance: np.ndarray  # (n, d, d)
+    sample_size: np.ndarray  # (n,) int64
+    agent_decision_index: np.ndarray  # (n,) int64
+
+    def __len__(self) -> int:
+        return int(self.group_ids.shape[0])
+
+    @property
+    def feature_dim(self) -> int:
+        return int(self.theta.shape[1])
+
+    def extend(self, fits: dict[str, dict]) -> "FrozenFits":
+        """A new stack with ``fits`` (``local_fits`` entries by group_id) appended."""
+        entries = list(fits.values())
+        theta = np.stack([np.asarray(f["theta_hat"], dtype=np.float64) for f in entries])
+        covariance = np.stack([np.asarray(f["covariance"], dtype=np.float64) for f in entries])
+        sample_size = np.asarray([f["sample_size"] for f in entries], dtype=np.int64)
+        index = np.asarray([f["agent_decision_index"] for f in entries], dtype=np.int64)
+        return FrozenFits(
+            group_ids=np.concatenate([self.group_ids, np.asarray(list(fits), dtype=str)]),
+            theta=np.concatenate([self.theta, theta]),
+            covariance=np.concatenate([self.covariance, covariance]),
+            sample_size=np.concatenate([self.sample_size, sample_size]),
+            agent_decision_index=np.concatenate([self.agent_decision_index, index]),
+        )
+
+    @classmethod
+    def empty(cls, feature_dim: int) -> "FrozenFits":
+        return cls(
+            group_ids=np.empty(0, dtype=str),
+            theta=np.empty((0, feature_dim), dtype=np.float64),
+            covariance=np.empty((0, feature_dim, feature_dim), dtype=np.float64),
+            sample_size=np.empty(0, dtype=np.int64),
+            agent_decision_index=np.empty(0, dtype=np.int64),
+        )
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            group_ids=self.group_ids,
+            theta=self.theta,
+            covariance=self.covariance,
+            sample_size=self.sample_size,
+            agent_decision_index=self.agent_decision_index,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "FrozenFits":
+        with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+            return cls(
+                group_ids=arrays["group_ids"],
+                theta=arrays["theta"],
+                covariance=arrays["covariance"],
+                sample_size=arrays["sample_size"],
+                agent_decision_index=arrays["agent_decision_index"],
+            )
+
+
+def load_frozen_fits(decision_type: str) -> FrozenFits | None:
+    row = FrozenDyadFits.query.filter_by(decision_type=decision_type).first()
+    if row is None:
+        return None
+    return FrozenFits.from_bytes(row.payload)
+
+
+def freeze_fits(decision_type: str, fits: dict[str, dict]) -> None:
+    """Append ``fits`` to the agent's archive row (created on first use)."""
+    if not fits:
+        return
+    row = FrozenDyadFits.query.filter_by(decision_type=decision_type).first()
+    feature_dim = len(next(iter(fits.values()))["theta_hat"])
+    current = FrozenFits.from_bytes(row.payload) if row is not None else FrozenFits.empty(feature_dim)
+    already = set(current.group_ids.tolist())
+    fits = {gid: fit for gid, fit in fits.items() if gid not in already}
+    if not fits:
+        return
+    stacked = current.extend(fits)
+    if row is None:
+        row = FrozenDyadFits(decision_type=decision_type)
+        db.session.add(row)
+    row.group_ids = stacked.group_ids.tolist()
+    row.n_dyads = len(stacked)
+    row.feature_dim = stacked.feature_dim
+    row.payload = stacked.to_bytes()
+    row.updated_at = datetime.datetime.now()
+    db.session.commit()
+
+
+def frozen_group_ids() -> dict[str, set[str]]:
+    """Frozen dyads per decision_type, read without decoding the payloads."""
+    rows = db.session.query(FrozenDyadFits.decision_type, FrozenDyadFits.group_ids).all()
+    return {decision_type: set(group_ids or []) for decision_type, group_ids in rows}
+
+
+def completed_group_ids(as_of: datetime.datetime, exclude: set[str] = frozenset()) -> set[str]:
+    """
+    Dyads ready to freeze at ``as_of``: past ``consent_end_date`` with no
+    action still waiting for its outcome window.
+    """
+    actions = dict(
+        db.session.query(Action.group_id, func.count(Action.id)).group_by(Action.group_id).all()
+    )
+    finalized = dict(
+        db.session.query(StudyData.group_id, func.count(StudyData.id))
+        .filter(StudyData.reward.isnot(None))
+        .group_by(StudyData.group_id)
+        .all()
+    )
+    completed = set()
+    for group in Group.query.all():
+        if group.group_id in exclude:
+            continue
+        end = (group.group_info or {}).get("consent_end_date")
+        if not end:
+            continue
+        try:
+            end_date = datetime.datetime.fromisoformat(str(end)).date()
+        except ValueError:
+            continue
+        if end_date >= as_of.date():
+            continue
+        if actions.get(group.group_id, 0) == finalized.get(group.group_id, 0):
+            completed.add(group.group_id)
+    return completed
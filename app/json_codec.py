@@ -0,0 +1,162 @@
+"""
+JSON codec for HTTP bodies and JSON columns (``JSON_CODEC``).
+
+"orjson" (the default when it is installed) decodes every request body and
+every JSON column read (``DataUpload.data``, the ``Action`` and
+``StudyData`` JSON fields, ``ModelParameters`` theta/covariance, ...) with
+orjson, and encodes responses with it. "stdlib" is Flask's and SQLAlchemy's
+stock ``json``; it is also what "orjson" falls back to when the package is
+missing, for input orjson rejects (integers beyond 64 bits; NaN / Infinity
+when decoding) and for responses holding NaN / Infinity, which orjson would
+encode as ``null`` where the stdlib writes ``NaN`` / ``Infinity``.
+
+Column writes always use the stdlib encoder, so the stored text is
+byte-identical under either codec: orjson formats floats and whitespace
+differently (``1e-7`` vs ``1e-07``, no spaces after separators), and the
+repro snapshots and backups are compared as text. Both encoders accept
+numpy arrays and scalars.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider, _default as _flask_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+JSON_CODECS = ("orjson", "stdlib")
+
+
+def numpy_default(obj):
+    """``default`` hook: numpy arrays and scalars as their Python values."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def resolve_codec(name: str | None) -> str:
+    """The codec to use for ``JSON_CODEC``; "orjson" degrades to "stdlib"."""
+    name = name or "orjson"
+    if name not in JSON_CODECS:
+        raise ValueError(f"JSON_CODEC must be one of {JSON_CODECS}, not {name!r}")
+    if name == "orjson" and orjson is None:
+        logging.warning("[JSON] orjson is not installed; using the stdlib codec")
+        return "stdlib"
+    return name
+
+
+def column_dumps(obj) -> str:
+    """Column encoder: ``json.dumps`` output (SQLAlchemy's default), plus numpy."""
+    return json.dumps(obj, default=numpy_default)
+
+
+def fast_loads(text):
+    """orjson decode, or ``json.loads`` for input orjson rejects."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
+def engine_json_options(codec: str) -> dict:
+    """``create_engine`` keyword arguments for the JSON column types."""
+    return {
+        "json_serializer": column_dumps,
+        "json_deserializer": fast_loads if codec == "orjson" else json.loads,
+    }
+
+
+def _non_finite(obj) -> bool:
+    """Whether ``obj`` holds a NaN or infinity (orjson encodes them as null)."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(map(_non_finite, obj.values()))
+    if isinstance(obj, (list, tuple)):
+        return any(map(_non_finite, obj))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind in "fc":
+            return not np.isfinite(obj).all()
+        return obj.dtype.kind == "O" and any(map(_non_finite, obj.flat))
+    if isinstance(obj, np.generic) and obj.dtype.kind in "fc":
+        return not np.isfinite(obj)
+    return False
+
+
+def _response_default(obj):
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    return _flask_default(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider on orjson. Responses keep Flask's sorted keys,
+    debug indentation, trailing newline and RFC 822 dates; non-ASCII text is
+    sent as UTF-8 rather than escaped. Calls with stdlib keyword arguments
+    use the stdlib.
+    """
+
+    default = staticmethod(_response_default)
+
+    def _options(self, indent: bool = False) -> int:
+        options = (
+            orjson.OPT_SORT_KEYS
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        return options | orjson.OPT_INDENT_2 if indent else options
+
+    def _encode(self, obj, option: int) -> bytes | None:
+        """orjson bytes for ``obj``, or None where the stdlib must encode it."""
+        try:
+            body = orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return None
+        # Only scan for NaN / Infinity when orjson wrote a null somewhere.
+        if b"null" in body and _non_finite(obj):
+            return None
+        return body
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        body = self._encode(obj, self._options())
+        return super().dumps(obj) if body is None else body.decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return fast_loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._encode(obj, self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        if body is None:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_codec(app) -> str:
+    """
+    Install the configured codec on ``app``: its JSON provider and the
+    engine options of its JSON columns. Call before ``db.init_app``.
+    """
+    codec = resolve_codec(app.config.get("JSON_CODEC"))
+    if codec == "orjson":
+        app.json = OrjsonProvider(app)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        **engine_json_options(codec),
+    }
+    app.json_codec = codec
+    return codec
@@ -1,46 +1,167 @@
-import logging
-import os
-from logging.handlers import RotatingFileHandler
-
-def setup_logging():
-    """
-    Configures the logging for the Flask application.
-    """
-    # Ensure the logs directory exists
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-
-    # Set up rotating file handler
-    log_file = os.path.join(log_dir, "app.log")
-    handler = RotatingFileHandler(log_file, maxBytes=100 * 1024 * 1024, backupCount=5000)  # 100 MB per file
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-    handler.setFormatter(formatter)
-
-    # Set up logging configuration
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[
-            handler,              # Log to file in logs directory
-            logging.StreamHandler()  # Log to console
-        ]
-    )
-
-def get_rl_logger():
-    """
-    Returns a logger for the RL Algorithm with a dedicated file handler.
-    """
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-
-    rl_log_file = os.path.join(log_dir, "rl.log")
-    rl_handler = RotatingFileHandler(rl_log_file, maxBytes=100 * 1024 * 1024, backupCount=5000)  # 100 MB per file
-    rl_handler.setLevel(logging.INFO)
-    rl_formatter = logging.Formatter("%(asctime)s [%(levelname)s] [RL] %(message)s")
-    rl_handler.setFormatter(rl_formatter)
-
-    rl_logger = logging.getLogger("RLAlgorithm")
-    rl_logger.setLevel(logging.INFO)
-    rl_logger.addHandler(rl_handler)
-
-    return rl_logger
\ No newline at end of file
+"""
+Queue-backed logging for app.log and rl.log.
+
+Request and update threads only enqueue records on a bounded queue; one
+``QueueListener`` thread per log formats them and does the file/console
+I/O, including rotation. When a queue is full, INFO/DEBUG records are
+dropped immediately and WARNING+ records wait up to
+``LOG_QUEUE_BLOCK_TIMEOUT_S`` before being dropped; every drop is counted
+(``dropped_log_records``, exported as ``rl_api_log_records_dropped_total``
+on GET /metrics).
+
+``setup_logging`` and ``get_rl_logger`` are idempotent: the handler and
+listener for each log are installed once per process, however many apps
+or learners are constructed. The binary decision log (app/decision_log.py)
+rides the same pipeline. The /update worker process (app/update_worker.py)
+installs its own files first, so two processes never rotate the same log.
+
+Under multi-study tenancy (app/tenancy.py) one process serves several
+studies, whose group ids may collide: app.log and rl.log lines logged in a
+study app's context are tagged ``[study=<STUDY_ID>]``, and each study's
+/update worker writes its own files.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import current_app, has_app_context
+
+LOG_DIR = "logs"
+LOG_QUEUE_MAXSIZE = 10_000
+LOG_QUEUE_BLOCK_TIMEOUT_S = 0.05
+_MAX_BYTES = 100 * 1024 * 1024  # 100 MB per file
+_BACKUP_COUNT = 5000
+
+_lock = threading.Lock()
+_handlers: dict[str, "DropCountingQueueHandler"] = {}
+_listeners: dict[str, "_BlockingStopQueueListener"] = {}
+
+
+class DropCountingQueueHandler(QueueHandler):
+    """``QueueHandler`` over a bounded queue that counts records it drops when full."""
+
+    def __init__(self, log_queue: queue.Queue, block_timeout_s: float = LOG_QUEUE_BLOCK_TIMEOUT_S):
+        super().__init__(log_queue)
+        self.block_timeout_s = block_timeout_s
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout_s)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class StudyContextFilter(logging.Filter):
+    """Set ``record.study``: `` [study=<id>]`` in a study app's context, else empty."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        study_id = current_app.config.get("STUDY_ID") if has_app_context() else None
+        record.study = f" [study={study_id}]" if study_id else ""
+        return True
+
+
+class _BlockingStopQueueListener(QueueListener):
+    # The stock sentinel uses put_nowait, which raises on a full queue at exit.
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _rotating_handler(log_dir: str, filename: str, fmt: str) -> RotatingFileHandler:
+    os.makedirs(log_dir, exist_ok=True)
+    handler = RotatingFileHandler(
+        os.path.join(log_dir, filename), maxBytes=_MAX_BYTES, backupCount=_BACKUP_COUNT
+    )
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(logging.Formatter(fmt))
+    return handler
+
+
+def install_queue_pipeline(
+    name: str, logger: logging.Logger, *handlers: logging.Handler, filters=()
+) -> bool:
+    """
+    Route ``logger`` through a bounded queue to ``handlers`` on a listener
+    thread; ``filters`` run on the logging thread, before the record is
+    queued. Installed once per ``name``; returns False (and closes
+    ``handlers``) if that pipeline already exists.
+    """
+    with _lock:
+        if name in _handlers:
+            for handler in handlers:
+                handler.close()
+            return False
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+        queue_handler = DropCountingQueueHandler(log_queue)
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+        listener = _BlockingStopQueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _handlers[name] = queue_handler
+        _listeners[name] = listener
+        logger.setLevel(logging.INFO)
+        logger.addHandler(queue_handler)
+        return True
+
+
+def stop_logging() -> None:
+    """Flush and stop every listener (registered with ``atexit``)."""
+    with _lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_logging)
+
+
+def dropped_log_records() -> dict[str, int]:
+    """Records dropped on a full queue since start-up, per pipeline ("app", "rl", "decisions")."""
+    return {name: handler.dropped for name, handler in _handlers.items()}
+
+
+def setup_logging(log_dir: str = LOG_DIR, filename: str = "app.log"):
+    """
+    Configures the logging for the Flask application.
+    """
+    if "app" in _handlers:
+        return
+    fmt = "%(asctime)s [%(levelname)s]%(study)s %(message)s"
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(fmt))
+    install_queue_pipeline(
+        "app",
+        logging.getLogger(),
+        _rotating_handler(log_dir, filename, fmt),
+        console,
+        filters=(StudyContextFilter(),),
+    )
+
+
+def get_rl_logger(log_dir: str = LOG_DIR, filename: str = "rl.log"):
+    """
+    Returns a logger for the RL Algorithm with a dedicated (queued) file handler.
+    """
+    rl_logger = logging.getLogger("RLAlgorithm")
+    if "rl" not in _handlers:
+        install_queue_pipeline(
+            "rl",
+            rl_logger,
+            _rotating_handler(
+                log_dir, filename, "%(asctime)s [%(levelname)s] [RL]%(study)s %(message)s"
+            ),
+            filters=(StudyContextFilter(),),
+        )
+    return rl_logger
@@ -0,0 +1,313 @@
+"""
+In-process metrics registry exposed at GET /api/v1/metrics.
+
+Prometheus text exposition format (0.0.4), implemented here so the API
+does not grow a client-library dependency. One ``MetricsRegistry`` lives
+on ``app.metrics``; ``init_metrics`` wires it into the request cycle:
+
+  - rl_api_request_duration_seconds   total request latency
+  - rl_api_db_duration_seconds        time inside SQL cursor executes
+  - rl_api_commit_duration_seconds    time inside ``Session.commit``
+  - rl_api_sampler_lock_wait_seconds  wait on the deterministic-sampler lock
+  - rl_api_learner_duration_seconds   ``make_state`` / ``get_action`` calls
+  - rl_api_decisions_total            warm-up vs posterior decisions
+  - rl_api_cache_requests_total       hit / miss per named cache
+  - rl_api_log_records_dropped_total  log records dropped on a full log queue
+
+Per-request histograms carry ``endpoint`` (the URL rule, never the
+concrete path) and ``decision_type`` (only one of ``DECISION_TYPES``,
+else empty). No group_id, member or payload value is ever used as a
+label value, matching the HTTP audit policy in app/__init__.py.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.logging_config import dropped_log_records
+from app.protocol import DECISION_TYPES
+
+# Seconds; request paths are ms-scale, /update can take seconds.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        """Mirror a total kept by another component (e.g. the log queues)."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """The API's metric families (see module docstring)."""
+
+    def __init__(self):
+        request_labels = ("endpoint", "decision_type")
+        self.request_duration = Histogram(
+            "rl_api_request_duration_seconds", "Total request latency.", request_labels
+        )
+        self.db_duration = Histogram(
+            "rl_api_db_duration_seconds", "Time spent executing SQL per request.", request_labels
+        )
+        self.commit_duration = Histogram(
+            "rl_api_commit_duration_seconds", "Time spent in session commits per request.", request_labels
+        )
+        self.sampler_lock_wait = Histogram(
+            "rl_api_sampler_lock_wait_seconds",
+            "Time spent waiting for the deterministic sampler lock per request.",
+            request_labels,
+        )
+        self.learner_duration = Histogram(
+            "rl_api_learner_duration_seconds",
+            "Learner call latency (make_state, get_action).",
+            request_labels + ("method",),
+        )
+        self.decisions = Counter(
+            "rl_api_decisions_total",
+            "Decisions served, by path (warmup or posterior).",
+            ("decision_type", "path", "warmup_reason"),
+        )
+        self.cache_requests = Counter(
+            "rl_api_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+        )
+        self.log_records_dropped = Counter(
+            "rl_api_log_records_dropped_total", "Log records dropped on a full log queue.", ("log",)
+        )
+        self._families = (
+            self.request_duration,
+            self.db_duration,
+            self.commit_duration,
+            self.sampler_lock_wait,
+            self.learner_duration,
+            self.decisions,
+            self.cache_requests,
+            self.log_records_dropped,
+        )
+
+    def render(self) -> str:
+        for log_name, dropped in dropped_log_records().items():
+            self.log_records_dropped.set(dropped, log=log_name)
+        lines: list[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------- request-cycle hooks
+
+def _request_labels() -> dict[str, str]:
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    body = request.get_json(silent=True) if request.is_json else None
+    decision_type = body.get("decision_type") if isinstance(body, dict) else None
+    return {
+        "endpoint": rule,
+        "decision_type": decision_type if decision_type in DECISION_TYPES else "",
+    }
+
+
+def _registry():
+    if not has_request_context():
+        return None
+    return getattr(current_app, "metrics", None)
+
+
+def record_decision(decision_type: str, is_warmup: bool, warmup_reason: str | None) -> None:
+    registry = _registry()
+    if registry is None:
+        return
+    registry.decisions.inc(
+        decision_type=decision_type,
+        path="warmup" if is_warmup else "posterior",
+        warmup_reason=warmup_reason or "",
+    )
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count one lookup in the named in-process cache (no-op outside a request)."""
+    registry = _registry()
+    if registry is None:
+        return
+    registry.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def time_learner(method: str):
+    """Time a learner call inside a request (``make_state``, ``get_action``)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry = _registry()
+        if registry is not None:
+            registry.learner_duration.observe(
+                time.perf_counter() - start, method=method, **_request_labels()
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "metrics_db_s" in g:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is not None and has_request_context() and "metrics_db_s" in g:
+        g.metrics_db_s += time.perf_counter() - started
+
+
+def _before_commit(session):
+    if has_request_context() and "metrics_commit_s" in g:
+        g.metrics_commit_started = time.perf_counter()
+
+
+def _end_commit(session):
+    if has_request_context() and g.get("metrics_commit_started") is not None:
+        g.metrics_commit_s += time.perf_counter() - g.metrics_commit_started
+        g.metrics_commit_started = None
+
+
+_session_hooks_installed = False
+
+
+def init_metrics(app, engine) -> None:
+    """Attach a registry to ``app`` and time every request against it."""
+    global _session_hooks_installed
+    app.metrics = MetricsRegistry()
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if not _session_hooks_installed:
+        # Session events are class-wide; the handlers only act inside a
+        # request whose before_request hook initialised the accumulators.
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _end_commit)
+        event.listen(Session, "after_rollback", _end_commit)
+        _session_hooks_installed = True
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_s = 0.0
+        g.metrics_commit_s = 0.0
+        g.metrics_commit_started = None
+        sampler = getattr(app, "sampler", None)
+        if sampler is not None:
+            sampler.take_lock_wait_seconds()  # drop waits from outside this request
+
+    @app.after_request
+    def observe_request_metrics(response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        labels = _request_labels()
+        registry = app.metrics
+        registry.request_duration.observe(time.perf_counter() - started, **labels)
+        registry.db_duration.observe(g.metrics_db_s, **labels)
+        registry.commit_duration.observe(g.metrics_commit_s, **labels)
+        sampler = getattr(app, "sampler", None)
+        if sampler is not None:
+            registry.sampler_lock_wait.observe(sampler.take_lock_wait_seconds(), **labels)
+        return response
@@ -1,8 +1,53 @@
 from app.extensions import db
 import datetime
 
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
 
-class Group(db.Model):
+# Rows written outside a tenant study (single-study ``create_app``).
+DEFAULT_STUDY_ID = "default"
+
+
+def current_study_id() -> str:
+    """The study of the current app (``STUDY_ID``), or ``DEFAULT_STUDY_ID``."""
+    study_id = current_app.config.get("STUDY_ID") if has_app_context() else None
+    return study_id or DEFAULT_STUDY_ID
+
+
+class StudyScoped:
+    """
+    Mixin for the study-scoped tables (app/tenancy.py). ``study_id`` is
+    filled from the current app on insert, ORM and Core alike, and
+    ``_scope_to_study`` limits every ORM SELECT / UPDATE / DELETE on these
+    tables to that study, so several studies share one database.
+    """
+
+    study_id = db.Column(
+        db.String(64),
+        nullable=False,
+        default=current_study_id,
+        server_default=DEFAULT_STUDY_ID,
+    )
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _scope_to_study(execute_state):
+    if not has_app_context():
+        return
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    study_id = current_study_id()
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(
+            StudyScoped, lambda cls: cls.study_id == study_id, include_aliases=True
+        )
+    )
+
+
+class Group(StudyScoped, db.Model):
     """
     Database table to store groups (dyads).
 
@@ -14,10 +59,12 @@ class Group(db.Model):
     __tablename__ = "groups"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    group_id = db.Column(db.String(255), unique=True, nullable=False)
+    group_id = db.Column(db.String(255), nullable=False)
     group_info = db.Column(db.JSON, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False)
 
+    __table_args__ = (db.UniqueConstraint("study_id", "group_id", name="uq_group_study_group"),)
+
     def __init__(
         self,
         group_id: str,
@@ -40,7 +87,7 @@ class Group(db.Model):
         return f"<Group group_id={self.group_id} created_at={self.created_at}>"
 
 
-class DataUpload(db.Model):
+class DataUpload(StudyScoped, db.Model):
     """
     Append-only log of every /upload_data call (API-Spec §6.3).
 
@@ -80,7 +127,7 @@ class DataUpload(db.Model):
         )
 
 
-class Action(db.Model):
+class Action(StudyScoped, db.Model):
     """
     Database table to store action generated by the RL algorithm.
     """
@@ -89,7 +136,7 @@ class Action(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     group_id = db.Column(db.String(255), nullable=False)
-    rid = db.Column(db.String(255), unique=True, nullable=False)
+    rid = db.Column(db.String(255), nullable=False)
     state = db.Column(db.JSON, nullable=True)
     decision_idx = db.Column(db.Integer, nullable=False)
     decision_type = db.Column(db.String(255), nullable=False)
@@ -107,11 +154,13 @@ class Action(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint(
+            "study_id",
             "group_id",
             "decision_type",
             "decision_idx",
             name="uq_action_group_type_idx",
         ),
+        db.UniqueConstraint("study_id", "rid", name="uq_action_study_rid"),
     )
 
     def __init__(
@@ -158,7 +207,7 @@ class Action(db.Model):
         return f"<Action rid={self.rid}, group_id={self.group_id}, action={self.action}, state={self.state}, action_prob={self.action_prob}>"
 
 
-class ModelParameters(db.Model):
+class ModelParameters(StudyScoped, db.Model):
     """
     Unified table for all decision-making-algorithm parameters.
 
@@ -234,7 +283,7 @@ class ModelParameters(db.Model):
         return f"<ModelParameters probability_of_action={self.probability_of_action}>"
 
 
-class ThompsonSamplingParams(db.Model):
+class ThompsonSamplingParams(StudyScoped, db.Model):
     """
     Thompson Sampling parameters per (group_id, decision_type).
     Each dyad and decision type has its own independent TS bandit.
@@ -248,7 +297,9 @@ class ThompsonSamplingParams(db.Model):
     params = db.Column(db.JSON, nullable=False)  # {action_0: {...}, action_1: {...}}
     updated_at = db.Column(db.DateTime, nullable=False)
 
-    __table_args__ = (db.UniqueConstraint("group_id", "decision_type", name="uq_group_decision"),)
+    __table_args__ = (
+        db.UniqueConstraint("study_id", "group_id", "decision_type", name="uq_group_decision"),
+    )
 
     def __init__(
         self,
@@ -265,7 +316,7 @@ class ThompsonSamplingParams(db.Model):
         self.updated_at = updated_at
 
 
-class ModelUpdateRequests(db.Model):
+class ModelUpdateRequests(StudyScoped, db.Model):
     """
     Database table to store model update requests.
     """
@@ -279,6 +330,13 @@ class ModelUpdateRequests(db.Model):
     created_at = db.Column(db.DateTime, nullable=False)
     completed_at = db.Column(db.DateTime, nullable=True)
     error_message = db.Column(db.String(1024), nullable=True)
+    # Sample-buffer window handed to an out-of-process update worker,
+    # {"normal": [start, end], "uniform": [start, end]} (app/update_worker.py).
+    sampler_window = db.Column(db.JSON, nullable=True)
+    # Input-data fingerprint, and the failed update whose stage checkpoints
+    # this one resumed from (app/update_checkpoints.py).
+    fingerprint = db.Column(db.String(64), nullable=True)
+    resumed_from = db.Column(db.String(255), nullable=True)
 
     def __init__(
         self,
@@ -307,7 +365,7 @@ class ModelUpdateRequests(db.Model):
         return f"<ModelUpdateRequests update_id={self.update_id}, status={self.status}>"
 
 
-class StudyData(db.Model):
+class StudyData(StudyScoped, db.Model):
     """
     Update-derived (action, outcome) pairs (API-Spec §6.4).
 
@@ -336,6 +394,7 @@ class StudyData(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint(
+            "study_id",
             "group_id",
             "decision_type",
             "decision_idx",
@@ -383,7 +442,7 @@ class StudyData(db.Model):
         return f"<StudyData group_id={self.group_id}, raw_context={self.raw_context}, action={self.action}, reward={self.reward}>"
 
 
-class StandardizationBaseline(db.Model):
+class StandardizationBaseline(StudyScoped, db.Model):
     """
     Per-dyad week-1 baselines used to standardize continuous state variables
     before they enter the learner (main.tex §3, "Variable Standardization").
@@ -406,6 +465,7 @@ class StandardizationBaseline(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint(
+            "study_id",
             "group_id",
             "decision_type",
             "variable_name",
@@ -434,7 +494,7 @@ class StandardizationBaseline(db.Model):
         self.created_at = created_at
 
 
-class UpdateReproducibilitySnapshot(db.Model):
+class UpdateReproducibilitySnapshot(StudyScoped, db.Model):
     """
     Points to an on-disk full copy of data_uploads, actions (decision states),
     and groups taken immediately before a model update completes. Under the
@@ -475,3 +535,131 @@ class UpdateReproducibilitySnapshot(db.Model):
         self.groups_count = groups_count
         self.total_bytes = total_bytes
         self.created_at = created_at
+
+
+class UpdatePhaseProfile(StudyScoped, db.Model):
+    """
+    Per-phase resource profile of one /update job: wall time, CPU time and
+    peak memory for each pipeline stage (backup, derive_study_data, ...) and
+    for each agent's fit inside the learner (``learner_update.<decision_type>``).
+    Child rows of model_update_requests, keyed by update_id and ordered by
+    ``seq``; see app/profiling.py for how each figure is measured.
+    """
+
+    __tablename__ = "update_phase_profiles"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    update_id = db.Column(db.String(255), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    phase = db.Column(db.String(255), nullable=False)
+    decision_type = db.Column(db.String(255), nullable=True)
+    wall_s = db.Column(db.Float, nullable=False)
+    cpu_s = db.Column(db.Float, nullable=False)
+    tracemalloc_peak_kib = db.Column(db.Float, nullable=True)
+    rss_peak_kib = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(
+        self,
+        update_id: str,
+        seq: int,
+        phase: str,
+        wall_s: float,
+        cpu_s: float,
+        decision_type: str | None = None,
+        tracemalloc_peak_kib: float | None = None,
+        rss_peak_kib: float | None = None,
+        created_at: datetime.datetime | None = None,
+    ):
+        if created_at is None:
+            created_at = datetime.datetime.now()
+        self.update_id = update_id
+        self.seq = seq
+        self.phase = phase
+        self.decision_type = decision_type
+        self.wall_s = float(wall_s)
+        self.cpu_s = float(cpu_s)
+        self.tracemalloc_peak_kib = tracemalloc_peak_kib
+        self.rss_peak_kib = rss_peak_kib
+        self.created_at = created_at
+
+
+class FrozenDyadFits(StudyScoped, db.Model):
+    """
+    Per-agent archive of completed dyads' final local fits (see
+    app/frozen_archive.py). One row per decision_type; ``payload`` is an
+    ``.npz`` of stacked arrays (group_ids, theta, covariance, sample_size,
+    agent_decision_index) and ``group_ids`` lists the same dyads as JSON so
+    the frozen set can be read without decoding the arrays.
+    """
+
+    __tablename__ = "frozen_dyad_fits"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    decision_type = db.Column(db.String(255), nullable=False)
+    group_ids = db.Column(db.JSON, nullable=False)
+    n_dyads = db.Column(db.Integer, nullable=False, default=0)
+    feature_dim = db.Column(db.Integer, nullable=False, default=0)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("study_id", "decision_type", name="uq_frozen_study_decision"),
+    )
+
+    def __init__(
+        self,
+        decision_type: str,
+        group_ids: list[str] | None = None,
+        n_dyads: int = 0,
+        feature_dim: int = 0,
+        payload: bytes = b"",
+        updated_at: datetime.datetime | None = None,
+    ):
+        if updated_at is None:
+            updated_at = datetime.datetime.now()
+        self.decision_type = decision_type
+        self.group_ids = group_ids or []
+        self.n_dyads = n_dyads
+        self.feature_dim = feature_dim
+        self.payload = payload
+        self.updated_at = updated_at
+
+
+class UpdateCheckpoint(StudyScoped, db.Model):
+    """
+    One completed stage of an /update job (backup, derive_study_data,
+    repro_snapshot, one agent's fit, the learner as a whole) with the
+    stage's output. A retry of a failed update with the same input
+    ``fingerprint`` copies these rows to its own update_id and skips the
+    stages they cover; see app/update_checkpoints.py.
+    """
+
+    __tablename__ = "update_checkpoints"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    update_id = db.Column(db.String(255), nullable=False, index=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    stage = db.Column(db.String(255), nullable=False)
+    output = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("study_id", "update_id", "stage", name="uq_checkpoint_update_stage"),
+    )
+
+    def __init__(
+        self,
+        update_id: str,
+        fingerprint: str,
+        stage: str,
+        output: dict | None = None,
+        created_at: datetime.datetime | None = None,
+    ):
+        if created_at is None:
+            created_at = datetime.datetime.now()
+        self.update_id = update_id
+        self.fingerprint = fingerprint
+        self.stage = stage
+        self.output = output
+        self.created_at = created_at
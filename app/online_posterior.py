@@ -0,0 +1,313 @@
+"""
+Online posterior mini-updates between /update runs (``ONLINE_POSTERIOR_UPDATES``).
+
+A posterior only moves when the weekly /update refits it. When enabled,
+every /upload_data also finalizes the rewards whose outcome window the
+upload closes (the same pairing ``derive_study_data`` applies, without
+writing study_data) and folds each (φ, r) into the learner's cached
+posterior with one Sherman–Morrison step, O(D²) instead of an
+O(n·D²) refit:
+
+    s = σ² + φᵀΣφ,   μ ← μ + Σφ (r − φᵀμ) / s,   Σ ← Σ − ΣφφᵀΣ / s.
+
+The folded posteriors are keyed by (decision_type, group_id); the pooled
+REL fit is keyed by group None. Each fold is one ``online``
+model_parameters row holding its inputs only: φ (``theta``), the target,
+the noise variance, the record key and the snapshot it was folded onto
+(``base_id``). ``OnlinePosteriorStore`` rebuilds a posterior by folding
+those rows onto the learner's snapshot, and caches the result per process
+keyed by the newest row applied, so API restarts and every API process
+see the same folds at O(D) storage per fold. Rows apply only while the
+learner still reads ``base_id``. Every update, completed or failed,
+writes an ``online_reset`` row (``register_policy_listener``) that retires
+the folds before it, so the weekly refit stays authoritative; the retired
+rows stay for replay.
+Decisions drawn from a folded posterior record the newest fold row's id
+as ``random_state["online_version"]``; tools/reproduce_run.py refolds the
+rows up to it.
+
+The folded target is the bare reward. That is exact for the contextual
+bandit (γ = 0); for γ > 0 it is the batch target of the newest row, and
+the bootstrap term the refit later adds to the previous row is left to
+the refit.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.algorithms.linalg_kernels import rank1_posterior_update
+from app.extensions import db
+from app.models import Action, DataUpload, ModelParameters, StudyData
+from app.protocol import compute_reward, outcome_from_snapshot
+from app.reward_derivation import _find_outcome_upload
+from app.update_worker import register_policy_listener
+
+
+ONLINE_FOLD = "online"
+ONLINE_RESET = "online_reset"
+
+
+@dataclass(frozen=True)
+class OnlinePosterior:
+    base_id: tuple
+    mean: np.ndarray
+    covariance: np.ndarray
+    version: int
+    applied: frozenset
+
+
+def _record_key(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def live_folds(*criteria):
+    """Criteria for the fold rows written since the latest ``online_reset``."""
+    reset = (
+        select(func.coalesce(func.max(ModelParameters.id), 0))
+        .where(ModelParameters.snapshot_type == ONLINE_RESET)
+        .scalar_subquery()
+    )
+    return (ModelParameters.snapshot_type == ONLINE_FOLD, ModelParameters.id > reset, *criteria)
+
+
+def fold_key(decision_type: str, group_id: str | None) -> tuple:
+    return (
+        ModelParameters.decision_type == decision_type,
+        ModelParameters.group_id.is_(None)
+        if group_id is None
+        else ModelParameters.group_id == group_id,
+    )
+
+
+def refold(entry: OnlinePosterior, rows) -> OnlinePosterior:
+    """``entry`` with the fold rows ``rows`` (id order) applied on top."""
+    mean, cov, version, applied = entry.mean, entry.covariance, entry.version, entry.applied
+    for row in rows:
+        metadata = row.metadata_json
+        mean, cov = rank1_posterior_update(
+            mean,
+            cov,
+            np.asarray(row.theta, dtype=np.float64),
+            float(metadata["target"]),
+            float(metadata["noise_var"]),
+        )
+        version, applied = row.id, applied | {_record_key(metadata["record_key"])}
+    return OnlinePosterior(entry.base_id, mean, cov, version, applied)
+
+
+class OnlinePosteriorStore:
+    """
+    Folded posteriors per (decision_type, group_id), rebuilt from the
+    ``online`` fold rows and cached per process. An entry's version is the
+    id of the newest fold row it applies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._cache: dict[tuple[str, str | None], OnlinePosterior] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        decision_type: str,
+        group_id: str | None,
+        base_id: tuple,
+        mean: np.ndarray,
+        cov: np.ndarray,
+    ) -> OnlinePosterior | None:
+        """
+        The posterior (``mean``, ``cov``) read from the snapshot ``base_id``
+        with the live folds onto it applied, or None if there are none.
+        """
+        with self._lock:
+            base_id = tuple(base_id)
+            rows = db.session.execute(
+                select(ModelParameters.id, ModelParameters.metadata_json)
+                .where(*live_folds(*fold_key(decision_type, group_id)))
+                .order_by(ModelParameters.id.asc())
+            ).all()
+            ids = [
+                row_id for row_id, metadata in rows if tuple(metadata["base_id"]) == base_id
+            ]
+            if not ids:
+                return None
+            entry = self._cache.get((decision_type, group_id))
+            if entry is None or entry.base_id != base_id or entry.version not in ids:
+                entry = OnlinePosterior(base_id, mean, cov, 0, frozenset())
+            if entry.version != ids[-1]:
+                pending = [row_id for row_id in ids if row_id > entry.version]
+                entry = refold(
+                    entry,
+                    ModelParameters.query.filter(ModelParameters.id.in_(pending))
+                    .order_by(ModelParameters.id.asc())
+                    .all(),
+                )
+                self._cache[(decision_type, group_id)] = entry
+            return entry
+
+    def fold(
+        self,
+        decision_type: str,
+        group_id: str | None,
+        base_id: tuple,
+        mean: np.ndarray,
+        cov: np.ndarray,
+        phi: np.ndarray,
+        target: float,
+        noise_var: float,
+        record_key,
+    ) -> int | None:
+        """
+        Add one observation to the posterior (``mean``, ``cov``) read from
+        ``base_id``. ``record_key`` names the observation so it is folded at
+        most once. Returns the new version, or None if the record was
+        already applied. Does not commit.
+        """
+        entry = self.get(decision_type, group_id, base_id, mean, cov)
+        if entry is not None and record_key in entry.applied:
+            return None
+        row = ModelParameters(
+            snapshot_type=ONLINE_FOLD,
+            group_id=group_id,
+            decision_type=decision_type,
+            sample_size=1 if entry is None else len(entry.applied) + 1,
+            feature_dim=len(phi),
+            theta=np.asarray(phi, dtype=np.float64).tolist(),
+            metadata_json={
+                "base_id": list(base_id),
+                "record_key": list(record_key) if isinstance(record_key, tuple) else record_key,
+                "target": float(target),
+                "noise_var": float(noise_var),
+            },
+        )
+        db.session.add(row)
+        db.session.flush()
+        return row.id
+
+    def agent_version(self, decision_type: str) -> int:
+        version = db.session.execute(
+            select(func.max(ModelParameters.id)).where(
+                *live_folds(ModelParameters.decision_type == decision_type)
+            )
+        ).scalar()
+        return version or 0
+
+    def clear(self) -> None:
+        """Retire every fold so far (after an update, completed or failed)."""
+        with self._lock, self.app.app_context():
+            db.session.add(ModelParameters(snapshot_type=ONLINE_RESET))
+            db.session.commit()
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return db.session.execute(
+            select(func.count(ModelParameters.id)).where(*live_folds())
+        ).scalar()
+
+
+def init_online_updates(app) -> None:
+    """Attach the store to ``app`` when ONLINE_POSTERIOR_UPDATES is on."""
+    app.online_posteriors = None
+    if not app.config.get("ONLINE_POSTERIOR_UPDATES", False):
+        return
+    store = OnlinePosteriorStore(app)
+    app.online_posteriors = store
+    register_policy_listener(app, lambda update_id: store.clear())
+
+
+def online_overlay(app, decision_type, group_id, base_id, mean, cov):
+    """
+    ``(mean, cov, random_state)``: the folded posterior when folds apply to
+    ``base_id``, with ``{"online_version": ...}`` for the decision's
+    random_state; else the inputs and ``{}``.
+    """
+    store = getattr(app, "online_posteriors", None)
+    entry = None if store is None else store.get(decision_type, group_id, base_id, mean, cov)
+    if entry is None:
+        return mean, cov, {}
+    return entry.mean, entry.covariance, {"online_version": entry.version}
+
+
+def online_agent_version(app, decision_type: str) -> int:
+    store = getattr(app, "online_posteriors", None)
+    return 0 if store is None else store.agent_version(decision_type)
+
+
+def finalized_records(upload: DataUpload) -> list[dict]:
+    """
+    Rewards of the upload's dyad whose outcome window ``upload`` closes:
+    actions before it without a finalized study_data row, paired as
+    ``derive_study_data`` would pair them.
+    """
+    finalized = {
+        (decision_type, decision_idx)
+        for decision_type, decision_idx in db.session.query(
+            StudyData.decision_type, StudyData.decision_idx
+        ).filter(StudyData.group_id == upload.group_id, StudyData.reward.isnot(None))
+    }
+    pending = [
+        action
+        for action in Action.query.filter(
+            Action.group_id == upload.group_id,
+            Action.request_timestamp < upload.request_timestamp,
+        ).order_by(Action.request_timestamp.asc(), Action.id.asc())
+        if (action.decision_type, action.decision_idx) not in finalized
+    ]
+    if not pending:
+        return []
+    uploads = (
+        DataUpload.query.filter(
+            DataUpload.group_id == upload.group_id,
+            DataUpload.request_timestamp > pending[0].request_timestamp,
+            DataUpload.request_timestamp <= upload.request_timestamp,
+        )
+        .order_by(DataUpload.request_timestamp.asc(), DataUpload.id.asc())
+        .all()
+    )
+
+    records = []
+    for action in pending:
+        uploads_after = [u for u in uploads if u.request_timestamp > action.request_timestamp]
+        outcome_upload = _find_outcome_upload(action.decision_type, action, uploads_after)
+        if outcome_upload is None or outcome_upload.id != upload.id:
+            continue
+        outcome = outcome_from_snapshot(action.decision_type, upload.data)
+        records.append(
+            {
+                "decision_type": action.decision_type,
+                "decision_idx": action.decision_idx,
+                "raw_context": action.raw_context,
+                "action": int(action.action),
+                "reward": compute_reward(action.decision_type, int(action.action), outcome),
+            }
+        )
+    return records
+
+
+def apply_online_updates(app, upload_id: int) -> int:
+    """Fold the rewards ``upload_id`` finalizes; returns how many were folded."""
+    if getattr(app, "online_posteriors", None) is None:
+        return 0
+    try:
+        upload = db.session.get(DataUpload, upload_id)
+        if upload is None:
+            return 0
+        folded = 0
+        for record in finalized_records(upload):
+            version = app.rl_algorithm.online_update(
+                upload.group_id, record["decision_type"], record
+            )
+            folded += version is not None
+        db.session.commit()
+        return folded
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"[Online Update] Error: {e}")
+        logging.exception(e)
+        return 0
@@ -0,0 +1,146 @@
+"""
+Phase timing and resource profiling for the /update job.
+
+``process_update_request`` wraps each stage (backup, reward derivation,
+study_data load, repro snapshot, learner fit, parameter write) in a
+``PhaseTimer.phase`` block; the learners nest one
+``learner_update.<decision_type>`` phase per agent inside the fit via
+``iter_agent_phases``. Each phase records:
+
+  - wall_s                 ``time.perf_counter`` elapsed
+  - cpu_s                  ``time.thread_time`` elapsed (the update runs on
+                           its own thread, so this excludes request traffic)
+  - tracemalloc_peak_kib   peak traced Python/numpy allocation above the
+                           phase's starting level (None when not tracing)
+  - rss_peak_kib           process RSS high-water mark at phase end
+                           (``ru_maxrss``; None where ``resource`` is absent)
+
+The breakdown is logged with the update, persisted to
+``update_phase_profiles`` (read back via GET /update/<update_id>/profile)
+and kept on ``app.last_update_timings`` so the endpoint benchmark
+(tests/benchmark_endpoints.py) can attribute /update time to a stage
+without a profiler attached.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_peak_kib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / 1024.0 if sys.platform == "darwin" else float(peak)
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time, CPU time and peak memory per named phase.
+
+    With ``trace_memory=True`` tracemalloc is started for the lifetime of the
+    timer (unless something else is already tracing) and stopped by
+    ``close``. Phases may nest; a parent's memory peak includes its children.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.phases: dict[str, float] = {}
+        self.details: dict[str, dict] = {}
+        self._stack: list[list] = []
+        self._started = time.perf_counter()
+        self._owns_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    def _fold_traced_peak(self) -> int:
+        """Fold tracemalloc's peak into every open phase and reset it."""
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def phase(self, name: str, decision_type: str | None = None):
+        detail = self.details.get(name)
+        if detail is None:
+            detail = self.details[name] = {
+                "decision_type": decision_type,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "tracemalloc_peak_kib": None,
+                "rss_peak_kib": None,
+            }
+            self.phases[name] = 0.0
+        tracing = tracemalloc.is_tracing()
+        frame = None
+        if tracing:
+            base = self._fold_traced_peak()
+            frame = [base, base]
+            self._stack.append(frame)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            detail["wall_s"] += wall
+            detail["cpu_s"] += time.thread_time() - cpu_start
+            self.phases[name] += wall
+            if frame is not None and tracemalloc.is_tracing():
+                self._fold_traced_peak()
+                self._stack = [open_frame for open_frame in self._stack if open_frame is not frame]
+                peak_kib = max(0, frame[1] - frame[0]) / 1024.0
+                previous = detail["tracemalloc_peak_kib"]
+                detail["tracemalloc_peak_kib"] = (
+                    peak_kib if previous is None else max(previous, peak_kib)
+                )
+            detail["rss_peak_kib"] = _rss_peak_kib()
+
+    def close(self) -> None:
+        """Stop tracemalloc if this timer started it."""
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._owns_tracing = False
+
+    def as_dict(self) -> dict:
+        """``{"total_s", "phases": {name: seconds}, "details": {name: {...}}}`` in phase order."""
+        return {
+            "total_s": time.perf_counter() - self._started,
+            "phases": dict(self.phases),
+            "details": {name: dict(detail) for name, detail in self.details.items()},
+        }
+
+    def summary(self) -> str:
+        """One-line ``name=12.3ms`` rendering for the update log."""
+        return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+
+
+def iter_agent_phases(data: dict, items):
+    """
+    Yield ``(decision_type, value)`` pairs from ``items``, timing each
+    iteration as ``learner_update.<decision_type>`` on ``data["profiler"]``
+    when the caller supplied one (the /update job does; the simulators and
+    benchmarks need not). ``data["agent_done"](decision_type)``, when
+    given, runs once the caller's loop body for that agent has finished
+    without raising (the /update job checkpoints the agent).
+    """
+    profiler = data.get("profiler")
+    agent_done = data.get("agent_done")
+    for decision_type, value in items:
+        if profiler is None:
+            yield decision_type, value
+        else:
+            with profiler.phase(f"learner_update.{decision_type}", decision_type=decision_type):
+                yield decision_type, value
+        if agent_done is not None:
+            agent_done(decision_type)
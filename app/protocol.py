@@ -89,40 +89,14 @@ def validate_context(decision_type: str, context: dict[str, Any]) -> tuple[bool,
     valid_type, message = validate_decision_type(decision_type)
     if not valid_type:
         return False, message
-
-    if not isinstance(context, dict):
-        return False, "context must be a dictionary."
-
-    schema = CONTEXT_SCHEMAS[decision_type]
-    for field_name, field_type in schema.items():
-        if field_name not in context:
-            return False, f"Invalid context for {decision_type}. {field_name} is required."
-        value = context[field_name]
-        valid, error_message = _validate_field(field_type, value)
-        if not valid:
-            return False, f"Invalid context for {decision_type}. {field_name}: {error_message}"
-
-    return True, ""
+    return _CONTEXT_VALIDATORS[decision_type](context)
 
 
 def validate_outcome(decision_type: str, outcome: dict[str, Any]) -> tuple[bool, str]:
     valid_type, message = validate_decision_type(decision_type)
     if not valid_type:
         return False, message
-
-    if not isinstance(outcome, dict):
-        return False, "outcome must be a dictionary."
-
-    schema = OUTCOME_SCHEMAS[decision_type]
-    for field_name, field_type in schema.items():
-        if field_name not in outcome:
-            return False, f"Invalid outcome for {decision_type}. {field_name} is required."
-        value = outcome[field_name]
-        valid, error_message = _validate_field(field_type, value)
-        if not valid:
-            return False, f"Invalid outcome for {decision_type}. {field_name}: {error_message}"
-
-    return True, ""
+    return _OUTCOME_VALIDATORS[decision_type](outcome)
 
 
 def encode_state(
@@ -131,10 +105,10 @@ def encode_state(
     baselines: dict[str, dict[str, float]] | None = None,
 ) -> list[float]:
     """Pre-action feature vector u(s): intercept + per-variable [I, v*I]."""
-    from app.feature_builder import ProtocolRLFeatureBuilder
+    from app.feature_builder import feature_builder
 
     return (
-        ProtocolRLFeatureBuilder(decision_type)
+        feature_builder(decision_type)
         .base_vector(context, baselines=baselines)
         .tolist()
     )
@@ -218,18 +192,13 @@ SNAPSHOT_SCHEMA: dict[str, str] = {
 
 def validate_snapshot(data: dict[str, Any]) -> tuple[bool, str]:
     """Validate a full flat /upload_data snapshot (every key required)."""
-    if not isinstance(data, dict):
-        return False, "data must be a dictionary."
-    for field_name in data:
-        if field_name not in SNAPSHOT_SCHEMA:
-            return False, f"unknown field '{field_name}'."
-    for field_name, field_type in SNAPSHOT_SCHEMA.items():
-        if field_name not in data:
-            return False, f"{field_name} is required (full snapshot)."
-        valid, error_message = _validate_field(field_type, data[field_name])
-        if not valid:
-            return False, f"{field_name}: {error_message}"
-    return True, ""
+    return _SNAPSHOT_VALIDATOR(data)
+
+
+def validate_snapshots(snapshots) -> list[tuple[bool, str]]:
+    """``validate_snapshot`` for each of ``snapshots``, in order."""
+    check = _SNAPSHOT_VALIDATOR
+    return [check(data) for data in snapshots]
 
 
 def _engagement_or_default(value: Any, default: int = 1) -> int:
@@ -417,3 +386,126 @@ def _validate_field(field_type: str, value: Any) -> tuple[bool, str]:
         return True, ""
 
     return False, f"unsupported schema field type '{field_type}'."
+
+
+# ---------------------------------------------------------------------------
+# Compiled validators. Each schema above is turned once, at import, into a
+# Python function with the field names, the per-type checks and the
+# MISSING_TOKEN test written inline, so validating a snapshot is a straight
+# run of comparisons instead of a loop over the schema and a chain of
+# field-type string compares per field. ``_validate_field`` stays the
+# reference: the generated checks are its failure conditions verbatim, and a
+# failing field's message is still produced by it.
+# ---------------------------------------------------------------------------
+_MISSING = f"(v is None or v == {MISSING_TOKEN!r})"
+_FAILURE_CONDITIONS: dict[str, str] = {
+    "slot": "v not in {'am', 'pm'}",
+    "positive_int": "not isinstance(v, int) or v <= 0",
+    "nonneg_int": "not isinstance(v, int) or v < 0",
+    "nonneg_float": "not isinstance(v, (int, float)) or float(v) < 0",
+    "unit_interval": "not isinstance(v, (int, float)) or not 0.0 <= float(v) <= 1.0",
+    "binary": "v not in {0, 1}",
+    "binary_or_miss": f"not {_MISSING} and v not in {{0, 1}}",
+    "float_or_miss": f"not {_MISSING} and not isinstance(v, (int, float))",
+    "engagement": "v not in {1, 2, 3, 4}",
+    "engagement_or_miss": f"not {_MISSING} and v not in {{1, 2, 3, 4}}",
+    "unit_interval_or_miss": (
+        f"not {_MISSING} and "
+        "(not isinstance(v, (int, float)) or not 0.0 <= float(v) <= 1.0)"
+    ),
+    "bool": "not isinstance(v, bool)",
+}
+
+
+def compile_validator(
+    schema: dict[str, str],
+    *,
+    not_dict_message: str,
+    required_message: str,
+    error_prefix: str,
+    closed: bool = False,
+    name: str = "validate",
+):
+    """
+    Build ``f(data) -> (ok, message)`` for ``schema`` (field -> field type),
+    returning the same results as looping over it with ``_validate_field``.
+
+    ``required_message`` and ``error_prefix`` are ``str.format`` templates
+    of the field name. A ``closed`` schema also rejects keys it does not
+    list, reporting the first unknown key before any other error.
+    """
+    lines = [
+        f"def {name}(data):",
+        "    if not isinstance(data, dict):",
+        f"        return False, {not_dict_message!r}",
+    ]
+    if closed:
+        lines += ["    if data.keys() != FIELDS:", "        return key_error(data)"]
+    for field_name, field_type in schema.items():
+        if not closed:
+            lines += [
+                f"    if {field_name!r} not in data:",
+                f"        return False, {required_message.format(field_name)!r}",
+            ]
+        condition = _FAILURE_CONDITIONS.get(
+            field_type, f"not validate_field({field_type!r}, v)[0]"
+        )
+        lines += [
+            f"    v = data[{field_name!r}]",
+            f"    if {condition}:",
+            f"        return False, {error_prefix.format(field_name)!r}"
+            f" + validate_field({field_type!r}, v)[1]",
+        ]
+    lines.append("    return True, ''")
+
+    def key_error(data):
+        for field_name in data:
+            if field_name not in schema:
+                return False, f"unknown field '{field_name}'."
+        # Only missing keys: report whichever comes first in schema order,
+        # a missing field or an invalid one, as the loop always has.
+        for field_name, field_type in schema.items():
+            if field_name not in data:
+                return False, required_message.format(field_name)
+            valid, error_message = _validate_field(field_type, data[field_name])
+            if not valid:
+                return False, error_prefix.format(field_name) + error_message
+        return True, ""
+
+    namespace = {
+        "FIELDS": frozenset(schema),
+        "key_error": key_error,
+        "validate_field": _validate_field,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace[name]
+
+
+_SNAPSHOT_VALIDATOR = compile_validator(
+    SNAPSHOT_SCHEMA,
+    not_dict_message="data must be a dictionary.",
+    required_message="{} is required (full snapshot).",
+    error_prefix="{}: ",
+    closed=True,
+    name="validate_snapshot",
+)
+_CONTEXT_VALIDATORS = {
+    decision_type: compile_validator(
+        schema,
+        not_dict_message="context must be a dictionary.",
+        required_message=f"Invalid context for {decision_type}. {{}} is required.",
+        error_prefix=f"Invalid context for {decision_type}. {{}}: ",
+        name=f"validate_{decision_type}_context",
+    )
+    for decision_type, schema in CONTEXT_SCHEMAS.items()
+}
+_OUTCOME_VALIDATORS = {
+    decision_type: compile_validator(
+        schema,
+        not_dict_message="outcome must be a dictionary.",
+        required_message=f"Invalid outcome for {decision_type}. {{}} is required.",
+        error_prefix=f"Invalid outcome for {decision_type}. {{}}: ",
+        name=f"validate_{decision_type}_outcome",
+    )
+    for decision_type, schema in OUTCOME_SCHEMAS.items()
+}
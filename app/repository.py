@@ -0,0 +1,332 @@
+"""
+Persistence seam between the learners and their storage.
+
+The sampler-backed learners read and write exactly three kinds of state
+outside the request path:
+
+  - EB snapshots (``ModelParameters`` rows with a ``snapshot_type`` of
+    ``local_fit`` / ``hyper`` / ``posterior``),
+  - per-dyad week-1 standardization baselines (``StandardizationBaseline``),
+    and
+  - the frozen-dyad archive of completed dyads' final fits
+    (``FrozenDyadFits``, see app/frozen_archive.py).
+
+They also read the /update request log, to count completed updates.
+
+``SqlRepository`` is the production implementation on the Flask-SQLAlchemy
+session and preserves the historical query semantics exactly.
+``InMemoryRepository`` keeps the same state in plain dicts so the headless
+simulation engine (``tests/headless_simulation.py``) can drive a learner
+with no app context, no ORM and no HTTP layer, and still reproduce the
+decisions of a Flask-backed run for the same seed.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from sqlalchemy import select
+
+from app import frozen_archive
+from app.extensions import db
+from app.frozen_archive import FrozenFits
+from app.models import ModelParameters, ModelUpdateRequests
+from app.standardization import (
+    baseline_group_ids,
+    compute_week1_baselines_bulk,
+    compute_week1_baselines_for_dyad,
+    fetch_agent_baselines,
+    fetch_baselines,
+    week1_baseline_stats,
+)
+
+
+class SqlRepository:
+    """ORM-backed repository (the default for every learner)."""
+
+    def __init__(self, app=None):
+        self.app = app
+
+    # ------------------------------------------------------------ snapshots
+
+    def save_snapshot(
+        self,
+        snapshot_type: str,
+        decision_type: str,
+        agent_decision_index: int,
+        group_id: str | None,
+        sample_size: int,
+        theta: list[float],
+        covariance: list[list[float]],
+        perturbation: list[float] | None,
+        metadata_json: dict | None,
+    ) -> None:
+        if self.app is None:
+            return
+        with self.app.app_context():
+            snapshot = ModelParameters(
+                snapshot_type=snapshot_type,
+                group_id=group_id,
+                decision_type=decision_type,
+                agent_decision_index=agent_decision_index,
+                sample_size=sample_size,
+                feature_dim=len(theta),
+                theta=theta,
+                covariance=covariance,
+                perturbation=perturbation,
+                metadata_json=metadata_json,
+            )
+            db.session.add(snapshot)
+            db.session.commit()
+
+    def load_latest_snapshot(
+        self, snapshot_type: str, decision_type: str, group_id: str | None = None
+    ):
+        if self.app is None:
+            return None
+        with self.app.app_context():
+            query = ModelParameters.query.filter_by(
+                snapshot_type=snapshot_type,
+                decision_type=decision_type,
+                group_id=group_id,
+            ).order_by(
+                ModelParameters.agent_decision_index.desc(), ModelParameters.id.desc()
+            )
+            return query.first()
+
+    def load_latest_snapshots(self, keys) -> list:
+        """
+        ``load_latest_snapshot`` for several (snapshot_type, decision_type,
+        group_id) keys in one statement; results follow ``keys``.
+        """
+        if self.app is None:
+            return [None] * len(keys)
+        with self.app.app_context():
+            latest_ids = [
+                select(ModelParameters.id)
+                .where(
+                    ModelParameters.snapshot_type == snapshot_type,
+                    ModelParameters.decision_type == decision_type,
+                    ModelParameters.group_id.is_(None)
+                    if group_id is None
+                    else ModelParameters.group_id == group_id,
+                )
+                .order_by(
+                    ModelParameters.agent_decision_index.desc(), ModelParameters.id.desc()
+                )
+                .limit(1)
+                .scalar_subquery()
+                for snapshot_type, decision_type, group_id in keys
+            ]
+            rows = ModelParameters.query.filter(ModelParameters.id.in_(latest_ids)).all()
+            by_key = {(r.snapshot_type, r.decision_type, r.group_id): r for r in rows}
+            return [by_key.get(tuple(key)) for key in keys]
+
+    # ------------------------------------------------------------ baselines
+
+    def fetch_baselines(self, group_id: str, decision_type: str) -> dict[str, dict[str, float]]:
+        return fetch_baselines(group_id, decision_type)
+
+    def fetch_agent_baselines(self, decision_type: str) -> dict[str, dict[str, dict[str, float]]]:
+        return fetch_agent_baselines(decision_type)
+
+    def has_baselines(self, group_id: str, decision_type: str) -> bool:
+        return bool(fetch_baselines(group_id, decision_type))
+
+    def baseline_group_ids(self, decision_type: str) -> set[str]:
+        return baseline_group_ids(decision_type)
+
+    def persist_week1_baselines(
+        self, group_id: str, decision_type: str, week1_records: Iterable[dict]
+    ) -> dict[str, dict[str, float]]:
+        return compute_week1_baselines_for_dyad(group_id, decision_type, week1_records)
+
+    def persist_week1_baselines_bulk(
+        self, decision_type: str, week1_by_dyad: dict[str, list[dict]]
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        return compute_week1_baselines_bulk(decision_type, week1_by_dyad)
+
+    # ------------------------------------------------------- frozen dyads
+
+    def load_frozen_fits(self, decision_type: str) -> FrozenFits | None:
+        if self.app is None:
+            return None
+        with self.app.app_context():
+            return frozen_archive.load_frozen_fits(decision_type)
+
+    def freeze_fits(self, decision_type: str, fits: dict[str, dict]) -> None:
+        if self.app is None:
+            return
+        with self.app.app_context():
+            frozen_archive.freeze_fits(decision_type, fits)
+
+    # -------------------------------------------------------------- updates
+
+    def completed_updates_after(self, update_id: str | None) -> int | None:
+        """
+        Completed /update requests made after ``update_id``; None when that
+        request is unknown.
+        """
+        if self.app is None or update_id is None:
+            return None
+        with self.app.app_context():
+            request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+            if request_row is None:
+                return None
+            return ModelUpdateRequests.query.filter(
+                ModelUpdateRequests.id > request_row.id,
+                ModelUpdateRequests.status == "completed",
+            ).count()
+
+
+@dataclass
+class SnapshotRecord:
+    """In-memory analogue of a ``ModelParameters`` snapshot row."""
+
+    id: int
+    snapshot_type: str
+    decision_type: str
+    group_id: str | None
+    agent_decision_index: int
+    sample_size: int
+    feature_dim: int
+    theta: list[float]
+    covariance: list[list[float]]
+    perturbation: list[float] | None
+    metadata_json: dict | None
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)
+
+
+class InMemoryRepository:
+    """
+    Dict-backed repository for headless runs.
+
+    ``load_latest_snapshot`` returns the highest ``agent_decision_index`` and,
+    among ties, the latest-inserted row — the ``ORDER BY agent_decision_index
+    DESC, id DESC`` of ``SqlRepository`` (ties occur when a dyad with no new
+    data is re-shrunk against a moved hyperprior).
+    """
+
+    def __init__(self):
+        self.snapshots: list[SnapshotRecord] = []
+        self._latest: dict[tuple[str, str, str | None], SnapshotRecord] = {}
+        self.baselines: dict[tuple[str, str], dict[str, dict[str, float]]] = {}
+        self.frozen: dict[str, FrozenFits] = {}
+
+    # ------------------------------------------------------------ snapshots
+
+    def save_snapshot(
+        self,
+        snapshot_type: str,
+        decision_type: str,
+        agent_decision_index: int,
+        group_id: str | None,
+        sample_size: int,
+        theta: list[float],
+        covariance: list[list[float]],
+        perturbation: list[float] | None,
+        metadata_json: dict | None,
+    ) -> None:
+        record = SnapshotRecord(
+            id=len(self.snapshots) + 1,
+            snapshot_type=snapshot_type,
+            decision_type=decision_type,
+            group_id=group_id,
+            agent_decision_index=int(agent_decision_index),
+            sample_size=sample_size,
+            feature_dim=len(theta),
+            theta=theta,
+            covariance=covariance,
+            perturbation=perturbation,
+            metadata_json=metadata_json,
+        )
+        self.snapshots.append(record)
+        key = (snapshot_type, decision_type, group_id)
+        current = self._latest.get(key)
+        if current is None or record.agent_decision_index >= current.agent_decision_index:
+            self._latest[key] = record
+
+    def load_latest_snapshot(
+        self, snapshot_type: str, decision_type: str, group_id: str | None = None
+    ):
+        return self._latest.get((snapshot_type, decision_type, group_id))
+
+    def load_latest_snapshots(self, keys) -> list:
+        return [self._latest.get(tuple(key)) for key in keys]
+
+    def iter_snapshots(
+        self, snapshot_type: str, decision_type: str | None = None
+    ) -> Iterable[SnapshotRecord]:
+        """Snapshots of one type in insertion order (for analysis tools)."""
+        for record in self.snapshots:
+            if record.snapshot_type != snapshot_type:
+                continue
+            if decision_type is not None and record.decision_type != decision_type:
+                continue
+            yield record
+
+    # ------------------------------------------------------------ baselines
+
+    def fetch_baselines(self, group_id: str, decision_type: str) -> dict[str, dict[str, float]]:
+        stored = self.baselines.get((group_id, decision_type), {})
+        return {name: dict(values) for name, values in stored.items()}
+
+    def fetch_agent_baselines(self, decision_type: str) -> dict[str, dict[str, dict[str, float]]]:
+        return {
+            gid: self.fetch_baselines(gid, dt) for gid, dt in self.baselines if dt == decision_type
+        }
+
+    def has_baselines(self, group_id: str, decision_type: str) -> bool:
+        return bool(self.baselines.get((group_id, decision_type)))
+
+    def baseline_group_ids(self, decision_type: str) -> set[str]:
+        return {gid for gid, dt in self.baselines if dt == decision_type}
+
+    def persist_week1_baselines(
+        self, group_id: str, decision_type: str, week1_records: Iterable[dict]
+    ) -> dict[str, dict[str, float]]:
+        if self.has_baselines(group_id, decision_type):
+            return self.fetch_baselines(group_id, decision_type)
+        stats = week1_baseline_stats(decision_type, week1_records)
+        baselines = {
+            name: {"mu": values["mu"], "sigma": values["sigma"]}
+            for name, values in stats.items()
+        }
+        if baselines:
+            self.baselines[(group_id, decision_type)] = baselines
+        return self.fetch_baselines(group_id, decision_type)
+
+    def persist_week1_baselines_bulk(
+        self, decision_type: str, week1_by_dyad: dict[str, list[dict]]
+    ) -> dict[str, dict[str, dict[str, float]]]:
+        written = {}
+        for group_id, records in week1_by_dyad.items():
+            if not self.has_baselines(group_id, decision_type):
+                baselines = self.persist_week1_baselines(group_id, decision_type, records)
+                if baselines:
+                    written[group_id] = baselines
+        return written
+
+    # ------------------------------------------------------- frozen dyads
+
+    def load_frozen_fits(self, decision_type: str) -> FrozenFits | None:
+        return self.frozen.get(decision_type)
+
+    def freeze_fits(self, decision_type: str, fits: dict[str, dict]) -> None:
+        current = self.frozen.get(decision_type)
+        if current is not None:
+            already = set(current.group_ids.tolist())
+            fits = {gid: fit for gid, fit in fits.items() if gid not in already}
+        if not fits:
+            return
+        if current is None:
+            current = FrozenFits.empty(len(next(iter(fits.values()))["theta_hat"]))
+        self.frozen[decision_type] = current.extend(fits)
+
+    # -------------------------------------------------------------- updates
+
+    def completed_updates_after(self, update_id: str | None) -> int | None:
+        """Headless runs keep no request log: the learner counts in memory."""
+        return None
@@ -5,6 +5,8 @@ Writes JSON files under REPRO_SNAPSHOT_ROOT/<update_id>/:
   - data_uploads.json (the upstream timeline study_data is derived from)
   - actions.json (includes `state` used at decision time)
   - groups.json
+  - online_folds.json (online posterior fold and reset rows, see
+    app/online_posterior.py)
   - metadata.json
 """
 
@@ -20,9 +22,11 @@ from app.models import (
     Action,
     DataUpload,
     Group,
+    ModelParameters,
     ModelUpdateRequests,
     UpdateReproducibilitySnapshot,
 )
+from app.online_posterior import ONLINE_FOLD, ONLINE_RESET
 
 
 def _json_default(obj: Any):
@@ -65,6 +69,13 @@ def save_pre_update_repro_snapshot(app, update_id: str, model_parameters_id: int
     update_rows = ModelUpdateRequests.query.order_by(
         ModelUpdateRequests.request_timestamp.asc()
     ).all()
+    fold_rows = (
+        ModelParameters.query.filter(
+            ModelParameters.snapshot_type.in_((ONLINE_FOLD, ONLINE_RESET))
+        )
+        .order_by(ModelParameters.id.asc())
+        .all()
+    )
 
     upload_payload = []
     for r in upload_rows:
@@ -125,6 +136,19 @@ def save_pre_update_repro_snapshot(app, update_id: str, model_parameters_id: int
             }
         )
 
+    fold_payload = []
+    for r in fold_rows:
+        fold_payload.append(
+            {
+                "id": r.id,
+                "snapshot_type": r.snapshot_type,
+                "decision_type": r.decision_type,
+                "group_id": r.group_id,
+                "theta": r.theta,
+                "metadata_json": r.metadata_json,
+            }
+        )
+
     meta = {
         "update_id": update_id,
         "model_parameters_id": model_parameters_id,
@@ -133,6 +157,7 @@ def save_pre_update_repro_snapshot(app, update_id: str, model_parameters_id: int
         "actions_count": len(action_payload),
         "groups_count": len(group_payload),
         "updates_count": len(updates_payload),
+        "online_folds_count": len(fold_payload),
     }
 
     total = 0
@@ -142,6 +167,7 @@ def save_pre_update_repro_snapshot(app, update_id: str, model_parameters_id: int
     total += _write_json(
         os.path.join(out_dir, "model_update_requests.json"), updates_payload
     )
+    total += _write_json(os.path.join(out_dir, "online_folds.json"), fold_payload)
     total += _write_json(os.path.join(out_dir, "metadata.json"), meta)
 
     row = UpdateReproducibilitySnapshot(
@@ -57,17 +57,20 @@ def _find_outcome_upload(decision_type: str, action: Action, uploads_after: list
     return None
 
 
-def derive_study_data(app) -> int:
+def derive_study_data(app, skip_group_ids=frozenset()) -> int:
     """
     Pair every unpaired action with its outcome upload and write/update the
     corresponding study_data row. Returns the number of rows finalized this
-    pass.
+    pass. ``skip_group_ids`` (the frozen dyads, whose rows are all final)
+    are not re-scanned.
     """
     now = datetime.datetime.now()
     finalized = 0
 
     for group in Group.query.order_by(Group.group_id.asc()).all():
         gid = group.group_id
+        if gid in skip_group_ids:
+            continue
         actions = (
             Action.query.filter_by(group_id=gid)
             .order_by(Action.request_timestamp.asc(), Action.id.asc())
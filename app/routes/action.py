@@ -2,9 +2,13 @@ import logging
 import datetime
 import uuid
 from flask import Blueprint, request, jsonify, current_app
+from app.action_queries import fetch_decision_inputs, insert_action
+from app.decision_log import log_decision
 from app.extensions import db
-from app.models import Group, Action, ModelParameters, DataUpload
+from app.metrics import record_decision, time_learner
+from app.models import Group, Action
 from app.protocol import validate_decision_type, project_snapshot
+from app.speculation import take_speculative_decision
 
 action_blueprint = Blueprint("action", __name__)
 
@@ -51,19 +55,18 @@ def _evaluate_warmup(group_id: str, decision_type: str) -> tuple[bool, str | Non
     decisions (its first active week — cp_message fires once per active day,
     so its count is a shared day clock for all three agents).
     """
-    cohort_min = int(current_app.config.get("WARMUP_COHORT_MIN_DYADS", 5))
-    week1_cp = int(current_app.config.get("WARMUP_WEEK1_CP_DECISIONS", 6))
-
-    n_reg = Group.query.count()
-    if n_reg < cohort_min:
-        return True, "cohort"
-
     cp_count = Action.query.filter_by(
         group_id=group_id, decision_type="cp_message"
     ).count()
-    if cp_count < week1_cp:
-        return True, "week1"
+    return warmup_gate(Group.query.count(), cp_count)
+
 
+def warmup_gate(registered_dyads: int, cp_decisions: int) -> tuple[bool, str | None]:
+    """The warm-up rule of ``_evaluate_warmup`` on counts already read."""
+    if registered_dyads < int(current_app.config.get("WARMUP_COHORT_MIN_DYADS", 5)):
+        return True, "cohort"
+    if cp_decisions < int(current_app.config.get("WARMUP_WEEK1_CP_DECISIONS", 6)):
+        return True, "week1"
     return False, None
 
 
@@ -85,6 +88,18 @@ def _draw_warmup_action() -> tuple[int, dict]:
     return int(_random.random() < 0.5), {"mode": "warmup"}
 
 
+def _duplicate_decision():
+    return (
+        jsonify(
+            {
+                "status": "failed",
+                "message": "Decision index already exists for this (group, decision_type).",
+            }
+        ),
+        400,
+    )
+
+
 @action_blueprint.route("/action", methods=["POST"])
 def request_action():
     """
@@ -106,33 +121,20 @@ def request_action():
             request_timestamp = datetime.datetime.fromisoformat(request_timestamp)
         received_timestamp = datetime.datetime.now()
 
-        # Check if the group exists in the database
-        group = Group.query.filter_by(group_id=group_id).first()
-        if not group:
+        # Group, idempotency, latest upload, policy row and warm-up counts in
+        # one statement (app/action_queries.py).
+        inputs = fetch_decision_inputs(group_id, decision_type, decision_idx)
+        if not inputs.group_exists:
             return jsonify({"status": "failed", "message": "Group not found."}), 404
 
         # Idempotency: (group_id, decision_type, decision_idx) is per-agent.
-        action_row = Action.query.filter_by(
-            group_id=group_id, decision_type=decision_type, decision_idx=decision_idx
-        ).first()
-        if action_row:
-            return (
-                jsonify(
-                    {
-                        "status": "failed",
-                        "message": "Decision index already exists for this (group, decision_type).",
-                    }
-                ),
-                400,
-            )
+        # Checked here so a repeat never draws; the insert's ON CONFLICT
+        # settles concurrent requests.
+        if inputs.decision_exists:
+            return _duplicate_decision()
 
-        # Pull the dyad's most recent uploaded snapshot; 409 if none yet.
-        latest_upload = (
-            DataUpload.query.filter_by(group_id=group_id)
-            .order_by(DataUpload.request_timestamp.desc(), DataUpload.id.desc())
-            .first()
-        )
-        if latest_upload is None:
+        # The dyad's most recent uploaded snapshot; 409 if none yet.
+        if inputs.upload_id is None:
             return (
                 jsonify(
                     {
@@ -143,19 +145,9 @@ def request_action():
                 409,
             )
 
-        # Project the subset this decision_type needs (§5.2). Recorded on the
-        # action so the decision is reproducible even if later uploads
-        # overwrite individual fields; also seeds warm-up rows into the fit.
-        raw_context = project_snapshot(decision_type, latest_upload.data, decision_idx)
-
-        # Get the latest "policy" row (non-snapshot); EB snapshot rows live in
+        # The latest "policy" row (non-snapshot); EB snapshot rows live in
         # the same table and are filtered out.
-        model_parameters = (
-            ModelParameters.query.filter(ModelParameters.snapshot_type.is_(None))
-            .order_by(ModelParameters.timestamp.desc())
-            .first()
-        )
-        if not model_parameters:
+        if inputs.model_parameters_id is None:
             return (
                 jsonify({"status": "failed", "message": "Model parameters not found."}),
                 404,
@@ -164,50 +156,100 @@ def request_action():
         rl_algorithm = current_app.rl_algorithm
 
         # Server-side warm-up gate.
-        is_warmup, warmup_reason = _evaluate_warmup(group_id, decision_type)
+        is_warmup, warmup_reason = warmup_gate(inputs.registered_dyads, inputs.cp_decisions)
+
+        # Decision prepared by /upload_data for this snapshot, if still valid
+        # (app/speculation.py); None means the full path below.
+        speculative = None
+        if not is_warmup:
+            speculative = take_speculative_decision(
+                current_app,
+                group_id,
+                decision_type,
+                inputs.upload_id,
+                decision_idx,
+                inputs.model_parameters_id,
+            )
+
+        # Project the subset this decision_type needs (§5.2). Recorded on the
+        # action so the decision is reproducible even if later uploads
+        # overwrite individual fields; also seeds warm-up rows into the fit.
+        if speculative is not None:
+            raw_context = speculative.raw_context
+        else:
+            raw_context = project_snapshot(decision_type, inputs.upload_data, decision_idx)
 
         if is_warmup:
             action, random_state = _draw_warmup_action()
             random_state["warmup_reason"] = warmup_reason
             prob = 0.5
             state = None
+        elif speculative is not None:
+            state = speculative.state
+            with time_learner("get_action"):
+                action, prob, random_state = rl_algorithm.draw_prepared_action(
+                    group_id,
+                    decision_type,
+                    decision_idx,
+                    speculative.prob_action_1,
+                    speculative.random_state,
+                )
         else:
             context_with_meta = {
                 **raw_context,
                 "decision_type": decision_type,
                 "group_id": group_id,
             }
-            status, state = rl_algorithm.make_state(context_with_meta)
+            with time_learner("make_state"):
+                status, state = rl_algorithm.make_state(context_with_meta)
             if not status:
                 return jsonify({"status": "failed", "message": state}), 400
 
-            probability = model_parameters.probability_of_action
-            action, prob, random_state = rl_algorithm.get_action(
-                group_id, state, {"probability": probability}, decision_type, decision_idx
-            )
+            probability = inputs.probability_of_action
+            with time_learner("get_action"):
+                action, prob, random_state = rl_algorithm.get_action(
+                    group_id, state, {"probability": probability}, decision_type, decision_idx
+                )
 
         rid = str(uuid.uuid4())[:8]
 
-        new_action = Action(
+        inserted = insert_action(
+            {
+                "group_id": group_id,
+                "action": action,
+                "rid": rid,
+                "state": state,
+                "decision_idx": decision_idx,
+                "decision_type": decision_type,
+                "raw_context": raw_context,
+                "action_prob": prob,
+                "is_warmup": is_warmup,
+                "warmup_reason": warmup_reason,
+                "random_state": random_state,
+                "model_parameters_id": inputs.model_parameters_id,
+                "request_timestamp": request_timestamp,
+                "timestamp": received_timestamp,
+            }
+        )
+        db.session.commit()
+        if not inserted:
+            # A concurrent request wrote this decision first.
+            return _duplicate_decision()
+        record_decision(decision_type, is_warmup, warmup_reason)
+        log_decision(
+            study_id=current_app.config.get("STUDY_ID"),
             group_id=group_id,
-            action=action,
-            rid=rid,
-            state=state,
-            decision_idx=decision_idx,
             decision_type=decision_type,
-            raw_context=raw_context,
-            action_prob=prob,
-            is_warmup=is_warmup,
-            warmup_reason=warmup_reason,
+            decision_idx=decision_idx,
+            action=action,
+            prob=prob,
             random_state=random_state,
-            model_parameters_id=model_parameters.id,
+            warmup=is_warmup,
+            warmup_reason=warmup_reason,
             request_timestamp=request_timestamp,
-            timestamp=received_timestamp,
+            served_at=received_timestamp,
         )
 
-        db.session.add(new_action)
-        db.session.commit()
-
         return (
             jsonify(
                 {
@@ -1,9 +1,12 @@
 import datetime
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import insert
 from app.models import Group, DataUpload
 from app.extensions import db
-from app.protocol import validate_snapshot
+from app.online_posterior import apply_online_updates
+from app.protocol import validate_snapshot, validate_snapshots
+from app.speculation import schedule_speculation
 
 data_blueprint = Blueprint("data", __name__)
 
@@ -17,19 +20,30 @@ def check_fields(data: dict) -> tuple[bool, str]:
     the field dictionary (§5.1) must be present in `data` (use "miss" / null
     to mark an unobservable value).
     """
+    fields_present, error_message = _check_envelope(data)
+    if not fields_present:
+        return False, error_message
+    return validate_snapshot(data["data"])
+
+
+def _check_envelope(data: dict) -> tuple[bool, str]:
+    """``check_fields`` short of validating the snapshot itself."""
     if not data or "group_id" not in data:
         return False, "group_id is required."
 
-    if not isinstance(data["group_id"], str):
+    if not isinstance(data.get("group_id"), str):
         return False, "group_id must be a string."
 
     if "timestamp" not in data:
         return False, "timestamp is required."
 
+    if not isinstance(data["timestamp"], str):
+        return False, "timestamp must be an ISO-8601 string."
+
     if "data" not in data:
         return False, "data is required."
 
-    return validate_snapshot(data["data"])
+    return True, ""
 
 
 @data_blueprint.route("/upload_data", methods=["POST"])
@@ -73,6 +87,16 @@ def upload_data(data: dict | None = None):
 
         logging.info(f"[Upload Data] Snapshot stored for group: {group_id}")
 
+        app = current_app._get_current_object()
+        # Fold the rewards this upload finalizes into the cached posteriors
+        # (no-op unless ONLINE_POSTERIOR_UPDATES is on), so the decisions
+        # prepared next already see them.
+        apply_online_updates(app, upload.id)
+
+        # Prepare the dyad's next decisions ahead of its /action (no-op unless
+        # SPECULATIVE_DECISIONS is on).
+        schedule_speculation(app, upload.id)
+
         return jsonify({"status": "success", "message": "Data uploaded successfully."}), 201
 
     except Exception as e:
@@ -80,3 +104,175 @@ def upload_data(data: dict | None = None):
         logging.error(f"[Upload Data] Error: {e}")
         logging.exception(e)
         return jsonify({"error": "Internal Server Error"}), 500
+
+
+# Stand-in for an NDJSON line that does not parse.
+_INVALID_JSON = object()
+
+
+def _parse_batch_body() -> list | None:
+    """The items of a batch body (a JSON array or NDJSON), or None."""
+    if request.mimetype == "application/x-ndjson":
+        items = []
+        for line in request.get_data().splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(current_app.json.loads(line))
+            except ValueError:
+                items.append(_INVALID_JSON)
+        return items
+    body = request.get_json(silent=True)
+    return body if isinstance(body, list) else None
+
+
+def _parse_timestamp(timestamp: str) -> datetime.datetime | None:
+    try:
+        return datetime.datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def _insert_uploads(rows: list[dict], chunk_rows: int) -> list[int]:
+    """Insert ``rows`` with one multi-row INSERT per chunk; ids in row order."""
+    ids = []
+    # sort_by_parameter_order would make SQLite fall back to one statement
+    # per row; autoincrement ids follow the VALUES order, so sort instead.
+    statement = insert(DataUpload).returning(DataUpload.id)
+    for start in range(0, len(rows), chunk_rows):
+        ids.extend(sorted(db.session.scalars(statement, rows[start : start + chunk_rows])))
+    return ids
+
+
+@data_blueprint.route("/upload_data:batch", methods=["POST"])
+def upload_data_batch():
+    """
+    Append many snapshots at once, across groups: host catch-up after an
+    outage, or backfill. The body is a JSON array of /upload_data payloads,
+    or one payload per line with Content-Type ``application/x-ndjson``.
+
+    Every item is validated (envelope, ``validate_snapshots``, group) before
+    anything is written; the valid ones are stored in one transaction with
+    one INSERT per UPLOAD_BATCH_CHUNK_ROWS items, and the per-upload hooks
+    of /upload_data run afterwards: online posterior folds for each upload
+    in timestamp order, and speculation once per group for its newest
+    upload. ``results`` gives each item's status in request order; the
+    response is 201 when every item was stored, else 207.
+    """
+    try:
+        items = _parse_batch_body()
+        if items is None:
+            return (
+                jsonify(
+                    {
+                        "status": "failed",
+                        "message": "Body must be a JSON array of uploads or NDJSON.",
+                    }
+                ),
+                400,
+            )
+        max_items = int(current_app.config.get("UPLOAD_BATCH_MAX_ITEMS", 10_000))
+        if len(items) > max_items:
+            return (
+                jsonify(
+                    {"status": "failed", "message": f"At most {max_items} uploads per batch."}
+                ),
+                413,
+            )
+
+        results: list[dict | None] = [None] * len(items)
+
+        def reject(index, message):
+            results[index] = {"index": index, "status": "failed", "code": 400, "message": message}
+
+        enveloped = []
+        for index, item in enumerate(items):
+            if item is _INVALID_JSON:
+                ok, message = False, "Invalid JSON."
+            elif not isinstance(item, dict):
+                ok, message = False, "Each upload must be an object."
+            else:
+                ok, message = _check_envelope(item)
+            if ok:
+                enveloped.append(index)
+            else:
+                reject(index, message)
+        checked = []
+        snapshot_checks = validate_snapshots(items[index]["data"] for index in enveloped)
+        for index, (ok, message) in zip(enveloped, snapshot_checks):
+            if not ok:
+                reject(index, message)
+                continue
+            timestamp = _parse_timestamp(items[index]["timestamp"])
+            if timestamp is None:
+                reject(index, "timestamp must be ISO-8601.")
+            else:
+                checked.append((index, items[index], timestamp))
+
+        group_ids = {item["group_id"] for _, item, _ in checked}
+        known = (
+            {gid for (gid,) in db.session.query(Group.group_id).filter(Group.group_id.in_(group_ids))}
+            if group_ids
+            else set()
+        )
+        stored = []
+        for index, item, timestamp in checked:
+            if item["group_id"] in known:
+                stored.append((index, item, timestamp))
+            else:
+                results[index] = {
+                    "index": index,
+                    "status": "failed",
+                    "code": 404,
+                    "message": "Group not found.",
+                }
+
+        created_at = datetime.datetime.now()
+        upload_ids = _insert_uploads(
+            [
+                {
+                    "group_id": item["group_id"],
+                    "data": item["data"],
+                    "request_timestamp": timestamp,
+                    "created_at": created_at,
+                }
+                for _, item, timestamp in stored
+            ],
+            int(current_app.config.get("UPLOAD_BATCH_CHUNK_ROWS", 500)),
+        )
+        db.session.commit()
+        for (index, _, _), upload_id in zip(stored, upload_ids):
+            results[index] = {"index": index, "status": "success", "upload_id": upload_id}
+
+        logging.info(
+            f"[Upload Data] Batch stored {len(stored)} of {len(items)} snapshots "
+            f"for {len({item['group_id'] for _, item, _ in stored})} groups"
+        )
+
+        app = current_app._get_current_object()
+        by_group: dict[str, list[tuple[datetime.datetime, int]]] = {}
+        for (_, item, timestamp), upload_id in zip(stored, upload_ids):
+            by_group.setdefault(item["group_id"], []).append((timestamp, upload_id))
+        for uploads in by_group.values():
+            uploads.sort()
+            for _, upload_id in uploads:
+                apply_online_updates(app, upload_id)
+            schedule_speculation(app, uploads[-1][1])
+
+        failed = len(items) - len(stored)
+        return (
+            jsonify(
+                {
+                    "status": "success" if not failed else "partial",
+                    "stored": len(stored),
+                    "failed": failed,
+                    "results": results,
+                }
+            ),
+            201 if not failed else 207,
+        )
+
+    except Exception as e:
+        logging.error(f"[Upload Data] Batch error: {e}")
+        logging.exception(e)
+        return jsonify({"error": "Internal Server Error"}), 500
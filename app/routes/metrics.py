@@ -0,0 +1,16 @@
+from flask import Blueprint, Response, current_app
+
+metrics_blueprint = Blueprint("metrics", __name__)
+
+
+@metrics_blueprint.route("/metrics", methods=["GET"])
+def export_metrics():
+    """
+    In-process request/learner metrics in Prometheus text format (see
+    app/metrics.py). Labels carry endpoint and decision_type only — no PHI.
+    """
+    return Response(
+        current_app.metrics.render(),
+        mimetype="text/plain",
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
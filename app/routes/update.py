@@ -4,7 +4,6 @@ import uuid
 import shutil
 import os
 import csv
-from threading import Thread
 from flask import Blueprint, current_app, request, jsonify
 from app.models import (
     ModelParameters,
@@ -15,11 +14,19 @@ from app.models import (
     DataUpload,
     ThompsonSamplingParams,
     UpdateReproducibilitySnapshot,
+    UpdatePhaseProfile,
+    UpdateCheckpoint,
 )
 from app.algorithms.base import RLAlgorithm
 from app.extensions import db
+from app.frozen_archive import completed_group_ids, frozen_group_ids
+from app.profiling import PhaseTimer
+from app.protocol import DECISION_TYPES
 from app.reward_derivation import derive_study_data
 from app.repro_snapshot import save_pre_update_repro_snapshot
+from app.study_data_stream import StudyDataStream
+from app.update_checkpoints import UpdateCheckpoints
+from app.update_worker import dispatch_update
 
 update_blueprint = Blueprint("update", __name__)
 
@@ -44,6 +51,8 @@ def backup_tables(app):
             ModelParameters,
             ThompsonSamplingParams,
             UpdateReproducibilitySnapshot,
+            UpdatePhaseProfile,
+            UpdateCheckpoint,
         ]
 
         for model in models:
@@ -72,102 +81,186 @@ def backup_tables(app):
     return f"{backup_dir}.zip"
 
 
+def _load_update_records(frozen=None):
+    """
+    The study_data stream the learners read, in the (decision_type,
+    group_id, decision_idx) order they expect, plus the latest policy row
+    and the per-agent decision index the update is taken at. ``frozen``
+    maps decision_type to dyads whose rows the learner reads from the
+    frozen-dyad archive instead.
+    """
+    # Get the latest model parameters from the database
+    current_params = ModelParameters.query.order_by(
+        ModelParameters.timestamp.desc()
+    ).first()
+
+    # Rows are read dyad by dyad while the learner runs (app/study_data_stream.py)
+    stream = StudyDataStream(exclude=frozen)
+    return stream, current_params, stream.current_index()
+
+
+def _save_phase_profile(update_id: str, timer: PhaseTimer) -> None:
+    """Write one update_phase_profiles row per phase timed so far."""
+    for seq, (name, detail) in enumerate(timer.details.items()):
+        db.session.add(
+            UpdatePhaseProfile(
+                update_id=update_id,
+                seq=seq,
+                phase=name,
+                decision_type=detail["decision_type"],
+                wall_s=detail["wall_s"],
+                cpu_s=detail["cpu_s"],
+                tracemalloc_peak_kib=detail["tracemalloc_peak_kib"],
+                rss_peak_kib=detail["rss_peak_kib"],
+            )
+        )
+    db.session.commit()
+
+
+def _run_stage(checkpoints: UpdateCheckpoints, timer: PhaseTimer, stage: str, run):
+    """``run()`` as timed phase ``stage``, or its checkpointed output."""
+    if checkpoints.done(stage):
+        logging.info(f"[Update] Update ID: {checkpoints.update_id} reuses stage {stage}")
+        return checkpoints.output(stage)
+    with timer.phase(stage):
+        output = run()
+    checkpoints.record(stage, output)
+    return output
+
+
 def process_update_request(app, update_id: str, rl_algorithm: RLAlgorithm):
     """
     Process the update request (API-Spec §3.4).
 
     No callback: completion is observed by reading model_update_requests.status
     / completed_at. Rewards are derived server-side from the data_uploads
-    timeline before fitting.
+    timeline before fitting. Per-phase and per-agent timings are persisted to
+    update_phase_profiles whether the update completes or fails.
+
+    Returns True if the update completed.
+
+    Dyads in the frozen-dyad archive (app/frozen_archive.py) are neither
+    re-derived nor loaded for the agents the learner archives; with
+    FREEZE_COMPLETED_DYADS, dyads that completed the study by the request
+    timestamp are handed to the learner to freeze in this update.
+
+    Stages (backup, derive_study_data, repro_snapshot, each agent's fit,
+    the learner) are checkpointed as they complete. Retrying a failed
+    update on unchanged inputs resumes after its last completed stage
+    and agent (app/update_checkpoints.py).
     """
+    timer = PhaseTimer(trace_memory=app.config.get("UPDATE_PROFILE_TRACEMALLOC", False))
     try:
-        # Check if the database backup is enabled
-        if app.config.get("BACKUP_DATABASE"):
-            backup_file = backup_tables(app)
-            app.logger.info("Database backed up to: %s", backup_file)
-
         with app.app_context():
+            checkpoints = UpdateCheckpoints.start(app, update_id)
+
+            # Check if the database backup is enabled
+            if app.config.get("BACKUP_DATABASE"):
+                backup_file = _run_stage(
+                    checkpoints, timer, "backup", lambda: backup_tables(app)
+                )
+                app.logger.info("Database backed up to: %s", backup_file)
+
+            frozen_types = rl_algorithm.frozen_decision_types()
+            frozen = {
+                decision_type: group_ids
+                for decision_type, group_ids in frozen_group_ids().items()
+                if decision_type in frozen_types
+            }
+            frozen_everywhere = (
+                set.intersection(*(frozen.get(dt, set()) for dt in frozen_types))
+                if frozen_types
+                else set()
+            )
+
             # Derive (action, outcome) pairs from the data_uploads timeline,
             # writing/refreshing study_data rows before the learner runs.
-            n_derived = derive_study_data(app)
+            n_derived = _run_stage(
+                checkpoints,
+                timer,
+                "derive_study_data",
+                lambda: derive_study_data(app, skip_group_ids=frozen_everywhere),
+            )
             app.logger.info("[Update] Derived %d study_data rows", n_derived)
 
-            # Get the latest model parameters from the database
-            current_params = ModelParameters.query.order_by(
-                ModelParameters.timestamp.desc()
-            ).first()
-
-            # Get the data required for the update
-            study_data = StudyData.query.order_by(
-                StudyData.decision_type.asc(),
-                StudyData.group_id.asc(),
-                StudyData.decision_idx.asc(),
-            ).all()
-
-            records = []
-            current_index = {}
-            for row in study_data:
-                agent_idx = int(row.raw_context.get("agent_decision_index", row.decision_idx + 1))
-                records.append(
-                    {
-                        "group_id": row.group_id,
-                        "decision_idx": row.decision_idx,
-                        "decision_type": row.decision_type,
-                        "agent_decision_index": agent_idx,
-                        "state": row.state,
-                        "action": row.action,
-                        "reward": row.reward,
-                        "raw_context": row.raw_context,
-                        "outcome": row.outcome,
-                    }
-                )
-                current_index[row.decision_type] = max(
-                    current_index.get(row.decision_type, 0), agent_idx
+            with timer.phase("load_study_data"):
+                stream, current_params, current_index = _load_update_records(frozen)
+            # Agents whose fit a failed attempt already committed are not refit.
+            agents_done = checkpoints.agents_done()
+            if agents_done:
+                stream = stream.restrict(set(DECISION_TYPES) - agents_done)
+
+            freeze_group_ids = set()
+            if frozen_types and app.config.get("FREEZE_COMPLETED_DYADS", False):
+                model_update_request = ModelUpdateRequests.query.filter_by(
+                    update_id=update_id
+                ).first()
+                freeze_group_ids = completed_group_ids(
+                    model_update_request.request_timestamp, exclude=frozen_everywhere
                 )
 
             update_data = {
-                "records": records,
+                "stream": stream,
                 "current_index": current_index,
+                "profiler": timer,
+                "freeze_group_ids": freeze_group_ids,
+                "agent_done": checkpoints.record_agent,
+                "update_id": update_id,
             }
 
-            snap_dir = save_pre_update_repro_snapshot(
-                app, update_id, current_params.id if current_params else None
+            snap_dir = _run_stage(
+                checkpoints,
+                timer,
+                "repro_snapshot",
+                lambda: save_pre_update_repro_snapshot(
+                    app, update_id, current_params.id if current_params else None
+                ),
             )
             if snap_dir:
                 app.logger.info("Pre-update reproducibility snapshot: %s", snap_dir)
 
-            status, new_parameters = rl_algorithm.update(
-                {"probability_of_action": current_params.probability_of_action},
-                update_data,
-            )
+            def run_learner():
+                status, new_parameters = rl_algorithm.update(
+                    {"probability_of_action": current_params.probability_of_action},
+                    update_data,
+                )
+                if not status:
+                    raise Exception("Model update failed.")
+                return new_parameters
 
-            if not status:
-                raise Exception("Model update failed.")
+            new_parameters = _run_stage(checkpoints, timer, "learner_update", run_learner)
 
-            # Add the new model parameters to the database
-            new_model_parameters = ModelParameters(
-                new_parameters["probability_of_action"]
-            )
+            with timer.phase("persist_parameters"):
+                # Add the new model parameters to the database
+                new_model_parameters = ModelParameters(
+                    new_parameters["probability_of_action"]
+                )
 
-            db.session.add(new_model_parameters)
-            db.session.commit()
+                db.session.add(new_model_parameters)
+                db.session.commit()
 
-            # Update the status of the request
-            model_update_request = ModelUpdateRequests.query.filter_by(
-                update_id=update_id
-            ).first()
-            model_update_request.status = "completed"
-            model_update_request.completed_at = datetime.datetime.now()
-            db.session.commit()
+                # Update the status of the request
+                model_update_request = ModelUpdateRequests.query.filter_by(
+                    update_id=update_id
+                ).first()
+                model_update_request.status = "completed"
+                model_update_request.completed_at = datetime.datetime.now()
+                db.session.commit()
+
+            app.last_update_timings = timer.as_dict()
+            _save_phase_profile(update_id, timer)
 
             # Log the completion
             logging.info(f"[Update] Update ID: {update_id} completed.")
+            logging.info(f"[Update] Update ID: {update_id} phases: {timer.summary()}")
+            return True
 
     except Exception as e:
         with app.app_context():
             # Log the error
             logging.error(f"[Update] Error: {e}")
             logging.exception(e)
+            db.session.rollback()
 
             # Update the status of the request
             model_update_request = ModelUpdateRequests.query.filter_by(
@@ -178,9 +271,17 @@ def process_update_request(app, update_id: str, rl_algorithm: RLAlgorithm):
                 model_update_request.completed_at = datetime.datetime.now()
                 model_update_request.error_message = str(e)
                 db.session.commit()
+            try:
+                _save_phase_profile(update_id, timer)
+            except Exception:
+                db.session.rollback()
+                logging.exception("[Update] Could not save phase profile")
 
             # Log the completion
             logging.info(f"[Update] Update ID: {update_id} failed.")
+            return False
+    finally:
+        timer.close()
 
 
 def check_fields(data: dict) -> tuple[bool, str]:
@@ -226,17 +327,8 @@ def update_model():
         db.session.commit()
 
         app = current_app._get_current_object()  # Get the actual app object
-        if app.config.get("TESTING"):
-            # Run inline under tests: a background thread sharing the in-memory
-            # SQLite connection races the request thread's transaction.
-            process_update_request(app, update_id, rl_algorithm)
-        else:
-            # Process the update request in a separate thread.
-            thread = Thread(
-                target=process_update_request,
-                args=(app, update_id, rl_algorithm),
-            )
-            thread.start()
+        # Inline, on a thread, or in a worker process (UPDATE_EXECUTOR).
+        dispatch_update(app, update_id, rl_algorithm)
 
         return jsonify({"status": "processing", "update_id": update_id}), 202
 
@@ -245,3 +337,57 @@ def update_model():
         logging.error(f"[Update] Error: {e}")
         logging.exception(e)
         return jsonify({"error": "Internal server error."}), 500
+
+
+@update_blueprint.route("/update/<update_id>/profile", methods=["GET"])
+def get_update_profile(update_id: str):
+    """
+    Per-phase wall time, CPU time and peak memory of one /update job, in
+    execution order. Agent-level rows (``learner_update.<decision_type>``)
+    are nested inside ``learner_update``, so phase times do not sum to the
+    job's total.
+    """
+    try:
+        model_update_request = ModelUpdateRequests.query.filter_by(
+            update_id=update_id
+        ).first()
+        if model_update_request is None:
+            return jsonify({"status": "failed", "message": "Update not found."}), 404
+
+        rows = (
+            UpdatePhaseProfile.query.filter_by(update_id=update_id)
+            .order_by(UpdatePhaseProfile.seq.asc())
+            .all()
+        )
+        return (
+            jsonify(
+                {
+                    "update_id": update_id,
+                    "status": model_update_request.status,
+                    "resumed_from": model_update_request.resumed_from,
+                    "created_at": model_update_request.created_at.isoformat(),
+                    "completed_at": (
+                        model_update_request.completed_at.isoformat()
+                        if model_update_request.completed_at
+                        else None
+                    ),
+                    "phases": [
+                        {
+                            "phase": row.phase,
+                            "decision_type": row.decision_type,
+                            "wall_s": row.wall_s,
+                            "cpu_s": row.cpu_s,
+                            "tracemalloc_peak_kib": row.tracemalloc_peak_kib,
+                            "rss_peak_kib": row.rss_peak_kib,
+                        }
+                        for row in rows
+                    ],
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        logging.error(f"[Update] Error: {e}")
+        logging.exception(e)
+        return jsonify({"error": "Internal server error."}), 500
@@ -0,0 +1,237 @@
+"""
+Speculative decisions (``SPECULATIVE_DECISIONS``).
+
+The host posts /upload_data shortly before the matching /action (API-Spec
+§3.2). When enabled, /upload_data schedules, off the request path, the part
+of /action that depends only on the new snapshot and the current policy,
+for each decision type the snapshot can feed: ``project_snapshot``,
+``make_state`` (with its baseline lookup) and the learner's
+``prepare_action`` (π). The results are cached per (dyad, decision_type),
+tagged with the upload's id, so a newer upload replaces older entries.
+
+/action still evaluates the warm-up gate. It then takes the cached entry
+for (group_id, decision_type), draws the action with
+``draw_prepared_action`` and writes the row. An entry is used only if it
+was prepared from the dyad's latest upload, for the requested
+decision_idx, against the current ModelParameters row and
+``app.policy_version`` (and, with ONLINE_POSTERIOR_UPDATES, no online fold
+into the agent's posteriors since); otherwise /action falls back to the
+full path.
+Every update, completed or failed, clears the cache and bumps
+``app.policy_version`` (``register_policy_listener``): a failed update may
+already have committed some agents' posteriors, and it writes no new
+ModelParameters row for the entry's tag to catch.
+The draw is the same call the full path makes, so the recorded decision is
+identical either way.
+
+``SPECULATION_EXECUTOR`` is "thread" (one background thread) or "inline"
+(in the /upload_data request; tests use it because the in-memory SQLite
+database is not visible from another thread).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.metrics import record_cache
+from app.models import Action, DataUpload, ModelParameters
+from app.online_posterior import online_agent_version
+from app.protocol import DECISION_TYPES, project_snapshot
+from app.update_worker import register_policy_listener
+
+SPECULATION_EXECUTORS = ("inline", "thread")
+# At most three entries per dyad, so this bound is only a safety rail.
+SPECULATIVE_CACHE_MAX_ENTRIES = 4_096
+
+
+@dataclass(frozen=True)
+class SpeculativeDecision:
+    upload_id: int
+    decision_idx: int
+    model_parameters_id: int
+    policy_version: int
+    online_version: int
+    raw_context: dict
+    state: list
+    prob_action_1: float
+    random_state: dict
+
+
+class SpeculativeDecisionCache:
+    """LRU-bounded map of (group_id, decision_type) to a SpeculativeDecision."""
+
+    def __init__(self, max_entries: int = SPECULATIVE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], SpeculativeDecision] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, group_id: str, decision_type: str, decision: SpeculativeDecision) -> None:
+        with self._lock:
+            self._entries[(group_id, decision_type)] = decision
+            self._entries.move_to_end((group_id, decision_type))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def take(self, group_id: str, decision_type: str) -> SpeculativeDecision | None:
+        """Remove and return the entry; each prepared decision serves one /action."""
+        with self._lock:
+            return self._entries.pop((group_id, decision_type), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def init_speculation(app) -> None:
+    """Attach the cache and executor to ``app`` when SPECULATIVE_DECISIONS is on."""
+    app.speculative_decisions = None
+    if not app.config.get("SPECULATIVE_DECISIONS", False):
+        return
+    executor = app.config.get("SPECULATION_EXECUTOR", "thread")
+    if executor not in SPECULATION_EXECUTORS:
+        raise ValueError(
+            f"SPECULATION_EXECUTOR must be one of {SPECULATION_EXECUTORS}, not {executor!r}"
+        )
+    cache = SpeculativeDecisionCache()
+    app.speculative_decisions = cache
+    app.speculation_executor = (
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculation")
+        if executor == "thread"
+        else None
+    )
+    register_policy_listener(app, lambda update_id: cache.clear())
+
+
+def schedule_speculation(app, upload_id: int) -> None:
+    """Prepare the decisions ``upload_id`` can feed, off the request path."""
+    if getattr(app, "speculative_decisions", None) is None:
+        return
+    if app.speculation_executor is None:
+        _speculate_safely(app, upload_id)
+    else:
+        app.speculation_executor.submit(_speculate_safely, app, upload_id)
+
+
+def speculative_decision_types(snapshot: dict) -> tuple[str, ...]:
+    """Decision types a snapshot can precede: only aya_message has a pm slot."""
+    if snapshot.get("slot") == "pm":
+        return ("aya_message",)
+    return DECISION_TYPES
+
+
+def latest_model_parameters():
+    """The latest policy row; EB snapshot rows share the table and are skipped."""
+    return (
+        ModelParameters.query.filter(ModelParameters.snapshot_type.is_(None))
+        .order_by(ModelParameters.timestamp.desc())
+        .first()
+    )
+
+
+def next_decision_idx(group_id: str, decision_type: str) -> int:
+    last = (
+        db.session.query(func.max(Action.decision_idx))
+        .filter(Action.group_id == group_id, Action.decision_type == decision_type)
+        .scalar()
+    )
+    return 0 if last is None else int(last) + 1
+
+
+def _speculate_safely(app, upload_id: int) -> None:
+    try:
+        with app.app_context():
+            speculate_decisions(app, upload_id)
+    except Exception as e:
+        logging.error(f"[Speculation] Error: {e}")
+        logging.exception(e)
+
+
+def speculate_decisions(app, upload_id: int) -> int:
+    """Prepare and cache the decisions for one upload; returns how many were cached."""
+    from app.routes.action import _evaluate_warmup
+
+    cache = app.speculative_decisions
+    # Read before any snapshot so an update finishing mid-way invalidates the entries.
+    policy_version = getattr(app, "policy_version", 0)
+    upload = db.session.get(DataUpload, upload_id)
+    model_parameters = latest_model_parameters()
+    if upload is None or model_parameters is None:
+        return 0
+
+    rl_algorithm = app.rl_algorithm
+    group_id = upload.group_id
+    cached = 0
+    for decision_type in speculative_decision_types(upload.data):
+        is_warmup, _ = _evaluate_warmup(group_id, decision_type)
+        if is_warmup:
+            continue
+        decision_idx = next_decision_idx(group_id, decision_type)
+        online_version = online_agent_version(app, decision_type)
+        raw_context = project_snapshot(decision_type, upload.data, decision_idx)
+        status, state = rl_algorithm.make_state(
+            {**raw_context, "decision_type": decision_type, "group_id": group_id}
+        )
+        if not status:
+            continue
+        prepared = rl_algorithm.prepare_action(
+            group_id,
+            state,
+            {"probability": model_parameters.probability_of_action},
+            decision_type,
+            decision_idx,
+        )
+        if prepared is None:
+            continue
+        prob_action_1, random_state = prepared
+        cache.put(
+            group_id,
+            decision_type,
+            SpeculativeDecision(
+                upload_id=upload_id,
+                decision_idx=decision_idx,
+                model_parameters_id=model_parameters.id,
+                policy_version=policy_version,
+                online_version=online_version,
+                raw_context=raw_context,
+                state=state,
+                prob_action_1=prob_action_1,
+                random_state=random_state,
+            ),
+        )
+        cached += 1
+    return cached
+
+
+def take_speculative_decision(
+    app,
+    group_id: str,
+    decision_type: str,
+    upload_id: int,
+    decision_idx: int,
+    model_parameters_id: int,
+) -> SpeculativeDecision | None:
+    """The cached decision for this /action if it is still valid, else None."""
+    cache = getattr(app, "speculative_decisions", None)
+    if cache is None:
+        return None
+    decision = cache.take(group_id, decision_type)
+    hit = (
+        decision is not None
+        and decision.upload_id == upload_id
+        and decision.decision_idx == decision_idx
+        and decision.model_parameters_id == model_parameters_id
+        and decision.policy_version == getattr(app, "policy_version", 0)
+        and decision.online_version == online_agent_version(app, decision_type)
+    )
+    record_cache("speculative_decision", hit)
+    return decision if hit else None
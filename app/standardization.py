@@ -8,30 +8,119 @@ calls look up these baselines and apply them inside the feature builder.
 
 If a dyad has no recorded baselines yet (week 1 in progress, or warmup
 override), the feature builder falls through to raw scaled values.
+
+Lookups go through a per-app ``BaselineCache`` shared by every request and
+update thread: baselines are written once per (dyad, agent) and never
+modified, so only a cached "none yet" can go stale. Inserts here
+invalidate their keys; inserts made by the /update worker process are
+picked up when the API process clears the cache after the update exits,
+completed or failed (the learners persist an agent's pending baselines
+before fitting it, so a failed update may have written some).
+``compute_week1_baselines_bulk`` persists a whole agent's pending
+baselines in one transaction.
 """
 
 from __future__ import annotations
 
 import datetime
-from typing import Iterable
+import threading
+from typing import Iterable, Mapping
 
 import numpy as np
+from flask import current_app
 
 from app.extensions import db
 from app.feature_builder import (
     CONTINUOUS_VARIABLES,
     MIN_BASELINE_SIGMA,
-    ProtocolRLFeatureBuilder,
+    feature_builder,
 )
+from app.metrics import record_cache
 from app.models import StandardizationBaseline
+from app.update_worker import register_policy_listener
+
+
+class BaselineCache:
+    """
+    (group_id, decision_type) -> baselines, including "none yet" ({}).
+
+    ``version`` increases on every invalidation; a lookup that raced an
+    insert (read at an older version) is not stored.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, str], dict[str, dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def get(self, key: tuple[str, str]) -> dict[str, dict[str, float]] | None:
+        return self._entries.get(key)
+
+    def put(self, key: tuple[str, str], baselines: dict, version: int) -> None:
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = baselines
+
+    def invalidate(self, keys: Iterable[tuple[str, str]]) -> None:
+        with self._lock:
+            self.version += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+
+def init_baseline_cache(app) -> None:
+    """Give ``app`` its cache, cleared after every /update, completed or failed."""
+    cache = baseline_cache(app)
+    register_policy_listener(app, lambda update_id: cache.clear())
+
+
+def baseline_cache(app=None) -> BaselineCache:
+    """The app's baseline cache (``current_app`` by default)."""
+    app = app if app is not None else current_app
+    cache = app.extensions.get("baseline_cache")
+    if cache is None:
+        cache = app.extensions.setdefault("baseline_cache", BaselineCache())
+    return cache
 
 
 def fetch_baselines(group_id: str, decision_type: str) -> dict[str, dict[str, float]]:
     """Return {variable_name: {'mu': μ, 'sigma': σ}} for one (dyad, agent)."""
-    rows = StandardizationBaseline.query.filter_by(
-        group_id=group_id, decision_type=decision_type
-    ).all()
-    return {row.variable_name: {"mu": row.mu, "sigma": row.sigma} for row in rows}
+    cache = baseline_cache()
+    key = (group_id, decision_type)
+    baselines = cache.get(key)
+    record_cache("baselines", baselines is not None)
+    if baselines is None:
+        version = cache.version
+        rows = StandardizationBaseline.query.filter_by(
+            group_id=group_id, decision_type=decision_type
+        ).all()
+        baselines = {row.variable_name: {"mu": row.mu, "sigma": row.sigma} for row in rows}
+        cache.put(key, baselines, version)
+    return {name: dict(values) for name, values in baselines.items()}
+
+
+def fetch_agent_baselines(decision_type: str) -> dict[str, dict[str, dict[str, float]]]:
+    """``fetch_baselines`` for every dyad of one agent, in one query."""
+    rows = StandardizationBaseline.query.filter_by(decision_type=decision_type).all()
+    baselines: dict[str, dict[str, dict[str, float]]] = {}
+    for row in rows:
+        baselines.setdefault(row.group_id, {})[row.variable_name] = {"mu": row.mu, "sigma": row.sigma}
+    return baselines
+
+
+def baseline_group_ids(decision_type: str) -> set[str]:
+    """Dyads that already have week-1 baselines for ``decision_type``."""
+    rows = (
+        db.session.query(StandardizationBaseline.group_id)
+        .filter_by(decision_type=decision_type)
+        .distinct()
+    )
+    return {group_id for (group_id,) in rows}
 
 
 def compute_week1_baselines_for_dyad(
@@ -55,8 +144,84 @@ def compute_week1_baselines_for_dyad(
     if existing is not None:
         return fetch_baselines(group_id, decision_type)
 
-    fb = ProtocolRLFeatureBuilder(decision_type)
-    continuous_specs = [s for s in fb._specs if s.name in CONTINUOUS_VARIABLES]
+    stats = week1_baseline_stats(decision_type, week1_records)
+    if not stats:
+        return {}
+
+    baselines = _add_baseline_rows(group_id, decision_type, stats, datetime.datetime.now())
+    db.session.commit()
+    baseline_cache().invalidate([(group_id, decision_type)])
+    return baselines
+
+
+def compute_week1_baselines_bulk(
+    decision_type: str,
+    week1_by_dyad: Mapping[str, Iterable[dict]],
+) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    Bulk form of `compute_week1_baselines_for_dyad` for one agent: persist
+    baselines for every dyad in ``week1_by_dyad`` that has none yet, with
+    one existence query, one feature-spec lookup and one commit. Returns
+    {group_id: baselines} for the dyads written.
+    """
+    existing = baseline_group_ids(decision_type)
+    specs = _continuous_specs(decision_type)
+    now = datetime.datetime.now()
+    written: dict[str, dict[str, dict[str, float]]] = {}
+    for group_id, records in week1_by_dyad.items():
+        if group_id in existing:
+            continue
+        stats = week1_baseline_stats(decision_type, records, specs=specs)
+        if stats:
+            written[group_id] = _add_baseline_rows(group_id, decision_type, stats, now)
+    if written:
+        db.session.commit()
+        baseline_cache().invalidate((group_id, decision_type) for group_id in written)
+    return written
+
+
+def _add_baseline_rows(
+    group_id: str,
+    decision_type: str,
+    stats: dict[str, dict[str, float]],
+    created_at: datetime.datetime,
+) -> dict[str, dict[str, float]]:
+    baselines: dict[str, dict[str, float]] = {}
+    for name, values in stats.items():
+        baselines[name] = {"mu": values["mu"], "sigma": values["sigma"]}
+        db.session.add(
+            StandardizationBaseline(
+                group_id=group_id,
+                decision_type=decision_type,
+                variable_name=name,
+                mu=values["mu"],
+                sigma=values["sigma"],
+                sample_size=values["sample_size"],
+                created_at=created_at,
+            )
+        )
+    return baselines
+
+
+def _continuous_specs(decision_type: str) -> list:
+    fb = feature_builder(decision_type)
+    return [s for s in fb._specs if s.name in CONTINUOUS_VARIABLES]
+
+
+def week1_baseline_stats(
+    decision_type: str,
+    week1_records: Iterable[dict],
+    specs: list | None = None,
+) -> dict[str, dict[str, float]]:
+    """
+    Pure (μ, σ, n) computation behind `compute_week1_baselines_for_dyad`,
+    shared with storage backends that do not go through the ORM.
+
+    Returns {variable_name: {'mu', 'sigma', 'sample_size'}} in feature-spec
+    order; variables never observed in week 1 are omitted. Bulk callers
+    pass the agent's continuous ``specs`` once.
+    """
+    continuous_specs = specs if specs is not None else _continuous_specs(decision_type)
     if not continuous_specs:
         return {}
 
@@ -72,8 +237,7 @@ def compute_week1_baselines_for_dyad(
                 continue
             values_by_var[spec.name].append(float(spec.value(ctx)))
 
-    baselines: dict[str, dict[str, float]] = {}
-    now = datetime.datetime.now()
+    stats: dict[str, dict[str, float]] = {}
     for spec in continuous_specs:
         values = values_by_var[spec.name]
         if not values:
@@ -83,20 +247,8 @@ def compute_week1_baselines_for_dyad(
         mu = float(arr.mean())
         sigma = float(arr.std(ddof=0)) if len(arr) > 1 else 0.0
         sigma = max(sigma, MIN_BASELINE_SIGMA)
-        baselines[spec.name] = {"mu": mu, "sigma": sigma}
-        db.session.add(
-            StandardizationBaseline(
-                group_id=group_id,
-                decision_type=decision_type,
-                variable_name=spec.name,
-                mu=mu,
-                sigma=sigma,
-                sample_size=len(values),
-                created_at=now,
-            )
-        )
-    db.session.commit()
-    return baselines
+        stats[spec.name] = {"mu": mu, "sigma": sigma, "sample_size": len(values)}
+    return stats
 
 
 def filter_week1_records(records: Iterable[dict]) -> list[dict]:
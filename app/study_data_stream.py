@@ -0,0 +1,249 @@
+"""
+Streaming study_data reader for the /update job.
+
+``process_update_request`` hands the learners a ``StudyDataStream`` as
+``data["stream"]`` instead of a materialized ``data["records"]`` list.
+Iterating the stream yields one dyad's trajectory at a time, in the
+(decision_type, group_id, decision_idx) order the learners expect, so peak
+memory is bounded by the largest single dyad rather than the whole study.
+
+Rows are read in keyset pages of ``chunk_rows``: every page is a short,
+complete query, so no cursor stays open while a learner commits snapshots
+between dyads (a server-side cursor would be closed by the commit on
+PostgreSQL, and an open SQLite reader would block the writer).
+
+Headless callers (tests/headless_simulation.py, tools/reproduce_run.py,
+the benchmarks) keep passing ``data["records"]``; learners read either
+shape through ``iter_agent_dyads``.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import and_, func, not_, tuple_
+
+from app.extensions import db
+from app.models import StudyData
+from app.standardization import filter_week1_records
+
+STREAM_CHUNK_ROWS = 1_000
+
+_RECORD_COLUMNS = (
+    StudyData.group_id,
+    StudyData.decision_idx,
+    StudyData.decision_type,
+    StudyData.state,
+    StudyData.action,
+    StudyData.reward,
+    StudyData.raw_context,
+    StudyData.outcome,
+)
+_ORDER = (StudyData.decision_type, StudyData.group_id, StudyData.decision_idx)
+
+
+def agent_decision_index(row) -> int:
+    return int(row.raw_context.get("agent_decision_index", row.decision_idx + 1))
+
+
+def study_data_record(row) -> dict:
+    """The learner record for one study_data row (ORM object or column row)."""
+    return {
+        "group_id": row.group_id,
+        "decision_idx": row.decision_idx,
+        "decision_type": row.decision_type,
+        "agent_decision_index": agent_decision_index(row),
+        "state": row.state,
+        "action": row.action,
+        "reward": row.reward,
+        "raw_context": row.raw_context,
+        "outcome": row.outcome,
+    }
+
+
+class StudyDataStream:
+    """
+    Re-iterable per-dyad view of study_data.
+
+    ``exclude`` maps decision_type to dyads left out for that agent (the
+    frozen-dyad archive); ``decision_types`` limits the stream to those
+    agents. Must be iterated inside an app context.
+    """
+
+    def __init__(
+        self,
+        exclude: dict[str, set[str]] | None = None,
+        decision_types=None,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+    ):
+        self.exclude = {dt: set(gids) for dt, gids in (exclude or {}).items() if gids}
+        self.decision_types = None if decision_types is None else frozenset(decision_types)
+        self.chunk_rows = chunk_rows
+
+    def restrict(self, decision_types) -> "StudyDataStream":
+        """The same stream limited to ``decision_types``."""
+        keep = frozenset(decision_types)
+        if self.decision_types is not None:
+            keep &= self.decision_types
+        return StudyDataStream(self.exclude, keep, self.chunk_rows)
+
+    def _query(self, *columns):
+        query = db.session.query(*columns)
+        if self.decision_types is not None:
+            query = query.filter(StudyData.decision_type.in_(sorted(self.decision_types)))
+        for decision_type, group_ids in self.exclude.items():
+            query = query.filter(
+                not_(
+                    and_(
+                        StudyData.decision_type == decision_type,
+                        StudyData.group_id.in_(sorted(group_ids)),
+                    )
+                )
+            )
+        return query
+
+    def _rows(self):
+        after = None
+        while True:
+            query = self._query(*_RECORD_COLUMNS)
+            if after is not None:
+                query = query.filter(tuple_(*_ORDER) > tuple_(*after))
+            page = query.order_by(*_ORDER).limit(self.chunk_rows).all()
+            yield from page
+            if len(page) < self.chunk_rows:
+                return
+            last = page[-1]
+            after = (last.decision_type, last.group_id, last.decision_idx)
+
+    def __iter__(self):
+        """Yield ``(decision_type, group_id, records)`` per dyad."""
+        records = (study_data_record(row) for row in self._rows())
+        for (decision_type, group_id), dyad in groupby(
+            records, key=itemgetter("decision_type", "group_id")
+        ):
+            yield decision_type, group_id, list(dyad)
+
+    def dyad_counts(self, decision_type: str) -> dict[str, int]:
+        """Rows per dyad of one agent, counted without reading them."""
+        query = (
+            self._query(StudyData.group_id, func.count(StudyData.id))
+            .filter(StudyData.decision_type == decision_type)
+            .group_by(StudyData.group_id)
+        )
+        return {group_id: count for group_id, count in query}
+
+    def _dyad_rows(self, decision_type: str, group_id: str, after: int | None):
+        while True:
+            query = self._query(*_RECORD_COLUMNS).filter(
+                StudyData.decision_type == decision_type, StudyData.group_id == group_id
+            )
+            if after is not None:
+                query = query.filter(StudyData.decision_idx > after)
+            page = query.order_by(StudyData.decision_idx).limit(self.chunk_rows).all()
+            yield from page
+            if len(page) < self.chunk_rows:
+                return
+            after = page[-1].decision_idx
+
+    def dyads_after(self, decision_type: str, group_ids, marks: dict[str, int]):
+        """
+        Yield ``(group_id, records)`` for ``group_ids`` of one agent, each
+        dyad read from just past its ``marks`` decision_idx (from its first
+        row when it has none).
+        """
+        for group_id in sorted(group_ids):
+            rows = self._dyad_rows(decision_type, group_id, marks.get(group_id))
+            yield group_id, [study_data_record(row) for row in rows]
+
+    def current_index(self) -> dict[str, int]:
+        """Highest agent_decision_index per decision_type in the stream."""
+        current: dict[str, int] = {}
+        query = self._query(
+            StudyData.decision_type, StudyData.decision_idx, StudyData.raw_context
+        ).yield_per(self.chunk_rows)
+        for row in query:
+            current[row.decision_type] = max(
+                current.get(row.decision_type, 0), agent_decision_index(row)
+            )
+        return current
+
+
+def iter_agent_dyads(data: dict):
+    """
+    Yield ``(decision_type, dyads)`` per agent, where ``dyads`` yields
+    ``(group_id, records)``; read from ``data["stream"]`` when present,
+    else grouped from ``data["records"]``. Each agent's ``dyads`` must be
+    consumed before the next agent is drawn.
+    """
+    stream = data.get("stream")
+    if stream is None:
+        grouped: dict[str, dict[str, list[dict]]] = defaultdict(lambda: defaultdict(list))
+        for record in data.get("records", []):
+            grouped[record["decision_type"]][record["group_id"]].append(record)
+        for decision_type, group_records in grouped.items():
+            yield decision_type, iter(group_records.items())
+        return
+    for decision_type, chunks in groupby(stream, key=itemgetter(0)):
+        yield decision_type, ((group_id, records) for _, group_id, records in chunks)
+
+
+def agent_dyads_after(data: dict, decision_type: str, marks: dict[str, int]):
+    """
+    ``(counts, dyads)`` for one agent: ``counts`` maps each dyad to its
+    number of rows, and ``dyads`` yields ``(group_id, records)`` holding
+    only the rows past the dyad's ``marks`` decision_idx (every row for a
+    dyad without one). From a stream the rows up to a mark are counted but
+    never read.
+    """
+    stream = data.get("stream")
+    if stream is None:
+        grouped: dict[str, list[dict]] = defaultdict(list)
+        for record in data.get("records", []):
+            if record["decision_type"] == decision_type:
+                grouped[record["group_id"]].append(record)
+        counts = {group_id: len(records) for group_id, records in grouped.items()}
+        dyads = (
+            (group_id, [r for r in records if r["decision_idx"] > marks.get(group_id, -1)])
+            for group_id, records in grouped.items()
+        )
+        return counts, dyads
+    counts = stream.dyad_counts(decision_type)
+    return counts, stream.dyads_after(decision_type, counts, marks)
+
+
+def restrict_update_data(data: dict, decision_types) -> dict:
+    """A copy of update ``data`` whose rows are limited to ``decision_types``."""
+    keep = frozenset(decision_types)
+    routed = dict(data)
+    if data.get("stream") is not None:
+        routed["stream"] = data["stream"].restrict(keep)
+    else:
+        routed["records"] = [r for r in data.get("records", []) if r["decision_type"] in keep]
+    return routed
+
+
+def agent_week1_records(data: dict, decision_type: str, skip_group_ids) -> dict[str, list[dict]]:
+    """
+    Week-1 records per dyad of one agent, leaving out ``skip_group_ids``
+    (dyads that already have baselines). From a stream only those dyads'
+    rows are read.
+    """
+    skip = set(skip_group_ids)
+    stream = data.get("stream")
+    if stream is not None:
+        exclude = dict(stream.exclude)
+        exclude[decision_type] = exclude.get(decision_type, set()) | skip
+        dyads = (
+            (group_id, records)
+            for _, group_id, records in StudyDataStream(exclude, {decision_type}, stream.chunk_rows)
+        )
+    else:
+        grouped: dict[str, list[dict]] = defaultdict(list)
+        for record in data.get("records", []):
+            if record["decision_type"] == decision_type and record["group_id"] not in skip:
+                grouped[record["group_id"]].append(record)
+        dyads = grouped.items()
+    week1 = {group_id: filter_week1_records(records) for group_id, records in dyads}
+    return {group_id: records for group_id, records in week1.items() if records}
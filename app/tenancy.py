@@ -0,0 +1,245 @@
+"""
+Multi-study tenancy: many cohorts served by one server process.
+
+``create_tenant_app`` returns a WSGI app that serves each study in
+``STUDIES`` under ``/studies/<study_id>/api/v1/...``. Every study is a
+separate ``create_app`` instance with its own config overrides; the
+studies share the process and the database:
+
+  - tables: one set for every study (``STUDY_DATABASE_URI``). Each row
+    carries the ``study_id`` of the app that wrote it, and every ORM
+    query, update and delete is limited to the current app's study
+    (``StudyScoped`` in app/models.py), so dyad ids, decision indices and
+    snapshots never cross studies. A ``{study_id}`` in the URI still gives
+    a study its own database;
+  - learner, sampler, baseline / speculation / online-posterior caches,
+    metrics and policy listeners: attributes of the study's app;
+  - sample buffer: ``STUDY_SAMPLE_BUFFER_PATH``, seeded per study from
+    ``SAMPLE_BUFFER_SEED`` and the study id unless the study sets its own;
+  - /update: the study's ``UPDATE_EXECUTOR``; a worker process is rebuilt
+    from the study's config, so it only ever sees the study's rows.
+
+The process-wide sinks tag their records with the study: the binary
+decision log records ``study_id`` on every decision, and app.log / rl.log
+lines logged in a study's context carry ``[study=<study_id>]``. Each
+study's /update workers write their own ``update_worker_<study_id>.log`` and
+``rl_update_worker_<study_id>.log``, so concurrent updates of different
+studies never rotate the same file.
+
+Apps are built on a study's first request and unloaded once it has been
+idle for ``STUDY_IDLE_EVICT_S`` with no request or update in flight. That
+releases the learner and the buffer and disposes the engine; the next
+request rebuilds the app, which resumes the sampler cursor from the
+study's latest action like a server restart does.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from flask import Config
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import ClosingIterator
+
+from app.extensions import db
+from app.models import ModelUpdateRequests
+
+STUDY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_PATH = re.compile(r"^/studies/([^/]+)(/.*)?$")
+
+
+def study_seed(base_seed: int, study_id: str) -> int:
+    """An independent sample-buffer seed per study, stable across restarts."""
+    sequence = np.random.SeedSequence([int(base_seed), zlib.crc32(study_id.encode("utf-8"))])
+    return int(sequence.generate_state(1)[0])
+
+
+def study_overrides(config, study_id: str) -> dict:
+    """The config overrides that build ``study_id``'s app from ``config``."""
+    overrides = {
+        "STUDY_ID": study_id,
+        "SQLALCHEMY_DATABASE_URI": config["STUDY_DATABASE_URI"].format(study_id=study_id),
+        "SAMPLE_BUFFER_SEED": study_seed(config.get("SAMPLE_BUFFER_SEED", 0), study_id),
+    }
+    buffer_path = config.get("STUDY_SAMPLE_BUFFER_PATH")
+    overrides["SAMPLE_BUFFER_PATH"] = (
+        buffer_path.format(study_id=study_id) if buffer_path else None
+    )
+    overrides.update(config["STUDIES"][study_id] or {})
+    return overrides
+
+
+class _ResidentStudy:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+
+class StudyRegistry:
+    """
+    The resident study apps, built on demand and unloaded when idle.
+
+    ``factory(config_class, overrides)`` builds one app (``create_app``).
+    """
+
+    def __init__(self, config_class, config, factory, base_overrides=None):
+        for study_id in config["STUDIES"]:
+            if not STUDY_ID_PATTERN.match(study_id):
+                raise ValueError(f"Invalid study id {study_id!r}")
+        self.config_class = config_class
+        self.config = config
+        self.factory = factory
+        self.base_overrides = dict(base_overrides or {})
+        self.idle_evict_s = config.get("STUDY_IDLE_EVICT_S")
+        self._lock = threading.Lock()
+        self._loading: dict[str, threading.Lock] = {}
+        self._resident: dict[str, _ResidentStudy] = {}
+
+    def __contains__(self, study_id: str) -> bool:
+        return study_id in self.config["STUDIES"]
+
+    def resident(self) -> list[str]:
+        with self._lock:
+            return sorted(self._resident)
+
+    def acquire(self, study_id: str):
+        """The study's app, built if needed, marked in use until ``release``."""
+        with self._lock:
+            entry = self._resident.get(study_id)
+            if entry is None:
+                loading = self._loading.setdefault(study_id, threading.Lock())
+            else:
+                entry.in_flight += 1
+                return entry.app
+        with loading:
+            with self._lock:
+                entry = self._resident.get(study_id)
+            if entry is None:
+                logging.info("[Tenancy] Loading study %s", study_id)
+                overrides = {
+                    **self.base_overrides,
+                    **study_overrides(self.config, study_id),
+                }
+                entry = _ResidentStudy(self.factory(self.config_class, overrides))
+            with self._lock:
+                self._resident[study_id] = entry
+                entry.in_flight += 1
+                return entry.app
+
+    def release(self, study_id: str) -> None:
+        with self._lock:
+            entry = self._resident[study_id]
+            entry.in_flight -= 1
+            entry.last_used = time.monotonic()
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """Unload every study idle past ``STUDY_IDLE_EVICT_S``; their ids."""
+        if self.idle_evict_s is None:
+            return []
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [
+                study_id
+                for study_id, entry in self._resident.items()
+                if entry.in_flight == 0 and now - entry.last_used >= self.idle_evict_s
+            ]
+        return [study_id for study_id in idle if self.evict(study_id)]
+
+    def evict(self, study_id: str) -> bool:
+        """Unload one study unless a request or an /update is running for it."""
+        with self._lock:
+            entry = self._resident.get(study_id)
+            if entry is None or entry.in_flight:
+                return False
+            last_used = entry.last_used
+        if _update_in_flight(entry.app):
+            return False
+        with self._lock:
+            # A request may have come (and gone) while the database was read.
+            if entry.in_flight or entry.last_used != last_used:
+                return False
+            del self._resident[study_id]
+        _shutdown(entry.app)
+        logging.info("[Tenancy] Unloaded idle study %s", study_id)
+        return True
+
+
+def _update_in_flight(app) -> bool:
+    with app.app_context():
+        try:
+            return (
+                ModelUpdateRequests.query.filter_by(status="processing").first() is not None
+            )
+        finally:
+            db.session.remove()
+
+
+def _shutdown(app) -> None:
+    executor = getattr(app, "speculation_executor", None)
+    if executor is not None:
+        executor.shutdown(wait=True)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+class StudyDispatcher:
+    """WSGI app routing ``/studies/<study_id>/...`` to the study's app."""
+
+    def __init__(self, registry: StudyRegistry):
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        match = _PATH.match(environ.get("PATH_INFO", ""))
+        if match is None or match.group(1) not in self.registry:
+            response = Response(
+                json.dumps({"status": "failed", "message": "Study not found."}),
+                status=404,
+                mimetype="application/json",
+            )
+            return response(environ, start_response)
+
+        study_id, rest = match.group(1), match.group(2) or ""
+        self.registry.evict_idle()
+        app = self.registry.acquire(study_id)
+        try:
+            environ = {
+                **environ,
+                "SCRIPT_NAME": f"{environ.get('SCRIPT_NAME', '')}/studies/{study_id}",
+                "PATH_INFO": rest,
+            }
+            body = app(environ, start_response)
+        except BaseException:
+            self.registry.release(study_id)
+            raise
+        return ClosingIterator(body, lambda: self.registry.release(study_id))
+
+
+def create_tenant_app(config_class="config.Config", overrides=None):
+    """
+    The multi-study WSGI app for ``config_class`` (``STUDIES`` and the
+    ``STUDY_*`` templates). ``overrides`` apply to every study, under the
+    study's own.
+    """
+    from app import create_app
+
+    config = Config(".")
+    config.from_object(config_class)
+    if overrides:
+        config.update(overrides)
+    registry = StudyRegistry(
+        config_class,
+        config,
+        lambda config_class, overrides: create_app(config_class, overrides=overrides),
+        base_overrides=overrides,
+    )
+    dispatcher = StudyDispatcher(registry)
+    logging.info("[Tenancy] Serving studies %s", sorted(config["STUDIES"]))
+    return dispatcher
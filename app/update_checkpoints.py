@@ -0,0 +1,128 @@
+"""
+Stage checkpoints for the /update job (``UPDATE_RESUME``).
+
+``process_update_request`` runs as a pipeline of stages::
+
+    backup -> derive_study_data -> repro_snapshot
+           -> learner_update (learner_update.<decision_type> per agent)
+           -> persist_parameters
+
+Each completed stage writes an ``update_checkpoints`` row with its output
+(the backup path, the derived row count, the snapshot directory, the
+learner's new parameters); the per-agent rows are written by
+``iter_agent_phases`` as each agent's fit finishes. The learners commit
+their snapshots as they go, so an agent's checkpoint means its outputs are
+already in model_parameters.
+
+Every update records the fingerprint of its inputs: the algorithm, the
+request date (dyad freezing is decided by date) and the row count and
+highest id of groups, data_uploads and actions, which /update reads but
+never writes. If the previous update request failed against the same
+fingerprint, the new one copies that request's checkpoints, records
+``resumed_from`` and skips the stages and agents they cover. Any new
+upload, action or dyad changes the fingerprint and the update starts over.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import logging
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import Action, DataUpload, Group, ModelUpdateRequests, UpdateCheckpoint
+
+AGENT_STAGE_PREFIX = "learner_update."
+
+
+def input_fingerprint(algorithm: str, request_timestamp: datetime.datetime) -> str:
+    """SHA-256 of everything an update's stages read but do not write."""
+    tables = (Group, DataUpload, Action)
+    columns = []
+    for model in tables:
+        columns += [
+            select(func.count(model.id)).scalar_subquery(),
+            select(func.coalesce(func.max(model.id), 0)).scalar_subquery(),
+        ]
+    row = db.session.execute(select(*columns)).one()
+    inputs = {
+        "algorithm": algorithm,
+        "as_of": request_timestamp.date().isoformat(),
+        **{
+            model.__tablename__: [int(row[2 * i]), int(row[2 * i + 1])]
+            for i, model in enumerate(tables)
+        },
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class UpdateCheckpoints:
+    """The completed stages of one update, with their outputs."""
+
+    def __init__(self, update_id: str, fingerprint: str, completed=None, resumed_from=None):
+        self.update_id = update_id
+        self.fingerprint = fingerprint
+        self.completed: dict[str, dict | None] = dict(completed or {})
+        self.resumed_from = resumed_from
+
+    @classmethod
+    def start(cls, app, update_id: str) -> "UpdateCheckpoints":
+        """
+        Fingerprint the update's inputs and, when the previous request
+        failed on the same inputs, take over its checkpoints.
+        """
+        request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+        fingerprint = input_fingerprint(
+            app.config.get("RL_ALGORITHM", "flat_prob"), request_row.request_timestamp
+        )
+        request_row.fingerprint = fingerprint
+        checkpoints = cls(update_id, fingerprint)
+
+        previous = (
+            ModelUpdateRequests.query.filter(ModelUpdateRequests.id < request_row.id)
+            .order_by(ModelUpdateRequests.id.desc())
+            .first()
+        )
+        if (
+            app.config.get("UPDATE_RESUME", True)
+            and previous is not None
+            and previous.status == "failed"
+            and previous.fingerprint == fingerprint
+        ):
+            for row in UpdateCheckpoint.query.filter_by(update_id=previous.update_id):
+                db.session.add(UpdateCheckpoint(update_id, fingerprint, row.stage, row.output))
+                checkpoints.completed[row.stage] = row.output
+            request_row.resumed_from = checkpoints.resumed_from = previous.update_id
+            logging.info(
+                "[Update] Update ID: %s resumes %s past %s",
+                update_id,
+                previous.update_id,
+                sorted(checkpoints.completed),
+            )
+        db.session.commit()
+        return checkpoints
+
+    def done(self, stage: str) -> bool:
+        return stage in self.completed
+
+    def output(self, stage: str):
+        return self.completed[stage]
+
+    def record(self, stage: str, output=None) -> None:
+        """Persist ``stage`` as completed with ``output`` (JSON)."""
+        db.session.add(UpdateCheckpoint(self.update_id, self.fingerprint, stage, output))
+        db.session.commit()
+        self.completed[stage] = output
+
+    def record_agent(self, decision_type: str) -> None:
+        self.record(AGENT_STAGE_PREFIX + decision_type)
+
+    def agents_done(self) -> set[str]:
+        return {
+            stage[len(AGENT_STAGE_PREFIX) :]
+            for stage in self.completed
+            if stage.startswith(AGENT_STAGE_PREFIX)
+        }
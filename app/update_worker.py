@@ -0,0 +1,221 @@
+"""
+Executors for the /update job (``UPDATE_EXECUTOR``).
+
+  - "inline"   run ``process_update_request`` in the request (tests).
+  - "thread"   run it on a thread of the API process.
+  - "process"  run it in a worker process (``python -m app.update_worker``)
+               sharing the database, so the fit's GIL-bound stretches (MAP
+               optimization, per-dyad loops, snapshot JSON encoding) never
+               stall /action.
+
+The worker rebuilds the app from the API process's config, read as JSON on
+stdin, without the decision log (only the API process writes it), and logs
+to its own ``update_worker.log`` / ``rl_update_worker.log`` (suffixed with
+the study id under multi-study tenancy, see ``worker_log_filenames``). It
+hands its
+results back through the database like the in-process executors do: new
+snapshots, the ModelParameters row, model_update_requests.status and the
+phase profile. A watcher thread in the API process waits for the worker
+to exit, then reads the request row; if it is still "processing", the
+worker died, and the watcher marks the update failed. Either way it then
+sends ``notify_policy_updated``, the cache-invalidation signal every
+executor sends after every update: a failed update may already have
+committed some agents' snapshots and week-1 baselines.
+
+Sampler handoff: at dispatch the API process ``reserve``-s
+``UPDATE_WORKER_SAMPLER_RESERVE`` primitives of the shared buffer and
+records the window on the request row (``sampler_window``); the worker's
+sampler is ``confine``-d to it. The fits draw nothing today, so the
+default window is empty and any draw in the worker fails loudly instead of
+silently reusing primitives /action is consuming. tools/reproduce_run.py
+replays the same window.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import subprocess
+import sys
+from threading import Thread
+
+from app.extensions import db
+from app.logging_config import get_rl_logger, setup_logging
+from app.models import ModelUpdateRequests, UpdatePhaseProfile
+
+UPDATE_EXECUTORS = ("inline", "thread", "process")
+
+
+def register_policy_listener(app, callback) -> None:
+    """
+    Call ``callback(update_id)`` in the API process after every update,
+    completed or failed (a failed one may have committed part of its
+    output).
+    """
+    if not hasattr(app, "policy_listeners"):
+        app.policy_listeners = []
+    app.policy_listeners.append(callback)
+
+
+def notify_policy_updated(app, update_id: str) -> None:
+    """Bump ``app.policy_version`` and run the policy listeners."""
+    app.policy_version = getattr(app, "policy_version", 0) + 1
+    for callback in getattr(app, "policy_listeners", []):
+        try:
+            callback(update_id)
+        except Exception:
+            logging.exception("[Update] Policy listener failed for %s", update_id)
+
+
+def dispatch_update(app, update_id: str, rl_algorithm) -> None:
+    """Start the update job on the configured executor."""
+    executor = app.config.get("UPDATE_EXECUTOR", "thread")
+    if executor not in UPDATE_EXECUTORS:
+        raise ValueError(f"UPDATE_EXECUTOR must be one of {UPDATE_EXECUTORS}, not {executor!r}")
+    if executor == "process":
+        _start_worker_process(app, update_id)
+    elif executor == "thread":
+        Thread(target=_run_in_process, args=(app, update_id, rl_algorithm)).start()
+    else:
+        _run_in_process(app, update_id, rl_algorithm)
+
+
+def _run_in_process(app, update_id: str, rl_algorithm) -> None:
+    from app.routes.update import process_update_request
+
+    try:
+        process_update_request(app, update_id, rl_algorithm)
+    finally:
+        notify_policy_updated(app, update_id)
+
+
+# ------------------------------------------------------------ worker process
+
+def _portable_config(app) -> dict:
+    """The JSON-serializable part of ``app.config`` (Flask re-derives the rest)."""
+    config = {}
+    for key, value in app.config.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        config[key] = value
+    return config
+
+
+def _start_worker_process(app, update_id: str) -> None:
+    window = None
+    sampler = getattr(app, "sampler", None)
+    if sampler is not None:
+        reserve = app.config.get("UPDATE_WORKER_SAMPLER_RESERVE") or {}
+        window = sampler.reserve(
+            normals=int(reserve.get("normal", 0)), uniforms=int(reserve.get("uniform", 0))
+        )
+        request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+        request_row.sampler_window = window
+        db.session.commit()
+
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "app.update_worker", update_id],
+        stdin=subprocess.PIPE,
+        cwd=os.path.dirname(app.root_path),
+    )
+    worker.stdin.write(json.dumps({"config": _portable_config(app)}).encode("utf-8"))
+    worker.stdin.close()
+    logging.info(
+        "[Update] Update ID: %s dispatched to worker pid=%s sampler_window=%s",
+        update_id,
+        worker.pid,
+        window,
+    )
+    Thread(target=_watch_worker, args=(app, update_id, worker), daemon=True).start()
+
+
+def _watch_worker(app, update_id: str, worker) -> None:
+    returncode = worker.wait()
+    try:
+        with app.app_context():
+            request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+            if request_row is None:
+                return
+            if request_row.status == "processing":
+                message = f"update worker exited with code {returncode}"
+                logging.error(f"[Update] Error: {message} (update {update_id})")
+                request_row.status = "failed"
+                request_row.error_message = message
+                request_row.completed_at = datetime.datetime.now()
+                db.session.commit()
+            else:
+                app.last_update_timings = _timings_from_profile(update_id)
+    finally:
+        # Whatever the outcome, the worker may have committed snapshots or
+        # baselines the API process has cached.
+        notify_policy_updated(app, update_id)
+
+
+def worker_log_filenames(study_id: str | None) -> tuple[str, str]:
+    """The worker's (app log, RL log) file names; one pair per study."""
+    suffix = f"_{study_id}" if study_id else ""
+    return f"update_worker{suffix}.log", f"rl_update_worker{suffix}.log"
+
+
+def _timings_from_profile(update_id: str) -> dict:
+    """``PhaseTimer.as_dict`` rebuilt from the worker's update_phase_profiles rows."""
+    rows = (
+        UpdatePhaseProfile.query.filter_by(update_id=update_id)
+        .order_by(UpdatePhaseProfile.seq.asc())
+        .all()
+    )
+    details = {
+        row.phase: {
+            "decision_type": row.decision_type,
+            "wall_s": row.wall_s,
+            "cpu_s": row.cpu_s,
+            "tracemalloc_peak_kib": row.tracemalloc_peak_kib,
+            "rss_peak_kib": row.rss_peak_kib,
+        }
+        for row in rows
+    }
+    phases = {name: detail["wall_s"] for name, detail in details.items()}
+    total = sum(wall for name, wall in phases.items() if not name.startswith("learner_update."))
+    return {"total_s": total, "phases": phases, "details": details}
+
+
+def main(argv=None) -> int:
+    """``python -m app.update_worker <update_id>``, config JSON on stdin."""
+    argv = sys.argv[1:] if argv is None else argv
+    update_id = argv[0]
+    payload = json.loads(sys.stdin.read() or "{}")
+
+    app_log, rl_log = worker_log_filenames(payload.get("config", {}).get("STUDY_ID"))
+    setup_logging(filename=app_log)
+    get_rl_logger(filename=rl_log)
+
+    from app import create_app
+    from app.routes.update import process_update_request
+
+    app = create_app(
+        overrides=dict(
+            payload.get("config", {}),
+            DECISION_LOG_PATH=None,
+            UPDATE_EXECUTOR="inline",
+            SPECULATIVE_DECISIONS=False,
+        )
+    )
+    sampler = getattr(app, "sampler", None)
+    if sampler is not None:
+        with app.app_context():
+            request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+            window = request_row.sampler_window if request_row is not None else None
+        if window is not None:
+            sampler.confine(window)
+    completed = process_update_request(app, update_id, app.rl_algorithm)
+    if sampler is not None:
+        logging.info("[Update] Update ID: %s worker sampler cursor=%s", update_id, sampler.cursor())
+    return 0 if completed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
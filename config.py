@@ -34,6 +34,11 @@ class Config:
     }
     RL_ALGORITHM_SEED = 42  # Seed for RL Algorithm random state
 
+    # JSON codec for request/response bodies and JSON-column reads: "orjson"
+    # (falls back to "stdlib" when orjson is not installed) or "stdlib".
+    # Stored column text is the same under both; see app/json_codec.py.
+    JSON_CODEC = os.getenv("JSON_CODEC", "orjson")
+
     # ---- Server-side warm-up (API-Spec §3.2) ----
     # A decision is purely randomized (Bernoulli(0.5), drawn from the sample
     # buffer) iff the cohort still has fewer than WARMUP_COHORT_MIN_DYADS
@@ -64,6 +69,66 @@ class Config:
     SAVE_UPDATE_REPRO_SNAPSHOTS = True
     REPRO_SNAPSHOT_ROOT = "repro_snapshots"
 
+    # Trace Python/numpy allocations during /update so update_phase_profiles
+    # records a per-phase tracemalloc peak. Slows the fit (and, with the
+    # thread executor, request threads), so it is off unless asked for;
+    # wall/CPU time and RSS are recorded either way.
+    UPDATE_PROFILE_TRACEMALLOC = os.getenv("UPDATE_PROFILE_TRACEMALLOC", "0") == "1"
+
+    # Append-only binary log of every /action decision (π, m, v, source,
+    # sampler cursors); read with app.decision_log.load_decision_log.
+    # None disables it.
+    DECISION_LOG_PATH = "logs/decisions.bin"
+
+    # Where /update runs: "process" (a worker process sharing the DB, so the
+    # fit never holds the API process's GIL), "thread" or "inline".
+    UPDATE_EXECUTOR = os.getenv("UPDATE_EXECUTOR", "process")
+    # Checkpoint each /update stage (backup, derivation, repro snapshot, each
+    # agent's fit); an update that follows a failed one on unchanged inputs
+    # resumes where it stopped (UPDATE_RESUME=0 disables). See
+    # app/update_checkpoints.py.
+    UPDATE_RESUME = os.getenv("UPDATE_RESUME", "1") == "1"
+    # Sample-buffer primitives reserved for the worker process. The fits
+    # draw none; a draw outside the reserved window fails the update.
+    UPDATE_WORKER_SAMPLER_RESERVE = {"normal": 0, "uniform": 0}
+
+    # Let /upload_data prepare the dyad's next decisions (state, π) off the
+    # request path so the matching /action only draws and writes the row;
+    # see app/speculation.py. "thread" or "inline" (in the upload request).
+    SPECULATIVE_DECISIONS = os.getenv("SPECULATIVE_DECISIONS", "0") == "1"
+    SPECULATION_EXECUTOR = "thread"
+
+    # /upload_data:batch (host catch-up and backfill): items per request,
+    # and rows per multi-row INSERT.
+    UPLOAD_BATCH_MAX_ITEMS = 10_000
+    UPLOAD_BATCH_CHUNK_ROWS = 500
+
+    # ---- Multi-study tenancy (app/tenancy.py) ----
+    # Studies served by `create_tenant_app` under /studies/<study_id>/api/v1,
+    # each a separate app: {study_id: {config overrides}}. The studies share
+    # one database, their rows told apart by a study_id column, and each
+    # gets its own sample buffer from the template below, learner, caches
+    # and update worker. A study idle for STUDY_IDLE_EVICT_S is unloaded and
+    # rebuilt on its next request. A `{study_id}` in STUDY_DATABASE_URI
+    # still gives each study a database of its own.
+    # STUDY_ID is set per study; None (study "default") for `create_app`.
+    STUDY_ID = None
+    STUDIES: dict = {}
+    STUDY_DATABASE_URI = os.getenv("STUDY_DATABASE_URI") or SQLALCHEMY_DATABASE_URI
+    STUDY_SAMPLE_BUFFER_PATH = "buffers/{study_id}.npz"
+    STUDY_IDLE_EVICT_S = 1800
+
+    # Fold each reward an /upload_data finalizes into the cached posterior
+    # with a rank-1 (Sherman–Morrison) update between weekly /update runs;
+    # the next /update clears them and refits. See app/online_posterior.py.
+    ONLINE_POSTERIOR_UPDATES = os.getenv("ONLINE_POSTERIOR_UPDATES", "0") == "1"
+
+    # Freeze dyads past consent_end_date with every action finalized: their
+    # final local fit is archived (frozen_dyad_fits) and later updates stop
+    # re-deriving, loading and refitting their study_data rows. Only the
+    # gamma == 0 agent (dyad_game) freezes; discounted fits keep moving.
+    FREEZE_COMPLETED_DYADS = True
+
     # RL algorithm: "flat_prob", "thompson_sampling", "empirical_bayes",
     # or "eb_gradient" (MAP marginal-likelihood EB + generalized-logistic
     # smooth allocation; see Prior_Construction_Note.tex).
@@ -120,6 +185,11 @@ class TestingConfig(Config):
     TESTING = True
     BACKUP_DATABASE = False
     SAVE_UPDATE_REPRO_SNAPSHOTS = False
+    DECISION_LOG_PATH = None
+    # Run /update and speculative decisions in the request: a background
+    # thread or worker cannot see the in-memory SQLite database.
+    UPDATE_EXECUTOR = "inline"
+    SPECULATION_EXECUTOR = "inline"
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     # Tests use an in-memory buffer (no path): each app boot gets a fresh
     # buffer generated from the seed below, so tests don't accumulate
@@ -129,6 +199,9 @@ class TestingConfig(Config):
     SAMPLE_BUFFER_SEED = 7
     SAMPLE_BUFFER_NORMALS = 500_000
     SAMPLE_BUFFER_UNIFORMS = 5_000
+    # Each study app gets its own in-memory database and buffer.
+    STUDY_DATABASE_URI = "sqlite:///:memory:"
+    STUDY_SAMPLE_BUFFER_PATH = None
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,57 @@
+"""add update_phase_profiles table
+
+Adds:
+- ``update_phase_profiles`` table — one row per (update_id, phase) with the
+  wall time, CPU time and peak memory of each /update pipeline stage and of
+  each agent's fit (``learner_update.<decision_type>``). Child rows of
+  ``model_update_requests``, read back via GET /update/<update_id>/profile.
+
+Revision ID: 20261019_01
+Revises: 20260529_01
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_01"
+down_revision = "20260529_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "update_phase_profiles" not in inspector.get_table_names():
+        op.create_table(
+            "update_phase_profiles",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("update_id", sa.String(length=255), nullable=False),
+            sa.Column("seq", sa.Integer(), nullable=False),
+            sa.Column("phase", sa.String(length=255), nullable=False),
+            sa.Column("decision_type", sa.String(length=255), nullable=True),
+            sa.Column("wall_s", sa.Float(), nullable=False),
+            sa.Column("cpu_s", sa.Float(), nullable=False),
+            sa.Column("tracemalloc_peak_kib", sa.Float(), nullable=True),
+            sa.Column("rss_peak_kib", sa.Float(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index(
+            "ix_update_phase_profiles_update_id",
+            "update_phase_profiles",
+            ["update_id"],
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "update_phase_profiles" in inspector.get_table_names():
+        op.drop_index(
+            "ix_update_phase_profiles_update_id", table_name="update_phase_profiles"
+        )
+        op.drop_table("update_phase_profiles")
@@ -0,0 +1,46 @@
+"""add frozen_dyad_fits table
+
+Adds:
+- ``frozen_dyad_fits`` table — one row per decision_type holding the final
+  local fits of dyads that completed the study, as an ``.npz`` payload of
+  stacked arrays plus a JSON list of the frozen group ids. Written by the
+  /update job (see app/frozen_archive.py).
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_02"
+down_revision = "20261019_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "frozen_dyad_fits" not in inspector.get_table_names():
+        op.create_table(
+            "frozen_dyad_fits",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("decision_type", sa.String(length=255), nullable=False, unique=True),
+            sa.Column("group_ids", sa.JSON(), nullable=False),
+            sa.Column("n_dyads", sa.Integer(), nullable=False),
+            sa.Column("feature_dim", sa.Integer(), nullable=False),
+            sa.Column("payload", sa.LargeBinary(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "frozen_dyad_fits" in inspector.get_table_names():
+        op.drop_table("frozen_dyad_fits")
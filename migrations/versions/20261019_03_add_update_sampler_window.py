@@ -0,0 +1,43 @@
+"""add model_update_requests.sampler_window
+
+Adds:
+- ``model_update_requests.sampler_window`` (JSON, nullable) — the
+  sample-buffer window reserved for an out-of-process update worker,
+  ``{"normal": [start, end], "uniform": [start, end]}``. NULL for updates
+  run in the API process.
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_03"
+down_revision = "20261019_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    columns = {c["name"] for c in inspector.get_columns("model_update_requests")}
+    if "sampler_window" not in columns:
+        op.add_column(
+            "model_update_requests",
+            sa.Column("sampler_window", sa.JSON(), nullable=True),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    columns = {c["name"] for c in inspector.get_columns("model_update_requests")}
+    if "sampler_window" in columns:
+        with op.batch_alter_table("model_update_requests") as batch_op:
+            batch_op.drop_column("sampler_window")
@@ -0,0 +1,73 @@
+"""add update_checkpoints table and resumable-update columns
+
+Adds:
+- ``update_checkpoints`` table — one row per (update_id, completed stage)
+  with the stage's output, keyed also by the update's input fingerprint
+  (see app/update_checkpoints.py).
+- ``model_update_requests.fingerprint`` (String, nullable) — the input-data
+  fingerprint the update ran against.
+- ``model_update_requests.resumed_from`` (String, nullable) — the failed
+  update whose checkpoints this one resumed from.
+
+Revision ID: 20261019_04
+Revises: 20261019_03
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_04"
+down_revision = "20261019_03"
+branch_labels = None
+depends_on = None
+
+_NEW_COLUMNS = ("fingerprint", "resumed_from")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "update_checkpoints" not in inspector.get_table_names():
+        op.create_table(
+            "update_checkpoints",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("update_id", sa.String(length=255), nullable=False),
+            sa.Column("fingerprint", sa.String(length=64), nullable=False),
+            sa.Column("stage", sa.String(length=255), nullable=False),
+            sa.Column("output", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.UniqueConstraint("update_id", "stage", name="uq_checkpoint_update_stage"),
+        )
+        op.create_index(
+            "ix_update_checkpoints_update_id", "update_checkpoints", ["update_id"]
+        )
+
+    columns = {c["name"] for c in inspector.get_columns("model_update_requests")}
+    if "fingerprint" not in columns:
+        op.add_column(
+            "model_update_requests",
+            sa.Column("fingerprint", sa.String(length=64), nullable=True),
+        )
+    if "resumed_from" not in columns:
+        op.add_column(
+            "model_update_requests",
+            sa.Column("resumed_from", sa.String(length=255), nullable=True),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    columns = {c["name"] for c in inspector.get_columns("model_update_requests")}
+    with op.batch_alter_table("model_update_requests") as batch_op:
+        for name in _NEW_COLUMNS:
+            if name in columns:
+                batch_op.drop_column(name)
+
+    if "update_checkpoints" in inspector.get_table_names():
+        op.drop_index("ix_update_checkpoints_update_id", table_name="update_checkpoints")
+        op.drop_table("update_checkpoints")
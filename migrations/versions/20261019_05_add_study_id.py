@@ -0,0 +1,151 @@
+"""add study_id to the study-scoped tables
+
+Adds ``study_id`` (String(64), NOT NULL, server default ``'default'``) to
+every table the API writes, so several studies share one database (see
+app/tenancy.py and ``StudyScoped`` in app/models.py). Rows that predate the
+column belong to the ``default`` study, the study of a single-study
+deployment.
+
+The natural keys become per-study:
+- ``groups``: (study_id, group_id), was group_id
+- ``actions``: (study_id, group_id, decision_type, decision_idx) and
+  (study_id, rid), was the same without study_id and rid
+- ``study_data``: (study_id, group_id, decision_type, decision_idx)
+- ``standardization_baselines``: (study_id, group_id, decision_type, variable_name)
+- ``thompson_sampling_params``: (study_id, group_id, decision_type)
+- ``frozen_dyad_fits``: (study_id, decision_type), was decision_type
+- ``update_checkpoints``: (study_id, update_id, stage)
+
+Revision ID: 20261019_05
+Revises: 20261019_04
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261019_05"
+down_revision = "20261019_04"
+branch_labels = None
+depends_on = None
+
+_TABLES = (
+    "groups",
+    "data_uploads",
+    "actions",
+    "model_parameters",
+    "thompson_sampling_params",
+    "model_update_requests",
+    "study_data",
+    "standardization_baselines",
+    "update_reproducibility_snapshots",
+    "update_phase_profiles",
+    "frozen_dyad_fits",
+    "update_checkpoints",
+)
+
+# table -> [(constraint name, columns before, columns after)]. Before this
+# revision, groups.group_id, actions.rid and frozen_dyad_fits.decision_type
+# were column-level ``unique=True`` keys the database named itself.
+_KEYS = {
+    "groups": [("uq_group_study_group", ["group_id"], ["study_id", "group_id"])],
+    "actions": [
+        (
+            "uq_action_group_type_idx",
+            ["group_id", "decision_type", "decision_idx"],
+            ["study_id", "group_id", "decision_type", "decision_idx"],
+        ),
+        ("uq_action_study_rid", ["rid"], ["study_id", "rid"]),
+    ],
+    "study_data": [
+        (
+            "uq_study_group_type_idx",
+            ["group_id", "decision_type", "decision_idx"],
+            ["study_id", "group_id", "decision_type", "decision_idx"],
+        ),
+    ],
+    "standardization_baselines": [
+        (
+            "uq_baseline_group_dt_var",
+            ["group_id", "decision_type", "variable_name"],
+            ["study_id", "group_id", "decision_type", "variable_name"],
+        ),
+    ],
+    "thompson_sampling_params": [
+        (
+            "uq_group_decision",
+            ["group_id", "decision_type"],
+            ["study_id", "group_id", "decision_type"],
+        ),
+    ],
+    "frozen_dyad_fits": [
+        ("uq_frozen_study_decision", ["decision_type"], ["study_id", "decision_type"]),
+    ],
+    "update_checkpoints": [
+        (
+            "uq_checkpoint_update_stage",
+            ["update_id", "stage"],
+            ["study_id", "update_id", "stage"],
+        ),
+    ],
+}
+
+# Lets batch mode drop the unnamed column-level unique constraints on SQLite.
+_NAMING = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _unique_name(inspector, table: str, columns: list[str]) -> str | None:
+    for uc in inspector.get_unique_constraints(table):
+        if uc["column_names"] == columns:
+            return uc["name"] or f"uq_{table}_{columns[0]}"
+    return None
+
+
+def _rekey(inspector, table: str, old: int, new: int) -> None:
+    """Swap the table's unique keys from ``_KEYS`` entry index ``old`` to ``new``."""
+    with op.batch_alter_table(table, naming_convention=_NAMING) as batch_op:
+        for key in _KEYS.get(table, ()):
+            name = _unique_name(inspector, table, key[old])
+            if name is not None:
+                batch_op.drop_constraint(name, type_="unique")
+            columns = key[new]
+            # The single-column keys were unnamed before this revision.
+            name = key[0] if len(columns) > 1 else _NAMING["uq"] % {
+                "table_name": table, "column_0_name": columns[0]
+            }
+            batch_op.create_unique_constraint(name, columns)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in _TABLES:
+        if table not in inspector.get_table_names():
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "study_id" in columns:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(
+                sa.Column(
+                    "study_id", sa.String(length=64), nullable=False, server_default="default"
+                )
+            )
+        _rekey(sa.inspect(bind), table, old=1, new=2)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table in _TABLES:
+        if table not in inspector.get_table_names():
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "study_id" not in columns:
+            continue
+        _rekey(inspector, table, old=2, new=1)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("study_id")
@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+"""
+Endpoint-level latency benchmark for the RL API, with regression tracking.
+
+Replays the ADAPTS-HCT protocol simulator through the Flask test client
+(no network, so the numbers are route + ORM + learner time) and records:
+
+  - p50 / p95 / p99 latency of /add_group, /upload_data and /action, with
+    /action split into the warm-up path and the posterior path, plus the
+    mean number of SQL statements each request executes;
+  - /update wall time, broken out by phase from ``app.last_update_timings``
+    (see app/profiling.py);
+
+for every cohort size in ``--dyads`` and per trial week. Unlike
+``run_simulation`` the default cohort is recruited all at once, so an
+N-dyad run really has N dyads active in every week; ``--staggered`` keeps
+the protocol's one-dyad-per-week recruitment.
+
+Results are written as JSON. ``--compare BASELINE.json`` matches runs by
+cohort size and flags every metric that got slower than the baseline by
+more than ``--tolerance`` (relative) and ``--min-delta-ms`` (absolute), and
+exits non-zero if anything regressed.
+
+Usage:
+    python tests/benchmark_endpoints.py --dyads 25,100 --weeks 4 --output bench.json
+    python tests/benchmark_endpoints.py --dyads 25,100 --weeks 4 --compare bench.json
+
+    # Against a local Postgres (tables are dropped and recreated per run):
+    python tests/benchmark_endpoints.py --database-url postgresql://me@localhost:5432/rl_bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import sqlalchemy
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.extensions import db
+from tests.simulate_adapts_hct import (
+    DAYS_ACTIVE,
+    ProtocolTrialSimulator,
+    _pre_action_timestamp,
+    _parse_timestamp,
+)
+
+ENDPOINTS = ("add_group", "upload_data", "action_warmup", "action_posterior")
+PERCENTILES = (50, 95, 99)
+
+
+class ConcurrentCohortSimulator(ProtocolTrialSimulator):
+    """Protocol simulator with every dyad recruited on ``base_date``."""
+
+    def _build_dyads(self):
+        dyads = super()._build_dyads()
+        for dyad in dyads:
+            dyad.recruit_date = self.base_date
+            dyad.consent_end_date = self.base_date + datetime.timedelta(days=DAYS_ACTIVE - 1)
+        self._dyads_by_id = {dyad.group_id: dyad for dyad in dyads}
+        return dyads
+
+    def _dyad(self, group_id: str):
+        return self._dyads_by_id[group_id]
+
+
+def benchmark_config(
+    database_url: str,
+    algorithm: str | None = None,
+    num_dyads: int = 25,
+    num_weeks: int = 4,
+):
+    """A TestingConfig subclass pointed at ``database_url``.
+
+    TESTING keeps /update inline so its phases are timed on the request
+    thread; the sample buffer is sized for the cohort.
+    """
+    from config import TestingConfig
+
+    attrs = {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SAMPLE_BUFFER_UNIFORMS": 40 * num_dyads * num_weeks + 10_000,
+        "SAMPLE_BUFFER_NORMALS": max(2_000_000, 400 * num_dyads * num_weeks),
+    }
+    if algorithm:
+        attrs["RL_ALGORITHM"] = algorithm
+    return type("BenchmarkConfig", (TestingConfig,), attrs)
+
+
+def latency_summary(samples_s: list[float]) -> dict:
+    """count / mean / p50 / p95 / p99 / max in milliseconds."""
+    if not samples_s:
+        return {"count": 0}
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    summary = {"count": int(ms.size), "mean_ms": round(float(ms.mean()), 4)}
+    for q, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        summary[f"p{q}_ms"] = round(float(value), 4)
+    summary["max_ms"] = round(float(ms.max()), 4)
+    return summary
+
+
+def statement_summary(counts: list[int]) -> dict:
+    """Mean SQL statements per request (empty when no request succeeded)."""
+    if not counts:
+        return {}
+    return {"statements_mean": round(float(np.mean(counts)), 3)}
+
+
+def _update_summary(updates: list[dict]) -> dict:
+    if not updates:
+        return {"count": 0}
+    phase_names = list(dict.fromkeys(name for u in updates for name in u["phases"]))
+    return {
+        "count": len(updates),
+        "wall": latency_summary([u["total_s"] for u in updates]),
+        "phases_mean_ms": {
+            name: round(1000.0 * float(np.mean([u["phases"].get(name, 0.0) for u in updates])), 4)
+            for name in phase_names
+        },
+    }
+
+
+def run_benchmark(
+    num_dyads: int,
+    num_weeks: int = 4,
+    database_url: str | None = None,
+    algorithm: str | None = None,
+    staggered: bool = False,
+    base_date: datetime.date | None = None,
+    seed: int = 42,
+) -> dict:
+    """Replay one cohort and return its latency / update-phase summary."""
+    if base_date is None:
+        base_date = datetime.date(2025, 1, 5)
+
+    tmp_dir = None
+    if database_url is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="rl_bench_")
+        database_url = f"sqlite:///{os.path.join(tmp_dir.name, 'bench.db')}"
+    else:
+        # Start from empty tables before the app boots, so neither the prior
+        # row nor the sampler cursor is restored from a previous run.
+        engine = sqlalchemy.create_engine(database_url)
+        db.metadata.drop_all(engine)
+        engine.dispose()
+
+    app = create_app(benchmark_config(database_url, algorithm, num_dyads, num_weeks))
+    client = app.test_client()
+
+    simulator_class = ProtocolTrialSimulator if staggered else ConcurrentCohortSimulator
+    simulator = simulator_class(
+        base_date=base_date, num_weeks=num_weeks, num_dyads=num_dyads, seed=seed
+    )
+
+    samples: dict[str, list[float]] = defaultdict(list)
+    statements: dict[str, list[int]] = defaultdict(list)
+    executed = [0]
+
+    def count_statement(*args):
+        executed[0] += 1
+
+    with app.app_context():
+        sqlalchemy.event.listen(db.engine, "before_cursor_execute", count_statement)
+    by_week: dict[int, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    updates: dict[int, dict] = {}
+    errors: list[dict] = []
+
+    def week_of(timestamp: str) -> int:
+        return (_parse_timestamp(timestamp).date() - base_date).days // 7
+
+    def timed_post(path: str, payload: dict):
+        executed[0] = 0
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        return response, time.perf_counter() - start
+
+    def record(name: str, week: int, elapsed: float, response, ok_codes):
+        if response.status_code not in ok_codes:
+            errors.append({"type": name, "status": response.status_code, "body": response.get_json()})
+            return
+        samples[name].append(elapsed)
+        statements[name].append(executed[0])
+        by_week[week][name].append(elapsed)
+
+    started = time.perf_counter()
+    for event in simulator.iter_schedule_events():
+        week = week_of(event["timestamp"])
+
+        if event["type"] == "add_group":
+            response, elapsed = timed_post("/api/v1/add_group", event["payload"])
+            record("add_group", max(week, 0), elapsed, response, (200, 201))
+            continue
+
+        if event["type"] == "update":
+            app.last_update_timings = None
+            response, elapsed = timed_post("/api/v1/update", event["payload"])
+            if response.status_code not in (200, 202):
+                errors.append({"type": "update", "status": response.status_code, "body": response.get_json()})
+                continue
+            timings = app.last_update_timings or {"total_s": elapsed, "phases": {}}
+            updates[week] = {"request_s": elapsed, **timings}
+            continue
+
+        snapshot = simulator.build_snapshot(event)
+        response, elapsed = timed_post(
+            "/api/v1/upload_data",
+            {
+                "group_id": event["group_id"],
+                "timestamp": _pre_action_timestamp(event["timestamp"]),
+                "data": snapshot,
+            },
+        )
+        record("upload_data", week, elapsed, response, (200, 201))
+
+        payload = simulator.build_action_payload(event)
+        response, elapsed = timed_post("/api/v1/action", payload)
+        body = response.get_json() or {}
+        name = "action_warmup" if body.get("warmup") else "action_posterior"
+        record(name, week, elapsed, response, (200, 201))
+        if response.status_code in (200, 201):
+            simulator.record_action(event, body)
+
+    replay_s = time.perf_counter() - started
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        db.session.remove()
+        db.engine.dispose()
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+    return {
+        "num_dyads": num_dyads,
+        "num_weeks": num_weeks,
+        "cohort": "staggered" if staggered else "concurrent",
+        "algorithm": app.config.get("RL_ALGORITHM"),
+        "database": dialect,
+        "replay_s": round(replay_s, 3),
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "endpoints": {
+            name: {**latency_summary(samples[name]), **statement_summary(statements[name])}
+            for name in ENDPOINTS
+        },
+        "update": _update_summary(list(updates.values())),
+        "by_week": [
+            {
+                "week": week,
+                "endpoints": {
+                    name: latency_summary(by_week[week][name])
+                    for name in ENDPOINTS
+                    if by_week[week][name]
+                },
+                "update": updates.get(week),
+            }
+            for week in sorted(set(by_week) | set(updates))
+        ],
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(
+    dyad_counts: list[int],
+    num_weeks: int = 4,
+    database_url: str | None = None,
+    algorithm: str | None = None,
+    staggered: bool = False,
+    verbose: bool = False,
+) -> dict:
+    runs = []
+    for num_dyads in dyad_counts:
+        run = run_benchmark(
+            num_dyads,
+            num_weeks=num_weeks,
+            database_url=database_url,
+            algorithm=algorithm,
+            staggered=staggered,
+        )
+        runs.append(run)
+        if verbose:
+            print(format_run(run))
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "runs": runs,
+    }
+
+
+# ------------------------------------------------------------- comparison
+
+def _flatten_metrics(run: dict) -> dict[str, float]:
+    metrics = {}
+    for name, summary in run["endpoints"].items():
+        for q in PERCENTILES:
+            key = f"p{q}_ms"
+            if key in summary:
+                metrics[f"{name}.{key}"] = summary[key]
+    update = run.get("update") or {}
+    for key, value in (update.get("wall") or {}).items():
+        if key.endswith("_ms") and key != "max_ms":
+            metrics[f"update.wall.{key}"] = value
+    for phase, value in (update.get("phases_mean_ms") or {}).items():
+        metrics[f"update.phase.{phase}_ms"] = value
+    return metrics
+
+
+def _run_key(run: dict) -> tuple:
+    return (run["num_dyads"], run["num_weeks"], run["cohort"], run["algorithm"], run["database"])
+
+
+def compare_results(
+    current: dict,
+    baseline: dict,
+    tolerance: float = 0.20,
+    min_delta_ms: float = 0.5,
+) -> list[dict]:
+    """Metrics slower than baseline by > ``tolerance`` and > ``min_delta_ms``."""
+    baseline_runs = {_run_key(run): run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in current.get("runs", []):
+        reference = baseline_runs.get(_run_key(run))
+        if reference is None:
+            continue
+        before = _flatten_metrics(reference)
+        for metric, value in _flatten_metrics(run).items():
+            old = before.get(metric)
+            if old is None:
+                continue
+            if value > old * (1.0 + tolerance) and value - old > min_delta_ms:
+                regressions.append(
+                    {
+                        "num_dyads": run["num_dyads"],
+                        "metric": metric,
+                        "baseline_ms": old,
+                        "current_ms": value,
+                        "ratio": round(value / old, 3) if old else None,
+                    }
+                )
+    return regressions
+
+
+def format_run(run: dict) -> str:
+    lines = [
+        f"[bench] dyads={run['num_dyads']} weeks={run['num_weeks']} cohort={run['cohort']} "
+        f"algorithm={run['algorithm']} db={run['database']} replay={run['replay_s']:.1f}s "
+        f"errors={run['error_count']}"
+    ]
+    for name, summary in run["endpoints"].items():
+        if not summary.get("count"):
+            continue
+        lines.append(
+            f"  {name:<17s} n={summary['count']:<7d} p50={summary['p50_ms']:8.2f}ms "
+            f"p95={summary['p95_ms']:8.2f}ms p99={summary['p99_ms']:8.2f}ms "
+            f"sql={summary['statements_mean']:.1f}"
+        )
+    update = run["update"]
+    if update.get("count"):
+        phases = " ".join(f"{k}={v:.1f}" for k, v in update["phases_mean_ms"].items())
+        lines.append(
+            f"  {'update':<17s} n={update['count']:<7d} p50={update['wall']['p50_ms']:8.2f}ms "
+            f"max={update['wall']['max_ms']:8.2f}ms  mean phases (ms): {phases}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RL API endpoint latency")
+    parser.add_argument("--dyads", default="25,100,250", help="Comma-separated cohort sizes")
+    parser.add_argument("--weeks", type=int, default=4, help="Trial weeks to replay per cohort")
+    parser.add_argument("--algorithm", default=None, help="RL_ALGORITHM (default: config/env)")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="SQLAlchemy URL (default: a temporary SQLite file per run)",
+    )
+    parser.add_argument("--staggered", action="store_true", help="Recruit one dyad per week")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Relative slowdown allowed")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Absolute slowdown ignored")
+    args = parser.parse_args()
+
+    results = run_suite(
+        [int(n) for n in args.dyads.split(",")],
+        num_weeks=args.weeks,
+        database_url=args.database_url,
+        algorithm=args.algorithm,
+        staggered=args.staggered,
+        verbose=True,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[bench] wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance, args.min_delta_ms)
+        if not regressions:
+            print(f"[bench] no regressions vs {args.compare}")
+            return 0
+        print(f"[bench] {len(regressions)} regression(s) vs {args.compare}:")
+        for r in regressions:
+            print(
+                f"  dyads={r['num_dyads']:<5d} {r['metric']:<40s} "
+                f"{r['baseline_ms']:.2f}ms -> {r['current_ms']:.2f}ms (x{r['ratio']})"
+            )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
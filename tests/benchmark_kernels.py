@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks for the learners' numerical kernels, in isolation.
+
+Where tests/benchmark_endpoints.py times whole requests, this times the
+hot kernels the /update job and /action are built from, on realistic
+inputs (contexts replayed from the protocol simulator, local fits produced
+by the learners themselves):
+
+  - ``_fit_local_model`` of empirical_bayes / eb_gradient / inf_lsvi and
+    ``_fit_pooled_model`` of inf_lsvi_pool;
+  - ``_estimate_hyperparameters``: MoM + anchor (empirical_bayes) and the
+    MAP marginal likelihood (eb_gradient);
+  - ``_shrink_to_hyperprior`` and ``_stabilize_covariance``;
+  - ``smooth_allocation_prob`` and ``closed_form_action_prob``;
+  - ``ProtocolRLFeatureBuilder.phi``.
+
+Each kernel is swept over the axes it depends on: feature dimension (the
+per-agent φ dimension, or a synthetic dimension for the dimension-generic
+linear algebra), trajectory length and number of dyads. Every point
+reports the median and best per-call time over ``--repeat`` timing rounds
+and the tracemalloc peak of a single call, so a regression in a
+linear-algebra path shows up as time or memory before it reaches /update.
+
+Usage:
+    python tests/benchmark_kernels.py --output kernels.json
+    python tests/benchmark_kernels.py --compare kernels.json --kernels fit_local,map
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.algorithms.eb_gradient import (
+    ThreeAgentEmpiricalBayesGradientAlgorithm,
+    smooth_allocation_prob,
+)
+from app.algorithms.empirical_bayes import ThreeAgentEmpiricalBayesAlgorithm
+from app.algorithms.inf_lsvi_local import ThreeAgentInfLsviAlgorithm
+from app.algorithms.inf_lsvi_pool import ThreeAgentInfLsviPooledAlgorithm
+from app.deterministic_sampler import DeterministicSampleStream, closed_form_action_prob
+from app.feature_builder import ProtocolRLFeatureBuilder
+from app.protocol import project_snapshot
+from app.repository import InMemoryRepository
+from tests.benchmark_endpoints import _git_revision
+from tests.simulate_adapts_hct import ProtocolTrialSimulator
+
+DECISION_TYPES = ("aya_message", "cp_message", "dyad_game")
+
+FULL_SWEEP = {
+    "trajectory_lengths": (14, 100, 300),
+    "dyad_counts": (5, 25, 100),
+    "dims": (8, 16, 32, 64),
+    "mc_samples": (500, 5_000),
+}
+QUICK_SWEEP = {
+    "trajectory_lengths": (14, 50),
+    "dyad_counts": (5, 10),
+    "dims": (8, 16),
+    "mc_samples": (500,),
+}
+
+
+# ------------------------------------------------------------------ inputs
+
+def sample_contexts(num_dyads: int = 4, num_weeks: int = 18, seed: int = 42) -> dict[str, list[dict]]:
+    """Raw per-agent contexts from a learner-free simulator replay."""
+    simulator = ProtocolTrialSimulator(
+        base_date=datetime.date(2025, 1, 5), num_weeks=num_weeks, num_dyads=num_dyads, seed=seed
+    )
+    rng = random.Random(seed)
+    contexts: dict[str, list[dict]] = {dt: [] for dt in DECISION_TYPES}
+    for event in simulator.iter_schedule_events():
+        if event["type"] != "action":
+            continue
+        snapshot = simulator.build_snapshot(event)
+        payload = simulator.build_action_payload(event)
+        contexts[event["decision_type"]].append(
+            project_snapshot(event["decision_type"], snapshot, payload["decision_idx"])
+        )
+        simulator.record_action(event, {"action": rng.randint(0, 1)})
+    return contexts
+
+
+def make_records(
+    contexts: list[dict], decision_type: str, length: int, group_id: str, rng: np.random.Generator
+) -> list[dict]:
+    """A ``length``-decision trajectory in the shape ``update`` receives."""
+    offset = int(rng.integers(len(contexts)))
+    records = []
+    for idx in range(length):
+        raw = contexts[(offset + idx) % len(contexts)]
+        records.append(
+            {
+                "group_id": group_id,
+                "decision_idx": idx,
+                "decision_type": decision_type,
+                "agent_decision_index": idx + 1,
+                "state": [],
+                "action": int(rng.integers(2)),
+                "reward": float(rng.normal()),
+                "raw_context": raw,
+            }
+        )
+    return records
+
+
+def random_spd(dim: int, rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+    a = rng.normal(size=(dim, dim))
+    return scale * (a @ a.T / dim + np.eye(dim))
+
+
+def build_learners() -> dict[str, object]:
+    """Learners on an in-memory repository (no app, no database)."""
+    sampler = DeterministicSampleStream.fresh(n_normals=10_000, n_uniforms=1_000, seed=7)
+    learners = {
+        "empirical_bayes": ThreeAgentEmpiricalBayesAlgorithm(
+            seed=42, sampler=sampler, repository=InMemoryRepository()
+        ),
+        "eb_gradient": ThreeAgentEmpiricalBayesGradientAlgorithm(
+            seed=42, sampler=sampler, repository=InMemoryRepository()
+        ),
+        "inf_lsvi": ThreeAgentInfLsviAlgorithm(
+            seed=42, sampler=sampler, repository=InMemoryRepository()
+        ),
+        "inf_lsvi_pool": ThreeAgentInfLsviPooledAlgorithm(
+            seed=42, sampler=sampler, repository=InMemoryRepository()
+        ),
+    }
+    # The MAP estimator logs every call; keep that out of the timings.
+    logging.getLogger("RLAlgorithm").setLevel(logging.WARNING)
+    return learners
+
+
+# ----------------------------------------------------------------- measure
+
+def measure(
+    fn: Callable[[], object],
+    repeat: int = 5,
+    min_round_s: float = 0.05,
+) -> dict:
+    """Per-call median/min time (µs) over ``repeat`` rounds + tracemalloc peak."""
+    fn()  # warm caches / lazy imports
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_s or calls >= 1 << 20:
+            break
+        calls *= 2 if elapsed <= 0 else max(2, min(10, int(min_round_s / elapsed) + 1))
+
+    rounds = [elapsed / calls]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        rounds.append((time.perf_counter() - start) / calls)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "calls_per_round": calls,
+        "median_us": round(float(np.median(rounds)) * 1e6, 3),
+        "min_us": round(float(np.min(rounds)) * 1e6, 3),
+        "peak_kib": round(peak / 1024.0, 2),
+    }
+
+
+# ------------------------------------------------------------------- cases
+
+def iter_cases(sweep: dict, learners: dict, contexts: dict[str, list[dict]], seed: int = 0):
+    """Yield ``(kernel, params, fn)`` for every point of the sweep."""
+    rng = np.random.default_rng(seed)
+
+    for dt in DECISION_TYPES:
+        fb = ProtocolRLFeatureBuilder(dt)
+        raw = contexts[dt][len(contexts[dt]) // 2]
+        baselines = {name: {"mu": 0.5, "sigma": 2.0} for name in fb.variable_names}
+        yield "phi", {"decision_type": dt, "feature_dim": fb.phi_dim, "baselines": False}, (
+            lambda fb=fb, raw=raw: fb.phi(raw, 1)
+        )
+        yield "phi", {"decision_type": dt, "feature_dim": fb.phi_dim, "baselines": True}, (
+            lambda fb=fb, raw=raw, baselines=baselines: fb.phi(raw, 1, baselines=baselines)
+        )
+
+        base = fb.base_vector(raw)
+        mean = rng.normal(size=fb.phi_dim)
+        cov = random_spd(fb.phi_dim, rng, scale=0.1)
+        yield "closed_form_action_prob", {"decision_type": dt, "feature_dim": fb.phi_dim}, (
+            lambda base=base, mean=mean, cov=cov, fb=fb: closed_form_action_prob(
+                base, mean, cov, fb.expand_base_to_phi
+            )
+        )
+
+        for length in sweep["trajectory_lengths"]:
+            records = make_records(contexts[dt], dt, length, "dyad_001", rng)
+            for name in ("empirical_bayes", "eb_gradient", "inf_lsvi"):
+                params = {"decision_type": dt, "feature_dim": fb.phi_dim, "trajectory_length": length}
+                yield f"fit_local.{name}", params, (
+                    lambda learner=learners[name], dt=dt, records=records: learner._fit_local_model(
+                        dt, records, None, None
+                    )
+                )
+
+        for n_dyads in sweep["dyad_counts"]:
+            length = sweep["trajectory_lengths"][0]
+            per_dyad = [
+                make_records(contexts[dt], dt, length, f"dyad_{i:03d}", rng) for i in range(n_dyads)
+            ]
+            params = {
+                "decision_type": dt,
+                "feature_dim": fb.phi_dim,
+                "num_dyads": n_dyads,
+                "trajectory_length": length,
+            }
+            pooled = [(records[0]["group_id"], records) for records in per_dyad]
+            yield "fit_pooled.inf_lsvi_pool", params, (
+                lambda learner=learners["inf_lsvi_pool"], dt=dt, pooled=pooled: learner._fit_pooled_model(
+                    dt, pooled, None
+                )
+            )
+            eb, ebg = learners["empirical_bayes"], learners["eb_gradient"]
+            mom_fits = {
+                records[0]["group_id"]: eb._fit_local_model(dt, records, None, None) for records in per_dyad
+            }
+            map_fits = {
+                records[0]["group_id"]: ebg._fit_local_model(dt, records, None, None) for records in per_dyad
+            }
+            yield "estimate_hyperparameters.mom", params, (
+                lambda eb=eb, fits=mom_fits, dt=dt: eb._estimate_hyperparameters(fits, dt)
+            )
+            yield "estimate_hyperparameters.map", params, (
+                lambda ebg=ebg, fits=map_fits, dt=dt: ebg._estimate_hyperparameters(fits, dt)
+            )
+
+    eb = learners["empirical_bayes"]
+    for dim in sweep["dims"]:
+        local_cov = random_spd(dim, rng, scale=0.2)
+        eb_cov = random_spd(dim, rng)
+        local_theta = rng.normal(size=dim)
+        eb_mean = rng.normal(size=dim)
+        yield "stabilize_covariance", {"feature_dim": dim}, (
+            lambda eb=eb, cov=local_cov: eb._stabilize_covariance(cov)
+        )
+        yield "shrink_to_hyperprior", {"feature_dim": dim}, (
+            lambda eb=eb, a=local_theta, b=local_cov, c=eb_mean, d=eb_cov: eb._shrink_to_hyperprior(
+                a, b, c, d
+            )
+        )
+
+    for n_mc in sweep["mc_samples"]:
+        z_bank = np.random.default_rng(12345).standard_normal(n_mc)
+        yield "smooth_allocation_prob", {"mc_samples": n_mc}, (
+            lambda z_bank=z_bank: smooth_allocation_prob(0.05, 0.02, z_bank)
+        )
+
+
+def run_kernels(
+    sweep: dict | None = None,
+    kernels: list[str] | None = None,
+    repeat: int = 5,
+    min_round_s: float = 0.05,
+    verbose: bool = False,
+) -> dict:
+    sweep = sweep or FULL_SWEEP
+    learners = build_learners()
+    contexts = sample_contexts()
+    results = []
+    for kernel, params, fn in iter_cases(sweep, learners, contexts):
+        if kernels and not any(token in kernel for token in kernels):
+            continue
+        stats = measure(fn, repeat=repeat, min_round_s=min_round_s)
+        results.append({"kernel": kernel, "params": params, **stats})
+        if verbose:
+            print(format_result(results[-1]))
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+# -------------------------------------------------------------- comparison
+
+def _result_key(result: dict) -> tuple:
+    return (result["kernel"], tuple(sorted(result["params"].items())))
+
+
+def compare_kernel_results(
+    current: dict,
+    baseline: dict,
+    tolerance: float = 0.20,
+    min_delta_us: float = 5.0,
+    memory_tolerance: float = 0.10,
+    min_delta_kib: float = 16.0,
+) -> list[dict]:
+    """Points slower (median) or hungrier (peak) than the baseline."""
+    before = {_result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        old = before.get(_result_key(result))
+        if old is None:
+            continue
+        checks = (
+            ("median_us", tolerance, min_delta_us),
+            ("peak_kib", memory_tolerance, min_delta_kib),
+        )
+        for metric, rel, floor in checks:
+            new_value, old_value = result[metric], old[metric]
+            if new_value > old_value * (1.0 + rel) and new_value - old_value > floor:
+                regressions.append(
+                    {
+                        "kernel": result["kernel"],
+                        "params": result["params"],
+                        "metric": metric,
+                        "baseline": old_value,
+                        "current": new_value,
+                        "ratio": round(new_value / old_value, 3) if old_value else None,
+                    }
+                )
+    return regressions
+
+
+def format_result(result: dict) -> str:
+    params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+    return (
+        f"[kernel] {result['kernel']:<30s} {params:<70s} "
+        f"median={result['median_us']:>11.1f}us min={result['min_us']:>11.1f}us "
+        f"peak={result['peak_kib']:>9.1f}KiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the learners' numerical kernels")
+    parser.add_argument("--kernels", default=None, help="Comma-separated substrings to select kernels")
+    parser.add_argument("--quick", action="store_true", help="Small sweep (smoke / CI)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per point")
+    parser.add_argument("--min-round-s", type=float, default=0.05, help="Minimum wall time per round")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Relative slowdown allowed")
+    parser.add_argument("--min-delta-us", type=float, default=5.0, help="Absolute slowdown ignored")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Relative peak growth allowed")
+    args = parser.parse_args()
+
+    results = run_kernels(
+        QUICK_SWEEP if args.quick else FULL_SWEEP,
+        kernels=args.kernels.split(",") if args.kernels else None,
+        repeat=args.repeat,
+        min_round_s=args.min_round_s,
+        verbose=True,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[kernel] wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_kernel_results(
+            results,
+            baseline,
+            tolerance=args.tolerance,
+            min_delta_us=args.min_delta_us,
+            memory_tolerance=args.memory_tolerance,
+        )
+        if not regressions:
+            print(f"[kernel] no regressions vs {args.compare}")
+            return 0
+        print(f"[kernel] {len(regressions)} regression(s) vs {args.compare}:")
+        for r in regressions:
+            params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+            print(
+                f"  {r['kernel']:<30s} {params:<60s} {r['metric']}: "
+                f"{r['baseline']:.1f} -> {r['current']:.1f} (x{r['ratio']})"
+            )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
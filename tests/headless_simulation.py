@@ -0,0 +1,440 @@
+"""
+Headless, in-process replay of the ADAPTS-HCT protocol simulator.
+
+``run_simulation`` (tests/simulate_adapts_hct.py) drives the RL API through
+the Flask test client: every event is JSON-encoded, routed, validated,
+written through the ORM and read back. That is the right harness for
+contract tests but far too slow for analysis sweeps over seeds and
+algorithms.
+
+``HeadlessTrial`` drives a learner directly. Learner state lives in an
+``InMemoryRepository`` (app/repository.py) and the API-side tables
+(groups, data_uploads, actions, study_data) live in plain Python lists. It
+reproduces the server-side semantics the decisions depend on:
+
+  - /upload_data: snapshot validation, append-only timeline;
+  - /action: latest-snapshot projection, the warm-up gate
+    (WARMUP_COHORT_MIN_DYADS / WARMUP_WEEK1_CP_DECISIONS) with the
+    Bernoulli(0.5) draw taken from the shared sampler, then
+    make_state + get_action;
+  - /update: §5.3 reward derivation and the study_data record ordering
+    (decision_type, group_id, decision_idx) handed to ``update``.
+
+For the sampler-backed learners the decisions, probabilities and sampler
+cursors match a Flask-backed ``run_simulation`` for the same simulator seed
+and config exactly (see tests/test_headless_simulation.py). The stateless
+baselines draw their warm-up action from ``random`` exactly as the route
+does, so their warm-up phase is not reproducible on either path.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import os
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+from flask import Config
+
+from app.algorithms.always_none import AlwaysNoneAlgorithm
+from app.algorithms.always_send import AlwaysSendAlgorithm
+from app.algorithms.eb_gradient import ThreeAgentEmpiricalBayesGradientAlgorithm
+from app.algorithms.empirical_bayes import ThreeAgentEmpiricalBayesAlgorithm
+from app.algorithms.hybrid_rel_pool import HybridRelPoolAlgorithm
+from app.algorithms.inf_lsvi_local import ThreeAgentInfLsviAlgorithm
+from app.algorithms.inf_lsvi_pool import ThreeAgentInfLsviPooledAlgorithm
+from app.algorithms.random_baseline import RandomBaselineAlgorithm
+from app.deterministic_sampler import DeterministicSampleStream
+from app.protocol import (
+    compute_reward,
+    outcome_from_snapshot,
+    project_snapshot,
+    validate_decision_type,
+    validate_snapshot,
+)
+from app.repository import InMemoryRepository
+from app.reward_derivation import _find_outcome_upload
+from tests.simulate_adapts_hct import (
+    NUM_DYADS,
+    ProtocolTrialSimulator,
+    _pre_action_timestamp,
+)
+
+
+# Algorithms that consume the deterministic sample buffer (mirrors the
+# RL_ALGORITHM dispatch in app/__init__.py).
+SAMPLER_ALGORITHMS = {
+    "empirical_bayes": ThreeAgentEmpiricalBayesAlgorithm,
+    "eb_gradient": ThreeAgentEmpiricalBayesGradientAlgorithm,
+    "inf_lsvi": ThreeAgentInfLsviAlgorithm,
+    "inf_lsvi_pool": ThreeAgentInfLsviPooledAlgorithm,
+    "hybrid_rel_pool": HybridRelPoolAlgorithm,
+}
+STATELESS_ALGORITHMS = {
+    "random_baseline": RandomBaselineAlgorithm,
+    "always_send": AlwaysSendAlgorithm,
+    "always_none": AlwaysNoneAlgorithm,
+}
+
+
+class _ConfigHost:
+    """Stands in for the Flask app: with a repository injected, the learners
+    only read ``app.config``."""
+
+    def __init__(self, config: Config):
+        self.config = config
+
+
+@dataclass
+class UploadRow:
+    group_id: str
+    data: dict
+    request_timestamp: datetime.datetime
+    id: int
+
+
+@dataclass
+class ActionRow:
+    group_id: str
+    decision_type: str
+    decision_idx: int
+    action: int
+    action_prob: float
+    state: list | None
+    raw_context: dict
+    is_warmup: bool
+    warmup_reason: str | None
+    random_state: dict
+    request_timestamp: datetime.datetime
+    id: int
+    reward: float | None = None
+    outcome: dict | None = field(default=None, repr=False)
+
+
+def load_config(config_class: str = "config.TestingConfig", overrides: dict | None = None) -> Config:
+    """The same config mapping ``create_app`` would build."""
+    config = Config(os.getcwd())
+    config.from_object(config_class)
+    if overrides:
+        config.update(overrides)
+    return config
+
+
+def build_sampler(config) -> DeterministicSampleStream:
+    """Sampler construction matching ``_load_or_init_sample_buffer``."""
+    buf_path = config.get("SAMPLE_BUFFER_PATH")
+    if buf_path:
+        for candidate in (buf_path, buf_path + ".npz"):
+            if os.path.exists(candidate):
+                return DeterministicSampleStream.load(candidate)
+    return DeterministicSampleStream.fresh(
+        n_normals=int(config.get("SAMPLE_BUFFER_NORMALS", 500_000)),
+        n_uniforms=int(config.get("SAMPLE_BUFFER_UNIFORMS", 5_000)),
+        seed=int(config.get("SAMPLE_BUFFER_SEED", 0)),
+    )
+
+
+class HeadlessTrial:
+    """One in-process trial: API-side tables plus a learner on an
+    ``InMemoryRepository``."""
+
+    def __init__(
+        self,
+        algorithm: str | None = None,
+        config_class: str = "config.TestingConfig",
+        config_overrides: dict | None = None,
+    ):
+        self.config = load_config(config_class, config_overrides)
+        self.algorithm = algorithm or self.config.get("RL_ALGORITHM", "empirical_bayes")
+        self.repository = InMemoryRepository()
+        seed = self.config.get("RL_ALGORITHM_SEED")
+        if self.algorithm in SAMPLER_ALGORITHMS:
+            self.sampler = build_sampler(self.config)
+            self.rl_algorithm = SAMPLER_ALGORITHMS[self.algorithm](
+                seed=seed,
+                app=_ConfigHost(self.config),
+                sampler=self.sampler,
+                repository=self.repository,
+            )
+        elif self.algorithm in STATELESS_ALGORITHMS:
+            self.sampler = None
+            self.rl_algorithm = STATELESS_ALGORITHMS[self.algorithm](
+                seed=seed, repository=self.repository
+            )
+        else:
+            raise ValueError(f"Headless engine does not support RL_ALGORITHM={self.algorithm!r}")
+
+        self.groups: dict[str, dict] = {}
+        self.uploads: dict[str, list[UploadRow]] = defaultdict(list)
+        self.actions: list[ActionRow] = []
+        self._action_keys: set[tuple[str, str, int]] = set()
+        self._actions_by_group: dict[str, list[ActionRow]] = defaultdict(list)
+        self._cp_counts: dict[str, int] = defaultdict(int)
+        self._pending: dict[str, list[ActionRow]] = defaultdict(list)
+        self.study_data: list[ActionRow] = []
+        self.probability_of_action = self.config.get("MODEL_PRIORS", {}).get(
+            "probability_of_action", 0.5
+        )
+        self.update_count = 0
+        self.results: dict[str, Any] = {}
+
+    # ---------------------------------------------------------------- routes
+
+    def add_group(self, payload: dict) -> tuple[int, dict]:
+        group_id = payload["group_id"]
+        if group_id in self.groups:
+            return 400, {"status": "failed", "message": "Group already exists."}
+        self.groups[group_id] = {
+            "member_list": payload["member_list"],
+            "consent_start_date": payload["consent_start_date"],
+            "consent_end_date": payload["consent_end_date"],
+        }
+        return 201, {"status": "success", "group_id": group_id}
+
+    def upload_data(self, group_id: str, timestamp: str, data: dict) -> tuple[int, dict]:
+        valid, message = validate_snapshot(data)
+        if not valid:
+            return 400, {"status": "failed", "message": message}
+        if group_id not in self.groups:
+            return 404, {"status": "failed", "message": "Group not found."}
+        rows = self.uploads[group_id]
+        rows.append(
+            UploadRow(
+                group_id=group_id,
+                data=data,
+                request_timestamp=datetime.datetime.fromisoformat(timestamp),
+                id=len(rows) + 1,
+            )
+        )
+        return 201, {"status": "success"}
+
+    def request_action(self, payload: dict) -> tuple[int, dict]:
+        group_id = payload["group_id"]
+        decision_type = payload["decision_type"]
+        decision_idx = payload["decision_idx"]
+        valid, message = validate_decision_type(decision_type)
+        if not valid:
+            return 400, {"status": "failed", "message": message}
+        if group_id not in self.groups:
+            return 404, {"status": "failed", "message": "Group not found."}
+        key = (group_id, decision_type, decision_idx)
+        if key in self._action_keys:
+            return 400, {
+                "status": "failed",
+                "message": "Decision index already exists for this (group, decision_type).",
+            }
+        uploads = self.uploads.get(group_id)
+        if not uploads:
+            return 409, {"status": "failed", "message": "No /upload_data received for this group yet."}
+        latest = max(uploads, key=lambda u: (u.request_timestamp, u.id))
+        raw_context = project_snapshot(decision_type, latest.data, decision_idx)
+
+        is_warmup, warmup_reason = self._evaluate_warmup(group_id)
+        if is_warmup:
+            action, random_state = self._draw_warmup_action()
+            random_state["warmup_reason"] = warmup_reason
+            prob = 0.5
+            state = None
+        else:
+            status, state = self.rl_algorithm.make_state(
+                {**raw_context, "decision_type": decision_type, "group_id": group_id}
+            )
+            if not status:
+                return 400, {"status": "failed", "message": state}
+            action, prob, random_state = self.rl_algorithm.get_action(
+                group_id,
+                state,
+                {"probability": self.probability_of_action},
+                decision_type,
+                decision_idx,
+            )
+
+        row = ActionRow(
+            group_id=group_id,
+            decision_type=decision_type,
+            decision_idx=decision_idx,
+            action=int(action),
+            action_prob=float(prob),
+            state=state,
+            raw_context=raw_context,
+            is_warmup=is_warmup,
+            warmup_reason=warmup_reason,
+            random_state=random_state,
+            request_timestamp=datetime.datetime.fromisoformat(payload["timestamp"]),
+            id=len(self.actions) + 1,
+        )
+        self.actions.append(row)
+        self._action_keys.add(key)
+        self._actions_by_group[group_id].append(row)
+        self._pending[group_id].append(row)
+        if decision_type == "cp_message":
+            self._cp_counts[group_id] += 1
+        return 201, {
+            "status": "success",
+            "group_id": group_id,
+            "state": state,
+            "action": row.action,
+            "action_prob": row.action_prob,
+            "warmup": is_warmup,
+            "warmup_reason": warmup_reason,
+        }
+
+    def update(self) -> tuple[int, dict]:
+        self.derive_study_data()
+        records = []
+        current_index: dict[str, int] = {}
+        for row in sorted(
+            self.study_data,
+            key=lambda r: (r.decision_type, r.group_id, r.decision_idx),
+        ):
+            agent_idx = int(row.raw_context.get("agent_decision_index", row.decision_idx + 1))
+            records.append(
+                {
+                    "group_id": row.group_id,
+                    "decision_idx": row.decision_idx,
+                    "decision_type": row.decision_type,
+                    "agent_decision_index": agent_idx,
+                    "state": row.state if row.state is not None else [],
+                    "action": row.action,
+                    "reward": row.reward,
+                    "raw_context": row.raw_context,
+                    "outcome": row.outcome,
+                }
+            )
+            current_index[row.decision_type] = max(current_index.get(row.decision_type, 0), agent_idx)
+
+        status, new_parameters = self.rl_algorithm.update(
+            {"probability_of_action": self.probability_of_action},
+            {"records": records, "current_index": current_index},
+        )
+        self.update_count += 1
+        if not status:
+            return 500, {"status": "failed", "message": "Model update failed."}
+        self.probability_of_action = new_parameters["probability_of_action"]
+        return 202, {"status": "completed"}
+
+    # --------------------------------------------------------------- helpers
+
+    def _evaluate_warmup(self, group_id: str) -> tuple[bool, str | None]:
+        cohort_min = int(self.config.get("WARMUP_COHORT_MIN_DYADS", 5))
+        week1_cp = int(self.config.get("WARMUP_WEEK1_CP_DECISIONS", 6))
+        if len(self.groups) < cohort_min:
+            return True, "cohort"
+        if self._cp_counts[group_id] < week1_cp:
+            return True, "week1"
+        return False, None
+
+    def _draw_warmup_action(self) -> tuple[int, dict]:
+        if self.sampler is not None:
+            cursor_start = self.sampler.cursor()
+            action = int(self.sampler.draw_bernoulli(0.5))
+            cursor_end = self.sampler.cursor()
+            return action, {
+                "mode": "warmup",
+                "sampler_cursor_start": cursor_start,
+                "sampler_cursor_end": cursor_end,
+            }
+        return int(random.random() < 0.5), {"mode": "warmup"}
+
+    def derive_study_data(self) -> int:
+        """§5.3 pairing for every action still waiting on its outcome window."""
+        finalized = 0
+        for group_id in sorted(self._pending):
+            pending = self._pending[group_id]
+            if not pending:
+                continue
+            uploads = sorted(self.uploads[group_id], key=lambda u: (u.request_timestamp, u.id))
+            times = [u.request_timestamp for u in uploads]
+            still_pending = []
+            for action in sorted(pending, key=lambda a: (a.request_timestamp, a.id)):
+                uploads_after = uploads[bisect.bisect_right(times, action.request_timestamp):]
+                outcome_upload = _find_outcome_upload(action.decision_type, action, uploads_after)
+                if outcome_upload is None:
+                    still_pending.append(action)
+                    continue
+                outcome = outcome_from_snapshot(action.decision_type, outcome_upload.data)
+                action.outcome = outcome
+                action.reward = compute_reward(action.decision_type, action.action, outcome)
+                self.study_data.append(action)
+                finalized += 1
+            self._pending[group_id] = still_pending
+        return finalized
+
+
+def run_headless_simulation(
+    algorithm: str | None = None,
+    base_date: datetime.date | None = None,
+    num_weeks: int = 4,
+    num_dyads: int | None = None,
+    seed: int | None = 42,
+    group_prefix: str = "",
+    config_class: str = "config.TestingConfig",
+    config_overrides: dict | None = None,
+    verbose: bool = False,
+) -> HeadlessTrial:
+    """
+    Headless counterpart of ``run_simulation``: same event stream, same
+    upload-before-action timing, no Flask. Returns the finished trial; the
+    event counters (same keys as ``run_simulation``) are on ``trial.results``.
+    """
+    if base_date is None:
+        base_date = datetime.date(2025, 1, 5)
+    if num_dyads is None:
+        num_dyads = min(5, NUM_DYADS)
+
+    trial = HeadlessTrial(algorithm, config_class=config_class, config_overrides=config_overrides)
+    simulator = ProtocolTrialSimulator(
+        base_date=base_date,
+        num_weeks=num_weeks,
+        num_dyads=num_dyads,
+        seed=seed,
+        group_prefix=group_prefix,
+    )
+    results: dict[str, Any] = {"add_group": 0, "action": 0, "upload_data": 0, "update": 0, "errors": []}
+
+    for event in simulator.iter_schedule_events():
+        if event["type"] == "add_group":
+            status, body = trial.add_group(event["payload"])
+            if status == 201:
+                results["add_group"] += 1
+            else:
+                results["errors"].append({"type": "add_group", "status": status, "body": body})
+            continue
+
+        if event["type"] == "update":
+            status, body = trial.update()
+            if status == 202:
+                results["update"] += 1
+            else:
+                results["errors"].append({"type": "update", "status": status, "body": body})
+            continue
+
+        snapshot = simulator.build_snapshot(event)
+        status, body = trial.upload_data(
+            event["group_id"], _pre_action_timestamp(event["timestamp"]), snapshot
+        )
+        if status == 201:
+            results["upload_data"] += 1
+        else:
+            results["errors"].append({"type": "upload_data", "status": status, "body": body})
+
+        payload = simulator.build_action_payload(event)
+        status, body = trial.request_action(payload)
+        if status == 201:
+            results["action"] += 1
+            simulator.record_action(event, body)
+            if verbose:
+                print(
+                    f"[headless] action group_id={payload['group_id']} "
+                    f"decision_type={payload['decision_type']} "
+                    f"decision_idx={payload['decision_idx']} "
+                    f"action={body['action']} warmup={body['warmup']}"
+                )
+        else:
+            results["errors"].append({"type": "action", "status": status, "body": body})
+
+    trial.results = results
+    return trial
@@ -1,5 +1,8 @@
+import dataclasses
 from copy import deepcopy
 
+import app.routes.action as action_route
+from app.action_queries import fetch_decision_inputs
 from app.routes.action import check_fields
 from tests.conftest import register_group, upload
 
@@ -95,3 +98,18 @@ def test_request_action_rejects_duplicate_decision_index(client):
     assert first.status_code == 201
     assert second.status_code == 400
     assert "Decision index already exists" in second.json["message"]
+
+
+def test_concurrent_duplicate_is_rejected_by_the_insert(client, monkeypatch):
+    """A duplicate the pre-read missed (a racing request) loses on ON CONFLICT."""
+    register_group(client, "test_group_123")
+    upload(client, "test_group_123", "2026-01-06T08:00:00")
+    assert client.post("/api/v1/action", json=deepcopy(test_action_json)).status_code == 201
+
+    def stale_inputs(*args):
+        return dataclasses.replace(fetch_decision_inputs(*args), decision_exists=False)
+
+    monkeypatch.setattr(action_route, "fetch_decision_inputs", stale_inputs)
+    second = client.post("/api/v1/action", json=deepcopy(test_action_json))
+    assert second.status_code == 400
+    assert "Decision index already exists" in second.json["message"]
@@ -0,0 +1,41 @@
+from tests.benchmark_endpoints import compare_results, run_benchmark
+
+
+def test_run_benchmark_reports_latency_and_update_phases():
+    run = run_benchmark(num_dyads=6, num_weeks=2)
+    assert run["error_count"] == 0
+    assert run["endpoints"]["add_group"]["count"] == 6
+    assert run["endpoints"]["action_warmup"]["count"] > 0
+    assert run["endpoints"]["action_posterior"]["count"] > 0
+    for name in ("upload_data", "action_warmup"):
+        summary = run["endpoints"][name]
+        assert 0 < summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+    # Warm-up /action: one read of its inputs, one insert.
+    assert run["endpoints"]["action_warmup"]["statements_mean"] == 2
+    assert run["update"]["count"] == 2
+    assert "learner_update" in run["update"]["phases_mean_ms"]
+    assert [week["week"] for week in run["by_week"]] == [0, 1]
+
+
+def test_compare_results_flags_only_real_slowdowns():
+    def result(p50_ms, update_ms):
+        return {
+            "runs": [
+                {
+                    "num_dyads": 25,
+                    "num_weeks": 4,
+                    "cohort": "concurrent",
+                    "algorithm": "empirical_bayes",
+                    "database": "sqlite",
+                    "endpoints": {"action_posterior": {"p50_ms": p50_ms, "p95_ms": 10.0, "p99_ms": 12.0}},
+                    "update": {"phases_mean_ms": {"learner_update": update_ms}},
+                }
+            ]
+        }
+
+    baseline = result(p50_ms=5.0, update_ms=100.0)
+    assert compare_results(result(5.2, 100.0), baseline) == []
+    regressions = compare_results(result(5.0, 150.0), baseline)
+    assert [r["metric"] for r in regressions] == ["update.phase.learner_update_ms"]
+    # Relative jump on a tiny absolute value is noise, not a regression.
+    assert compare_results(result(0.3, 100.0), result(0.1, 100.0), min_delta_ms=0.5) == []
@@ -0,0 +1,31 @@
+from tests.benchmark_kernels import QUICK_SWEEP, compare_kernel_results, run_kernels
+
+
+def test_run_kernels_reports_time_and_peak_memory():
+    results = run_kernels(
+        QUICK_SWEEP, kernels=["phi", "shrink", "fit_local.eb_gradient"], repeat=1, min_round_s=0.001
+    )["results"]
+    kernels = {r["kernel"] for r in results}
+    assert kernels == {"phi", "shrink_to_hyperprior", "fit_local.eb_gradient"}
+    assert all(r["median_us"] > 0 and r["peak_kib"] > 0 for r in results)
+    fits = [r for r in results if r["kernel"] == "fit_local.eb_gradient"]
+    assert {r["params"]["trajectory_length"] for r in fits} == set(QUICK_SWEEP["trajectory_lengths"])
+
+
+def test_compare_kernel_results_flags_time_and_memory_regressions():
+    def result(median_us, peak_kib):
+        return {
+            "results": [
+                {
+                    "kernel": "shrink_to_hyperprior",
+                    "params": {"feature_dim": 16},
+                    "median_us": median_us,
+                    "peak_kib": peak_kib,
+                }
+            ]
+        }
+
+    baseline = result(200.0, 20.0)
+    assert compare_kernel_results(result(210.0, 21.0), baseline) == []
+    regressions = compare_kernel_results(result(400.0, 80.0), baseline)
+    assert [r["metric"] for r in regressions] == ["median_us", "peak_kib"]
@@ -0,0 +1,75 @@
+import datetime
+import logging
+
+import numpy as np
+
+from app.decision_log import DecisionLogFileHandler, load_decision_log
+
+
+def _emit(handler, **decision):
+    record = logging.LogRecord("RLDecisions", logging.INFO, __file__, 0, "decision", None, None)
+    record.decision = decision
+    handler.handle(record)
+
+
+def test_decision_log_round_trip(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    handler = DecisionLogFileHandler(path)
+    _emit(
+        handler,
+        group_id="dyad_01",
+        decision_type="cp_message",
+        decision_idx=0,
+        action=1,
+        prob=0.5,
+        random_state={
+            "mode": "warmup",
+            "sampler_cursor_start": {"normal": 0, "uniform": 3},
+            "sampler_cursor_end": {"normal": 0, "uniform": 4},
+        },
+        warmup=True,
+        warmup_reason="cohort",
+        request_timestamp=datetime.datetime(2026, 1, 5, 9, 0),
+        served_at=datetime.datetime(2026, 1, 5, 9, 0, 1),
+    )
+    _emit(
+        handler,
+        group_id="dyad_02",
+        decision_type="aya_message",
+        decision_idx=7,
+        action=0,
+        prob=0.7,
+        random_state={"mode": "smooth_logistic", "source": "posterior", "m": -0.3, "v": 0.02},
+        warmup=False,
+        warmup_reason=None,
+        request_timestamp=datetime.datetime(2026, 1, 20, 12, 0, tzinfo=datetime.timezone.utc),
+        served_at=None,
+    )
+    handler.close()
+
+    columns = load_decision_log(path)
+    assert list(columns["group_id"]) == ["dyad_01", "dyad_02"]
+    assert list(columns["mode"]) == ["warmup", "smooth_logistic"]
+    assert list(columns["source"]) == ["", "posterior"]
+    np.testing.assert_allclose(columns["pi"], [0.5, 0.3])
+    assert np.isnan(columns["m"][0]) and columns["m"][1] == -0.3
+    assert list(columns["warmup"]) == [True, False]
+    assert list(columns["cursor_uniform_end"]) == [4, -1]
+    assert columns["request_timestamp"][1] == np.datetime64("2026-01-20T12:00:00", "us")
+    assert np.isnat(columns["served_at"][1])
+
+
+def test_decision_log_recovers_from_partial_record(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    handler = DecisionLogFileHandler(path)
+    _emit(handler, group_id="g", decision_type="cp_message", decision_idx=0, action=0, prob=0.5)
+    handler.close()
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 10)  # crash mid-write
+
+    assert len(load_decision_log(path)["group_id"]) == 1
+
+    handler = DecisionLogFileHandler(path)
+    _emit(handler, group_id="g", decision_type="cp_message", decision_idx=1, action=1, prob=0.5)
+    handler.close()
+    assert list(load_decision_log(path)["decision_idx"]) == [0, 1]
@@ -104,6 +104,32 @@ class TestExhaustion:
             s.draw_uniform()
 
 
+class TestReservedWindow:
+    def test_reserve_skips_window_and_confine_draws_only_inside_it(self):
+        api = DeterministicSampleStream.fresh(20, 10, seed=1)
+        api.draw_uniform()
+        window = api.reserve(normals=3, uniforms=2)
+        assert window == {"normal": [0, 3], "uniform": [1, 3]}
+        assert api.cursor() == {"normal": 3, "uniform": 3}
+
+        worker = DeterministicSampleStream.fresh(20, 10, seed=1)
+        worker.confine(window)
+        reference = DeterministicSampleStream.fresh(20, 10, seed=1)
+        np.testing.assert_array_equal(worker.draw_normal(3), reference.draw_normal(3))
+        worker.draw_uniform()
+        worker.draw_uniform()
+        with pytest.raises(SampleBufferExhausted):
+            worker.draw_uniform()
+        # The API stream's next draw is past the window.
+        reference.draw_uniform()
+        reference.draw_uniform()
+        reference.draw_uniform()
+        assert api.draw_uniform() == reference.draw_uniform()
+
+        worker.restore({"normal": 3, "uniform": 3})
+        worker.draw_uniform()  # restore lifts the window's limit
+
+
 class TestPersistence:
     def test_save_load_round_trips_primitives_and_cursor(self):
         s = DeterministicSampleStream.fresh(100, 50, seed=9)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from tools import experiment_runner
+from tools.experiment_runner import Cell, run_experiment
+
+
+def test_cached_cells_are_reused_until_the_code_version_changes(tmp_path, monkeypatch):
+    cells = [Cell("empirical_bayes", seed=3, num_dyads=2, num_weeks=1)]
+
+    (first,) = run_experiment(cells, tmp_path, max_workers=1)
+    assert not first.cached and first.path.exists()
+    mtime = first.path.stat().st_mtime_ns
+
+    (again,) = run_experiment(cells, tmp_path, max_workers=1)
+    assert again.cached and again.path == first.path
+    assert again.path.stat().st_mtime_ns == mtime
+    for name, column in first.decisions.items():
+        np.testing.assert_array_equal(again.decisions[name], column)
+
+    # Overrides are part of the cell: a different config is a different key.
+    assert Cell("empirical_bayes", seed=3, num_dyads=2, num_weeks=1,
+                config_overrides={"SAMPLE_BUFFER_SEED": 1}).key() != cells[0].key()
+
+    # Editing a learner / simulator source changes code_version().
+    monkeypatch.setattr(experiment_runner, "_CODE_VERSION", "edited-source")
+    (recomputed,) = run_experiment(cells, tmp_path, max_workers=1)
+    assert not recomputed.cached and recomputed.path != first.path
+    np.testing.assert_array_equal(recomputed.decisions["action"], first.decisions["action"])
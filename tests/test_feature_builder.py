@@ -111,3 +111,20 @@ def test_dyad_game_uses_five_tailoring_vars():
     ]
     assert "aya_diary_summary" not in fb.variable_names
     assert "cp_diary_summary" not in fb.variable_names
+
+
+def test_feature_builder_registry_and_cached_prior():
+    from app.algorithms.empirical_bayes import _prior_covariance, _prior_precision
+    from app.feature_builder import feature_builder, tailoring_mask
+
+    fb = feature_builder("cp_message")
+    assert feature_builder("cp_message") is fb
+    assert ProtocolRLFeatureBuilder.for_decision_type("cp_message") is fb
+    assert tailoring_mask("cp_message") is fb.tailoring_mask
+    assert fb.main_block == slice(0, 3 + fb.n_vars)
+    assert fb.interaction_block.stop == fb.phi_dim
+
+    cov = _prior_covariance("cp_message")
+    assert cov is _prior_covariance("cp_message")
+    assert not cov.flags.writeable and not fb.tailoring_mask.flags.writeable
+    assert np.allclose(cov @ _prior_precision("cp_message"), np.eye(fb.phi_dim))
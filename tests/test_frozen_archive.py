@@ -0,0 +1,109 @@
+import numpy as np
+
+from app.algorithms.empirical_bayes import EB_REFRESH_EVERY, ThreeAgentEmpiricalBayesAlgorithm
+from app.deterministic_sampler import DeterministicSampleStream
+from app.frozen_archive import FrozenFits
+from app.repository import InMemoryRepository
+from tests.benchmark_kernels import make_records, sample_contexts
+
+
+def _learner(repo):
+    return ThreeAgentEmpiricalBayesAlgorithm(
+        seed=1,
+        sampler=DeterministicSampleStream.fresh(n_normals=1_000, n_uniforms=100, seed=3),
+        repository=repo,
+    )
+
+
+def test_frozen_dyad_is_skipped_but_still_pooled():
+    # dyad_game (γ = 0): an unfrozen clean dyad's fit stands too, so the
+    # archived fit must pool exactly like it. Its hyperprior is refreshed
+    # on every EB_REFRESH_EVERY["dyad_game"]-th update.
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)["dyad_game"]
+    rng = np.random.default_rng(0)
+    trajectories = {
+        gid: make_records(contexts, "dyad_game", 8, gid, rng) for gid in ("d1", "d2", "d3")
+    }
+
+    def records(lengths, skip=()):
+        return [
+            r
+            for gid, rows in trajectories.items()
+            if gid not in skip
+            for r in rows[: lengths[gid]]
+        ]
+
+    first = {"d1": 4, "d2": 4, "d3": 4}
+    second = {"d1": 4, "d2": 8, "d3": 4}
+    history = [first] + [second] * (EB_REFRESH_EVERY["dyad_game"] - 1)
+
+    frozen_repo = InMemoryRepository()
+    frozen_learner = _learner(frozen_repo)
+    ok, _ = frozen_learner.update(
+        {"probability_of_action": 0.5},
+        {"records": records(first), "freeze_group_ids": {"d1"}},
+    )
+    assert ok
+    archive = frozen_repo.load_frozen_fits("dyad_game")
+    assert isinstance(archive, FrozenFits)
+    assert archive.group_ids.tolist() == ["d1"]
+    d1_fit = frozen_repo.load_latest_snapshot("local_fit", "dyad_game", group_id="d1")
+    np.testing.assert_array_equal(archive.theta[0], np.asarray(d1_fit.theta))
+
+    # /update no longer loads d1's rows; stray ones are ignored all the same.
+    ok, _ = frozen_learner.update(
+        {"probability_of_action": 0.5}, {"records": records(second, skip={"d1"})}
+    )
+    assert ok
+    for lengths in history[2:]:
+        ok, _ = frozen_learner.update(
+            {"probability_of_action": 0.5}, {"records": records(lengths)}
+        )
+        assert ok
+    assert len(list(frozen_repo.iter_snapshots("local_fit", "dyad_game"))) == 4
+
+    # Same history without the archive: the frozen fit pools identically.
+    plain_repo = InMemoryRepository()
+    plain_learner = _learner(plain_repo)
+    for lengths in history:
+        ok, _ = plain_learner.update({"probability_of_action": 0.5}, {"records": records(lengths)})
+        assert ok
+
+    frozen_hyper = frozen_repo.load_latest_snapshot("hyper", "dyad_game")
+    plain_hyper = plain_repo.load_latest_snapshot("hyper", "dyad_game")
+    assert frozen_hyper.metadata_json["frozen_groups"] == 1
+    assert frozen_hyper.metadata_json["active_groups"] == 2
+    np.testing.assert_allclose(frozen_hyper.theta, plain_hyper.theta, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(
+        frozen_hyper.covariance, plain_hyper.covariance, rtol=1e-10, atol=1e-12
+    )
+
+
+def test_discounted_agents_do_not_freeze():
+    # cp_message (γ > 0): a completed dyad's LSVI fit keeps moving with the
+    # value estimate, so asking to freeze it must change nothing.
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)["cp_message"]
+    rng = np.random.default_rng(0)
+    records = [
+        r
+        for gid in ("d1", "d2", "d3")
+        for r in make_records(contexts, "cp_message", 8, gid, rng)
+    ]
+
+    frozen_repo, plain_repo = InMemoryRepository(), InMemoryRepository()
+    frozen_learner, plain_learner = _learner(frozen_repo), _learner(plain_repo)
+    assert "cp_message" not in frozen_learner.frozen_decision_types()
+    for update in range(3):
+        freeze = {"freeze_group_ids": {"d1"}} if update == 0 else {}
+        ok, _ = frozen_learner.update(
+            {"probability_of_action": 0.5}, {"records": records, **freeze}
+        )
+        assert ok
+        ok, _ = plain_learner.update({"probability_of_action": 0.5}, {"records": records})
+        assert ok
+
+    assert frozen_repo.load_frozen_fits("cp_message") is None
+    frozen_hyper = frozen_repo.load_latest_snapshot("hyper", "cp_message")
+    plain_hyper = plain_repo.load_latest_snapshot("hyper", "cp_message")
+    np.testing.assert_array_equal(frozen_hyper.theta, plain_hyper.theta)
+    np.testing.assert_array_equal(frozen_hyper.covariance, plain_hyper.covariance)
@@ -0,0 +1,51 @@
+"""
+Parity tests for the headless simulation engine.
+
+The headless engine must reproduce the Flask-backed replay decision for
+decision — same actions, probabilities and sampler cursors — for the same
+simulator seed and config.
+"""
+
+import pytest
+
+from app import create_app, db
+from app.models import Action, ModelParameters
+from config import TestingConfig
+from tests.headless_simulation import run_headless_simulation
+from tests.simulate_adapts_hct import run_simulation
+
+
+def _decision_rows(rows):
+    return [
+        (r.group_id, r.decision_type, r.decision_idx, r.action, r.action_prob, r.random_state)
+        for r in rows
+    ]
+
+
+@pytest.mark.parametrize("algorithm", ["empirical_bayes", "hybrid_rel_pool"])
+def test_headless_matches_flask_decisions(monkeypatch, algorithm):
+    monkeypatch.setattr(TestingConfig, "RL_ALGORITHM", algorithm)
+    app = create_app("config.TestingConfig")
+    with app.app_context():
+        results = run_simulation(app.test_client(), num_weeks=5, num_dyads=6)
+        flask_rows = _decision_rows(Action.query.order_by(Action.id.asc()).all())
+        flask_posteriors = ModelParameters.query.filter_by(snapshot_type="posterior").count()
+        db.session.remove()
+        db.drop_all()
+
+    trial = run_headless_simulation(algorithm, num_weeks=5, num_dyads=6)
+
+    assert results["errors"] == []
+    assert trial.results["errors"] == []
+    assert {k: trial.results[k] for k in ("add_group", "action", "upload_data", "update")} == {
+        k: results[k] for k in ("add_group", "action", "upload_data", "update")
+    }
+    assert _decision_rows(trial.actions) == flask_rows
+    assert sum(1 for _ in trial.repository.iter_snapshots("posterior")) == flask_posteriors
+    # The run must leave warm-up, otherwise parity is only checking the gate.
+    assert any(not row.is_warmup for row in trial.actions)
+
+
+def test_headless_rejects_unknown_algorithm():
+    with pytest.raises(ValueError):
+        run_headless_simulation("thompson_sampling", num_weeks=1, num_dyads=1)
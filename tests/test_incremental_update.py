@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+from app.algorithms import empirical_bayes, inf_lsvi_pool
+from app.algorithms.empirical_bayes import ThreeAgentEmpiricalBayesAlgorithm
+from app.algorithms.inf_lsvi_pool import ThreeAgentInfLsviPooledAlgorithm
+from app.deterministic_sampler import DeterministicSampleStream
+from app.repository import InMemoryRepository
+from tests.benchmark_kernels import make_records, sample_contexts
+
+
+def _count(repo, snapshot_type, decision_type="dyad_game"):
+    return sum(1 for _ in repo.iter_snapshots(snapshot_type, decision_type))
+
+
+def _fresh_learner(cls, repo):
+    return cls(
+        seed=1,
+        sampler=DeterministicSampleStream.fresh(n_normals=1_000, n_uniforms=100, seed=3),
+        repository=repo,
+    )
+
+
+def test_update_refits_only_dirty_dyads():
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)["dyad_game"]
+    rng = np.random.default_rng(0)
+    trajectories = {
+        gid: make_records(contexts, "dyad_game", 8, gid, rng) for gid in ("d1", "d2", "d3")
+    }
+    repo = InMemoryRepository()
+    learner = _fresh_learner(ThreeAgentEmpiricalBayesAlgorithm, repo)
+
+    def update(lengths):
+        records = [r for gid, rows in trajectories.items() for r in rows[: lengths[gid]]]
+        ok, _ = learner.update({"probability_of_action": 0.5}, {"records": records})
+        assert ok
+
+    update({"d1": 4, "d2": 4, "d3": 4})
+    assert (_count(repo, "local_fit"), _count(repo, "posterior"), _count(repo, "hyper")) == (3, 3, 1)
+
+    # No new finalized rows: nothing is refit, the hyperprior does not move.
+    update({"d1": 4, "d2": 4, "d3": 4})
+    assert (_count(repo, "local_fit"), _count(repo, "posterior"), _count(repo, "hyper")) == (3, 3, 1)
+
+    # Only d2 has new rows: one refit.
+    update({"d1": 4, "d2": 8, "d3": 4})
+    assert _count(repo, "local_fit") == 4
+    assert repo.load_latest_snapshot("local_fit", "dyad_game", group_id="d2").sample_size == 8
+
+
+@pytest.mark.parametrize(
+    "module, skip, cls",
+    [
+        (empirical_bayes, "is_clean_dyad", ThreeAgentEmpiricalBayesAlgorithm),
+        (inf_lsvi_pool, "is_clean_fit", ThreeAgentInfLsviPooledAlgorithm),
+    ],
+)
+def test_discounted_agents_iterate_on_unchanged_rows(monkeypatch, module, skip, cls):
+    """
+    With γ > 0 every update is one more value-iteration step, so unchanged
+    rows are still refit: the fits match a learner that never skips.
+    """
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)
+    rng = np.random.default_rng(0)
+    records = [
+        record
+        for decision_type in ("aya_message", "cp_message")
+        for gid in ("d1", "d2", "d3")
+        for record in make_records(contexts[decision_type], decision_type, 14, gid, rng)
+    ]
+
+    def run():
+        repo = InMemoryRepository()
+        learner = _fresh_learner(cls, repo)
+        for _ in range(3):
+            ok, _ = learner.update({"probability_of_action": 0.5}, {"records": list(records)})
+            assert ok
+        return {
+            (snapshot_type, decision_type): [
+                (s.group_id, s.agent_decision_index, s.theta)
+                for s in repo.iter_snapshots(snapshot_type, decision_type)
+            ]
+            for snapshot_type in ("local_fit", "posterior")
+            for decision_type in ("aya_message", "cp_message")
+        }
+
+    incremental = run()
+    monkeypatch.setattr(module, skip, lambda *args: False)
+    refit_every_update = run()
+    assert incremental == refit_every_update
+    fits = incremental[("local_fit", "aya_message")]
+    assert len(fits) == 3 * len({group_id for group_id, _, _ in fits})
+    assert fits[0][2] != fits[-1][2]
+
+
+def test_pooled_fit_extends_persisted_running_sums():
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)["dyad_game"]
+    rng = np.random.default_rng(0)
+    trajectories = {
+        gid: make_records(contexts, "dyad_game", 8, gid, rng) for gid in ("d1", "d2", "d3")
+    }
+
+    def learner():
+        repo = InMemoryRepository()
+        return repo, ThreeAgentInfLsviPooledAlgorithm(
+            seed=1,
+            sampler=DeterministicSampleStream.fresh(n_normals=1_000, n_uniforms=100, seed=3),
+            repository=repo,
+        )
+
+    def update(learner, length):
+        records = [r for rows in trajectories.values() for r in rows[:length]]
+        ok, _ = learner.update({"probability_of_action": 0.5}, {"records": records})
+        assert ok
+
+    repo, incremental = learner()
+    update(incremental, 4)
+    update(incremental, 8)
+    gram = repo.load_latest_snapshot("pooled_gram", "dyad_game")
+    assert gram.sample_size == 24
+    last = trajectories["d2"][-1]
+    assert gram.metadata_json["dyads"]["d2"] == [
+        8, last["agent_decision_index"], last["decision_idx"]
+    ]
+
+    fresh_repo, fresh = learner()
+    update(fresh, 8)
+    # Same sums up to summation order; the fit inherits that rounding
+    # through an ill-conditioned solve.
+    expected_gram = fresh_repo.load_latest_snapshot("pooled_gram", "dyad_game")
+    assert np.allclose(gram.covariance, expected_gram.covariance, rtol=1e-13)
+    assert np.allclose(gram.theta, expected_gram.theta, rtol=1e-13)
+    fit = repo.load_latest_snapshot("local_fit", "dyad_game")
+    expected = fresh_repo.load_latest_snapshot("local_fit", "dyad_game")
+    assert fit.sample_size == expected.sample_size == 24
+    assert np.allclose(fit.theta, expected.theta, rtol=1e-6, atol=1e-9)
+
+
+def test_pooled_fit_rebuilds_when_rows_change_below_the_mark():
+    contexts = sample_contexts(num_dyads=2, num_weeks=3)["dyad_game"]
+    rng = np.random.default_rng(0)
+    trajectories = {
+        gid: make_records(contexts, "dyad_game", 8, gid, rng) for gid in ("d1", "d2", "d3")
+    }
+    # d1 loses an already-folded row before the second update.
+    later = [r for rows in trajectories.values() for r in rows if r is not trajectories["d1"][1]]
+
+    def fit(*batches):
+        repo = InMemoryRepository()
+        learner = _fresh_learner(ThreeAgentInfLsviPooledAlgorithm, repo)
+        for records in batches:
+            ok, _ = learner.update({"probability_of_action": 0.5}, {"records": records})
+            assert ok
+        return repo.load_latest_snapshot("pooled_gram", "dyad_game")
+
+    gram = fit([r for rows in trajectories.values() for r in rows[:4]], later)
+    expected = fit(later)
+    assert gram.sample_size == expected.sample_size == 23
+    assert np.allclose(gram.covariance, expected.covariance, rtol=1e-13)
+    assert np.allclose(gram.theta, expected.theta, rtol=1e-13)
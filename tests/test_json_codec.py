@@ -0,0 +1,86 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+from app.json_codec import column_dumps, fast_loads, resolve_codec
+from tests.conftest import register_group, upload
+
+
+def test_fast_loads_matches_stdlib_and_falls_back():
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [rng.normal(size=500), rng.normal(size=200) * 1e-300, rng.normal(size=200) * 1e300]
+    ).tolist()
+    encoded = json.dumps({"x": values, "big": 2**70, "s": "ünïcode"})
+    assert fast_loads(encoded) == json.loads(encoded)
+    # orjson rejects NaN; the stdlib encoder writes it.
+    assert math.isnan(fast_loads(json.dumps([float("nan")]))[0])
+    # Columns accept numpy directly, encoded as the stdlib encodes the list.
+    theta = rng.normal(size=4)
+    assert column_dumps({"theta": theta}) == json.dumps({"theta": theta.tolist()})
+
+
+@pytest.fixture
+def codec_clients():
+    apps = {
+        codec: create_app("config.TestingConfig", overrides={"JSON_CODEC": codec})
+        for codec in ("stdlib", "orjson")
+    }
+    yield {codec: app.test_client() for codec, app in apps.items()}
+    for app in apps.values():
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def test_codecs_store_identical_column_text(codec_clients):
+    assert resolve_codec("orjson") == "orjson"
+    stored, bodies = {}, {}
+    for codec, client in codec_clients.items():
+        assert client.application.json_codec == codec
+        register_group(client, "dyad_000")
+        upload(client, "dyad_000", "2026-01-06T08:00:00", aya_app_burden=1e-7, cp_app_burden=1e16)
+        response = client.post(
+            "/api/v1/action",
+            json={
+                "group_id": "dyad_000",
+                "timestamp": "2026-01-06T09:00:00",
+                "decision_idx": 0,
+                "decision_type": "aya_message",
+            },
+        )
+        bodies[codec] = json.loads(response.data)
+        with client.application.app_context():
+            stored[codec] = [
+                tuple(row)
+                for row in db.session.execute(
+                    text(
+                        "SELECT data_uploads.data, actions.raw_context, actions.random_state "
+                        "FROM data_uploads, actions"
+                    )
+                )
+            ]
+    assert stored["orjson"] == stored["stdlib"]
+    assert "1e-07" in stored["orjson"][0][0]
+    for body in bodies.values():
+        body.pop("rid"), body.pop("timestamp")
+    assert bodies["orjson"] == bodies["stdlib"]
+
+
+def test_orjson_responses_keep_non_finite_floats(codec_clients):
+    app = codec_clients["orjson"].application
+    payload = {"nan": float("nan"), "inf": np.array([1.0, np.inf]), "none": None}
+    with app.test_request_context():
+        assert app.json.dumps(payload) == json.dumps(
+            {"inf": [1.0, float("inf")], "nan": float("nan"), "none": None}
+        )
+        body = app.json.response(payload).get_data(as_text=True)
+        # Finite bodies stay on orjson, nulls included.
+        finite = app.json.response({"x": 1e-7, "none": None}).get_data(as_text=True)
+    decoded = json.loads(body)
+    assert math.isnan(decoded["nan"]) and decoded["inf"] == [1.0, float("inf")]
+    assert "1e-7" in finite and "null" in finite
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.algorithms.empirical_bayes import MIN_COV_JITTER, shrink_to_hyperprior
+from app.algorithms.linalg_kernels import (
+    KERNEL_RTOL,
+    gaussian_product,
+    psd_project,
+    spd_inverse_logdet,
+)
+
+
+def _covariances(n, d, seed=0):
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(n, d, d + 3))
+    return a @ np.swapaxes(a, 1, 2) / d + 1e-3 * np.eye(d)
+
+
+def _close(actual, expected):
+    scale = max(1.0, float(np.max(np.abs(expected))))
+    return float(np.max(np.abs(actual - expected))) <= KERNEL_RTOL * scale
+
+
+def _legacy_stabilize(cov):
+    cov = (cov + cov.T) / 2.0
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    return eigvecs @ np.diag(np.maximum(eigvals, MIN_COV_JITTER)) @ eigvecs.T
+
+
+def test_batched_kernels_match_per_matrix_inversion():
+    covs = _covariances(6, 9)
+    covs[0] -= 2.0 * np.eye(9)  # not PSD: the projection floors it
+    projected, precision = psd_project(covs, MIN_COV_JITTER, return_precision=True)
+    for i in range(len(covs)):
+        assert _close(projected[i], _legacy_stabilize(covs[i]))
+        assert _close(precision[i], np.linalg.inv(projected[i]))
+
+    inverse, logdet = spd_inverse_logdet(projected[1:])
+    assert _close(inverse, np.linalg.inv(projected[1:]))
+    assert np.allclose(logdet, np.linalg.slogdet(projected[1:])[1])
+
+
+def test_stacked_shrinkage_matches_single_dyad():
+    rng = np.random.default_rng(1)
+    local_covs = _covariances(5, 7)
+    local_thetas = rng.normal(size=(5, 7))
+    eb_cov, eb_mean = _covariances(1, 7, seed=2)[0], rng.normal(size=7)
+
+    means, covs = shrink_to_hyperprior(local_thetas, local_covs, eb_mean, eb_cov)
+    for i in range(5):
+        local, eb = _legacy_stabilize(local_covs[i]), _legacy_stabilize(eb_cov)
+        post_cov = np.linalg.inv(np.linalg.inv(local) + np.linalg.inv(eb))
+        post_mean = post_cov @ (np.linalg.inv(local) @ local_thetas[i] + np.linalg.inv(eb) @ eb_mean)
+        assert _close(means[i], post_mean)
+        assert _close(covs[i], _legacy_stabilize(post_cov))
+        single = gaussian_product(local_thetas[i], np.linalg.inv(local), eb_mean, np.linalg.inv(eb))
+        assert _close(single[0], post_mean)
@@ -0,0 +1,31 @@
+import logging
+import queue
+
+from app.logging_config import DropCountingQueueHandler, get_rl_logger
+
+
+def test_get_rl_logger_attaches_one_handler():
+    logger = get_rl_logger()
+    get_rl_logger()
+    get_rl_logger()
+    queued = [h for h in logger.handlers if isinstance(h, DropCountingQueueHandler)]
+    assert len(queued) == 1
+    assert not any(isinstance(h, logging.FileHandler) for h in logger.handlers)
+
+
+def test_full_queue_drops_and_counts():
+    handler = DropCountingQueueHandler(queue.Queue(maxsize=1), block_timeout_s=0.0)
+    logger = logging.getLogger("test_logging_config.full_queue")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(3):
+            logger.info("line %d", i)
+        logger.error("still bounded")
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 3
+    assert handler.queue.get_nowait().getMessage() == "line 0"
@@ -0,0 +1,65 @@
+"""
+/api/v1/metrics: Prometheus text exposition of request, DB, commit,
+sampler-lock and learner timings plus decision counters. Labels carry the
+endpoint rule and decision_type only — never group_id or payload values.
+"""
+
+from app.metrics import Histogram
+from tests.conftest import register_group, upload
+
+
+def _action(client, group_id, idx, decision_type="aya_message"):
+    return client.post(
+        "/api/v1/action",
+        json={
+            "group_id": group_id,
+            "timestamp": "2026-01-06T09:00:00",
+            "decision_idx": idx,
+            "decision_type": decision_type,
+        },
+    )
+
+
+def test_metrics_endpoint_reports_request_phases_and_decisions(client):
+    for i in range(1, 6):
+        assert register_group(client, f"dyad_secret_{i:03d}").status_code == 201
+    assert upload(client, "dyad_secret_001", "2026-01-06T08:30:00").status_code == 201
+    assert _action(client, "dyad_secret_001", 0).status_code == 201
+    assert _action(client, "dyad_secret_001", 0, "cp_message").status_code == 201
+
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+
+    assert 'rl_api_request_duration_seconds_count{endpoint="/api/v1/add_group",decision_type=""} 5' in text
+    assert (
+        'rl_api_request_duration_seconds_count{endpoint="/api/v1/action",decision_type="aya_message"} 1'
+        in text
+    )
+    assert 'rl_api_db_duration_seconds_count{endpoint="/api/v1/upload_data",decision_type=""} 1' in text
+    assert 'rl_api_commit_duration_seconds_count{endpoint="/api/v1/action",decision_type="cp_message"} 1' in text
+    assert 'rl_api_sampler_lock_wait_seconds_count{endpoint="/api/v1/action"' in text
+    assert 'rl_api_decisions_total{decision_type="aya_message",path="warmup",warmup_reason="week1"} 1' in text
+    assert 'rl_api_decisions_total{decision_type="cp_message",path="warmup",warmup_reason="week1"} 1' in text
+    # No PHI: group ids never appear as label values.
+    assert "dyad_secret" not in text
+    assert "aya_dyad" not in text
+
+
+def test_db_time_is_measured_inside_requests(client, app):
+    register_group(client, "dyad_001")
+    assert app.metrics.db_duration.count(endpoint="/api/v1/add_group", decision_type="") == 1
+    series = app.metrics.db_duration._series[("/api/v1/add_group", "")]
+    assert series[-1] > 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h_seconds", "test", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, endpoint="/x")
+    lines = histogram.render()
+    assert 'h_seconds_bucket{endpoint="/x",le="0.1"} 2' in lines
+    assert 'h_seconds_bucket{endpoint="/x",le="1"} 3' in lines
+    assert 'h_seconds_bucket{endpoint="/x",le="+Inf"} 4' in lines
+    assert 'h_seconds_count{endpoint="/x"} 4' in lines
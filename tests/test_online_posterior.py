@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+
+from app import create_app, db
+from app.algorithms.empirical_bayes import SIGMA_NOISE, _prior_covariance, _prior_precision
+from app.feature_builder import feature_builder
+from app.models import Action, DataUpload, ModelParameters
+from app.online_posterior import ONLINE_FOLD, OnlinePosteriorStore, apply_online_updates
+from app.update_worker import notify_policy_updated
+from tests.conftest import register_group, upload
+from tools.reproduce_run import _ReplayFolds
+
+
+@pytest.fixture
+def online_client():
+    app = create_app("config.TestingConfig", overrides={"ONLINE_POSTERIOR_UPDATES": True})
+    yield app.test_client()
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _prior():
+    dim = feature_builder("cp_message").phi_dim
+    return ("prior", None), np.zeros(dim), _prior_covariance("cp_message")
+
+
+def _action(client, idx, ts):
+    return client.post(
+        "/api/v1/action",
+        json={
+            "group_id": "dyad_000",
+            "timestamp": ts,
+            "decision_idx": idx,
+            "decision_type": "cp_message",
+        },
+    )
+
+
+def test_uploads_fold_finalized_rewards_like_a_batch_refit(online_client):
+    client, app = online_client, online_client.application
+    store = app.online_posteriors
+    for i in range(5):
+        register_group(client, f"dyad_{i:03d}")
+    # Each morning upload closes the previous day's cp_message outcome window.
+    for day in range(8):
+        upload(
+            client,
+            "dyad_000",
+            f"2026-01-{6 + day:02d}T08:00:00",
+            day_in_study=day + 1,
+            cp_app_burden=0.1 * day,
+            daily_diary_completed=day % 2 == 0,
+            daily_diary_score=float(day),
+        )
+        _action(client, day, f"2026-01-{6 + day:02d}T09:05:00")
+
+    with app.app_context():
+        entry = store.get("cp_message", "dyad_000", *_prior())
+        assert entry is not None
+        assert entry.applied == frozenset(range(7))
+
+        # Folding one reward at a time equals the Bayesian linear regression
+        # on the same rows from the prior (no update has run yet).
+        fb = feature_builder("cp_message")
+        actions = Action.query.filter_by(decision_type="cp_message").order_by(Action.decision_idx)
+        x = np.vstack([fb.phi(a.raw_context, int(a.action)) for a in actions][:7])
+        # Decision d is rewarded by upload d + 1's diary (scored on even days).
+        y = np.array([float(day) if day % 2 == 0 else 0.0 for day in range(1, 8)])
+        precision = _prior_precision("cp_message") + x.T @ x / SIGMA_NOISE**2
+        cov = np.linalg.inv(precision)
+        mean = cov @ (x.T @ y) / SIGMA_NOISE**2
+        np.testing.assert_allclose(entry.covariance, cov, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(entry.mean, mean, rtol=1e-9, atol=1e-12)
+
+        # The post-warm-up decision was drawn from the folded posterior.
+        last = Action.query.filter_by(decision_type="cp_message", decision_idx=7).one()
+        assert last.random_state["online_version"] == entry.version
+
+        # A completed update drops the folds; the refit is authoritative.
+        notify_policy_updated(app, "u1")
+        assert len(store) == 0
+        assert store.agent_version("cp_message") == 0
+        assert store.get("cp_message", "dyad_000", *_prior()) is None
+
+
+def test_folds_outlive_the_process_and_replay_from_random_state(online_client):
+    client, app = online_client, online_client.application
+    for i in range(5):
+        register_group(client, f"dyad_{i:03d}")
+    for day in range(8):
+        upload(
+            client,
+            "dyad_000",
+            f"2026-01-{6 + day:02d}T08:00:00",
+            day_in_study=day + 1,
+            daily_diary_completed=day % 2 == 0,
+            daily_diary_score=float(day),
+        )
+        _action(client, day, f"2026-01-{6 + day:02d}T09:05:00")
+
+    with app.app_context():
+        entry = app.online_posteriors.get("cp_message", "dyad_000", *_prior())
+        # A restarted (or second) API process reads the same folds.
+        restarted = OnlinePosteriorStore(app).get("cp_message", "dyad_000", *_prior())
+        assert restarted.version == entry.version and restarted.applied == entry.applied
+        np.testing.assert_array_equal(restarted.mean, entry.mean)
+        np.testing.assert_array_equal(restarted.covariance, entry.covariance)
+
+        # One small row per fold; decisions log only the newest row id.
+        folds = ModelParameters.query.filter_by(snapshot_type=ONLINE_FOLD).all()
+        assert len(folds) == 7 and all(row.covariance is None for row in folds)
+        last = Action.query.filter_by(decision_type="cp_message", decision_idx=7).one()
+        assert last.random_state["online_version"] == entry.version
+        assert "online_mean" not in last.random_state
+        state, logged = last.state, dict(last.random_state)
+        logged_prob = last.action_prob if last.action == 1 else 1.0 - last.action_prob
+        rows = [
+            {
+                "id": row.id,
+                "snapshot_type": row.snapshot_type,
+                "decision_type": row.decision_type,
+                "group_id": row.group_id,
+                "theta": row.theta,
+                "metadata_json": row.metadata_json,
+            }
+            for row in folds
+        ]
+
+    # tools/reproduce_run.py replays against a fresh app from the fold rows.
+    replay = create_app("config.TestingConfig")
+    with replay.app_context():
+        prob, _ = replay.rl_algorithm.prepare_action("dyad_000", state, {}, "cp_message", 7)
+        assert prob != logged_prob
+        replay.online_posteriors = _ReplayFolds(rows)
+        replay.online_posteriors.version = logged["online_version"]
+        prob, random_state = replay.rl_algorithm.prepare_action(
+            "dyad_000", state, {}, "cp_message", 7
+        )
+        assert prob == logged_prob
+        assert random_state["online_version"] == logged["online_version"]
+        db.drop_all()
+
+
+def test_failed_fold_rolls_back_the_session(online_client, monkeypatch):
+    client, app = online_client, online_client.application
+    for i in range(5):
+        register_group(client, f"dyad_{i:03d}")
+    upload(client, "dyad_000", "2026-01-06T08:00:00", day_in_study=1)
+    _action(client, 0, "2026-01-06T09:05:00")
+    upload(client, "dyad_000", "2026-01-07T08:00:00", day_in_study=2)
+    _action(client, 1, "2026-01-07T09:05:00")
+
+    online_update = app.rl_algorithm.online_update
+
+    def fold_then_fail(*args):
+        online_update(*args)
+        raise RuntimeError("fold failed")
+
+    monkeypatch.setattr(app.rl_algorithm, "online_update", fold_then_fail)
+    with app.app_context():
+        ModelParameters.query.filter_by(snapshot_type=ONLINE_FOLD).delete()
+        db.session.commit()
+        upload_id = db.session.query(db.func.max(DataUpload.id)).scalar()
+        assert apply_online_updates(app, upload_id) == 0
+        # The flushed fold is rolled back and the session is usable again.
+        assert len(app.online_posteriors) == 0
+        assert app.online_posteriors.get("cp_message", "dyad_000", *_prior()) is None
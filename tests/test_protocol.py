@@ -3,11 +3,18 @@
 import pytest
 
 from app.protocol import (
+    _FAILURE_CONDITIONS,
+    _validate_field,
     CONTEXT_SCHEMAS,
+    SNAPSHOT_SCHEMA,
+    compile_validator,
     compute_reward,
     validate_context,
     validate_outcome,
+    validate_snapshot,
+    validate_snapshots,
 )
+from tests.conftest import full_snapshot
 
 
 class TestRewardAYA:
@@ -114,3 +121,55 @@ class TestContextSchemas:
         ok, msg = validate_context("dyad_game", ctx)
         assert not ok
         assert "prior_game_action" in msg
+
+
+class TestCompiledValidators:
+    """The generated validators agree with ``_validate_field``, message for message."""
+
+    VALUES = (
+        None, "miss", "am", "pm", "x", 0, 1, 2, 4, 5, -1, 0.5, 1.5, -0.1,
+        float("nan"), True, False, [], {"mood": 1, "physical": "miss"}, {"mood": "a"},
+    )
+
+    @pytest.mark.parametrize("field_type", [*_FAILURE_CONDITIONS, "diary_block", "bogus"])
+    def test_each_field_type_matches_the_reference(self, field_type):
+        check = compile_validator(
+            {"f": field_type},
+            not_dict_message="not a dict",
+            required_message="{} is required.",
+            error_prefix="{}: ",
+        )
+        for value in self.VALUES:
+            try:
+                expected = _validate_field(field_type, value)
+            except TypeError:  # unhashable value against a set of choices
+                with pytest.raises(TypeError):
+                    check({"f": value})
+                continue
+            ok, message = expected
+            assert check({"f": value}) == (ok, "" if ok else f"f: {message}")
+
+    def test_snapshot_errors_keep_their_order(self):
+        snapshot = full_snapshot()
+        assert validate_snapshot(snapshot) == (True, "")
+        assert validate_snapshot([]) == (False, "data must be a dictionary.")
+        assert validate_snapshot({**snapshot, "extra": 1, "slot": "x"}) == (
+            False,
+            "unknown field 'extra'.",
+        )
+        # A missing key does not mask an invalid field listed before it.
+        first, last = list(SNAPSHOT_SCHEMA)[0], list(SNAPSHOT_SCHEMA)[-1]
+        partial = {k: v for k, v in snapshot.items() if k != last}
+        assert validate_snapshot({**partial, first: -1}) == (
+            False,
+            f"{first}: must be a positive integer.",
+        )
+        assert validate_snapshot(partial) == (False, f"{last} is required (full snapshot).")
+        assert validate_snapshots([snapshot, partial]) == [
+            (True, ""),
+            (False, f"{last} is required (full snapshot)."),
+        ]
+        assert validate_outcome("cp_message", {"daily_diary_completed": True}) == (
+            False,
+            "Invalid outcome for cp_message. daily_diary_score is required.",
+        )
@@ -0,0 +1,98 @@
+import pytest
+
+from app import create_app, db
+from app.models import ModelUpdateRequests
+from app.update_worker import notify_policy_updated
+from tests.conftest import register_group, upload
+
+
+@pytest.fixture
+def make_client():
+    apps = []
+
+    def _make(**overrides):
+        app = create_app("config.TestingConfig", overrides=overrides)
+        apps.append(app)
+        return app.test_client()
+
+    yield _make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+
+def _action(client, group_id, decision_type, idx, ts):
+    return client.post(
+        "/api/v1/action",
+        json={
+            "group_id": group_id,
+            "timestamp": ts,
+            "decision_idx": idx,
+            "decision_type": decision_type,
+        },
+    )
+
+
+def _run(client, aya_idx=0):
+    """Past both warm-up gates, then one aya_message and one cp_message decision."""
+    for i in range(5):
+        register_group(client, f"dyad_{i:03d}")
+    for day in range(6):
+        upload(client, "dyad_000", f"2026-01-{6 + day:02d}T08:00:00", day_in_study=day + 1)
+        _action(client, "dyad_000", "cp_message", day, f"2026-01-{6 + day:02d}T09:05:00")
+    upload(client, "dyad_000", "2026-01-12T08:00:00", day_in_study=7, aya_app_burden=0.4)
+    responses = [
+        _action(client, "dyad_000", "aya_message", aya_idx, "2026-01-12T09:00:00").json,
+        _action(client, "dyad_000", "cp_message", 6, "2026-01-12T09:05:00").json,
+    ]
+    return [
+        {k: r[k] for k in ("action", "action_prob", "state", "warmup")} for r in responses
+    ]
+
+
+def _cache_hits(client, result):
+    return client.application.metrics.cache_requests.value(
+        cache="speculative_decision", result=result
+    )
+
+
+def test_speculative_decisions_match_the_full_path(make_client):
+    plain = _run(make_client())
+    speculative_client = make_client(SPECULATIVE_DECISIONS=True)
+    assert _run(speculative_client) == plain
+    assert plain[0]["warmup"] is False
+    # Only the two post-warm-up /action calls read the cache, and both hit.
+    assert _cache_hits(speculative_client, "hit") == 2
+    assert _cache_hits(speculative_client, "miss") == 0
+
+
+def test_stale_speculation_falls_back_to_full_path(make_client):
+    plain = _run(make_client(), aya_idx=3)
+    client = make_client(SPECULATIVE_DECISIONS=True)
+    # aya_message was prepared for decision_idx 0, not 3.
+    assert _run(client, aya_idx=3) == plain
+    assert _cache_hits(client, "miss") == 1
+
+    # A completed update empties the cache.
+    upload(client, "dyad_000", "2026-01-13T08:00:00", day_in_study=8)
+    assert len(client.application.speculative_decisions) == 3
+    with client.application.app_context():
+        notify_policy_updated(client.application, "u1")
+    assert len(client.application.speculative_decisions) == 0
+
+
+def test_failed_update_drops_speculative_decisions(make_client, monkeypatch):
+    client = make_client(SPECULATIVE_DECISIONS=True)
+    app = client.application
+    _run(client)
+    upload(client, "dyad_000", "2026-01-13T08:00:00", day_in_study=8)
+    assert len(app.speculative_decisions) == 3
+
+    # The learner may have committed posteriors before failing.
+    monkeypatch.setattr(app.rl_algorithm, "update", lambda old_params, data: (False, {}))
+    response = client.post("/api/v1/update", json={"timestamp": "2026-01-13T08:30:00"})
+    with app.app_context():
+        row = ModelUpdateRequests.query.filter_by(update_id=response.json["update_id"]).one()
+        assert row.status == "failed"
+    assert len(app.speculative_decisions) == 0
@@ -0,0 +1,75 @@
+import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models import StandardizationBaseline
+from app.protocol import project_snapshot
+from app.standardization import (
+    baseline_cache,
+    compute_week1_baselines_bulk,
+    compute_week1_baselines_for_dyad,
+    fetch_baselines,
+)
+from app.update_worker import notify_policy_updated
+from tests.conftest import full_snapshot
+
+
+def _week1(burdens):
+    return [
+        {"raw_context": project_snapshot("cp_message", full_snapshot(cp_app_burden=burden), idx)}
+        for idx, burden in enumerate(burdens)
+    ]
+
+
+def test_bulk_baselines_one_commit_and_skip_existing(app):
+    compute_week1_baselines_for_dyad("d1", "cp_message", _week1([0.1, 0.3]))
+    before = fetch_baselines("d1", "cp_message")
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    event.listen(db.session, "after_commit", count_commit)
+    try:
+        written = compute_week1_baselines_bulk(
+            "cp_message",
+            {"d1": _week1([5.0, 9.0]), "d2": _week1([0.2, 0.6]), "d3": _week1([1.0])},
+        )
+    finally:
+        event.remove(db.session, "after_commit", count_commit)
+    assert sorted(written) == ["d2", "d3"]
+    assert len(commits) == 1
+    # Baselines are write-once: d1 keeps its original values.
+    assert fetch_baselines("d1", "cp_message") == before
+    assert fetch_baselines("d2", "cp_message") == written["d2"]
+
+
+def test_baseline_cache_invalidation(app):
+    assert fetch_baselines("d1", "cp_message") == {}
+    cache = baseline_cache()
+    assert cache.get(("d1", "cp_message")) == {}
+
+    # An insert through this module invalidates the cached "none yet".
+    compute_week1_baselines_for_dyad("d1", "cp_message", _week1([0.1, 0.3]))
+    assert fetch_baselines("d1", "cp_message")
+
+    # Rows written elsewhere (the /update worker process) show up once the
+    # cache is cleared after the update completes.
+    fetch_baselines("d2", "cp_message")
+    db.session.add(
+        StandardizationBaseline(
+            group_id="d2",
+            decision_type="cp_message",
+            variable_name="cp_app_burden",
+            mu=0.5,
+            sigma=0.1,
+            sample_size=2,
+            created_at=datetime.datetime(2026, 1, 12),
+        )
+    )
+    db.session.commit()
+    assert fetch_baselines("d2", "cp_message") == {}
+    notify_policy_updated(app, "u1")
+    assert fetch_baselines("d2", "cp_message") == {"cp_app_burden": {"mu": 0.5, "sigma": 0.1}}
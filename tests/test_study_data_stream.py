@@ -0,0 +1,80 @@
+import datetime
+
+from app import db
+from app.models import StudyData
+from app.study_data_stream import (
+    StudyDataStream,
+    agent_dyads_after,
+    iter_agent_dyads,
+    study_data_record,
+)
+
+
+def _add_rows(rows):
+    now = datetime.datetime(2026, 3, 1)
+    for group_id, decision_type, decision_idx in rows:
+        db.session.add(
+            StudyData(
+                group_id=group_id,
+                decision_idx=decision_idx,
+                decision_type=decision_type,
+                action=decision_idx % 2,
+                action_prob=0.5,
+                state=[0.0],
+                raw_context={"agent_decision_index": decision_idx + 1},
+                outcome={},
+                reward=1.0,
+                request_timestamp=now,
+                derived_at=now,
+            )
+        )
+    db.session.commit()
+
+
+def _as_lists(data):
+    return [
+        (decision_type, [(gid, [r["decision_idx"] for r in rows]) for gid, rows in dyads])
+        for decision_type, dyads in iter_agent_dyads(data)
+    ]
+
+
+def test_stream_yields_dyads_across_pages_in_learner_order(app):
+    rows = [
+        (gid, dt, idx)
+        for dt, n in (("cp_message", 5), ("aya_message", 4))
+        for gid in ("g2", "g1")
+        for idx in reversed(range(n))
+    ]
+    _add_rows(rows)
+    records = [
+        study_data_record(row)
+        for row in StudyData.query.order_by(
+            StudyData.decision_type, StudyData.group_id, StudyData.decision_idx
+        )
+    ]
+
+    # Pages of 3 rows split every dyad; the stream must regroup them.
+    stream = StudyDataStream(chunk_rows=3)
+    assert _as_lists({"stream": stream}) == _as_lists({"records": records})
+    assert _as_lists({"stream": stream})[0] == (
+        "aya_message", [("g1", [0, 1, 2, 3]), ("g2", [0, 1, 2, 3])]
+    )
+    assert stream.current_index() == {"aya_message": 4, "cp_message": 5}
+
+    trimmed = StudyDataStream(exclude={"cp_message": {"g1"}}, chunk_rows=3).restrict(
+        {"cp_message"}
+    )
+    assert _as_lists({"stream": trimmed}) == [("cp_message", [("g2", [0, 1, 2, 3, 4])])]
+
+
+def test_agent_dyads_after_reads_only_rows_past_the_marks(app):
+    _add_rows([(gid, "dyad_game", idx) for gid, n in (("g1", 5), ("g2", 3)) for idx in range(n)])
+    _add_rows([("g1", "cp_message", 0)])
+    records = [study_data_record(row) for row in StudyData.query]
+
+    for data in ({"stream": StudyDataStream(chunk_rows=1)}, {"records": records}):
+        counts, dyads = agent_dyads_after(data, "dyad_game", {"g1": 2})
+        assert counts == {"g1": 5, "g2": 3}
+        assert sorted((gid, [r["decision_idx"] for r in rows]) for gid, rows in dyads) == [
+            ("g1", [3, 4]), ("g2", [0, 1, 2])
+        ]
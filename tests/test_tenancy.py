@@ -0,0 +1,169 @@
+import datetime
+import logging
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from werkzeug.test import Client
+
+from app import db
+from app.decision_log import encode_decision
+from app.logging_config import StudyContextFilter
+from app.models import Action, DataUpload, Group, ModelParameters, ModelUpdateRequests
+from app.tenancy import create_tenant_app, study_overrides
+from app.update_worker import worker_log_filenames
+from tests.conftest import register_group, upload
+
+
+class _StudyClient:
+    """A test client whose /api/v1 paths go to one study."""
+
+    def __init__(self, client, study_id):
+        self.client, self.prefix = client, f"/studies/{study_id}"
+
+    def post(self, path, **kwargs):
+        # Buffered, so the response is closed and the study released.
+        return self.client.post(self.prefix + path, buffered=True, **kwargs)
+
+
+def _action(client, idx, ts="2026-01-06T09:00:00"):
+    return client.post(
+        "/api/v1/action",
+        json={
+            "group_id": "dyad_000",
+            "timestamp": ts,
+            "decision_idx": idx,
+            "decision_type": "cp_message",
+        },
+    )
+
+
+@pytest.fixture
+def tenant(tmp_path):
+    dispatcher = create_tenant_app(
+        "config.TestingConfig",
+        overrides={
+            "STUDIES": {"site_a": {}, "site_b": {"RL_ALGORITHM": "flat_prob"}},
+            "STUDY_DATABASE_URI": f"sqlite:///{tmp_path}/studies.db",
+        },
+    )
+    yield dispatcher
+    for study_id in dispatcher.registry.resident():
+        dispatcher.registry.evict(study_id)
+
+
+def test_studies_are_isolated_and_loaded_lazily(tenant):
+    client = Client(tenant)
+    site_a, site_b = _StudyClient(client, "site_a"), _StudyClient(client, "site_b")
+    assert tenant.registry.resident() == []
+
+    assert register_group(site_a, "dyad_000").status_code == 201
+    assert upload(site_a, "dyad_000", "2026-01-06T08:00:00").status_code == 201
+    assert tenant.registry.resident() == ["site_a"]
+
+    # The same dyad id is unknown to the other study, which can register it.
+    assert upload(site_b, "dyad_000", "2026-01-06T08:00:00").status_code == 404
+    assert _action(site_a, 0).status_code == 201
+    assert tenant.registry.resident() == ["site_a", "site_b"]
+    assert register_group(site_b, "dyad_000").status_code == 201
+    assert register_group(site_b, "dyad_000").status_code != 201
+
+    apps = {study_id: tenant.registry.acquire(study_id) for study_id in ("site_a", "site_b")}
+    for study_id in apps:
+        tenant.registry.release(study_id)
+    assert apps["site_a"].config["STUDY_ID"] == "site_a"
+    assert type(apps["site_a"].rl_algorithm).__name__ != type(apps["site_b"].rl_algorithm).__name__
+    assert apps["site_a"].config["SAMPLE_BUFFER_SEED"] != apps["site_b"].config["SAMPLE_BUFFER_SEED"]
+
+    # One set of tables: each row carries its study, each app sees its own.
+    with apps["site_a"].app_context():
+        rows = db.session.execute(
+            text("SELECT study_id, group_id FROM groups ORDER BY study_id")
+        ).all()
+        assert [tuple(row) for row in rows] == [("site_a", "dyad_000"), ("site_b", "dyad_000")]
+        assert [g.group_id for g in Group.query.all()] == ["dyad_000"]
+        assert Action.query.count() == 1
+        assert {p.study_id for p in ModelParameters.query.all()} == {"site_a"}
+    with apps["site_b"].app_context():
+        assert Action.query.count() == 0
+        assert DataUpload.query.count() == 0
+
+    assert client.post("/studies/site_c/api/v1/action", json={}).status_code == 404
+    assert client.post("/api/v1/action", json={}).status_code == 404
+
+
+def test_idle_studies_are_unloaded_and_resume(tenant):
+    client = Client(tenant)
+    site_a = _StudyClient(client, "site_a")
+    for i in range(5):
+        register_group(site_a, f"dyad_{i:03d}")
+    upload(site_a, "dyad_000", "2026-01-06T08:00:00")
+    _action(site_a, 0)
+    first = tenant.registry.acquire("site_a")
+    tenant.registry.release("site_a")
+    cursor = first.sampler.cursor()
+
+    # An /update still marked as running keeps the study resident.
+    with first.app_context():
+        db.session.add(ModelUpdateRequests("u-running", datetime.datetime.now()))
+        db.session.commit()
+    assert tenant.registry.evict_idle(now=float("inf")) == []
+    with first.app_context():
+        ModelUpdateRequests.query.filter_by(update_id="u-running").update({"status": "failed"})
+        db.session.commit()
+    assert tenant.registry.evict_idle(now=float("inf")) == ["site_a"]
+    assert tenant.registry.resident() == []
+
+    # Rebuilt from its rows: same dyads, sampler cursor resumed.
+    assert _action(site_a, 1, ts="2026-01-07T09:00:00").status_code == 201
+    second = tenant.registry.acquire("site_a")
+    tenant.registry.release("site_a")
+    assert second is not first
+    # Warm-up draws are uniforms; the rebuilt stream continues past the first.
+    assert cursor["uniform"] > 0
+    assert second.sampler.cursor()["uniform"] > cursor["uniform"]
+
+
+def test_study_config_and_decision_log_record():
+    config = {
+        "STUDIES": {"pilot": {"SAMPLE_BUFFER_SEED": 3}},
+        "STUDY_DATABASE_URI": "postgresql://db/adapts_{study_id}",
+        "STUDY_SAMPLE_BUFFER_PATH": "buffers/{study_id}.npz",
+        "SAMPLE_BUFFER_SEED": 1,
+    }
+    overrides = study_overrides(config, "pilot")
+    assert overrides["SQLALCHEMY_DATABASE_URI"] == "postgresql://db/adapts_pilot"
+    assert overrides["SAMPLE_BUFFER_PATH"] == "buffers/pilot.npz"
+    assert overrides["SAMPLE_BUFFER_SEED"] == 3  # the study's own setting wins
+    record = encode_decision(
+        {
+            "study_id": "pilot",
+            "group_id": "g",
+            "decision_type": "cp_message",
+            "decision_idx": 0,
+            "action": 1,
+            "prob": 0.5,
+        }
+    )
+    assert record["study_id"] == b"pilot"
+
+
+def test_study_log_lines_and_worker_files_are_per_study():
+    def tag(app=None):
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "dyad_000", None, None)
+        if app is None:
+            StudyContextFilter().filter(record)
+        else:
+            with app.app_context():
+                StudyContextFilter().filter(record)
+        return record.study
+
+    study_app, plain_app = Flask("site_a"), Flask("plain")
+    study_app.config["STUDY_ID"] = "site_a"
+    assert tag(study_app) == " [study=site_a]"
+    assert tag(plain_app) == tag() == ""
+    assert worker_log_filenames("site_a") == (
+        "update_worker_site_a.log",
+        "rl_update_worker_site_a.log",
+    )
+    assert worker_log_filenames(None) == ("update_worker.log", "rl_update_worker.log")
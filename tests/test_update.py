@@ -82,3 +82,296 @@ def test_update_requires_timestamp(client):
     response = client.post("/api/v1/update", json={})
     assert response.status_code == 400
     assert "timestamp is required" in response.json["message"]
+
+
+def test_update_profile_records_phases_and_agents(client):
+    """
+    Every /update persists wall/CPU/memory per pipeline phase and per agent
+    fit, readable from GET /update/<update_id>/profile.
+    """
+    client.application.config["UPDATE_PROFILE_TRACEMALLOC"] = True
+    register_group(client, "test_group_123")
+    upload(
+        client,
+        "test_group_123",
+        "2026-01-05T08:00:00",
+        slot="am",
+        day_in_study=1,
+        cp_diary_mood=4,
+        daily_diary_completed=True,
+        daily_diary_score=4.0,
+    )
+    client.post(
+        "/api/v1/action",
+        json={
+            "group_id": "test_group_123",
+            "timestamp": "2026-01-05T09:00:00",
+            "decision_idx": 0,
+            "decision_type": "cp_message",
+        },
+    )
+    upload(
+        client,
+        "test_group_123",
+        "2026-01-06T08:00:00",
+        slot="am",
+        day_in_study=2,
+        cp_diary_mood=4,
+        daily_diary_completed=True,
+        daily_diary_score=4.0,
+    )
+    update_id = client.post(
+        "/api/v1/update", json={"timestamp": "2026-01-12T03:00:00"}
+    ).get_json()["update_id"]
+
+    response = client.get(f"/api/v1/update/{update_id}/profile")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "completed"
+
+    phases = {row["phase"]: row for row in body["phases"]}
+    assert list(phases)[:3] == ["derive_study_data", "load_study_data", "repro_snapshot"]
+    assert "learner_update" in phases and "persist_parameters" in phases
+
+    agent = phases["learner_update.cp_message"]
+    assert agent["decision_type"] == "cp_message"
+    assert 0.0 <= agent["wall_s"] <= phases["learner_update"]["wall_s"]
+    assert agent["cpu_s"] >= 0.0
+    assert agent["tracemalloc_peak_kib"] is not None
+    assert agent["tracemalloc_peak_kib"] <= phases["learner_update"]["tracemalloc_peak_kib"]
+
+
+def test_update_profile_unknown_update(client):
+    response = client.get("/api/v1/update/does-not-exist/profile")
+    assert response.status_code == 404
+
+
+def test_update_worker_process_reports_through_db(tmp_path):
+    from app import create_app
+    from app.update_worker import register_policy_listener
+
+    app = create_app(
+        "config.TestingConfig",
+        overrides={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'worker.db'}",
+            "UPDATE_EXECUTOR": "process",
+        },
+    )
+    completed = []
+    register_policy_listener(app, completed.append)
+    client = app.test_client()
+    cursor = app.sampler.cursor()
+
+    response = client.post("/api/v1/update", json={"timestamp": "2026-01-12T00:00:00"})
+    assert response.status_code == 202
+    update_id = response.get_json()["update_id"]
+
+    deadline = time.time() + 60
+    while not completed and time.time() < deadline:
+        time.sleep(0.1)
+    assert completed == [update_id]
+    assert app.policy_version == 1
+    assert "learner_update" in app.last_update_timings["phases"]
+    with app.app_context():
+        request_row = ModelUpdateRequests.query.filter_by(update_id=update_id).first()
+        assert request_row.status == "completed"
+        # Empty reservation: the API stream's cursor is untouched.
+        assert request_row.sampler_window == {
+            "normal": [cursor["normal"]] * 2,
+            "uniform": [cursor["uniform"]] * 2,
+        }
+    assert app.sampler.cursor() == cursor
+
+
+def test_worker_updates_keep_the_dyad_game_refresh_cadence(tmp_path):
+    """
+    Every process-executor update builds a fresh learner; the EB refresh
+    count still advances across updates, so dyad_game (every 4th update)
+    re-estimates its hyperprior after the bootstrap.
+    """
+    import datetime
+
+    from app import create_app, db
+    from app.algorithms.empirical_bayes import EB_REFRESH_EVERY
+    from app.models import ModelParameters
+    from app.update_worker import register_policy_listener
+
+    app = create_app(
+        "config.TestingConfig",
+        overrides={
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'worker.db'}",
+            "UPDATE_EXECUTOR": "process",
+        },
+    )
+    completed = []
+    register_policy_listener(app, completed.append)
+    client = app.test_client()
+    group_ids = [f"dyad_{i:03d}" for i in range(3)]
+    for group_id in group_ids:
+        register_group(client, group_id)
+
+    monday = datetime.datetime(2026, 1, 5, 8, 0)
+    n_updates = EB_REFRESH_EVERY["dyad_game"] + 1
+    for week in range(1, n_updates + 1):
+        for i, group_id in enumerate(group_ids):
+            upload(
+                client,
+                group_id,
+                monday.isoformat(),
+                week_in_study=week,
+                day_in_study=7 * (week - 1) + 1,
+                weekly_survey_completed=True,
+                weekly_relationship_score=float((week + i) % 4),
+            )
+            client.post(
+                "/api/v1/action",
+                json={
+                    "group_id": group_id,
+                    "timestamp": (monday + datetime.timedelta(hours=1)).isoformat(),
+                    "decision_idx": week - 1,
+                    "decision_type": "dyad_game",
+                },
+            )
+        monday += datetime.timedelta(days=7)
+        if week == 1:
+            continue  # no outcome window has closed yet
+        client.post("/api/v1/update", json={"timestamp": monday.isoformat()})
+        deadline = time.time() + 60
+        while len(completed) < week - 1 and time.time() < deadline:
+            time.sleep(0.1)
+        assert len(completed) == week - 1
+
+    with app.app_context():
+        hypers = ModelParameters.query.filter_by(
+            snapshot_type="hyper", decision_type="dyad_game"
+        ).order_by(ModelParameters.id).all()
+        assert [h.metadata_json["update_call_index"] for h in hypers] == [1, 4]
+        assert hypers[1].metadata_json["update_id"] == completed[3]
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_failed_update_still_invalidates_api_caches(client, monkeypatch):
+    """
+    A failed update may have committed snapshots or week-1 baselines, so
+    the policy listeners run after it as after a completed one.
+    """
+    from app.standardization import baseline_cache, fetch_baselines
+
+    app = client.application
+    register_group(client, "test_group_123")
+    assert fetch_baselines("test_group_123", "cp_message") == {}
+    assert baseline_cache(app).get(("test_group_123", "cp_message")) == {}
+    version = getattr(app, "policy_version", 0)
+
+    monkeypatch.setattr(app.rl_algorithm, "update", lambda old_params, data: (False, {}))
+    update_id = client.post(
+        "/api/v1/update", json={"timestamp": "2026-01-12T03:00:00"}
+    ).get_json()["update_id"]
+
+    assert ModelUpdateRequests.query.filter_by(update_id=update_id).one().status == "failed"
+    assert app.policy_version == version + 1
+    assert baseline_cache(app).get(("test_group_123", "cp_message")) is None
+
+
+def test_failed_update_resumes_at_the_failed_agent(client, monkeypatch):
+    """
+    A retry on unchanged inputs reuses the failed update's completed stages
+    and agents; new data starts the pipeline over.
+    """
+    from app.models import ModelParameters, UpdateCheckpoint
+
+    register_group(client, "test_group_123")
+    upload(client, "test_group_123", "2026-01-05T08:00:00", day_in_study=1)
+    for decision_type in ("aya_message", "cp_message"):
+        client.post(
+            "/api/v1/action",
+            json={
+                "group_id": "test_group_123",
+                "timestamp": "2026-01-05T09:00:00",
+                "decision_idx": 0,
+                "decision_type": decision_type,
+            },
+        )
+    upload(client, "test_group_123", "2026-01-05T20:00:00", day_in_study=1, slot="pm")
+    upload(
+        client,
+        "test_group_123",
+        "2026-01-06T08:00:00",
+        day_in_study=2,
+        previous_med_adherence=1,
+        daily_diary_completed=True,
+        daily_diary_score=3.0,
+    )
+
+    learner = client.application.rl_algorithm
+    fit_local_model = learner._fit_local_model
+    failures = []
+
+    def flaky_fit(decision_type, *args):
+        if decision_type == "cp_message" and not failures:
+            failures.append(decision_type)
+            raise RuntimeError("connection reset during the cp_message fit")
+        return fit_local_model(decision_type, *args)
+
+    monkeypatch.setattr(learner, "_fit_local_model", flaky_fit)
+
+    def run_update():
+        update_id = client.post(
+            "/api/v1/update", json={"timestamp": "2026-01-12T03:00:00"}
+        ).get_json()["update_id"]
+        return update_id, client.get(f"/api/v1/update/{update_id}/profile").get_json()
+
+    def aya_fits():
+        return ModelParameters.query.filter_by(
+            snapshot_type="local_fit", decision_type="aya_message"
+        ).count()
+
+    failed_id, failed = run_update()
+    assert failed["status"] == "failed"
+    with client.application.app_context():
+        stages = {
+            row.stage for row in UpdateCheckpoint.query.filter_by(update_id=failed_id)
+        }
+        assert stages == {"derive_study_data", "repro_snapshot", "learner_update.aya_message"}
+        fits_before = aya_fits()
+        assert fits_before == 1
+
+    resumed_id, resumed = run_update()
+    assert resumed["status"] == "completed"
+    assert resumed["resumed_from"] == failed_id
+    phases = {row["phase"] for row in resumed["phases"]}
+    assert "derive_study_data" not in phases and "repro_snapshot" not in phases
+    assert "learner_update.aya_message" not in phases
+    assert "learner_update.cp_message" in phases
+    with client.application.app_context():
+        assert aya_fits() == fits_before
+        assert ModelUpdateRequests.query.filter_by(update_id=resumed_id).one().fingerprint == (
+            ModelUpdateRequests.query.filter_by(update_id=failed_id).one().fingerprint
+        )
+
+    # A new upload changes the inputs: the next retry starts from scratch.
+    failures.clear()
+    client.post(
+        "/api/v1/action",
+        json={
+            "group_id": "test_group_123",
+            "timestamp": "2026-01-06T09:00:00",
+            "decision_idx": 1,
+            "decision_type": "cp_message",
+        },
+    )
+    upload(
+        client,
+        "test_group_123",
+        "2026-01-07T08:00:00",
+        day_in_study=3,
+        daily_diary_completed=True,
+        daily_diary_score=2.0,
+    )
+    assert run_update()[1]["status"] == "failed"
+    upload(client, "test_group_123", "2026-01-07T20:00:00", day_in_study=3, slot="pm")
+    fresh = run_update()[1]
+    assert fresh["status"] == "completed"
+    assert fresh["resumed_from"] is None
+    assert "derive_study_data" in {row["phase"] for row in fresh["phases"]}
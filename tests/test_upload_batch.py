@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import DataUpload
+from tests.conftest import full_snapshot, register_group
+
+
+@pytest.fixture
+def batch_client():
+    app = create_app("config.TestingConfig", overrides={"UPLOAD_BATCH_CHUNK_ROWS": 2})
+    yield app.test_client()
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _item(group_id, timestamp, **overrides):
+    return {"group_id": group_id, "timestamp": timestamp, "data": full_snapshot(**overrides)}
+
+
+def test_batch_stores_valid_items_and_reports_each(batch_client):
+    client, app = batch_client, batch_client.application
+    register_group(client, "dyad_000")
+    register_group(client, "dyad_001")
+    incomplete = _item("dyad_001", "2026-01-06T08:00:00")
+    del incomplete["data"]["slot"]
+    items = [
+        _item("dyad_000", "2026-01-06T08:00:00", day_in_study=1),
+        _item("dyad_001", "2026-01-06T08:01:00"),
+        _item("dyad_404", "2026-01-06T08:02:00"),
+        incomplete,
+        _item("dyad_000", "not-a-time"),
+        _item("dyad_000", "2026-01-07T08:00:00", day_in_study=2),
+        _item("dyad_001", "2026-01-07T08:01:00"),
+    ]
+
+    inserts = []
+    with app.app_context():
+        listener = lambda *args: inserts.append(args[2]) if args[2].startswith("INSERT") else None
+        event.listen(db.engine, "before_cursor_execute", listener)
+    response = client.post("/api/v1/upload_data:batch", json=items)
+    with app.app_context():
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 207
+    body = response.json
+    assert (body["stored"], body["failed"]) == (4, 3)
+    assert [r["status"] for r in body["results"]] == [
+        "success", "success", "failed", "failed", "failed", "success", "success"
+    ]
+    assert [r.get("code") for r in body["results"] if r["status"] == "failed"] == [404, 400, 400]
+    # Four rows in chunks of two: two multi-row statements.
+    assert len(inserts) == 2
+
+    with app.app_context():
+        rows = DataUpload.query.order_by(DataUpload.id).all()
+        assert [row.id for row in rows] == [
+            r["upload_id"] for r in body["results"] if r["status"] == "success"
+        ]
+        assert rows[2].data["day_in_study"] == 2
+
+    # The batch feeds /action like single uploads do.
+    action = client.post(
+        "/api/v1/action",
+        json={
+            "group_id": "dyad_000",
+            "timestamp": "2026-01-07T09:00:00",
+            "decision_idx": 0,
+            "decision_type": "cp_message",
+        },
+    )
+    assert action.status_code == 201
+
+
+def test_batch_accepts_ndjson(batch_client):
+    client = batch_client
+    register_group(client, "dyad_000")
+    lines = [json.dumps(_item("dyad_000", f"2026-01-0{6 + i}T08:00:00")) for i in range(3)]
+    lines.insert(1, "{not json")
+    response = client.post(
+        "/api/v1/upload_data:batch",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 207
+    assert [r["status"] for r in response.json["results"]] == [
+        "success", "failed", "success", "success"
+    ]
+    assert response.json["results"][1]["message"] == "Invalid JSON."
+
+    all_ok = client.post(
+        "/api/v1/upload_data:batch", json=[_item("dyad_000", "2026-01-10T08:00:00")]
+    )
+    assert all_ok.status_code == 201
+    assert client.post("/api/v1/upload_data:batch", json={"not": "a list"}).status_code == 400
+
+
+def test_batch_rejects_non_string_envelope_fields_per_item(batch_client):
+    client = batch_client
+    register_group(client, "dyad_000")
+    items = [
+        _item(["dyad_000"], "2026-01-06T08:00:00"),
+        _item({"id": "dyad_000"}, "2026-01-06T08:00:00"),
+        _item("dyad_000", 1767686400),
+        _item("dyad_000", "2026-01-06T08:00:00"),
+    ]
+    response = client.post("/api/v1/upload_data:batch", json=items)
+    assert response.status_code == 207
+    results = response.json["results"]
+    assert [r["status"] for r in results] == ["failed", "failed", "failed", "success"]
+    assert [r.get("code") for r in results[:3]] == [400, 400, 400]
+    assert results[0]["message"] == results[1]["message"] == "group_id must be a string."
+    assert results[2]["message"] == "timestamp must be an ISO-8601 string."
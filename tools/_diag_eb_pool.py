@@ -52,7 +52,9 @@ def main():
             hyper = (
                 ModelParameters.query
                 .filter_by(snapshot_type="hyper", decision_type=agent)
-                .order_by(ModelParameters.agent_decision_index.desc())
+                .order_by(
+                    ModelParameters.agent_decision_index.desc(), ModelParameters.id.desc()
+                )
                 .first()
             )
             if hyper is None:
@@ -1,15 +1,15 @@
 """
 Cohort-median π(a=1) over trial-calendar decision time, averaged across
 several independent simulator seeds to dampen run-level noise.
+
+Seeds run in parallel through ``tools/experiment_runner.py`` and are cached
+per (algorithm, seed, config, code version); re-plotting reuses them.
 """
 from __future__ import annotations
 
 import argparse
-import datetime
 import os
 import sys
-import threading as _threading
-from collections import defaultdict
 from pathlib import Path
 
 import matplotlib
@@ -20,21 +20,13 @@ import numpy as np
 REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-import app.routes.update as _update_module
-
-class _SyncThread(_threading.Thread):
-    def start(self):  # type: ignore[override]
-        self.run()
-
-_update_module.Thread = _SyncThread
-
-import requests as _requests
-_requests.post = lambda *a, **kw: type("R", (), {"status_code": 200, "text": ""})()
-
-from config import TestingConfig
-TestingConfig.SAMPLE_BUFFER_UNIFORMS = 50_000
-TestingConfig.SAMPLE_BUFFER_NORMALS = 2_000_000
-TestingConfig.RL_ALGORITHM = os.environ.get("RL_ALGORITHM", "hybrid_rel_pool")
+from tools.experiment_runner import (
+    ANALYSIS_CONFIG_OVERRIDES,
+    DEFAULT_CACHE_DIR,
+    Cell,
+    CellResult,
+    run_experiment,
+)
 
 AGENT_ORDER = ("aya_message", "cp_message", "dyad_game")
 AGENT_LABELS = {
@@ -47,61 +39,36 @@ FIG_DIR = REPO_ROOT.parent / "Monitoring_Algorithm/figures/eb_gradient_prior_val
 FIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def run_one(seed: int, num_dyads: int, num_weeks: int) -> dict[str, dict]:
-    """Run one sim with the given simulator seed, return per-agent curves."""
-    # Patch ProtocolTrialSimulator's default seed for this run via monkey-patch.
-    from tests import simulate_adapts_hct as sm
-    _orig_init = sm.ProtocolTrialSimulator.__init__
-
-    def _patched_init(self, *args, **kwargs):
-        kwargs["seed"] = seed
-        _orig_init(self, *args, **kwargs)
-
-    sm.ProtocolTrialSimulator.__init__ = _patched_init
-    try:
-        from app import create_app, db
-        from app.models import Action
-        from tests.simulate_adapts_hct import run_simulation
-
-        app = create_app("config.TestingConfig")
-        out: dict[str, dict] = {}
-        with app.app_context():
-            db.create_all()
-            res = run_simulation(
-                app.test_client(),
-                base_date=datetime.date(2025, 1, 5),
-                num_weeks=num_weeks,
-                num_dyads=num_dyads,
-                verbose=False,
-                group_prefix=f"s{seed}_",
-            )
-
-            for agent in AGENT_ORDER:
-                events = []
-                for a in (
-                    Action.query.filter_by(decision_type=agent)
-                    .order_by(Action.request_timestamp.asc(), Action.id.asc())
-                    .all()
-                ):
-                    pi1 = float(a.action_prob) if int(a.action) == 1 else 1.0 - float(a.action_prob)
-                    events.append((a.group_id, pi1))
-
-                last_pi: dict[str, float] = {}
-                xs, medians, n_active = [], [], []
-                for k, (gid, pi) in enumerate(events, start=1):
-                    last_pi[gid] = pi
-                    vals = np.array(list(last_pi.values()))
-                    xs.append(k)
-                    medians.append(float(np.median(vals)))
-                    n_active.append(len(last_pi))
-                out[agent] = {
-                    "xs": np.asarray(xs, dtype=np.int64),
-                    "medians": np.asarray(medians, dtype=np.float64),
-                    "n_active": np.asarray(n_active, dtype=np.int64),
-                }
-        return out
-    finally:
-        sm.ProtocolTrialSimulator.__init__ = _orig_init
+def seed_cell(algorithm: str, seed: int, num_dyads: int, num_weeks: int) -> Cell:
+    return Cell(
+        algorithm=algorithm,
+        seed=seed,
+        num_dyads=num_dyads,
+        num_weeks=num_weeks,
+        group_prefix=f"s{seed}_",
+        config_overrides=dict(ANALYSIS_CONFIG_OVERRIDES),
+    )
+
+
+def cohort_median_curves(result: CellResult) -> dict[str, dict]:
+    """Per-agent running cohort median of each dyad's latest π(a=1)."""
+    out: dict[str, dict] = {}
+    for agent in AGENT_ORDER:
+        rows = result.decisions_for(agent)
+        last_pi: dict[str, float] = {}
+        xs, medians, n_active = [], [], []
+        for k, (gid, pi) in enumerate(zip(rows["group_id"], rows["pi1"]), start=1):
+            last_pi[str(gid)] = float(pi)
+            vals = np.array(list(last_pi.values()))
+            xs.append(k)
+            medians.append(float(np.median(vals)))
+            n_active.append(len(last_pi))
+        out[agent] = {
+            "xs": np.asarray(xs, dtype=np.int64),
+            "medians": np.asarray(medians, dtype=np.float64),
+            "n_active": np.asarray(n_active, dtype=np.int64),
+        }
+    return out
 
 
 def main():
@@ -109,15 +76,22 @@ def main():
     ap.add_argument("--num-dyads", type=int, default=25)
     ap.add_argument("--num-weeks", type=int, default=35)
     ap.add_argument("--n-runs", type=int, default=5)
+    ap.add_argument("--algorithm", default=os.environ.get("RL_ALGORITHM", "hybrid_rel_pool"))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--force", action="store_true", help="Recompute cached seeds.")
     ap.add_argument("--out", default=str(FIG_DIR / "cohort_median_trial_time.png"))
     args = ap.parse_args()
 
     seeds = [42 + i for i in range(args.n_runs)]
     print(f"running {args.n_runs} sims with seeds {seeds}")
 
+    cells = [seed_cell(args.algorithm, s, args.num_dyads, args.num_weeks) for s in seeds]
+    results = run_experiment(cells, args.cache_dir, args.workers, args.force)
+
     per_run = []
-    for s in seeds:
-        out = run_one(s, args.num_dyads, args.num_weeks)
+    for s, result in zip(seeds, results):
+        out = cohort_median_curves(result)
         for agent in AGENT_ORDER:
             n = len(out[agent]["xs"])
             fm = out[agent]["medians"][-1] if n else float("nan")
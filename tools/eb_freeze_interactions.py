@@ -77,6 +77,9 @@ _orig_expand = fb_module.ProtocolRLFeatureBuilder.expand_base_to_phi
 _orig_prior_eb = eb_module._prior_covariance
 _orig_prior_grad = eb_grad_module._prior_covariance
 _orig_prior_il = il_module._prior_covariance
+_orig_precision_eb = eb_module._prior_precision
+_orig_precision_grad = eb_grad_module._prior_precision
+_orig_precision_il = il_module._prior_precision
 
 
 def _phi_dim_main_only(self):
@@ -117,20 +120,28 @@ def _prior_covariance_intercept_action(decision_type):
     return np.diag(np.asarray([tau_m_sq, tau_m_sq], dtype=np.float64))
 
 
+def _precision_of(prior_covariance):
+    # The learners read the cached inverse prior separately from Σ_0.
+    return lambda decision_type: np.linalg.inv(prior_covariance(decision_type))
+
+
+def _patch_prior(prior_covariance):
+    precision = _precision_of(prior_covariance)
+    for module in (eb_module, eb_grad_module, il_module):
+        module._prior_covariance = prior_covariance
+        module._prior_precision = precision
+
+
 def apply_main_only_patches():
     fb_module.ProtocolRLFeatureBuilder.phi_dim = property(_phi_dim_main_only)
     fb_module.ProtocolRLFeatureBuilder.expand_base_to_phi = _expand_main_only
-    eb_module._prior_covariance = _prior_covariance_main_only
-    eb_grad_module._prior_covariance = _prior_covariance_main_only
-    il_module._prior_covariance = _prior_covariance_main_only
+    _patch_prior(_prior_covariance_main_only)
 
 
 def apply_intercept_action_patches():
     fb_module.ProtocolRLFeatureBuilder.phi_dim = property(_phi_dim_intercept_action)
     fb_module.ProtocolRLFeatureBuilder.expand_base_to_phi = _expand_intercept_action
-    eb_module._prior_covariance = _prior_covariance_intercept_action
-    eb_grad_module._prior_covariance = _prior_covariance_intercept_action
-    il_module._prior_covariance = _prior_covariance_intercept_action
+    _patch_prior(_prior_covariance_intercept_action)
 
 
 def restore_full_features():
@@ -139,6 +150,9 @@ def restore_full_features():
     eb_module._prior_covariance = _orig_prior_eb
     eb_grad_module._prior_covariance = _orig_prior_grad
     il_module._prior_covariance = _orig_prior_il
+    eb_module._prior_precision = _orig_precision_eb
+    eb_grad_module._prior_precision = _orig_precision_grad
+    il_module._prior_precision = _orig_precision_il
 
 
 # ----- runner -----------------------------------------------------------------
@@ -0,0 +1,306 @@
+"""
+Parallel multi-seed experiment runner with an on-disk results cache.
+
+An experiment is a list of ``Cell``s — one (algorithm, simulator seed,
+config) combination each. ``run_experiment`` runs every cell that is not
+already cached through the headless engine (tests/headless_simulation.py),
+fanning the cells out over a process pool, and returns one ``CellResult``
+per cell.
+
+Each finished cell is written to ``<cache_dir>/<key>.npz`` as plain numpy
+columns (no pickles):
+
+  - ``decisions__*``: the decision log in chronological order (group_id,
+    decision_type, decision_idx, action, action_prob, pi1, is_warmup,
+    reward, request_timestamp, sampler uniform cursor);
+  - ``snapshots__*``: the learner's snapshot history in insertion order
+    (snapshot_type, decision_type, group_id, agent_decision_index,
+    sample_size, covariance trace, theta[action]).
+
+The key hashes the cell definition together with ``code_version()``, a
+digest of the learner / protocol / simulator sources, so editing the
+algorithm invalidates every cached cell while re-running a plotting
+script after a cosmetic change reuses them.
+
+Cells may name a ``setup`` hook (``"module:function"`` + kwargs) that runs
+inside the worker before the trial — e.g. the feature-correlation patch of
+``tools/stress_test_correlation.py``. Each worker process serves a single
+cell, so such patches never leak between cells.
+
+    python tools/experiment_runner.py --algorithms eb_gradient,inf_lsvi \\
+        --seeds 42,43,44 --workers 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+DEFAULT_CACHE_DIR = REPO_ROOT / "experiment_cache"
+
+# Sources whose edits change trial outcomes. Plotting tools are deliberately
+# excluded so restyling a figure never invalidates the cache.
+CODE_VERSION_SOURCES = (
+    "app",
+    "config.py",
+    "tests/simulate_adapts_hct.py",
+    "tests/headless_simulation.py",
+    "tools/experiment_runner.py",
+)
+
+# Buffer sizes the analysis tools have always used for 25 × 35 runs.
+ANALYSIS_CONFIG_OVERRIDES = {
+    "SAMPLE_BUFFER_UNIFORMS": 50_000,
+    "SAMPLE_BUFFER_NORMALS": 2_000_000,
+}
+
+
+@dataclass(frozen=True)
+class Cell:
+    algorithm: str
+    seed: int = 42
+    num_dyads: int = 25
+    num_weeks: int = 35
+    group_prefix: str = ""
+    config_overrides: dict = field(default_factory=dict, hash=False, compare=False)
+    setup: str | None = None
+    setup_kwargs: dict = field(default_factory=dict, hash=False, compare=False)
+
+    def key(self, version: str | None = None) -> str:
+        payload = json.dumps(
+            {
+                "cell": asdict(self),
+                "code_version": version or code_version(),
+                "setup_version": _module_digest(self.setup.split(":", 1)[0]) if self.setup else None,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+@dataclass
+class CellResult:
+    cell: Cell
+    decisions: dict[str, np.ndarray]
+    snapshots: dict[str, np.ndarray]
+    path: Path
+    cached: bool = False
+
+    def decisions_for(self, decision_type: str) -> dict[str, np.ndarray]:
+        mask = self.decisions["decision_type"] == decision_type
+        return {name: column[mask] for name, column in self.decisions.items()}
+
+    def snapshots_for(self, snapshot_type: str, decision_type: str) -> dict[str, np.ndarray]:
+        mask = (self.snapshots["snapshot_type"] == snapshot_type) & (
+            self.snapshots["decision_type"] == decision_type
+        )
+        return {name: column[mask] for name, column in self.snapshots.items()}
+
+
+_CODE_VERSION: str | None = None
+
+
+def code_version() -> str:
+    """Digest of every source file listed in ``CODE_VERSION_SOURCES``."""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        digest = hashlib.sha256()
+        paths: list[Path] = []
+        for entry in CODE_VERSION_SOURCES:
+            root = REPO_ROOT / entry
+            paths.extend(sorted(root.rglob("*.py")) if root.is_dir() else [root])
+        for path in paths:
+            digest.update(str(path.relative_to(REPO_ROOT)).encode("utf-8"))
+            digest.update(path.read_bytes())
+        _CODE_VERSION = digest.hexdigest()[:16]
+    return _CODE_VERSION
+
+
+def _module_digest(module_name: str) -> str:
+    """Source digest of a setup-hook module (located without importing it)."""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        raise ValueError(f"setup module {module_name!r} not found")
+    return hashlib.sha256(Path(spec.origin).read_bytes()).hexdigest()[:16]
+
+
+# ----------------------------------------------------------------- workers
+
+def _run_setup(cell: Cell) -> None:
+    if not cell.setup:
+        return
+    module_name, func_name = cell.setup.split(":", 1)
+    getattr(importlib.import_module(module_name), func_name)(**cell.setup_kwargs)
+
+
+def _trial_columns(trial) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    rows = trial.actions
+    pi1 = [
+        row.action_prob if row.action == 1 else 1.0 - row.action_prob for row in rows
+    ]
+    decisions = {
+        "group_id": np.asarray([r.group_id for r in rows], dtype=str),
+        "decision_type": np.asarray([r.decision_type for r in rows], dtype=str),
+        "decision_idx": np.asarray([r.decision_idx for r in rows], dtype=np.int64),
+        "action": np.asarray([r.action for r in rows], dtype=np.int8),
+        "action_prob": np.asarray([r.action_prob for r in rows], dtype=np.float64),
+        "pi1": np.asarray(pi1, dtype=np.float64),
+        "is_warmup": np.asarray([r.is_warmup for r in rows], dtype=bool),
+        "reward": np.asarray(
+            [np.nan if r.reward is None else r.reward for r in rows], dtype=np.float64
+        ),
+        "request_timestamp": np.asarray(
+            [r.request_timestamp for r in rows], dtype="datetime64[s]"
+        ),
+        "uniform_cursor": np.asarray(
+            [(r.random_state or {}).get("sampler_cursor_end", {}).get("uniform", -1) for r in rows],
+            dtype=np.int64,
+        ),
+    }
+    snaps = trial.repository.snapshots
+    snapshots = {
+        "snapshot_type": np.asarray([s.snapshot_type for s in snaps], dtype=str),
+        "decision_type": np.asarray([s.decision_type for s in snaps], dtype=str),
+        "group_id": np.asarray([s.group_id or "" for s in snaps], dtype=str),
+        "agent_decision_index": np.asarray([s.agent_decision_index for s in snaps], dtype=np.int64),
+        "sample_size": np.asarray([s.sample_size for s in snaps], dtype=np.int64),
+        "trace": np.asarray(
+            [float(np.trace(np.asarray(s.covariance, dtype=np.float64))) for s in snaps],
+            dtype=np.float64,
+        ),
+        "theta_action": np.asarray(
+            [float(s.theta[1]) if len(s.theta) > 1 else np.nan for s in snaps],
+            dtype=np.float64,
+        ),
+    }
+    return decisions, snapshots
+
+
+def run_cell(cell: Cell, path: str) -> str:
+    """Worker entry point: run one cell and write its columns to ``path``."""
+    from tests.headless_simulation import run_headless_simulation
+
+    _run_setup(cell)
+    trial = run_headless_simulation(
+        cell.algorithm,
+        num_weeks=cell.num_weeks,
+        num_dyads=cell.num_dyads,
+        seed=cell.seed,
+        group_prefix=cell.group_prefix,
+        config_overrides=cell.config_overrides,
+    )
+    if trial.results["errors"]:
+        raise RuntimeError(f"{cell}: {len(trial.results['errors'])} simulator errors, "
+                           f"first={trial.results['errors'][0]}")
+    decisions, snapshots = _trial_columns(trial)
+    columns = {f"decisions__{k}": v for k, v in decisions.items()}
+    columns.update({f"snapshots__{k}": v for k, v in snapshots.items()})
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_cell(cell: Cell, path: Path, cached: bool = True) -> CellResult:
+    decisions: dict[str, np.ndarray] = {}
+    snapshots: dict[str, np.ndarray] = {}
+    with np.load(path, allow_pickle=False) as data:
+        for name in data.files:
+            table, column = name.split("__", 1)
+            (decisions if table == "decisions" else snapshots)[column] = data[name]
+    return CellResult(cell=cell, decisions=decisions, snapshots=snapshots, path=path, cached=cached)
+
+
+# ------------------------------------------------------------------ driver
+
+def run_experiment(
+    cells: list[Cell],
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+    max_workers: int | None = None,
+    force: bool = False,
+) -> list[CellResult]:
+    """Return one ``CellResult`` per cell (same order), computing only the
+    cells missing from ``cache_dir`` (or every cell when ``force``)."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    version = code_version()
+    paths = [cache_dir / f"{cell.key(version)}.npz" for cell in cells]
+
+    todo = [i for i, path in enumerate(paths) if force or not path.exists()]
+    # Duplicate cells share one computation.
+    unique: dict[Path, int] = {}
+    for i in todo:
+        unique.setdefault(paths[i], i)
+
+    if unique:
+        workers = max_workers or min(len(unique), os.cpu_count() or 1)
+        print(f"[runner] {len(cells) - len(todo)} cached, computing {len(unique)} cell(s) "
+              f"on {workers} worker(s) (code version {version})")
+        # One cell per worker process: setup hooks monkeypatch module state.
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+            futures = {
+                pool.submit(run_cell, cells[i], str(path)): (i, time.perf_counter())
+                for path, i in unique.items()
+            }
+            for future in as_completed(futures):
+                i, started = futures[future]
+                future.result()
+                print(f"[runner] done {cells[i]} in {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"[runner] all {len(cells)} cell(s) cached (code version {version})")
+
+    computed = set(unique)
+    return [load_cell(cell, path, cached=path not in computed) for cell, path in zip(cells, paths)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--algorithms", default="eb_gradient")
+    ap.add_argument("--seeds", default="42")
+    ap.add_argument("--num-dyads", type=int, default=25)
+    ap.add_argument("--num-weeks", type=int, default=35)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--force", action="store_true", help="Recompute even if cached.")
+    args = ap.parse_args()
+
+    cells = [
+        Cell(
+            algorithm=algorithm,
+            seed=int(seed),
+            num_dyads=args.num_dyads,
+            num_weeks=args.num_weeks,
+            config_overrides=dict(ANALYSIS_CONFIG_OVERRIDES),
+        )
+        for algorithm in args.algorithms.split(",")
+        for seed in args.seeds.split(",")
+    ]
+    for result in run_experiment(cells, args.cache_dir, args.workers, args.force):
+        d = result.decisions
+        print(
+            f"{result.cell.algorithm:>16s} seed={result.cell.seed:<4d} "
+            f"decisions={len(d['action'])} mean_pi1={float(np.mean(d['pi1'])):.3f} "
+            f"{'(cached)' if result.cached else ''} -> {result.path}"
+        )
+
+
+if __name__ == "__main__":
+    main()
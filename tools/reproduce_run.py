@@ -13,11 +13,18 @@ Input sources (choose one):
   --snapshot PATH    a repro snapshot directory (contains actions.json,
                      study_data.json, groups.json, and — optionally —
                      model_update_requests.json produced by this tool when
-                     the --augment flag was used during the original run).
+                     the --augment flag was used during the original run,
+                     and online_folds.json).
   --exports PATH     a `flask export-csv` output directory. CSVs must
                      include groups, actions, study_data, and
                      model_update_requests.
 
+Decisions drawn between updates from an online-folded posterior
+(ONLINE_POSTERIOR_UPDATES) record the newest fold row they applied as
+``random_state["online_version"]``; the replay refolds the logged fold
+rows (online_folds.json, or the online rows of model_parameters.csv) up to
+that row onto the replayed posterior.
+
 Usage:
     python tools/reproduce_run.py \\
         --buffer buffers/study_buffer.npz \\
@@ -30,6 +37,7 @@ mismatches.
 from __future__ import annotations
 
 import argparse
+import ast
 import csv
 import datetime
 import json
@@ -37,6 +45,7 @@ import os
 import sys
 from dataclasses import dataclass
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any
 
 # Ensure project root importable
@@ -165,6 +174,7 @@ def _load_exports(exports_dir: Path) -> list[Event]:
         )
 
     for row in read_csv("model_update_requests.csv"):
+        row["sampler_window"] = _maybe_json(row.get("sampler_window"))
         events.append(
             Event(
                 ts=_parse_ts(row.get("request_timestamp")),
@@ -200,12 +210,19 @@ def _build_app_with_buffer(buffer_path: str):
     return app
 
 
-def reproduce(buffer_path: str, events: list[Event], verbose: bool = False) -> dict:
+def reproduce(
+    buffer_path: str,
+    events: list[Event],
+    verbose: bool = False,
+    online_folds: list[dict] | None = None,
+) -> dict:
     """
     Replay the event stream against a fresh in-memory DB with the given
-    buffer. Returns a report dict.
+    buffer. ``online_folds`` are the logged online posterior fold rows.
+    Returns a report dict.
     """
     app = _build_app_with_buffer(buffer_path)
+    app.online_posteriors = _ReplayFolds(online_folds or [])
 
     from app.extensions import db
     from app.models import (
@@ -281,6 +298,79 @@ def _replay_add_group(payload: dict, db, Group) -> None:
     db.session.commit()
 
 
+def _load_online_folds(snapshot_dir: Path) -> list[dict]:
+    path = snapshot_dir / "online_folds.json"
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _load_exported_online_folds(exports_dir: Path) -> list[dict]:
+    from app.online_posterior import ONLINE_FOLD, ONLINE_RESET
+
+    path = exports_dir / "model_parameters.csv"
+    if not path.exists():
+        return []
+    rows = []
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("snapshot_type") not in (ONLINE_FOLD, ONLINE_RESET):
+                continue
+            rows.append(
+                {
+                    "id": int(row["id"]),
+                    "snapshot_type": row["snapshot_type"],
+                    "decision_type": row.get("decision_type") or None,
+                    "group_id": row.get("group_id") or None,
+                    # export-csv writes Python reprs of the JSON columns.
+                    "theta": ast.literal_eval(row["theta"]) if row.get("theta") else None,
+                    "metadata_json": ast.literal_eval(row.get("metadata_json") or "{}"),
+                }
+            )
+    return rows
+
+
+class _ReplayFolds:
+    """
+    Stands in for the online posterior store (app/online_posterior.py)
+    while the decisions replay: refolds the logged fold rows up to the
+    replayed decision's ``online_version`` onto the replayed posterior.
+    """
+
+    def __init__(self, rows: list[dict]):
+        self.rows = sorted(rows, key=lambda row: int(row["id"]))
+        self.version = 0
+
+    def get(self, decision_type, group_id, base_id, mean, cov):
+        from app.online_posterior import ONLINE_FOLD, ONLINE_RESET, OnlinePosterior, refold
+
+        if not self.version:
+            return None
+        reset = max(
+            (
+                row["id"]
+                for row in self.rows
+                if row["snapshot_type"] == ONLINE_RESET and row["id"] < self.version
+            ),
+            default=0,
+        )
+        folds = [
+            SimpleNamespace(**row)
+            for row in self.rows
+            if row["snapshot_type"] == ONLINE_FOLD
+            and reset < row["id"] <= self.version
+            and row["decision_type"] == decision_type
+            and row["group_id"] == group_id
+        ]
+        if not folds:
+            return None
+        return refold(OnlinePosterior(tuple(base_id), mean, cov, 0, frozenset()), folds)
+
+    def agent_version(self, decision_type) -> int:
+        return self.version
+
+
 def _replay_action(app, payload, db, Action, ModelParameters):
     group_id = payload["group_id"]
     decision_type = payload["decision_type"]
@@ -301,6 +391,13 @@ def _replay_action(app, payload, db, Action, ModelParameters):
         ModelParameters.timestamp.desc()
     ).first()
 
+    # Decisions drawn between updates from an online-folded posterior logged
+    # the newest fold row applied; the replay refolds up to it.
+    logged_state = payload.get("random_state")
+    if isinstance(logged_state, str):
+        logged_state = ast.literal_eval(logged_state)
+    app.online_posteriors.version = int((logged_state or {}).get("online_version") or 0)
+
     action, prob, random_state = app.rl_algorithm.get_action(
         group_id,
         state,
@@ -402,10 +499,19 @@ def _replay_update(app, payload, db, StudyData):
         ModelParameters.timestamp.desc()
     ).first()
 
-    status, _ = app.rl_algorithm.update(
-        {"probability_of_action": current_params.probability_of_action},
-        {"records": records, "current_index": {}},
-    )
+    # Updates run by the worker process (app/update_worker.py) drew only from
+    # the window reserved at dispatch; the API process resumed past it.
+    window = payload.get("sampler_window")
+    if window:
+        app.sampler.confine(window)
+    try:
+        status, _ = app.rl_algorithm.update(
+            {"probability_of_action": current_params.probability_of_action},
+            {"records": records, "current_index": {}},
+        )
+    finally:
+        if window:
+            app.sampler.restore({"normal": window["normal"][1], "uniform": window["uniform"][1]})
     if not status:
         raise RuntimeError("algorithm.update returned False")
 
@@ -441,11 +547,13 @@ def main():
 
     if args.snapshot:
         events = _load_snapshot(Path(args.snapshot))
+        online_folds = _load_online_folds(Path(args.snapshot))
     else:
         events = _load_exports(Path(args.exports))
+        online_folds = _load_exported_online_folds(Path(args.exports))
 
     print(f"Loaded {len(events)} events")
-    report = reproduce(args.buffer, events, verbose=args.verbose)
+    report = reproduce(args.buffer, events, verbose=args.verbose, online_folds=online_folds)
 
     print()
     print("== report ==")
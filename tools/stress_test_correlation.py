@@ -16,14 +16,18 @@ matches the linear-model assumption of the stress test.
 The two paired features are chosen from the AYA continuous variables;
 the user can swap them via ``--pair COL_A,COL_B`` (default: action·indicator
 columns of ``aya_app_burden`` and ``aya_app_engagement``).
+
+Each ρ is one cell of ``tools/experiment_runner.py``: the grid runs in
+parallel on the headless engine and finished cells are cached, so
+re-plotting does not rerun the trials (``--force`` recomputes).
 """
 
 from __future__ import annotations
 
 import argparse
-import datetime
+import os
 import sys
-import threading as _threading
+from collections import defaultdict
 from pathlib import Path
 
 import matplotlib
@@ -34,26 +38,21 @@ import numpy as np
 REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-# Patch /update Thread + suppress callback.
-import app.routes.update as _update_module
-
-class _SyncThread(_threading.Thread):
-    def start(self):  # type: ignore[override]
-        self.run()
-
-_update_module.Thread = _SyncThread
-
-import requests as _requests
-_requests.post = lambda *a, **kw: type("R", (), {"status_code": 200, "text": ""})()
-
-from config import TestingConfig
-import os
-TestingConfig.SAMPLE_BUFFER_UNIFORMS = 50_000
-TestingConfig.SAMPLE_BUFFER_NORMALS = 2_000_000
-TestingConfig.RL_ALGORITHM = os.environ.get("RL_ALGORITHM", "hybrid_rel_pool")
-
 import app.feature_builder as fb_module
-from tools.validate_prior_in_rl_api import run_simulation_and_collect, AGENT_ORDER, AGENT_LABELS
+from tools.experiment_runner import (
+    ANALYSIS_CONFIG_OVERRIDES,
+    DEFAULT_CACHE_DIR,
+    Cell,
+    CellResult,
+    run_experiment,
+)
+
+AGENT_ORDER = ("aya_message", "cp_message", "dyad_game")
+AGENT_LABELS = {
+    "aya_message": "AYA (twice/day)",
+    "cp_message": "CP (daily)",
+    "dyad_game": "REL (weekly)",
+}
 
 FIG_DIR = REPO_ROOT.parent / "Monitoring_Algorithm/figures/eb_gradient_prior_validation"
 FIG_DIR.mkdir(parents=True, exist_ok=True)
@@ -135,7 +134,7 @@ def apply_correlation_patch(rho: float, pair: tuple[str, str], mode: str = "pair
                             latent_seed: int = 12345) -> None:
     global _RHO, _PAIR, _MODE, _LATENT_RNG
     _RHO = float(rho)
-    _PAIR = pair
+    _PAIR = tuple(pair)
     _MODE = mode
     _LATENT_RNG = np.random.default_rng(latent_seed)
     fb_module.ProtocolRLFeatureBuilder.expand_base_to_phi = _expand_with_correlation
@@ -147,6 +146,58 @@ def restore_feature_builder() -> None:
 
 # ----- per-ρ run + summary plot --------------------------------------------
 
+def rho_cell(rho: float, pair: tuple[str, str], mode: str, algorithm: str,
+             num_dyads: int, num_weeks: int) -> Cell:
+    """One experiment cell; ρ > 0 applies the correlation patch in the worker."""
+    return Cell(
+        algorithm=algorithm,
+        num_dyads=num_dyads,
+        num_weeks=num_weeks,
+        config_overrides=dict(ANALYSIS_CONFIG_OVERRIDES),
+        setup="tools.stress_test_correlation:apply_correlation_patch" if rho > 0.0 else None,
+        setup_kwargs={"rho": rho, "pair": list(pair), "mode": mode} if rho > 0.0 else {},
+    )
+
+
+def collect_from_result(result: CellResult) -> dict:
+    """Rebuild the ``run_simulation_and_collect`` dump (hyper / posterior /
+    actions per agent) from a cached experiment cell."""
+    out: dict = {"hyper": {}, "posterior": {}, "actions": {}}
+    for agent in AGENT_ORDER:
+        hyper = result.snapshots_for("hyper", agent)
+        order = np.argsort(hyper["agent_decision_index"], kind="stable")
+        out["hyper"][agent] = [
+            {
+                "agent_idx": int(hyper["agent_decision_index"][i]),
+                "sample_size": int(hyper["sample_size"][i]),
+                "trace": float(hyper["trace"][i]),
+                "theta_action": float(hyper["theta_action"][i]),
+            }
+            for i in order
+        ]
+
+        post = result.snapshots_for("posterior", agent)
+        if len(post["trace"]):
+            by_idx: dict[int, list[float]] = defaultdict(list)
+            for idx, tr in zip(post["agent_decision_index"], post["trace"]):
+                by_idx[int(idx)].append(float(tr))
+            out["posterior"][agent] = sorted(by_idx.items())
+        else:
+            # Fully-pooled learners write one shared local_fit per refresh.
+            pooled = result.snapshots_for("local_fit", agent)
+            pooled_traces = pooled["trace"][pooled["group_id"] == ""]
+            out["posterior"][agent] = [
+                (i + 1, [float(tr)]) for i, tr in enumerate(pooled_traces)
+            ]
+
+        acts = result.decisions_for(agent)
+        out["actions"][agent] = [
+            (float(a), float(pi), "warmup" if w else "eb")
+            for a, pi, w in zip(acts["action"], acts["pi1"], acts["is_warmup"])
+        ]
+    return out
+
+
 def _summarize_run(data: dict) -> dict[str, dict]:
     """Compress the raw snapshot dump into the per-ρ summary plotted below:
     hyper trace trajectory, posterior trace trajectory, cumulative π."""
@@ -269,6 +320,10 @@ def main():
     ap.add_argument("--mode", choices=("pair", "all"), default="pair",
                     help="pair = correlate one AYA variable pair only; "
                          "all = equicorrelate every value column across all agents via a shared latent.")
+    ap.add_argument("--algorithm", default=os.environ.get("RL_ALGORITHM", "hybrid_rel_pool"))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--force", action="store_true", help="Recompute cached ρ cells.")
     ap.add_argument(
         "--out",
         default=None,
@@ -286,23 +341,21 @@ def main():
                    else "stress_test_correlation_all.png")
     )
 
-    summaries: dict[float, dict] = {}
-    for rho in rhos:
-        if args.mode == "pair":
-            print(f"\n=== running mode=pair rho={rho:.2f} (pair = {pair[0]}, {pair[1]}) ===")
-        else:
-            print(f"\n=== running mode=all rho={rho:.2f} (equicorrelated across all agents/vars) ===")
-        if rho > 0.0:
-            apply_correlation_patch(rho, pair, mode=args.mode)
-        else:
-            restore_feature_builder()
-        try:
-            data = run_simulation_and_collect(
-                num_dyads=args.num_dyads, num_weeks=args.num_weeks
-            )
-            summaries[rho] = _summarize_run(data)
-        finally:
-            restore_feature_builder()
+    global _MODE
+    _MODE = args.mode
+    if args.mode == "pair":
+        print(f"running mode=pair rho={rhos} (pair = {pair[0]}, {pair[1]})")
+    else:
+        print(f"running mode=all rho={rhos} (equicorrelated across all agents/vars)")
+    cells = [
+        rho_cell(rho, pair, args.mode, args.algorithm, args.num_dyads, args.num_weeks)
+        for rho in rhos
+    ]
+    results = run_experiment(cells, args.cache_dir, args.workers, args.force)
+    summaries: dict[float, dict] = {
+        rho: _summarize_run(collect_from_result(result))
+        for rho, result in zip(rhos, results)
+    }
 
     plot_stress_grid(summaries, out_path)
 